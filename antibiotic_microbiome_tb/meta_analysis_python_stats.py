@@ -20,9 +20,15 @@ from pathlib import Path
 import statsmodels.api as sm
 import statsmodels.formula.api as smf
 from scipy import stats
+import sys
 import warnings
 warnings.filterwarnings("ignore")
 
+# Add the research-automation-core to Python path
+sys.path.append(str(Path(__file__).resolve().parent.parent / "research-automation-core"))
+
+from resampling_engine import ResamplingEngine
+
 print("📦 Python statistical libraries loaded successfully")
 
 # File paths
@@ -31,6 +37,10 @@ EXTRACTION_FILE = DATA_DIR / "data_extraction_detailed_20250925.json"
 QUALITY_FILE = DATA_DIR / "robins_assessment_detailed_20250925.json"
 OUTPUT_DIR = DATA_DIR / "meta_analysis_outputs"
 
+# Resampling inference settings
+N_RESAMPLES = 10000
+RESAMPLING_SEED = 20250925
+
 # Create output directory
 OUTPUT_DIR.mkdir(exist_ok=True)
 
@@ -73,7 +83,7 @@ def create_integrated_dataset(study_chars, antibiotics, microbiome, clinical, qu
         antibiotic_match = antibiotics[antibiotics['study_id'] == study_id]
         microbiome_match = microbiome[microbiome['study_id'] == study_id]
         clinical_match = clinical[clinical['study_id'] == study_id]
-        quality_match = quality[pd.Series([rec.get('study_id') == study_id for rec in quality['study_id'] if isinstance(rec, dict) or rec == study_id])]
+        quality_match = quality[quality['study_id'] == study_id]
 
         if not antibiotic_match.empty and not microbiome_match.empty and not clinical_match.empty and not quality_match.empty:
             # Extract microbiome data
@@ -166,6 +176,11 @@ def perform_meta_analysis(data, outcome_var, outcome_name):
         z_stat = weighted_mean / se if se > 0 else 0
         p_value = 2 * (1 - stats.norm.cdf(abs(z_stat)))
 
+        # Bootstrap CIs and permutation p-values
+        engine = ResamplingEngine(n_resamples=N_RESAMPLES, seed=RESAMPLING_SEED)
+        # Same inverse-variance fixed-effect estimator as the reported weighted_mean
+        resampling = engine.full_inference(effect_sizes, standard_errors ** 2, estimator='fixed')
+
         result = {
             'outcome': outcome_name,
             'studies': len(data),
@@ -177,7 +192,11 @@ def perform_meta_analysis(data, outcome_var, outcome_name):
             'i_squared': round(float(i_squared), 1),
             'heterogeneity_level': 'Low' if i_squared < 25 else 'Moderate' if i_squared < 50 else 'High' if i_squared < 75 else 'Very High',
             'direction': 'Beneficial' if weighted_mean > 0 else 'Harmful' if weighted_mean < 0 else 'No Change',
-            'significance': 'Significant' if p_value < 0.05 else 'Not Significant'
+            'significance': 'Significant' if p_value < 0.05 else 'Not Significant',
+            'bootstrap_ci_lower': round(resampling['bootstrap']['overall_effect']['ci_lower'], 3),
+            'bootstrap_ci_upper': round(resampling['bootstrap']['overall_effect']['ci_upper'], 3),
+            'permutation_p_value': round(resampling['effect_test']['p_value'], 4),
+            'heterogeneity_p_value': round(resampling['heterogeneity_test']['p_value'], 4)
         }
 
         return result
@@ -307,7 +326,7 @@ def generate_publication_report(all_results, dataset, output_file):
 {subgroup_content}
 
 ## Methodological Notes
-- **Statistical Method**: Random effects meta-analysis (inverse-variance weighted)
+- **Statistical Method**: Inverse-variance weighted (fixed-effect) meta-analysis; bootstrap CIs and permutation p-values for the same estimator
 - **Heterogeneity Assessment**: I² statistic with 95% confidence intervals
 - **Quality Control**: ROBINS-I bias risk assessment for all studies
 - **Effect Measure**: Standardized Mean Difference (SMD)
@@ -327,50 +346,6 @@ def generate_publication_report(all_results, dataset, output_file):
 *Python-based meta-analysis using statsmodels and scientific computing libraries*
 *Publication-ready systematic review of antibiotic-microbiome interactions*
 *Generated: {date_generated}*"""
-# Meta-Analysis: Antibiotic-Microbiome Interactions in TB Treatment
-
-## Study Overview
-- **Total Studies**: {len(dataset)}
-- **Total Participants**: {total_participants} patients
-- **Geographic Distribution**: {", ".join(countries)}
-- **Study Duration**: {dataset['duration_weeks'].min()}-{dataset['duration_weeks'].max()} weeks
-- **Quality Assessment**: ROBINS-I methodology applied
-
-## Primary Outcomes Meta-Analysis Results
-
-| Outcome | Studies | Effect Size (95% CI) | P-value | I² | Direction | Significance |
-|---------|---------|----------------------|--------|---|-----------|--------------|
-{f"table_content"}
-
-## Key Findings
-- **Primary Effect**: Consistent negative impact on microbial diversity
-- **Confidence Level**: {quality_distribution.index[0].title()} risk in most studies
-- **Clinical Implications**: Strong evidence for microbiome monitoring in TB treatment
-
-## Subgroup Analyses
-{f"subgroup_content"}
-
-## Methodological Notes
-- **Statistical Method**: Inverse-variance weighted meta-analysis
-- **Heterogeneity**: {np.mean([r['i_squared'] for r in primary_results if r]):.1f}% average I²
-- **Quality Control**: ROBINS-I bias assessment included
-- **Effect Measure**: Standardized mean difference
-
-## Clinical Recommendations
-1. **Monitoring**: Implement microbiome assessment during TB therapy
-2. **Interventions**: Consider probiotic supplementation to prevent dysbiosis
-3. **Personalization**: Use microbiome profiles for treatment optimization
-
-## Research Gaps
-1. Randomized controlled trials needed for causal evidence
-2. Long-term microbiome recovery studies required
-3. Specific probiotic strain effectiveness research needed
-
----
-*Analysis conducted with Python statistics libraries and meta-analysis methods*
-*Publication-ready results for clinical and research application*
-*Generated: {datetime.now().strftime('%B %d, %Y')}*
-"""
 
     # Create results table content
     table_content = ""
@@ -384,15 +359,15 @@ def generate_publication_report(all_results, dataset, output_file):
             subgroup_content += f"- **{result['outcome']}**: {result['effect_size']:.3f} (95% CI: {result['ci_lower']:.3f}, {result['ci_upper']:.3f}), I²={result['i_squared']:.1f}%\n"
 
     # Format the report
-    report = report.format(
-        len(dataset),
-        total_participants,
-        ", ".join(countries),
-        dataset['duration_weeks'].min(),
-        dataset['duration_weeks'].max(),
-        quality_distribution.index[0].title(),
+    report = report_template.format(
+        studies_count=len(dataset),
+        participants=total_participants,
+        countries=", ".join(countries),
+        min_weeks=dataset['duration_weeks'].min(),
+        max_weeks=dataset['duration_weeks'].max(),
         table_content=table_content,
-        subgroup_content=subgroup_content
+        subgroup_content=subgroup_content,
+        date_generated=datetime.now().strftime('%B %d, %Y')
     )
 
     with open(OUTPUT_DIR / output_file, 'w', encoding='utf-8') as f:
@@ -458,15 +433,15 @@ def main():
     generate_publication_report(results, meta_dataset, "meta_analysis_manuscript_section.md")
 
     # Display key findings
-    print("
-📈 META-ANALYSIS COMPLETED SUCCESSFULLY!"    print(f"📁 Results saved to: {OUTPUT_DIR}")
+    print("\n📈 META-ANALYSIS COMPLETED SUCCESSFULLY!")
+    print(f"📁 Results saved to: {OUTPUT_DIR}")
     print(f"📊 Studies analyzed: {len(meta_dataset)}")
     print(f"🔬 Outcomes evaluated: {len([r for r in results if r])}")
     print(f"✨ Outputs: Dataset CSV, Results CSV, Forest plot PNG, Publication report")
 
     if results:
-        print("
-🎯 KEY FINDINGS SUMMARY:"        significant_results = [r for r in results if r and r['significance'] == 'Significant']
+        print("\n🎯 KEY FINDINGS SUMMARY:")
+        significant_results = [r for r in results if r and r['significance'] == 'Significant']
         if significant_results:
             for result in significant_results[:3]:  # Show top 3
                 effect_desc = "reduction" if result['effect_size'] < 0 else "increase"
@@ -495,7 +470,7 @@ def main():
 if __name__ == "__main__":
     exit_code = main()
     if exit_code == 0:
-        print("
-✅ SUCCESS: Meta-analysis completed with publication-ready outputs"    else:
-        print("
-❌ ERROR: Meta-analysis execution failed"        print("   Check data files and Python dependencies"
+        print("\n✅ SUCCESS: Meta-analysis completed with publication-ready outputs")
+    else:
+        print("\n❌ ERROR: Meta-analysis execution failed")
+        print("   Check data files and Python dependencies")
@@ -19,15 +19,24 @@ Overall Risk: Low, Moderate, Serious, Critical, No Information
 
 import json
 import csv
+import sys
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List
 from collections import defaultdict
 
+import numpy as np
+import pandas as pd
+
+sys.path.append(str(Path(__file__).resolve().parents[1] / 'research-automation-core'))
+from robins_i import ROBINSIEngine, ROBINS_I_DOMAINS, question_columns
+
 # File paths for extracted data
 INCLUSION_DATA_FILE = Path("screening_detailed_results_20250925.json")
 EXTRACTION_DATA_FILE = Path("data_extraction_detailed_20250925.json")
 ASSESSMENT_OUTPUT_DIR = Path(".")
+# Signalling answers and cached judgements; re-runs only reassess studies whose answers changed
+SIGNALLING_ANSWERS_FILE = ASSESSMENT_OUTPUT_DIR / "robins_signalling_answers.csv"
 
 class ROBINSI_Assessment_Engine(object):
     """
@@ -60,50 +69,17 @@ class ROBINSI_Assessment_Engine(object):
             }
         }
 
-        # ROBINS-I domain criteria
+        # ROBINS-I domain criteria, grouped by stage
+        stages = {
+            'pre-intervention': ['confounding', 'selection'],
+            'at-intervention': ['intervention'],
+            'post-intervention': ['deviations', 'missing_data', 'outcomes', 'reporting']
+        }
         self.robin_criteria = {
-            'pre-intervention': {
-                'confounding': [
-                    'Did the authors adequately control for confounding?',
-                    'Were confounding domains similar between groups?',
-                    'Were no important differences present?'
-                ],
-                'selection': [
-                    'Was selection bias possibly avoided?',
-                    'Were control groups assembled at start?',
-                    'Was bias minimised through selection?'
-                ]
-            },
-            'at-intervention': {
-                'intervention': [
-                    'Were interventions classified correctly?',
-                    'Was intervention status unambiguous?',
-                    'Were exposure measurements valid?'
-                ]
-            },
-            'post-intervention': {
-                'deviations': [
-                    'Were intervention deviations avoided?',
-                    'Were deviations similar across groups?',
-                    'Were statistical methods appropriate?'
-                ],
-                'missing_data': [
-                    'Were missing data adequately handled?',
-                    'Was missingness similar across groups?',
-                    'Were missing data patterns considered?'
-                ],
-                'outcomes': [
-                    'Were outcome measurements valid?',
-                    'Were outcome assessors blinded?',
-                    'Were measurements consistent?'
-                ],
-                'reporting': [
-                    'Were results plausibly selected?',
-                    'Was reporting comprehensive?',
-                    'Were analyses pre-specified?'
-                ]
-            }
+            stage: {domain: ROBINS_I_DOMAINS[domain] for domain in domains}
+            for stage, domains in stages.items()
         }
+        self.engine = ROBINSIEngine.load(SIGNALLING_ANSWERS_FILE)
 
         self.load_studies()
 
@@ -140,11 +116,16 @@ class ROBINSI_Assessment_Engine(object):
         print(f"\n🧹 INITIATING ROBINS-I ASSESSMENT for {len(self.included_studies)} studies...")
         print("🔍 Assessing: Confounding, Selection, Intervention, Deviations, Missing data, Outcomes, Reporting")
 
-        for study in self.included_studies:
-            study_assessment = self.assess_study_bias(study)
-            self.assessment_results['study_assessments'].append(study_assessment)
+        changed = self.engine.record_answers(self.signalling_answers(self.included_studies))
+        print(f"🔄 Signalling answers changed for {len(changed)} studies")
 
-        self.calculate_domain_summaries()
+        judgements = self.engine.assess()
+        self.assessment_results['study_assessments'] = [
+            self.assess_study_bias(study, judgements.loc[str(study['study_id'])])
+            for study in self.included_studies
+        ]
+
+        self.calculate_domain_summaries(judgements)
         self.export_assessment_results()
 
         print(f"\n✅ ROBINS-I ASSESSMENT COMPLETE:")
@@ -152,22 +133,38 @@ class ROBINSI_Assessment_Engine(object):
         print(f"   📈 Quality distribution calculated")
         print(f"   📑 Domain-specific insights generated")
 
-    def assess_study_bias(self, study: Dict) -> Dict:
-        """Perform detailed ROBINS-I assessment for a single study"""
+    def signalling_answers(self, studies: List[Dict]) -> pd.DataFrame:
+        """Signalling-question answers for every study, derived from study characteristics
+
+        Simulated answers; in production these come from reviewer decisions. Reassuring
+        answers (PY) give a moderate judgement, small samples (<30) raise concern (PN,
+        serious) and longitudinal cohorts are answered Y (low). Population-specific
+        confounding in China/India is always considered (PY).
+        """
+        frame = pd.DataFrame(studies)
+        sample_size = pd.to_numeric(frame.get('sample_size'), errors='coerce').fillna(0).to_numpy()
+        design = frame.get('study_design', pd.Series('', index=frame.index)).fillna('').to_numpy()
+        country = frame.get('country', pd.Series('', index=frame.index)).fillna('').str.lower()
+
+        answer = np.where(sample_size < 30, 'PN', np.where(design == 'longitudinal_cohort', 'Y', 'PY'))
+        population_specific = (country.str.contains('china') | country.str.contains('india')).to_numpy()
+
+        answers = pd.DataFrame({col: answer for col in question_columns(ROBINS_I_DOMAINS)})
+        for col in answers.columns:
+            if col.startswith('confounding.'):
+                answers[col] = np.where(population_specific, 'PY', answers[col])
+        answers.insert(0, 'study_id', frame['study_id'].astype(str))
+        return answers
+
+    def assess_study_bias(self, study: Dict, judgement: pd.Series) -> Dict:
+        """Assemble the ROBINS-I assessment record for a single study from engine judgements"""
         study_id = study['study_id']
 
         domain_assessments = {
-            'confounding': self.assess_domain('confounding', study),
-            'selection': self.assess_domain('selection', study),
-            'intervention': self.assess_domain('intervention', study),
-            'deviations': self.assess_domain('deviations', study),
-            'missing_data': self.assess_domain('missing_data', study),
-            'outcomes': self.assess_domain('outcomes', study),
-            'reporting': self.assess_domain('reporting', study)
+            domain: self.assess_domain(domain, study, judgement[domain])
+            for domain in ROBINS_I_DOMAINS
         }
-
-        # Determine overall risk of bias
-        overall_risk = self.calculate_overall_risk(domain_assessments)
+        overall_risk = judgement['overall']
 
         study_assessment = {
             'study_id': study_id,
@@ -176,65 +173,34 @@ class ROBINSI_Assessment_Engine(object):
             'domains': domain_assessments,
             'overall_risk_of_bias': overall_risk,
             'risk_comment': self.generate_risk_comment(overall_risk),
-            'confidence_rating': self.calculate_confidence_rating(domain_assessments)
+            'confidence_rating': judgement['confidence_rating']
         }
 
         return study_assessment
 
-    def assess_domain(self, domain_name: str, study: Dict) -> Dict:
-        """Assess a specific ROBINS-I domain"""
-        study_id = study['study_id']
-        criteria = self.robin_criteria.get('pre-intervention', {}).get(domain_name, [])
-        if not criteria:
-            criteria = self.robin_criteria.get('at-intervention', {}).get(domain_name, [])
-        if not criteria:
-            criteria = self.robin_criteria.get('post-intervention', {}).get(domain_name, [])
-
-        # Simulated assessment based on study characteristics
-        # In production, this would involve systematic reviewer decisions
+    def assess_domain(self, domain_name: str, study: Dict, risk_judgment: str) -> Dict:
+        """Describe a ROBINS-I domain judgement"""
+        criteria = ROBINS_I_DOMAINS.get(domain_name, [])
 
         assessment = {
             'domain': domain_name,
             'criteria_evaluated': len(criteria) if criteria else 1,
-            'risk_judgment': 'moderate',  # Default assessment
+            'risk_judgment': risk_judgment,
             'support_for_judgment': 'Study demonstrates adequate methodological rigor in microbiome analysis',
             'additional_comments': 'Good quality sequencing methods and statistical analysis reported'
         }
 
-        # Adjust based on study characteristics
         if study.get('sample_size', 0) < 30:
-            assessment['risk_judgment'] = 'serious'
             assessment['support_for_judgment'] += 'Small sample size increases uncertainty'
-
         elif study.get('study_design') == 'longitudinal_cohort':
-            assessment['risk_judgment'] = 'low'
             assessment['support_for_judgment'] = 'Prospective design minimizes many bias types'
 
-        # Domain-specific adjustments
         if domain_name == 'confounding':
             if 'china' in study.get('country', '').lower() or 'india' in study.get('country', '').lower():
-                assessment['risk_judgment'] = 'moderate'
                 assessment['additional_comments'] += ', Population-specific factors considered'
 
         return assessment
 
-    def calculate_overall_risk(self, domain_assessments: Dict) -> str:
-        """Calculate overall risk of bias across all domains"""
-        risk_levels = [d['risk_judgment'] for d in domain_assessments.values()]
-        risk_hierarchy = {'low': 1, 'moderate': 2, 'serious': 3, 'critical': 4, 'no_information': 5}
-
-        max_risk_level = max(risk_hierarchy.get(r, 2) for r in risk_levels)
-
-        # ROBINS-I logic: any critical judgment = critical overall
-        if any(judgment == 'critical' for judgment in risk_levels):
-            return 'critical'
-        elif any(judgment == 'serious' for judgment in risk_levels):
-            return 'serious'
-        elif any(judgment == 'moderate' for judgment in risk_levels):
-            return 'moderate'
-        else:
-            return 'low'
-
     def generate_risk_comment(self, overall_risk: str) -> str:
         """Generate human-readable risk assessment comment"""
         comments = {
@@ -246,31 +212,14 @@ class ROBINSI_Assessment_Engine(object):
         }
         return comments.get(overall_risk, 'Risk assessment incomplete')
 
-    def calculate_confidence_rating(self, domain_assessments: Dict) -> str:
-        """Calculate confidence in meta-analysis results"""
-        overall_risk = self.calculate_overall_risk(domain_assessments)
-
-        confidence_map = {
-            'low': 'High confidence',
-            'moderate': 'Moderate confidence',
-            'serious': 'Low confidence',
-            'critical': 'Very low confidence',
-            'no_information': 'Uncertain'
-        }
-
-        return confidence_map.get(overall_risk, 'Uncertain')
-
-    def calculate_domain_summaries(self):
+    def calculate_domain_summaries(self, judgements: pd.DataFrame):
         """Calculate summarized statistics for each domain"""
-        for assessment in self.assessment_results['study_assessments']:
-            for domain_name, domain_data in assessment['domains'].items():
-                risk_level = domain_data['risk_judgment']
-                if domain_name not in self.assessment_results['domain_summary']:
-                    self.assessment_results['domain_summary'][domain_name] = defaultdict(int)
-                self.assessment_results['domain_summary'][domain_name][risk_level] += 1
-
-            overall_risk = assessment['overall_risk_of_bias']
-            self.assessment_results['overall_summary'][overall_risk] += 1
+        summary = self.engine.domain_summary(judgements.loc[[str(s['study_id']) for s in self.included_studies]])
+        for domain_name in ROBINS_I_DOMAINS:
+            self.assessment_results['domain_summary'][domain_name] = defaultdict(int, summary[domain_name])
+        self.assessment_results['overall_summary'] = defaultdict(int, summary['overall'])
+
+        self.engine.save(SIGNALLING_ANSWERS_FILE)
 
     def export_assessment_results(self):
         """Export comprehensive assessment results"""
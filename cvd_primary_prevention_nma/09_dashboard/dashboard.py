@@ -19,6 +19,10 @@ import sys
 # Add parent directory to path
 sys.path.append(str(Path(__file__).parent.parent))
 
+# Shared plotting layer (decimation + WebGL for long series)
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'research-automation-core'))
+from timeseries_plotting import WEBGL_THRESHOLD
+
 # Set page configuration
 st.set_page_config(
     page_title="CVD Primary Prevention NMA Dashboard",
@@ -464,7 +468,7 @@ def show_safety_profiles(results_df):
         else:
             safety_level = "🔴 Requires Monitoring"
 
-        st.markdown(f"**{row['treatment']}**: {safety_level} (Score: {row['safety_score']".1f"}%)")
+        st.markdown(f"**{row['treatment']}**: {safety_level} (Score: {row['safety_score']:.1f}%)")
 
 def show_evidence_network(studies_df):
     """Show evidence network visualization"""
@@ -559,9 +563,11 @@ def show_study_explorer(studies_df):
 
         with col2:
             # Publication year trend
+            # Same WebGL switch-over point as the other dashboards' series
             fig = px.scatter(studies_df, x='year', y='sample_size',
                            size='sample_size', color='intervention',
-                           title="Study Timeline and Size")
+                           title="Study Timeline and Size",
+                           render_mode='webgl' if len(studies_df) > WEBGL_THRESHOLD else 'svg')
             st.plotly_chart(fig, use_container_width=True)
 
 def show_component_analysis(results_df):
@@ -1,8 +1,14 @@
 import os
+import sys
 import pandas as pd
 import numpy as np
-from sklearn.metrics import cohen_kappa_score
 import datetime
+from pathlib import Path
+
+# Agreement engine lives in the core package
+sys.path.append(str(Path(__file__).resolve().parent / 'research-automation-core'))
+from interrater_agreement import compute_agreement, batch_agreement, combined_discrepancy_index
+from extraction_diff import ExtractionDiff, DiscrepancyStore
 
 # List of projects from the directory
 projects = [
@@ -82,7 +88,8 @@ def perform_second_extraction(original_df):
             if pd.api.types.is_numeric_dtype(original_df[col]):
                 mask = np.random.rand(len(original_df)) < 0.1  # 10% discrepancy rate
                 variation = np.random.uniform(-0.1, 0.1, size=len(original_df))
-                second_df.loc[mask, col] = original_df.loc[mask, col] * (1 + variation[mask])
+                # where() upcasts integer columns instead of assigning floats into them
+                second_df[col] = original_df[col].where(~mask, original_df[col] * (1 + variation))
         elif col.lower() in ['country', 'study design', 'ai system type', 'disease category']:
             # For categorical fields, introduce typos or slight variations
             if pd.api.types.is_object_dtype(original_df[col]):
@@ -94,34 +101,32 @@ def perform_second_extraction(original_df):
 def calculate_agreement_metrics(original_df, second_df):
     """
     Calculate inter-rater reliability metrics between original and second extractions.
-    """
-    metrics = {}
 
-    # Percent agreement for each column
-    percent_agreement = {}
-    kappa_scores = {}
+    All fields are scored at once: percent agreement (numeric fields within 1%),
+    Cohen's kappa, quadratic-weighted kappa for ordinal fields, Krippendorff's alpha
+    and ICC(2,1) for numeric fields.
+    """
+    return metrics_from_agreement(compute_agreement(original_df, second_df))
 
-    for col in original_df.columns:
-        if col in second_df.columns:
-            if pd.api.types.is_numeric_dtype(original_df[col]):
-                # For numeric, check if values match within 1%
-                matches = abs(original_df[col] - second_df[col]) / original_df[col] < 0.01
-                percent_agreement[col] = matches.mean() * 100
-            else:
-                # For categorical, exact match
-                matches = original_df[col] == second_df[col]
-                percent_agreement[col] = matches.mean() * 100
-
-                # Calculate kappa if categorical
-                try:
-                    kappa = cohen_kappa_score(original_df[col], second_df[col])
-                    kappa_scores[col] = kappa
-                except:
-                    kappa_scores[col] = 'N/A'
-
-    metrics['percent_agreement'] = percent_agreement
-    metrics['kappa_scores'] = kappa_scores
-    metrics['overall_percent_agreement'] = np.mean(list(percent_agreement.values()))
+def metrics_from_agreement(agreement):
+    """
+    Convert the per-field agreement table into the metrics dictionary used by the reports.
+    """
+    table = agreement['table']
+
+    def as_dict(column):
+        return {field: ('N/A' if pd.isna(value) else float(value)) for field, value in table[column].items()}
+
+    metrics = {
+        'percent_agreement': table['percent_agreement'].to_dict(),
+        'kappa_scores': as_dict('kappa'),
+        'weighted_kappa': as_dict('weighted_kappa'),
+        'krippendorff_alpha': as_dict('krippendorff_alpha'),
+        'icc': as_dict('icc'),
+        'field_types': table['kind'].to_dict(),
+        'overall_percent_agreement': table['percent_agreement'].mean() if len(table) else np.nan,
+        'agreement_table': table
+    }
 
     return metrics
 
@@ -147,16 +152,22 @@ This report presents the results of double data extraction validation for the {p
 
 ## Detailed Agreement Metrics by Field
 
-| Field | Percent Agreement | Cohen's Kappa |
-|-------|------------------|---------------|
+| Field | Type | Percent Agreement | Cohen's Kappa | Weighted Kappa | Krippendorff's Alpha | ICC |
+|-------|------|------------------|---------------|----------------|----------------------|-----|
 """
 
+    def fmt(value):
+        return value if value == 'N/A' else f"{value:.3f}"
+
     for field in metrics.get('percent_agreement', {}):
         percent = metrics['percent_agreement'][field]
-        kappa = metrics['kappa_scores'].get(field, 'N/A')
-        if kappa != 'N/A':
-            kappa = f"{kappa:.3f}"
-        report_content += f"| {field} | {percent:.2f}% | {kappa} |\n"
+        report_content += (
+            f"| {field} | {metrics.get('field_types', {}).get(field, '')} | {percent:.2f}% "
+            f"| {fmt(metrics['kappa_scores'].get(field, 'N/A'))} "
+            f"| {fmt(metrics.get('weighted_kappa', {}).get(field, 'N/A'))} "
+            f"| {fmt(metrics.get('krippendorff_alpha', {}).get(field, 'N/A'))} "
+            f"| {fmt(metrics.get('icc', {}).get(field, 'N/A'))} |\n"
+        )
 
     report_content += "\n## Discrepancy Analysis\n\n"
 
@@ -195,7 +206,7 @@ This report presents the results of double data extraction validation for the {p
     report_content += "\n## Validation Methodology\n\n"
     report_content += "1. Independent data extraction by second researcher (Cline)\n"
     report_content += "2. Comparison of first vs second extraction for each record and field\n"
-    report_content += "3. Calculation of percent agreement and Cohen's kappa for categorical variables\n"
+    report_content += "3. Calculation of percent agreement, Cohen's and weighted kappa, Krippendorff's alpha and ICC\n"
     report_content += "4. Analysis of discrepancy patterns and potential causes\n"
 
     # Ensure directory exists
@@ -206,87 +217,100 @@ This report presents the results of double data extraction validation for the {p
 
     return report_path
 
-def identify_discrepancies(original_df, second_df):
+def identify_discrepancies(original_df, second_df, store=None, comparison='default'):
     """
     Identify specific records with discrepancies for detailed reporting.
-    """
-    discrepancies = []
-
-    for idx in original_df.index:
-        original_row = original_df.loc[idx]
-        second_row = second_df.loc[idx]
-        row_discrepancies = []
-
-        for col in original_df.columns:
-            if col in second_df.columns:
-                if original_df[col].dtype in ['int64', 'float64']:
-                    if abs(original_row[col] - second_row[col]) > original_row[col] * 0.01:  # >1% difference
-                        row_discrepancies.append(f"{col}: {original_row[col]} → {second_row[col]}")
-                elif original_row[col] != second_row[col]:
-                    row_discrepancies.append(f"{col}: '{original_row[col]}' → '{second_row[col]}'")
-
-        if row_discrepancies:
-            discrepancies.append({
-                'Record_ID': idx + 1,
-                'Discrepancies': '; '.join(row_discrepancies)
-            })
 
-    return pd.DataFrame(discrepancies)
+    With a DiscrepancyStore the discrepancies are written there under `comparison`
+    (for adjudication queries) and read back for the report.
+    """
+    # Rows are paired by position; numeric fields tolerate a 1% difference, others must match exactly
+    key = '_record_id'
+    original = original_df.reset_index(drop=True).assign(**{key: np.arange(1, len(original_df) + 1)})
+    second = second_df.reset_index(drop=True).assign(**{key: np.arange(1, len(second_df) + 1)})
+    rules = {col: {'type': 'categorical'} for col in original_df.columns
+             if original_df[col].dtype not in ['int64', 'float64']}
+    diff = ExtractionDiff(key=key, rules=rules, rtol=0.01).stream(original, second, store=store,
+                                                                  comparison=comparison)
+
+    found = diff['discrepancies'] if store is None else store.query(comparison=comparison)
+    found = found[found['field'] != '__record__']
+    if found.empty:
+        return pd.DataFrame(columns=['Record_ID', 'Discrepancies'])
+
+    numeric = found['kind'] == 'numeric'
+    quote = np.where(numeric, '', "'")
+    described = found['field'] + ': ' + quote + found['first_value'].astype(str) + quote + \
+        ' → ' + quote + found['second_value'].astype(str) + quote
+    records = described.groupby(found['record_id'].astype(int), sort=True).agg('; '.join)
+    return pd.DataFrame({'Record_ID': records.index, 'Discrepancies': records.values})
+
+def load_extraction_pair(project):
+    """
+    Load a project's extraction and produce the second extraction (runs in a worker process).
+    """
+    original_df = pd.read_csv(data_files_mapping[project])
+    return original_df, perform_second_extraction(original_df)
 
 # Main execution
 if __name__ == "__main__":
     summary_reports = []
     timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
 
+    available = []
     for project in projects:
-        if project in data_files_mapping:
-            file_path = data_files_mapping[project]
-
-            if os.path.exists(file_path):
-                try:
-                    original_df = pd.read_csv(file_path)
-                    print(f"Processing {project}...")
-
-                    # Perform second extraction
-                    second_df = perform_second_extraction(original_df)
-
-                    # Calculate agreement metrics
-                    metrics = calculate_agreement_metrics(original_df, second_df)
-
-                    # Identify discrepancies
-                    discrepancies_df = identify_discrepancies(original_df, second_df)
-
-                    # Generate report
-                    report_path = generate_validation_report(project, original_df, second_df, metrics, discrepancies_df)
-                    summary_reports.append({
-                        'Project': project,
-                        'Report_Path': report_path,
-                        'Overall_Agreement': f"{metrics.get('overall_percent_agreement', 0):.2f}%",
-                        'Status': 'Completed'
-                    })
-                    print(f"Generated validation report for {project}")
-
-                except Exception as e:
-                    summary_reports.append({
-                        'Project': project,
-                        'Error': str(e),
-                        'Status': 'Failed'
-                    })
-                    print(f"Error processing {project}: {e}")
-            else:
-                summary_reports.append({
-                    'Project': project,
-                    'Error': 'Data file not found',
-                    'Status': 'Skipped'
-                })
-                print(f"Data file not found for {project}")
-        else:
+        if project not in data_files_mapping:
             summary_reports.append({
                 'Project': project,
                 'Error': 'No data extraction available',
                 'Status': 'Skipped'
             })
             print(f"No data extraction available for {project}")
+        elif not os.path.exists(data_files_mapping[project]):
+            summary_reports.append({
+                'Project': project,
+                'Error': 'Data file not found',
+                'Status': 'Skipped'
+            })
+            print(f"Data file not found for {project}")
+        else:
+            available.append(project)
+
+    # Agreement for all projects in parallel
+    print(f"Processing {len(available)} projects...")
+    results = batch_agreement(available, load_extraction_pair)
+
+    # Per-field discrepancies for every project, queryable by field, severity and record
+    discrepancy_store_path = "double_extraction_discrepancies.db"
+    store = DiscrepancyStore(discrepancy_store_path)
+
+    for project in available:
+        result = results[project]
+        if result['status'] != 'completed':
+            summary_reports.append({
+                'Project': project,
+                'Error': result['error'],
+                'Status': 'Failed'
+            })
+            print(f"Error processing {project}: {result['error']}")
+            continue
+
+        metrics = metrics_from_agreement(result)
+        discrepancies_df = identify_discrepancies(result['original'], result['second'], store, comparison=project)
+
+        # Generate report
+        report_path = generate_validation_report(project, result['original'], result['second'], metrics, discrepancies_df)
+        summary_reports.append({
+            'Project': project,
+            'Report_Path': report_path,
+            'Overall_Agreement': f"{metrics.get('overall_percent_agreement', 0):.2f}%",
+            'Status': 'Completed'
+        })
+        print(f"Generated validation report for {project}")
+
+    # Tidy discrepancy index across every project, for adjudication
+    discrepancy_index_path = f"double_extraction_discrepancy_index_{timestamp}.csv"
+    combined_discrepancy_index(results).to_csv(discrepancy_index_path, index=False)
 
     # Generate summary report
     summary_df = pd.DataFrame(summary_reports)
@@ -330,6 +354,8 @@ if __name__ == "__main__":
 DOUBLE DATA EXTRACTION VALIDATION COMPLETED
 ==================================================================
 Summary report saved to: {summary_report_path}
+Discrepancy index saved to: {discrepancy_index_path}
+Discrepancy store (for adjudication queries): {discrepancy_store_path}
 
 Individual project reports generated in their respective directories.
 Review the summary report for overview and individual reports for details.
@@ -9,104 +9,117 @@ import numpy as np
 import matplotlib.pyplot as plt
 import seaborn as sns
 from scipy import stats
+import sys
+from pathlib import Path
 import warnings
 warnings.filterwarnings('ignore')
 
+# Add the research-automation-core to Python path
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'research-automation-core'))
+
+from network_meta_analysis import NetworkMetaAnalysis
+
+# Inputs and outputs are located from this file, not the working directory
+PROJECT_DIR = Path(__file__).resolve().parents[1]
+DATA_FILE = PROJECT_DIR / '02_data_extraction' / 'extracted_data.csv'
+RESULTS_DIR = PROJECT_DIR / '04_results'
+
 # Set style for publication-ready plots
 plt.style.use('seaborn-v0_8')
 sns.set_palette("husl")
 
-def load_real_data():
+def load_real_data(data_file=DATA_FILE):
     """Load the real extracted data from published studies"""
-    data = pd.read_csv("drug_resistant_tb_nma/02_data_extraction/extracted_data.csv")
+    data = pd.read_csv(data_file)
     return data
 
-def calculate_treatment_effects():
-    """Calculate treatment effects from real data"""
+def classify_regimen(treatment):
+    """Map a trial arm label onto its regimen class (network node)"""
 
-    data = load_real_data()
+    if 'BPaLM' in treatment:
+        return 'BPaLM'
+    if 'BPaL' in treatment:
+        return 'BPaL'
+    if treatment == 'Short_MDR':
+        return 'Short_MDR'
+    if 'Long' in treatment or 'Standard' in treatment:
+        return 'Long_Individualized'
+    return treatment
 
-    # Group by treatment and calculate success rates
-    treatment_effects = {}
+def load_network_data(data_file=DATA_FILE):
+    """Real arm-level data with regimen classes as network nodes"""
 
-    # BPaL treatments (from Nix-TB and ZeNix)
-    bpal_data = data[data['treatment'].str.contains('BPaL')]
-    if not bpal_data.empty:
-        total_responders = bpal_data['responders'].sum()
-        total_patients = bpal_data['sampleSize'].sum()
-        treatment_effects['BPaL'] = {
-            'success_rate': total_responders / total_patients,
-            'ci_lower': 0,  # Would calculate properly with statsmodels
-            'ci_upper': 0,
-            'total_patients': total_patients,
-            'studies': len(bpal_data)
-        }
-
-    # BPaLM treatments (from TB-PRACTECAL and NExT)
-    bpalm_data = data[data['treatment'].str.contains('BPaLM')]
-    if not bpalm_data.empty:
-        total_responders = bpalm_data['responders'].sum()
-        total_patients = bpalm_data['sampleSize'].sum()
-        treatment_effects['BPaLM'] = {
-            'success_rate': total_responders / total_patients,
-            'ci_lower': 0,
-            'ci_upper': 0,
-            'total_patients': total_patients,
-            'studies': len(bpalm_data)
-        }
+    data = load_real_data(data_file)
+    data['regimen'] = data['treatment'].apply(classify_regimen)
+    return data
 
-    # Short MDR regimen (from STREAM)
-    short_data = data[data['treatment'] == 'Short_MDR']
-    if not short_data.empty:
-        total_responders = short_data['responders'].sum()
-        total_patients = short_data['sampleSize'].sum()
-        treatment_effects['Short_MDR'] = {
-            'success_rate': total_responders / total_patients,
-            'ci_lower': 0,
-            'ci_upper': 0,
-            'total_patients': total_patients,
-            'studies': len(short_data)
-        }
+def calculate_treatment_effects(data_file=DATA_FILE):
+    """Calculate pooled treatment success rates (logit-scale 95% CIs, Wilson at 0%/100%) from real data"""
+
+    data = load_network_data(data_file)
+
+    arms = data.groupby('regimen').agg(
+        responders=('responders', 'sum'),
+        total_patients=('sampleSize', 'sum'),
+        studies=('study_id', 'nunique')
+    )
+
+    # Wald interval on the log-odds scale keeps the CI inside (0, 1); it is undefined for
+    # arms with 0 or all responders, which get a Wilson score interval instead
+    n = arms['total_patients']
+    rate = arms['responders'] / n
+    boundary = (arms['responders'] == 0) | (arms['responders'] == n)
+    interior_rate = rate.where(~boundary, 0.5)
+    logit = np.log(interior_rate / (1 - interior_rate))
+    logit_se = np.sqrt(1 / (n * interior_rate) + 1 / (n * (1 - interior_rate)))
+    ci_lower = 1 / (1 + np.exp(-(logit - 1.96 * logit_se)))
+    ci_upper = 1 / (1 + np.exp(-(logit + 1.96 * logit_se)))
+
+    centre = (rate + 1.96 ** 2 / (2 * n)) / (1 + 1.96 ** 2 / n)
+    half_width = 1.96 * np.sqrt(rate * (1 - rate) / n + 1.96 ** 2 / (4 * n ** 2)) / (1 + 1.96 ** 2 / n)
+    ci_lower = ci_lower.where(~boundary, centre - half_width)
+    ci_upper = ci_upper.where(~boundary, centre + half_width)
 
-    # Long regimens (from STREAM and others)
-    long_data = data[data['treatment'].str.contains('Long|Standard')]
-    if not long_data.empty:
-        total_responders = long_data['responders'].sum()
-        total_patients = long_data['sampleSize'].sum()
-        treatment_effects['Long_Individualized'] = {
-            'success_rate': total_responders / total_patients,
-            'ci_lower': 0,
-            'ci_upper': 0,
-            'total_patients': total_patients,
-            'studies': len(long_data)
+    treatment_effects = {}
+    for regimen in arms.index:
+        treatment_effects[regimen] = {
+            'success_rate': rate[regimen],
+            'ci_lower': ci_lower[regimen],
+            'ci_upper': ci_upper[regimen],
+            'total_patients': int(arms.loc[regimen, 'total_patients']),
+            'studies': int(arms.loc[regimen, 'studies'])
         }
 
     return treatment_effects
 
-def calculate_sucra_ranking(treatment_effects):
-    """Calculate SUCRA rankings from real data"""
+def fit_network_model(data_file=DATA_FILE):
+    """Random-effects network meta-analysis (log odds ratios) of the comparative trials"""
+
+    nma = NetworkMetaAnalysis(load_network_data(data_file), treatment_col='regimen',
+                              reference='Long_Individualized')
+    nma.fit(model='random')
+    return nma
 
-    treatments = list(treatment_effects.keys())
-    n_treatments = len(treatments)
+def calculate_sucra_ranking(treatment_effects, data_file=DATA_FILE):
+    """Calculate SUCRA rankings from the network meta-analysis
+
+    Only regimens connected to the comparative network can be ranked; single-arm
+    evidence (e.g. Nix-TB, ZeNix) is reported through the pooled success rates.
+    """
+
+    nma = fit_network_model(data_file)
+    ranks = nma.rank_probabilities(n_draws=10000, seed=2025, higher_is_better=True)
+    effects = nma.results['effects']
 
-    # Create ranking matrix (higher success rate = better rank)
     rankings = {}
-    for i, tx1 in enumerate(treatments):
-        rank_sum = 0
-        for j, tx2 in enumerate(treatments):
-            if i != j:
-                # P(superior) based on success rate comparison
-                if treatment_effects[tx1]['success_rate'] > treatment_effects[tx2]['success_rate']:
-                    rank_sum += 1
-                elif treatment_effects[tx1]['success_rate'] == treatment_effects[tx2]['success_rate']:
-                    rank_sum += 0.5
-
-        # Convert to SUCRA (0-100 scale)
-        sucra = (rank_sum / (n_treatments - 1)) * 100
-        rankings[tx1] = {
-            'SUCRA': sucra,
-            'success_rate': treatment_effects[tx1]['success_rate'],
-            'rank': rank_sum + 1
+    for tx in ranks['sucra'].index:
+        rankings[tx] = {
+            'SUCRA': ranks['sucra'][tx],
+            'success_rate': treatment_effects[tx]['success_rate'],
+            'rank': int(round(ranks['mean_rank'][tx])),
+            'log_or': effects.loc[tx, 'estimate'],
+            'log_or_ci_lower': effects.loc[tx, 'ci_lower'],
+            'log_or_ci_upper': effects.loc[tx, 'ci_upper']
         }
 
     # Sort by SUCRA
@@ -114,11 +127,11 @@ def calculate_sucra_ranking(treatment_effects):
 
     return rankings, sorted_rankings
 
-def create_comparison_with_synthetic():
+def create_comparison_with_synthetic(data_file=DATA_FILE, results_dir=RESULTS_DIR):
     """Compare real results with synthetic results"""
 
     # Real treatment effects
-    real_effects = calculate_treatment_effects()
+    real_effects = calculate_treatment_effects(data_file)
 
     # Synthetic effects (from original summary)
     synthetic_effects = {
@@ -148,14 +161,14 @@ def create_comparison_with_synthetic():
     comparison_df = pd.DataFrame(comparison_data)
 
     # Save comparison
-    comparison_df.to_csv("drug_resistant_tb_nma/04_results/real_vs_synthetic_comparison.csv", index=False)
+    comparison_df.to_csv(Path(results_dir) / "real_vs_synthetic_comparison.csv", index=False)
 
     return comparison_df
 
-def create_real_forest_plot():
+def create_real_forest_plot(data_file=DATA_FILE, results_dir=RESULTS_DIR):
     """Create forest plot using real data"""
 
-    treatment_effects = calculate_treatment_effects()
+    treatment_effects = calculate_treatment_effects(data_file)
 
     # Prepare data for plotting
     treatments = []
@@ -167,15 +180,8 @@ def create_real_forest_plot():
         treatments.append(tx)
         success_rates.append(data['success_rate'])
 
-        # Calculate approximate 95% CI using normal approximation
-        rate = data['success_rate']
-        n = data['total_patients']
-        se = np.sqrt(rate * (1 - rate) / n)
-        ci_lower = max(0, rate - 1.96 * se)
-        ci_upper = min(1, rate + 1.96 * se)
-
-        ci_lowers.append(ci_lower)
-        ci_uppers.append(ci_upper)
+        ci_lowers.append(data['ci_lower'])
+        ci_uppers.append(data['ci_upper'])
 
     # Create forest plot
     fig, ax = plt.subplots(figsize=(10, 6))
@@ -203,17 +209,17 @@ def create_real_forest_plot():
                    bbox=dict(boxstyle='round,pad=0.3', facecolor='white', alpha=0.8))
 
     plt.tight_layout()
-    plt.savefig("drug_resistant_tb_nma/04_results/real_data_forest_plot.png",
+    plt.savefig(Path(results_dir) / "real_data_forest_plot.png",
                 dpi=300, bbox_inches='tight')
     plt.show()
 
     return fig, ax
 
-def create_real_sucra_plot():
+def create_real_sucra_plot(data_file=DATA_FILE, results_dir=RESULTS_DIR):
     """Create SUCRA ranking plot using real data"""
 
-    treatment_effects = calculate_treatment_effects()
-    rankings, sorted_rankings = calculate_sucra_ranking(treatment_effects)
+    treatment_effects = calculate_treatment_effects(data_file)
+    rankings, sorted_rankings = calculate_sucra_ranking(treatment_effects, data_file)
 
     # Prepare data for plotting
     treatments = [tx for tx, _ in sorted_rankings]
@@ -247,16 +253,16 @@ def create_real_sucra_plot():
                ha='center', va='top', fontsize=11, fontweight='bold', color='white')
 
     plt.tight_layout()
-    plt.savefig("drug_resistant_tb_nma/04_results/real_data_sucra_plot.png",
+    plt.savefig(Path(results_dir) / "real_data_sucra_plot.png",
                 dpi=300, bbox_inches='tight')
     plt.show()
 
     return fig, ax
 
-def analyze_safety_data():
+def analyze_safety_data(data_file=DATA_FILE):
     """Analyze safety outcomes from real data"""
 
-    data = load_real_data()
+    data = load_real_data(data_file)
 
     # Extract safety data
     safety_data = []
@@ -289,10 +295,10 @@ def analyze_safety_data():
 
     return safety_summary
 
-def create_safety_comparison_plot():
+def create_safety_comparison_plot(data_file=DATA_FILE, results_dir=RESULTS_DIR):
     """Create safety comparison plot"""
 
-    safety_data = analyze_safety_data()
+    safety_data = analyze_safety_data(data_file)
 
     # Prepare data for plotting
     treatments = list(safety_data.keys())
@@ -330,26 +336,26 @@ def create_safety_comparison_plot():
                 f'{rate:.1f}%', ha='center', va='bottom', fontsize=10, fontweight='bold')
 
     plt.tight_layout()
-    plt.savefig("drug_resistant_tb_nma/04_results/real_data_safety_comparison.png",
+    plt.savefig(Path(results_dir) / "real_data_safety_comparison.png",
                 dpi=300, bbox_inches='tight')
     plt.show()
 
     return fig, (ax1, ax2)
 
-def generate_real_results_summary():
+def generate_real_results_summary(data_file=DATA_FILE, results_dir=RESULTS_DIR):
     """Generate comprehensive summary of real data analysis"""
 
     # Calculate treatment effects
-    treatment_effects = calculate_treatment_effects()
+    treatment_effects = calculate_treatment_effects(data_file)
 
     # Calculate rankings
-    rankings, sorted_rankings = calculate_sucra_ranking(treatment_effects)
+    rankings, sorted_rankings = calculate_sucra_ranking(treatment_effects, data_file)
 
     # Analyze safety
-    safety_data = analyze_safety_data()
+    safety_data = analyze_safety_data(data_file)
 
     # Create comparison with synthetic
-    comparison = create_comparison_with_synthetic()
+    comparison = create_comparison_with_synthetic(data_file, results_dir)
 
     # Generate summary report
     summary = f"""
@@ -365,7 +371,10 @@ def generate_real_results_summary():
     summary += "\n## SUCRA Rankings (Real Data)\n\n"
 
     for i, (tx, ranking_info) in enumerate(sorted_rankings, 1):
-        summary += f"{i}. **{tx}**: SUCRA = {ranking_info['SUCRA']:.1f}% (Success rate: {treatment_effects[tx]['success_rate']:.1%})\n"
+        summary += (f"{i}. **{tx}**: SUCRA = {ranking_info['SUCRA']:.1f}% "
+                    f"(log OR vs Long_Individualized: {ranking_info['log_or']:.2f} "
+                    f"[{ranking_info['log_or_ci_lower']:.2f}, {ranking_info['log_or_ci_upper']:.2f}]; "
+                    f"Success rate: {treatment_effects[tx]['success_rate']:.1%})\n")
 
     summary += "\n## Safety Profile (Real Data)\n\n"
 
@@ -381,11 +390,11 @@ def generate_real_results_summary():
     summary += comparison.to_string(index=False)
 
     # Save summary
-    with open("drug_resistant_tb_nma/04_results/real_data_analysis_summary.md", 'w') as f:
+    with open(Path(results_dir) / "real_data_analysis_summary.md", 'w') as f:
         f.write(summary)
 
     print("Real data analysis completed!")
-    print("Results saved to drug_resistant_tb_nma/04_results/")
+    print(f"Results saved to {results_dir}/")
 
     return {
         'treatment_effects': treatment_effects,
@@ -394,18 +403,18 @@ def generate_real_results_summary():
         'comparison': comparison
     }
 
-def main():
-    """Main execution function"""
+def main(data_file=DATA_FILE, results_dir=RESULTS_DIR):
+    """Main execution function; reads data_file and writes every output to results_dir"""
 
     print("Starting real data analysis...")
 
     # Generate all visualizations
-    forest_fig, forest_ax = create_real_forest_plot()
-    sucra_fig, sucra_ax = create_real_sucra_plot()
-    safety_fig, safety_axes = create_safety_comparison_plot()
+    forest_fig, forest_ax = create_real_forest_plot(data_file, results_dir)
+    sucra_fig, sucra_ax = create_real_sucra_plot(data_file, results_dir)
+    safety_fig, safety_axes = create_safety_comparison_plot(data_file, results_dir)
 
     # Generate comprehensive summary
-    results = generate_real_results_summary()
+    results = generate_real_results_summary(data_file, results_dir)
 
     print("\n" + "="*60)
     print("REAL DATA ANALYSIS COMPLETE")
@@ -413,7 +422,7 @@ def main():
 
     # Print key findings
     print("\nTOP 3 TREATMENTS BY EFFICACY:")
-    rankings, sorted_rankings = calculate_sucra_ranking(results['treatment_effects'])
+    rankings, sorted_rankings = calculate_sucra_ranking(results['treatment_effects'], data_file)
     for i, (tx, _) in enumerate(sorted_rankings[:3], 1):
         sucra = rankings[tx]['SUCRA']
         rate = results['treatment_effects'][tx]['success_rate']
@@ -425,8 +434,8 @@ def main():
         myelo = safety['myelosuppression']
         print(f"{tx}: Neuropathy {neuro:.1f}%, Myelosuppression {myelo:.1f}%")
 
-    print(f"\nComparison with synthetic data saved to: drug_resistant_tb_nma/04_results/real_vs_synthetic_comparison.csv")
-    print(f"Complete analysis summary saved to: drug_resistant_tb_nma/04_results/real_data_analysis_summary.md")
+    print(f"\nComparison with synthetic data saved to: {Path(results_dir) / 'real_vs_synthetic_comparison.csv'}")
+    print(f"Complete analysis summary saved to: {Path(results_dir) / 'real_data_analysis_summary.md'}")
 
     return results
 
@@ -21,9 +21,9 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 class DataExtractor:
     """Automated data extraction system for MDR-TB studies"""
 
-    def __init__(self, config_path="../living_review_config.json"):
-        """Initialize the extraction system"""
-        self.config = self.load_config(config_path)
+    def __init__(self, config_path="../living_review_config.json", config=None):
+        """Initialize the extraction system (config may be passed in already loaded)"""
+        self.config = config if config is not None else self.load_config(config_path)
         self.setup_logging()
         self.extracted_data = []
 
@@ -458,19 +458,25 @@ class DataExtractor:
             else:
                 summary_df.to_csv(master_file, index=False)
 
-    def run_extraction(self):
-        """Run the complete extraction process"""
+    def run_extraction(self, new_studies: Optional[List[Dict[str, Any]]] = None):
+        """Run the complete extraction process
+
+        new_studies is the search batch handed over in memory; without it the most
+        recent search results file is loaded.
+        """
         self.logger.info("Starting automated data extraction...")
 
         # Load new studies
-        new_studies = self.load_new_studies()
+        if new_studies is None:
+            new_studies = self.load_new_studies()
 
         if not new_studies:
             self.logger.info("No new studies to process")
             return 0
 
         # Extract data from each study
-        extracted_studies = []
+        self.extracted_data = []
+        extracted_studies = self.extracted_data
         for study in new_studies:
             extracted = self.extract_data_from_study(study)
             if extracted:
@@ -19,10 +19,15 @@ sys.path.append(str(Path(__file__).parent.parent.parent))
 class LiteratureSearch:
     """Automated literature search system for MDR-TB studies"""
 
-    def __init__(self, config_path="living_review_config.json"):
-        """Initialize the search system with configuration"""
-        self.config = self.load_config(config_path)
+    def __init__(self, config_path="living_review_config.json", config=None, session=None):
+        """Initialize the search system with configuration
+
+        A scheduler running this in-process passes its already-loaded config and a
+        shared requests.Session so connections stay warm between stages and cycles.
+        """
+        self.config = config if config is not None else self.load_config(config_path)
         self.setup_logging()
+        self.session = session or requests.Session()
         self.search_results = []
 
     def load_config(self, config_path):
@@ -96,7 +101,7 @@ class LiteratureSearch:
             # PubMed E-utilities API
             base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esearch.fcgi"
 
-            response = requests.get(base_url, params=params, timeout=30)
+            response = self.session.get(base_url, params=params, timeout=30)
             response.raise_for_status()
 
             data = response.json()
@@ -105,11 +110,8 @@ class LiteratureSearch:
                 pmids = data['esearchresult'].get('idlist', [])
                 self.logger.info(f"Found {len(pmids)} studies in PubMed")
 
-                # Get detailed information for each PMID
-                for pmid in pmids[:100]:  # Limit to first 100 for efficiency
-                    details = self.get_pubmed_details(pmid)
-                    if details:
-                        self.search_results.append(details)
+                # Details for the first 100 PMIDs, in one ESummary request
+                self.search_results.extend(self.get_pubmed_summaries(pmids[:100]))
 
             return len(pmids)
 
@@ -119,23 +121,37 @@ class LiteratureSearch:
 
     def get_pubmed_details(self, pmid):
         """Get detailed information for a specific PMID"""
+        details = self.get_pubmed_summaries([pmid])
+        return details[0] if details else None
+
+    def get_pubmed_summaries(self, pmids):
+        """Get detailed information for a list of PMIDs with a single ESummary call"""
+        if not pmids:
+            return []
+
         try:
             base_url = "https://eutils.ncbi.nlm.nih.gov/entrez/eutils/esummary.fcgi"
             params = {
                 'db': 'pubmed',
-                'id': pmid,
+                'id': ','.join(pmids),
                 'retmode': 'json'
             }
 
-            response = requests.get(base_url, params=params, timeout=15)
+            response = self.session.get(base_url, params=params, timeout=30)
             response.raise_for_status()
 
             data = response.json()
 
+        except Exception as e:
+            self.logger.error(f"Failed to get details for {len(pmids)} PMIDs: {e}")
+            return []
+
+        summaries = []
+        for pmid in pmids:
             if 'result' in data and pmid in data['result']:
                 article = data['result'][pmid]
 
-                return {
+                summaries.append({
                     'source': 'PubMed',
                     'pmid': pmid,
                     'doi': article.get('doi', ''),
@@ -146,12 +162,9 @@ class LiteratureSearch:
                     'abstract': article.get('abstract', '')[:1000],  # Truncate long abstracts
                     'url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
                     'search_date': datetime.now().isoformat()
-                }
-
-        except Exception as e:
-            self.logger.error(f"Failed to get details for PMID {pmid}: {e}")
+                })
 
-        return None
+        return summaries
 
     def search_clinicaltrials_gov(self, search_terms):
         """Search ClinicalTrials.gov for relevant trials"""
@@ -181,7 +194,7 @@ class LiteratureSearch:
                 'format': 'json'
             }
 
-            response = requests.get(base_url, params=params, timeout=30)
+            response = self.session.get(base_url, params=params, timeout=30)
             response.raise_for_status()
 
             data = response.json()
@@ -334,6 +347,7 @@ class LiteratureSearch:
     def run_search(self):
         """Run the complete search process"""
         self.logger.info("Starting automated literature search...")
+        self.search_results = []
 
         search_config = self.config.get('search', {})
         search_terms = search_config.get('search_terms', {})
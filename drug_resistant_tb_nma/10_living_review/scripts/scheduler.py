@@ -4,20 +4,36 @@ Scheduler for Drug-Resistant TB Living Review System
 Manages automated execution of literature search, data extraction, and analysis updates
 """
 
+import io
 import json
 import logging
 import schedule
 import time
-import subprocess
+import contextlib
+import importlib.util
+import traceback
 from datetime import datetime, timedelta
 from pathlib import Path
 import sys
-import smtplib
-from email.mime.text import MimeText
-from email.mime.multipart import MimeMultipart
+
+import requests
 
 # Add parent directory to path for imports
 sys.path.append(str(Path(__file__).parent.parent.parent))
+sys.path.append(str(Path(__file__).resolve().parents[3] / 'research-automation-core'))
+sys.path.append(str(Path(__file__).resolve().parent))
+
+from auto_search import LiteratureSearch
+from auto_extraction import DataExtractor
+
+PROJECT_DIR = Path(__file__).resolve().parents[2]
+ANALYSIS_SCRIPT = PROJECT_DIR / '03_statistical_analysis' / 'real_nma_analysis.py'
+# Handed to the analysis explicitly, so it never depends on the working directory
+ANALYSIS_DATA = PROJECT_DIR / '02_data_extraction' / 'extracted_data.csv'
+ANALYSIS_RESULTS = PROJECT_DIR / '04_results'
+
+# Component output included in notifications (the tail is where results and errors are)
+OUTPUT_TAIL_LINES = 20
 
 
 class LivingReviewScheduler:
@@ -28,6 +44,16 @@ class LivingReviewScheduler:
         self.config = self.load_config(config_path)
         self.setup_logging()
         self.jobs = []
+        self.notifications = self.setup_notifications()
+
+        # Components run in-process and share the config, one HTTP session and the
+        # record batch handed from search to extraction
+        self.session = requests.Session()
+        self.searcher = LiteratureSearch(config=self.config, session=self.session)
+        self.extractor = DataExtractor(config=self.config)
+        self.analysis_module = None
+        self.pending_records = None
+        self.checkpoint_dir = Path(self.config.get('outputs', {}).get('checkpoint_dir', 'checkpoints'))
 
     def load_config(self, config_path):
         """Load configuration from JSON file"""
@@ -51,171 +77,233 @@ class LivingReviewScheduler:
         )
         self.logger = logging.getLogger(__name__)
 
+    def setup_notifications(self):
+        """Digest queue for the configured stakeholders, sent over one pooled SMTP connection"""
+        notification_config = self.config.get('notifications', {})
+        if not notification_config:
+            return None
+
+        # Imported after setup_logging so the scheduler's log file configuration wins
+        from notification_queue import NotificationQueue, PooledSMTPSender
+
+        # Without SMTP settings messages are only logged
+        sender = PooledSMTPSender(notification_config.get('smtp'))
+        return NotificationQueue(notification_config.get('queue_database', 'notifications.db'), sender,
+                                 templates={'living_review': self.render_digest})
+
     def run_literature_search(self):
-        """Run automated literature search"""
+        """Run automated literature search; the batch is held for extraction"""
         self.logger.info("Running scheduled literature search...")
 
         try:
-            result = subprocess.run([
-                sys.executable,
-                "scripts/auto_search.py"
-            ], capture_output=True, text=True, timeout=3600)
-
-            if result.returncode == 0:
-                self.logger.info("Literature search completed successfully")
-                self.send_notification(
-                    "Literature Search Completed",
-                    f"Literature search completed successfully.\n\n{result.stdout}"
-                )
+            started = time.perf_counter()
+            count = self.searcher.run_search()
+            self.pending_records = list(self.searcher.search_results) or None
+            # Checkpointed, so a failed extraction never forces a re-search
+            if self.pending_records:
+                self.save_checkpoint('search', self.pending_records)
             else:
-                self.logger.error(f"Literature search failed: {result.stderr}")
-                self.send_notification(
-                    "Literature Search Failed",
-                    f"Literature search failed with error:\n\n{result.stderr}",
-                    priority="high"
-                )
-
-        except subprocess.TimeoutExpired:
-            self.logger.error("Literature search timed out")
+                self.clear_checkpoint('search')
+
+            self.logger.info("Literature search completed successfully")
             self.send_notification(
-                "Literature Search Timeout",
-                "Literature search exceeded timeout limit",
-                priority="high"
+                "Literature Search Completed",
+                f"Literature search completed successfully in {time.perf_counter() - started:.1f}s.\n\n"
+                f"{count} eligible new studies queued for data extraction."
             )
+            return True
+
         except Exception as e:
             self.logger.error(f"Error running literature search: {e}")
             self.send_notification(
                 "Literature Search Error",
-                f"Unexpected error in literature search: {e}",
+                f"Unexpected error in literature search: {e}\n\n{self.output_tail(traceback.format_exc())}",
                 priority="high"
             )
+            return False
 
     def run_data_extraction(self):
-        """Run automated data extraction"""
+        """Run automated data extraction on the pending search batch"""
         self.logger.info("Running scheduled data extraction...")
 
+        if not self.has_pending_batch():
+            self.logger.info("No pending search batch to extract")
+            self.pending_records = None
+            self.clear_checkpoint('search')
+            return True
+
         try:
-            result = subprocess.run([
-                sys.executable,
-                "scripts/auto_extraction.py"
-            ], capture_output=True, text=True, timeout=1800)
-
-            if result.returncode == 0:
-                self.logger.info("Data extraction completed successfully")
-                self.send_notification(
-                    "Data Extraction Completed",
-                    f"Data extraction completed successfully.\n\n{result.stdout}"
-                )
-            else:
-                self.logger.error(f"Data extraction failed: {result.stderr}")
-                self.send_notification(
-                    "Data Extraction Failed",
-                    f"Data extraction failed with error:\n\n{result.stderr}",
-                    priority="high"
-                )
-
-        except subprocess.TimeoutExpired:
-            self.logger.error("Data extraction timed out")
+            started = time.perf_counter()
+            count = self.extractor.run_extraction(self.pending_records)
+            self.save_checkpoint('extraction', self.extractor.extracted_data)
+            self.pending_records = None
+            self.clear_checkpoint('search')
+
+            self.logger.info("Data extraction completed successfully")
             self.send_notification(
-                "Data Extraction Timeout",
-                "Data extraction exceeded timeout limit",
-                priority="high"
+                "Data Extraction Completed",
+                f"Data extraction completed successfully in {time.perf_counter() - started:.1f}s.\n\n"
+                f"Processed {count} studies."
             )
+            return True
+
         except Exception as e:
             self.logger.error(f"Error running data extraction: {e}")
             self.send_notification(
                 "Data Extraction Error",
-                f"Unexpected error in data extraction: {e}",
+                f"Unexpected error in data extraction: {e}\n\n{self.output_tail(traceback.format_exc())}\n\n"
+                f"The search batch is kept and will be retried without re-searching.",
                 priority="high"
             )
+            return False
+
+    def has_pending_batch(self) -> bool:
+        """Whether a non-empty search batch is waiting for extraction (in memory or checkpointed)"""
+        if self.pending_records is None:
+            checkpoint = self.load_checkpoint('search')
+            self.pending_records = (checkpoint['records'] or None) if checkpoint else None
+        return bool(self.pending_records)
+
+    def has_pending_analysis(self) -> bool:
+        """Whether an extraction finished but the analysis update after it did not
+
+        The extracted batch is restored from its checkpoint, so a restarted scheduler
+        re-runs only the analysis instead of searching and extracting again.
+        """
+        checkpoint = self.load_checkpoint('extraction')
+        if checkpoint is None:
+            return False
+        if not self.extractor.extracted_data:
+            self.extractor.extracted_data = checkpoint['records']
+        return True
 
     def run_analysis_update(self):
         """Run automated analysis update"""
         self.logger.info("Running scheduled analysis update...")
 
         try:
-            # This would run the R script for NMA updates
-            result = subprocess.run([
-                "Rscript",
-                "../03_statistical_analysis/real_nma_analysis.py"
-            ], capture_output=True, text=True, timeout=3600)
-
-            if result.returncode == 0:
-                self.logger.info("Analysis update completed successfully")
-                self.send_notification(
-                    "Analysis Update Completed",
-                    f"Analysis update completed successfully.\n\n{result.stdout}"
-                )
-            else:
-                self.logger.error(f"Analysis update failed: {result.stderr}")
-                self.send_notification(
-                    "Analysis Update Failed",
-                    f"Analysis update failed with error:\n\n{result.stderr}",
-                    priority="high"
-                )
-
-        except subprocess.TimeoutExpired:
-            self.logger.error("Analysis update timed out")
+            started = time.perf_counter()
+            analysis = self.load_analysis_module()
+            with contextlib.redirect_stdout(io.StringIO()) as output:
+                analysis.main(data_file=ANALYSIS_DATA, results_dir=ANALYSIS_RESULTS)
+            analysis.plt.close('all')
+            self.clear_checkpoint('extraction')
+
+            self.logger.info("Analysis update completed successfully")
             self.send_notification(
-                "Analysis Update Timeout",
-                "Analysis update exceeded timeout limit",
-                priority="high"
+                "Analysis Update Completed",
+                f"Analysis update completed successfully in {time.perf_counter() - started:.1f}s.\n\n"
+                f"{self.output_tail(output.getvalue())}"
             )
+            return True
+
         except Exception as e:
             self.logger.error(f"Error running analysis update: {e}")
             self.send_notification(
                 "Analysis Update Error",
-                f"Unexpected error in analysis update: {e}",
+                f"Unexpected error in analysis update: {e}\n\n{self.output_tail(traceback.format_exc())}",
                 priority="high"
             )
+            return False
+
+    def load_analysis_module(self):
+        """Import the NMA analysis once; later runs reuse the loaded module"""
+        if self.analysis_module is None:
+            spec = importlib.util.spec_from_file_location('real_nma_analysis', ANALYSIS_SCRIPT)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+            self.analysis_module = module
+        return self.analysis_module
+
+    def checkpoint_path(self, stage: str) -> Path:
+        return self.checkpoint_dir / f"{stage}_checkpoint.json"
+
+    def save_checkpoint(self, stage: str, records):
+        """Persist a completed stage's output so later stages can resume from it"""
+        self.checkpoint_dir.mkdir(parents=True, exist_ok=True)
+        path = self.checkpoint_path(stage)
+        temporary = path.with_suffix('.tmp')
+        with open(temporary, 'w', encoding='utf-8') as f:
+            json.dump({'stage': stage, 'completed': datetime.now().isoformat(), 'records': records},
+                      f, ensure_ascii=False, default=str)
+        temporary.replace(path)
+
+    def load_checkpoint(self, stage: str):
+        path = self.checkpoint_path(stage)
+        if not path.exists():
+            return None
+        with open(path, 'r', encoding='utf-8') as f:
+            checkpoint = json.load(f)
+        self.logger.info(f"Resuming from {stage} checkpoint of {checkpoint['completed']} "
+                         f"({len(checkpoint['records'])} records)")
+        return checkpoint
+
+    def clear_checkpoint(self, stage: str):
+        self.checkpoint_path(stage).unlink(missing_ok=True)
+
+    @staticmethod
+    def output_tail(output: str, lines: int = OUTPUT_TAIL_LINES) -> str:
+        """Last few lines of a component's output"""
+        output_lines = (output or '').rstrip().splitlines()
+        if len(output_lines) <= lines:
+            return '\n'.join(output_lines)
+        return '\n'.join([f"... ({len(output_lines) - lines} earlier lines omitted)"] + output_lines[-lines:])
 
     def send_notification(self, subject: str, message: str, priority: str = "normal"):
-        """Send email notification"""
-        notification_config = self.config.get('notifications', {})
+        """Queue a notification for stakeholders and send any digests now due
 
-        if not notification_config:
+        Stakeholders receive events on their configured frequency; high-priority
+        events go to every stakeholder and are sent at once, without waiting for a digest.
+        """
+        if not self.notifications:
             return
 
-        # Get notification settings based on priority
-        if priority == "high":
-            recipients = ["research@drugresistanttb-nma.org"]
+        stakeholders = self.config['notifications'].get('stakeholders', [])
+        recipients = [
+            {'email': s['email'], 'name': s.get('name'), 'notification_frequency': s.get('frequency', 'immediate')}
+            for s in stakeholders
+        ]
+        event = {'subject': subject, 'message': message, 'priority': priority,
+                 'timestamp': datetime.now().isoformat()}
+
+        try:
+            self.notifications.enqueue(recipients, event, template='living_review', priority=priority)
+            self.logger.info(f"Notification queued: {subject} ({len(recipients)} recipients)")
+            self.notifications.flush()
+
+        except Exception as e:
+            self.logger.error(f"Failed to send notification: {e}")
+
+    @staticmethod
+    def render_digest(events):
+        """Plain-text digest of queued notifications; $name is filled per stakeholder"""
+        if len(events) == 1:
+            subject = events[0]['subject']
         else:
-            recipients = ["research@drugresistanttb-nma.org"]
+            subject = f"{len(events)} updates since last digest"
 
-        # Create email message
-        msg = MimeMultipart()
-        msg['From'] = "livingreview@drugresistanttb-nma.org"
-        msg['To'] = ", ".join(recipients)
-        msg['Subject'] = f"[Living Review] {subject}"
+        sections = [
+            f"""Subject: {event['subject']}
+Priority: {event['priority']}
+Timestamp: {event['timestamp']}
+
+Message:
+{event['message']}
+""" for event in events
+        ]
 
-        # Add message body
         body = f"""
 Living Review System Notification
 
-Subject: {subject}
-Priority: {priority}
-Timestamp: {datetime.now().isoformat()}
-
-Message:
-{message}
+Dear $name,
 
+{chr(10).join(sections)}
 ---
 This is an automated message from the Drug-Resistant TB Living Review System.
 Contact: Dr Siddalingaiah H S (hssling@yahoo.com)
 Institution: Shridevi Institute of Medical Sciences and Research Hospital, Tumakuru
         """
-
-        msg.attach(MimeText(body, 'plain'))
-
-        try:
-            # For now, just log the notification
-            # In production, this would send actual emails
-            self.logger.info(f"Notification: {subject}")
-            self.logger.info(f"Recipients: {', '.join(recipients)}")
-            self.logger.info(f"Message: {message[:200]}...")
-
-        except Exception as e:
-            self.logger.error(f"Failed to send notification: {e}")
+        return f"[Living Review] {subject}", body, 'plain'
 
     def setup_schedule(self):
         """Setup the update schedule"""
@@ -268,25 +356,29 @@ Institution: Shridevi Institute of Medical Sciences and Research Hospital, Tumak
                 self.logger.info(f"Scheduled full review every 30 days at {time_str}")
 
     def run_full_review(self):
-        """Run complete review process"""
-        self.logger.info("Running full review process...")
-
-        # Run all components in sequence
-        self.run_literature_search()
-
-        # Wait a bit between processes
-        time.sleep(300)  # 5 minutes
+        """Run complete review process
 
-        self.run_data_extraction()
-
-        time.sleep(300)  # 5 minutes
+        Stages run in-process, in order, and stop at the first failure. A search batch
+        still waiting in its checkpoint is extracted instead of searching again, and an
+        extraction whose analysis never completed goes straight to the analysis.
+        """
+        self.logger.info("Running full review process...")
+        started = time.perf_counter()
 
-        self.run_analysis_update()
+        if self.has_pending_batch():
+            if not self.run_data_extraction():
+                return False
+        elif not self.has_pending_analysis():
+            if not self.run_literature_search() or not self.run_data_extraction():
+                return False
+        if not self.run_analysis_update():
+            return False
 
         self.send_notification(
             "Full Review Completed",
-            "Complete living review cycle finished successfully"
+            f"Complete living review cycle finished successfully in {time.perf_counter() - started:.1f}s"
         )
+        return True
 
     def run_continuously(self):
         """Run the scheduler continuously"""
@@ -14,6 +14,21 @@ import json
 from datetime import datetime
 from pathlib import Path
 import os
+import sys
+
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'research-automation-core'))
+from extraction_diff import ExtractionDiff, DiscrepancyStore
+
+# Keys aligning the two reviewers' records in each extraction form
+FORM_KEYS = {
+    'study_characteristics': ['study_id'],
+    'intervention_details': ['study_id'],
+    'outcome_data': ['study_id', 'outcome_name'],
+    'quality_assessment': ['study_id']
+}
+
+# Who extracted and when is not extracted data
+METADATA_FIELDS = ['extractor_initials', 'extraction_date']
 
 class DoubleExtractionSimulator:
     """
@@ -66,6 +81,7 @@ class DoubleExtractionSimulator:
         for study_id in double_extraction_studies:
             self._extract_study_double(study_id)
 
+        self._compare_extractions()
         self._calculate_overall_agreement()
         self._generate_validation_report()
 
@@ -85,14 +101,11 @@ class DoubleExtractionSimulator:
         second_extraction = self._simulate_reviewer_extraction(study_data, 'Reviewer_B',
                                                                simulate_discrepancies=True)
 
-        # Compare extractions
-        comparison = self._compare_extractions(first_extraction, second_extraction, study_id)
-
+        # Comparison happens for all studies at once in _compare_extractions
         self.extraction_results.append({
             'study_id': study_id,
             'first_extraction': first_extraction,
-            'second_extraction': second_extraction,
-            'comparison': comparison
+            'second_extraction': second_extraction
         })
 
     def _simulate_reviewer_extraction(self, study_data: pd.Series, reviewer: str,
@@ -200,110 +213,90 @@ class DoubleExtractionSimulator:
 
         return category
 
-    def _compare_extractions(self, first_ext: dict, second_ext: dict, study_id: str) -> dict:
+    def _form_frame(self, reviewer_key: str, form_name: str) -> pd.DataFrame:
         """
-        Compare two extractions and calculate agreement metrics
+        Flatten one reviewer's extractions of a form into a frame (one row per record)
         """
-        comparison = {
-            'study_id': study_id,
-            'overall_agreement': 0,
-            'form_agreements': {},
-            'discrepancies': []
-        }
-
-        total_fields = 0
-        agreed_fields = 0
-
-        # Compare study characteristics
-        first_sc = first_ext['study_characteristics']
-        second_sc = second_ext['study_characteristics']
-
-        sc_agreement = self._compare_form_fields(first_sc, second_sc, 'study_characteristics')
-        comparison['form_agreements']['study_characteristics'] = sc_agreement
-        agreed_fields += sc_agreement['agreed']
-        total_fields += sc_agreement['total']
-
-        # Compare intervention details
-        first_id = first_ext['intervention_details']
-        second_id = second_ext['intervention_details']
-
-        id_agreement = self._compare_form_fields(first_id, second_id, 'intervention_details')
-        comparison['form_agreements']['intervention_details'] = id_agreement
-        agreed_fields += id_agreement['agreed']
-        total_fields += id_agreement['total']
-
-        # Compare outcome data (compare first outcome only for simplicity)
-        if first_ext['outcome_data'] and second_ext['outcome_data']:
-            first_od = first_ext['outcome_data'][0]
-            second_od = second_ext['outcome_data'][0]
-
-            od_agreement = self._compare_form_fields(first_od, second_od, 'outcome_data')
-            comparison['form_agreements']['outcome_data'] = od_agreement
-            agreed_fields += od_agreement['agreed']
-            total_fields += od_agreement['total']
+        rows = []
+        for result in self.extraction_results:
+            form = result[reviewer_key][form_name]
+            rows.extend(form if isinstance(form, list) else [form])
 
-        # Compare quality assessment
-        first_qa = first_ext['quality_assessment']
-        second_qa = second_ext['quality_assessment']
+        frame = pd.DataFrame(rows).drop(columns=METADATA_FIELDS, errors='ignore')
+        for column in frame.columns:
+            if frame[column].map(lambda v: isinstance(v, list)).any():
+                frame[column] = frame[column].map(lambda v: '; '.join(v) if isinstance(v, list) else v)
+        return frame
 
-        qa_agreement = self._compare_form_fields(first_qa, second_qa, 'quality_assessment')
-        comparison['form_agreements']['quality_assessment'] = qa_agreement
-        agreed_fields += qa_agreement['agreed']
-        total_fields += qa_agreement['total']
+    def _compare_extractions(self):
+        """
+        Compare the two reviewers' extractions form by form with the extraction diff engine
 
-        # Calculate overall agreement
-        comparison['overall_agreement'] = agreed_fields / total_fields if total_fields > 0 else 0
+        Records are joined on study ID (and outcome name for outcome data) and whole fields
+        are compared at once: numbers within ±10% or ±1 unit agree, text is compared
+        case- and whitespace-insensitively. Discrepancies are also written to a SQLite
+        store for adjudication by field and severity.
+        """
+        if not self.extraction_results:
+            return
 
-        # Collect discrepancies
-        comparison['discrepancies'] = sum([f['discrepancies'] for f in comparison['form_agreements'].values()], [])
+        store_path = f"double_extraction_discrepancies_batch_{self.batch_info['batch_number']}.sqlite"
+        store = DiscrepancyStore(store_path)
+
+        per_study = {r['study_id']: {'agreed': 0, 'total': 0, 'form_agreements': {}, 'discrepancies': []}
+                     for r in self.extraction_results}
+
+        for form_name, key in FORM_KEYS.items():
+            first = self._form_frame('first_extraction', form_name)
+            second = self._form_frame('second_extraction', form_name)
+            rules = {col: {'type': 'text'} for col in first.columns
+                     if col not in key and not pd.api.types.is_numeric_dtype(first[col])}
+
+            diff = ExtractionDiff(key=key, rules=rules, rtol=0.1, atol=1).stream(first, second)
+            found = diff['discrepancies']
+            store.clear(form_name)
+            store.write(found, form_name)
+
+            # Record IDs are the joined key; the study ID always comes first
+            records = diff['records']
+            studies = records.index.str.split('|').str[0]
+            form_totals = records.groupby(studies).sum()
+            found = found.assign(study_id=found['record_id'].str.split('|').str[0])
+
+            for study_id, totals in form_totals.iterrows():
+                total = int(totals['fields_compared'])
+                agreed = total - int(totals['fields_disagreeing'])
+                study_found = found[(found['study_id'] == study_id) & (found['field'] != '__record__')]
+                discrepancies = [{
+                    'field': row.field,
+                    'first': row.first_value,
+                    'second': row.second_value,
+                    'form': form_name,
+                    'severity': row.severity
+                } for row in study_found.itertuples()]
+
+                entry = per_study[study_id]
+                entry['form_agreements'][form_name] = {
+                    'agreed': agreed,
+                    'total': total,
+                    'agreement_rate': agreed / total if total > 0 else 0,
+                    'discrepancies': discrepancies
+                }
+                entry['agreed'] += agreed
+                entry['total'] += total
+                entry['discrepancies'].extend(discrepancies)
 
-        return comparison
+        for result in self.extraction_results:
+            entry = per_study[result['study_id']]
+            result['comparison'] = {
+                'study_id': result['study_id'],
+                'overall_agreement': entry['agreed'] / entry['total'] if entry['total'] > 0 else 0,
+                'form_agreements': entry['form_agreements'],
+                'discrepancies': entry['discrepancies']
+            }
 
-    def _compare_form_fields(self, first_form: dict, second_form: dict, form_name: str) -> dict:
-        """
-        Compare fields within a specific form
-        """
-        agreed = 0
-        total = 0
-        discrepancies = []
-
-        for field in first_form:
-            if field in second_form:
-                total += 1
-                first_val = first_form[field]
-                second_val = second_form[field]
-
-                # Compare based on field type
-                if isinstance(first_val, (int, float)):
-                    # Numeric tolerance: ±10% or ±1 unit for small numbers
-                    tolerance = max(abs(first_val) * 0.1, 1)
-                    if abs(first_val - second_val) <= tolerance:
-                        agreed += 1
-                    else:
-                        discrepancies.append({
-                            'field': field,
-                            'first': first_val,
-                            'second': second_val,
-                            'form': form_name
-                        })
-                else:
-                    # String comparison (case-insensitive)
-                    if str(first_val).lower() == str(second_val).lower():
-                        agreed += 1
-                    else:
-                        discrepancies.append({
-                            'field': field,
-                            'first': first_val,
-                            'second': second_val,
-                            'form': form_name
-                        })
-
-        return {
-            'agreed': agreed,
-            'total': total,
-            'agreement_rate': agreed / total if total > 0 else 0,
-            'discrepancies': discrepancies
-        }
+        self.discrepancy_store = store
+        print(f"🗂️ Discrepancy store: {store_path}")
 
     def _calculate_overall_agreement(self):
         """
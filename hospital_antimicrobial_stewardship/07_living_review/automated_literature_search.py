@@ -15,6 +15,8 @@ import logging
 from typing import List, Dict, Optional
 from pathlib import Path
 
+from evidence_log import EvidenceLog
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -25,6 +27,9 @@ logging.basicConfig(
     ]
 )
 
+# Extraction results whose studies count as already known
+EXTRACTION_FILES = ["batch_2_extraction_results.csv", "complete_extraction_results.csv"]
+
 class ASPEvidenceMonitor:
     """Automated monitoring system for new ASP mortality evidence"""
 
@@ -46,6 +51,21 @@ class ASPEvidenceMonitor:
             "dental", "animal", "plant", "environmental"
         ]
 
+        # Known studies and pending hits live in an append-only log instead of rewritten CSVs
+        self.evidence_log = EvidenceLog(self.data_dir / "evidence_log")
+        self._seed_known_studies()
+
+    def _seed_known_studies(self):
+        """Mark already-extracted studies as known (every run, so newly extracted files count too)"""
+
+        for filename in EXTRACTION_FILES:
+            extraction_file = self.data_dir / filename
+            if extraction_file.exists():
+                pmids = pd.read_csv(extraction_file, usecols=['pmid'], dtype=str)['pmid'].dropna().unique()
+                added = self.evidence_log.seed(({'pmid': pmid} for pmid in pmids), source=filename)
+                if added:
+                    logging.info(f"Seeded {added} known studies from {filename}")
+
     def search_pubmed_api(self, days_back: int = 7) -> List[Dict]:
         """Search PubMed for new ASP mortality studies"""
         try:
@@ -161,25 +181,12 @@ class ASPEvidenceMonitor:
         """Remove duplicates from search results and existing database"""
 
         try:
-            # Load existing data
-            existing_file = self.data_dir / "batch_2_extraction_results.csv"
-            if existing_file.exists():
-                existing_df = pd.read_csv(existing_file)
-                existing_pmids = set(existing_df['pmid'].dropna().astype(str))
-            else:
-                existing_pmids = set()
-
-            # Filter out duplicates
-            unique_results = []
-            for result in new_results:
-                pmid = str(result.get('pmid', result.get('title', '')))
-                if pmid not in existing_pmids:
-                    result['duplicate_check'] = 'new'
-                    unique_results.append(result)
-                    existing_pmids.add(pmid)
-                else:
-                    result['duplicate_check'] = 'duplicate'
-                    logging.info(f"Duplicate found: {result.get('title', '')[:50]}...")
+            unique_results, duplicates = self.evidence_log.split_new(new_results)
+            for result in unique_results:
+                result['duplicate_check'] = 'new'
+            for result in duplicates:
+                result['duplicate_check'] = 'duplicate'
+                logging.info(f"Duplicate found: {str(result.get('title', ''))[:50]}...")
 
             return unique_results
 
@@ -188,32 +195,31 @@ class ASPEvidenceMonitor:
             return new_results
 
     def save_new_studies(self, studies: List[Dict]) -> str:
-        """Save new studies to pending review file"""
+        """Append new studies to the evidence log as a pending-review partition"""
 
         try:
             if not studies:
                 logging.info("No new studies found")
                 return "No new studies found"
 
-            # Convert to DataFrame
-            new_studies_df = pd.DataFrame(studies)
-
             # Add metadata
-            new_studies_df['discovered_at'] = datetime.now().isoformat()
-            new_studies_df['batch'] = 'automated_search'
-            new_studies_df['review_status'] = 'pending'
+            discovered_at = datetime.now().isoformat()
+            for study in studies:
+                study['discovered_at'] = discovered_at
+                study['batch'] = 'automated_search'
+                study['review_status'] = 'pending'
 
-            # Save to file
-            output_file = self.data_dir / "automated_search_pending.csv"
-            new_studies_df.to_csv(output_file, index=False)
+            # Earlier partitions are never rewritten
+            partition = self.evidence_log.append(studies)
 
-            # Also append to existing summary
+            # Summary of this run only
             summary_file = self.data_dir / "automated_search_summary.md"
 
             with open(summary_file, 'w') as f:
                 f.write("# Automated Literature Search Summary\n\n")
                 f.write(f"**Search Date:** {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
                 f.write(f"**New Studies Found:** {len(studies)}\n\n")
+                f.write(f"**Evidence Log Partition:** {partition.relative_to(self.data_dir)}\n\n")
 
                 if len(studies) > 0:
                     f.write("## New Studies Requiring Review\n\n")
@@ -285,7 +291,7 @@ def main():
 
     print(f"\n{result}")
     print("\nNext steps:")
-    print("1. Review automated_search_pending.csv")
+    print("1. Review the new partition in evidence_log/partitions (see automated_search_summary.md)")
     print("2. Extract data from eligible studies")
     print("3. Update meta-analysis with new data")
     print("4. Update manuscript and dashboard")
@@ -10,11 +10,19 @@ import datetime
 from typing import Dict, Optional
 import json
 
+from evidence_log import EvidenceLog
+
+# Cursor name for this script in the evidence log
+CONSUMER = "update_summary"
+
 class UpdateSummarizer:
     """Create comprehensive summary of evidence update"""
 
-    def __init__(self, data_dir: str = "../04_results_visualization"):
+    def __init__(self, data_dir: str = "../04_results_visualization",
+                 log_dir: str = "../02_data_extraction/evidence_log"):
         self.data_dir = Path(data_dir)
+        self.evidence_log = EvidenceLog(log_dir)
+        self.pending_seq = None
 
     def load_current_results(self) -> Optional[Dict]:
         """Load current meta-analysis results"""
@@ -38,12 +46,10 @@ class UpdateSummarizer:
             return None
 
     def load_pending_reviews(self) -> Optional[pd.DataFrame]:
-        """Load studies pending review from automated search"""
+        """Load studies logged by automated search since the last summary"""
         try:
-            pending_file = Path("../02_data_extraction/automated_search_pending.csv")
-            if pending_file.exists():
-                return pd.read_csv(pending_file)
-            return None
+            pending_df, self.pending_seq = self.evidence_log.read_since(CONSUMER)
+            return pending_df if len(pending_df) > 0 else None
         except Exception:
             return None
 
@@ -130,20 +136,20 @@ class UpdateSummarizer:
         summary_lines.append("")
 
         if pending_df is not None and len(pending_df) > 0:
-            summary_lines.append(f"**Studies Pending Review:** {len(pending_df)}")
+            summary_lines.append(f"**New Studies Since Last Update:** {len(pending_df)}")
             summary_lines.append("")
 
             # Show recent additions
             recent_pending = pending_df.head(5)
             for _, study in recent_pending.iterrows():
-                title = study.get('title', 'No title')[:60]
+                title = str(study.get('title', 'No title'))[:60]
                 source = study.get('source', study.get('search_term', 'Unknown'))
                 summary_lines.append(f"- **{title}...** (Source: {source})")
 
             if len(pending_df) > 5:
                 summary_lines.append(f"- ... and {len(pending_df) - 5} more studies")
         else:
-            summary_lines.append("No studies pending review")
+            summary_lines.append("No new studies since the last update")
 
         summary_lines.append("")
 
@@ -212,6 +218,9 @@ class UpdateSummarizer:
                 f.write(summary_content)
 
             print(f"Evidence update summary saved to: {output_file}")
+
+            # Only now are the partitions shown in this summary treated as read
+            self.evidence_log.acknowledge(CONSUMER, self.pending_seq)
             return True
 
         except Exception as e:
@@ -227,11 +236,13 @@ def main():
                        help="Data directory path")
     parser.add_argument("--output", type=str, default="evidence_update_summary.md",
                        help="Output file name")
+    parser.add_argument("--log-dir", type=str, default="../02_data_extraction/evidence_log",
+                       help="Evidence log directory")
 
     args = parser.parse_args()
 
     # Create summary
-    summarizer = UpdateSummarizer(args.data_dir)
+    summarizer = UpdateSummarizer(args.data_dir, args.log_dir)
     success = summarizer.save_summary(args.output)
 
     if success:
@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+"""
+Append-Only Evidence Log for the Living Review
+Partitioned search hits, a persistent known-study index and per-consumer read cursors
+"""
+
+import os
+import re
+import json
+import struct
+import hashlib
+import logging
+import sqlite3
+import math
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import pandas as pd
+
+# Sized for years of weekly searches; the filter is rebuilt larger if it fills up
+DEFAULT_CAPACITY = 100000
+DEFAULT_ERROR_RATE = 0.01
+
+_BLOOM_HEADER = struct.Struct('<4sQIQ')  # magic, bit count, hash count, items added
+_BLOOM_MAGIC = b'BLM1'
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over study keys, saved as a flat bit array"""
+
+    def __init__(self, capacity: int = DEFAULT_CAPACITY, error_rate: float = DEFAULT_ERROR_RATE):
+        self.capacity = capacity
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.bits = bytearray((self.num_bits + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: str) -> Iterable[int]:
+        # Double hashing: k positions from the two halves of one digest
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.num_bits for i in range(self.num_hashes))
+
+    def add(self, key: str):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    @property
+    def saturated(self) -> bool:
+        return self.count > self.capacity
+
+    def save(self, path: Path):
+        tmp_path = path.with_suffix(path.suffix + '.tmp')
+        with open(tmp_path, 'wb') as f:
+            f.write(_BLOOM_HEADER.pack(_BLOOM_MAGIC, self.num_bits, self.num_hashes, self.count))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: Path, capacity: int) -> Optional['BloomFilter']:
+        try:
+            with open(path, 'rb') as f:
+                magic, num_bits, num_hashes, count = _BLOOM_HEADER.unpack(f.read(_BLOOM_HEADER.size))
+                bits = bytearray(f.read())
+        except (OSError, struct.error):
+            return None
+        if magic != _BLOOM_MAGIC or len(bits) != (num_bits + 7) // 8:
+            return None
+        bloom = cls.__new__(cls)
+        bloom.capacity, bloom.num_bits, bloom.num_hashes = capacity, num_bits, num_hashes
+        bloom.bits, bloom.count = bits, count
+        return bloom
+
+
+def study_key(study: Dict) -> Optional[str]:
+    """Stable identity of a search hit: PMID, else DOI, else a hash of the normalised title"""
+
+    pmid = str(study.get('pmid') or '').strip()
+    if pmid.endswith('.0'):
+        pmid = pmid[:-2]
+    if pmid.isdigit():
+        return f"pmid:{pmid}"
+
+    doi = re.search(r'10\.\d{4,9}/\S+', str(study.get('doi') or ''))
+    if doi:
+        return f"doi:{doi.group(0).lower()}"
+
+    words = re.findall(r'[a-z0-9]+', str(study.get('title') or '').lower())
+    if words:
+        return "title:" + hashlib.sha1(' '.join(words).encode('utf-8')).hexdigest()
+    return None
+
+
+class EvidenceLog:
+    """Append-only, date-partitioned log of new evidence
+
+    Each run's new hits become one immutable CSV partition under partitions/dt=YYYY-MM-DD/.
+    Whether a hit is already known is answered by a Bloom filter (known.bloom) and, when
+    the filter says "maybe", confirmed against the exact index in evidence_log.db. The
+    same database lists the partitions in order and keeps a read cursor per consumer,
+    so downstream scripts only read partitions added since their last successful run.
+    """
+
+    def __init__(self, log_dir: str = "../02_data_extraction/evidence_log",
+                 capacity: int = DEFAULT_CAPACITY):
+        self.log_dir = Path(log_dir)
+        self.partition_dir = self.log_dir / "partitions"
+        self.partition_dir.mkdir(parents=True, exist_ok=True)
+        self.bloom_path = self.log_dir / "known.bloom"
+        self.conn = sqlite3.connect(self.log_dir / "evidence_log.db")
+        self.conn.execute("PRAGMA journal_mode = WAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS known_studies (
+                study_key TEXT PRIMARY KEY,
+                partition_seq INTEGER,
+                source TEXT,
+                first_seen TEXT
+            ) WITHOUT ROWID;
+            CREATE TABLE IF NOT EXISTS partitions (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                path TEXT NOT NULL,
+                rows INTEGER NOT NULL,
+                created TEXT NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS cursors (
+                consumer TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL,
+                updated TEXT
+            );
+        """)
+
+        known = self.conn.execute("SELECT COUNT(*) FROM known_studies").fetchone()[0]
+        self.bloom = BloomFilter.load(self.bloom_path, capacity)
+        if self.bloom is None or self.bloom.count != known:
+            self._rebuild_bloom(max(capacity, known * 2))
+
+    def close(self):
+        self.conn.close()
+
+    def _rebuild_bloom(self, capacity: int):
+        self.bloom = BloomFilter(capacity)
+        for (key,) in self.conn.execute("SELECT study_key FROM known_studies"):
+            self.bloom.add(key)
+        self.bloom.save(self.bloom_path)
+        logging.info(f"Rebuilt known-study filter for {self.bloom.count} studies")
+
+    # Known-study index
+
+    def is_known(self, key: str) -> bool:
+        if key not in self.bloom:
+            return False
+        return self.conn.execute("SELECT 1 FROM known_studies WHERE study_key = ?", (key,)).fetchone() is not None
+
+    def _remember(self, keys: List[str], partition_seq: Optional[int], source: str) -> int:
+        now = datetime.now().isoformat()
+        added = 0
+        for key in keys:
+            cursor = self.conn.execute(
+                "INSERT OR IGNORE INTO known_studies (study_key, partition_seq, source, first_seen) VALUES (?, ?, ?, ?)",
+                (key, partition_seq, source, now))
+            if cursor.rowcount:
+                self.bloom.add(key)
+                added += 1
+        return added
+
+    def seed(self, studies: Iterable[Dict], source: str) -> int:
+        """Mark studies as known without logging them (e.g. already-extracted studies)
+
+        Safe to repeat: keys the index already holds are dropped before any write.
+        """
+
+        keys = [key for key in (study_key(study) for study in studies) if key and not self.is_known(key)]
+        if not keys:
+            return 0
+        with self.conn:
+            added = self._remember(keys, None, source)
+        self._save_bloom()
+        return added
+
+    def _save_bloom(self):
+        if self.bloom.saturated:
+            self._rebuild_bloom(self.bloom.capacity * 2)
+        else:
+            self.bloom.save(self.bloom_path)
+
+    def split_new(self, studies: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """(new, duplicate) hits, also collapsing repeats within the batch"""
+
+        new, duplicates, seen = [], [], set()
+        for study in studies:
+            key = study_key(study)
+            if key is None or key in seen or self.is_known(key):
+                duplicates.append(study)
+            else:
+                seen.add(key)
+                new.append(study)
+        return new, duplicates
+
+    # Partitions
+
+    def append(self, studies: List[Dict], source: str = "automated_search") -> Optional[Path]:
+        """Write new hits as one immutable partition and add them to the known index"""
+
+        if not studies:
+            return None
+
+        now = datetime.now()
+        day_dir = self.partition_dir / f"dt={now.strftime('%Y-%m-%d')}"
+        day_dir.mkdir(parents=True, exist_ok=True)
+        df = pd.DataFrame(studies)
+        df['study_key'] = [study_key(study) for study in studies]
+
+        path = None
+        try:
+            with self.conn:
+                seq = self.conn.execute(
+                    "INSERT INTO partitions (path, rows, created) VALUES ('', ?, ?)",
+                    (len(df), now.isoformat())).lastrowid
+                path = day_dir / f"part-{seq:06d}-{now.strftime('%H%M%S')}.csv"
+                tmp_path = path.with_suffix('.tmp')
+                df.to_csv(tmp_path, index=False)
+                os.replace(tmp_path, path)
+                self.conn.execute("UPDATE partitions SET path = ? WHERE seq = ?",
+                                  (str(path.relative_to(self.log_dir)), seq))
+                self._remember([key for key in df['study_key'] if key], seq, source)
+        except Exception:
+            # The manifest rolled back, so the file must not survive as an orphan partition
+            if path is not None and path.exists():
+                path.unlink()
+            raise
+        self._save_bloom()
+
+        logging.info(f"Appended {len(df)} studies to evidence log partition {path.name}")
+        return path
+
+    def partitions_since(self, consumer: str) -> List[Dict]:
+        """Partitions this consumer has not yet processed, oldest first"""
+
+        cursor = self.conn.execute("SELECT seq FROM cursors WHERE consumer = ?", (consumer,)).fetchone()
+        rows = self.conn.execute(
+            "SELECT seq, path, rows, created FROM partitions WHERE seq > ? AND path != '' ORDER BY seq",
+            (cursor[0] if cursor else 0,)).fetchall()
+        return [{'seq': seq, 'path': self.log_dir / path, 'rows': n, 'created': created}
+                for seq, path, n, created in rows]
+
+    def read_since(self, consumer: str) -> Tuple[pd.DataFrame, Optional[int]]:
+        """New partitions for a consumer as one DataFrame, plus the seq to acknowledge"""
+
+        partitions = self.partitions_since(consumer)
+        if not partitions:
+            return pd.DataFrame(), None
+        frames = [pd.read_csv(p['path']).assign(partition_seq=p['seq']) for p in partitions]
+        return pd.concat(frames, ignore_index=True), partitions[-1]['seq']
+
+    def acknowledge(self, consumer: str, seq: Optional[int]):
+        """Advance a consumer's cursor once it has finished with partitions up to seq"""
+
+        if seq is None:
+            return
+        with self.conn:
+            self.conn.execute("""
+                INSERT INTO cursors (consumer, seq, updated) VALUES (?, ?, ?)
+                ON CONFLICT (consumer) DO UPDATE SET seq = MAX(seq, excluded.seq), updated = excluded.updated
+            """, (consumer, seq, datetime.now().isoformat()))
+
+    def partition_counts(self) -> pd.DataFrame:
+        """Rows per partition from the manifest alone (no partition files are read)"""
+
+        return pd.read_sql_query("SELECT seq, path, rows, created FROM partitions WHERE path != '' ORDER BY seq",
+                                 self.conn)
+
+    def stats(self) -> Dict:
+        known = self.conn.execute("SELECT COUNT(*) FROM known_studies").fetchone()[0]
+        logged, partitions = self.conn.execute("SELECT COALESCE(SUM(rows), 0), COUNT(*) FROM partitions").fetchone()
+        return {'known_studies': known, 'logged_studies': logged, 'partitions': partitions,
+                'bloom_bits': self.bloom.num_bits, 'bloom_hashes': self.bloom.num_hashes}
+
+
+def main():
+    """Command line interface"""
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Living review evidence log")
+    parser.add_argument("command", choices=['status', 'pending'], help="Show log status or unread partitions")
+    parser.add_argument("--log-dir", type=str, default="../02_data_extraction/evidence_log",
+                       help="Evidence log directory")
+    parser.add_argument("--consumer", type=str, default="update_summary",
+                       help="Consumer whose unread partitions to list")
+
+    args = parser.parse_args()
+    log = EvidenceLog(args.log_dir)
+
+    if args.command == 'status':
+        print(json.dumps(log.stats(), indent=2))
+    else:
+        for partition in log.partitions_since(args.consumer):
+            print(f"{partition['seq']:>6}  {partition['rows']:>5} studies  {partition['path']}")
+
+    log.close()
+
+
+if __name__ == "__main__":
+    main()
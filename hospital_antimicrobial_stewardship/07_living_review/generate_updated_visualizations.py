@@ -15,6 +15,11 @@ import numpy as np
 import warnings
 warnings.filterwarnings('ignore')
 
+from evidence_log import EvidenceLog
+
+# Cursor name for this script in the evidence log
+CONSUMER = "visualizations"
+
 # Set up plotting style
 plt.style.use('seaborn-v0_8')
 sns.set_palette("husl")
@@ -23,10 +28,13 @@ class VisualizationGenerator:
     """Generate publication-quality visualizations for meta-analysis results"""
 
     def __init__(self, data_dir: str = "../04_results_visualization",
-                 output_dir: str = "../09_publication_ready_visualizations"):
+                 output_dir: str = "../09_publication_ready_visualizations",
+                 log_dir: str = "../02_data_extraction/evidence_log"):
         self.data_dir = Path(data_dir)
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.evidence_log = EvidenceLog(log_dir)
+        self.evidence_seq = None
 
         # High-quality settings for publication
         plt.rcParams.update({
@@ -293,6 +301,59 @@ class VisualizationGenerator:
             print(f"Error creating GRADE quality plot: {e}")
             return False
 
+    def create_evidence_inflow_plot(self) -> bool:
+        """Create evidence inflow plot: studies logged per search run, and sources of the latest ones"""
+        try:
+            # Per-run counts come from the log manifest; only unseen partitions are read
+            counts = self.evidence_log.partition_counts()
+            new_studies, self.evidence_seq = self.evidence_log.read_since(CONSUMER)
+            if counts.empty:
+                print("No evidence log partitions yet")
+                return True
+
+            counts['run_date'] = pd.to_datetime(counts['created']).dt.date
+            per_run = counts.groupby('run_date')['rows'].sum()
+
+            fig, (ax1, ax2) = plt.subplots(1, 2, figsize=(15, 6))
+
+            ax1.bar(range(len(per_run)), per_run.values, color='#1f77b4', alpha=0.8, label='New studies')
+            ax1.plot(range(len(per_run)), per_run.cumsum().values, color='#ff7f0e', marker='o',
+                     linewidth=2, label='Cumulative')
+            ax1.set_xticks(range(len(per_run)))
+            ax1.set_xticklabels([str(d) for d in per_run.index], rotation=45, ha='right')
+            ax1.set_ylabel('Studies')
+            ax1.set_title('Studies Found by Automated Search')
+            ax1.legend()
+            ax1.grid(axis='y', alpha=0.3)
+
+            if len(new_studies) > 0:
+                sources = new_studies.get('source', pd.Series(index=new_studies.index, dtype=object))
+                source_counts = sources.fillna('pubmed').value_counts()
+                ax2.barh(range(len(source_counts)), source_counts.values, color='#2ca02c', alpha=0.8)
+                ax2.set_yticks(range(len(source_counts)))
+                ax2.set_yticklabels(source_counts.index)
+                ax2.set_xlabel('Studies')
+            else:
+                ax2.text(0.5, 0.5, 'No new studies', ha='center', va='center', fontsize=14)
+                ax2.set_yticks([])
+            ax2.set_title(f'Since Last Update ({len(new_studies)} studies)')
+            ax2.grid(axis='x', alpha=0.3)
+
+            fig.suptitle('Living Review Evidence Inflow', fontsize=16)
+            plt.tight_layout()
+
+            output_file = self.output_dir / "evidence_inflow_updated.png"
+            plt.savefig(output_file, dpi=300, bbox_inches='tight',
+                       facecolor='white', edgecolor='none')
+            plt.close()
+
+            print(f"Evidence inflow plot saved as: {output_file}")
+            return True
+
+        except Exception as e:
+            print(f"Error creating evidence inflow plot: {e}")
+            return False
+
     def update_readme_with_new_visualizations(self) -> bool:
         """Update the visualizations README with new files"""
         try:
@@ -319,12 +380,17 @@ class VisualizationGenerator:
         results['effect_distributions'] = self.create_effect_distribution_plot()
         results['intervention_comparison'] = self.create_intervention_comparison_plot()
         results['grade_assessment'] = self.create_quality_assessment_plot()
+        results['evidence_inflow'] = self.create_evidence_inflow_plot()
         results['readme_update'] = self.update_readme_with_new_visualizations()
 
         # Print summary
         successful = sum(results.values())
         total = len(results)
 
+        # New partitions count as read only when every figure was produced
+        if all(results.values()):
+            self.evidence_log.acknowledge(CONSUMER, self.evidence_seq)
+
         print(f"\nVisualization Generation Complete:")
         print(f"✓ {successful}/{total} visualizations successfully generated")
 
@@ -343,11 +409,13 @@ def main():
                        help="Data directory path")
     parser.add_argument("--output-dir", type=str, default="../09_publication_ready_visualizations",
                        help="Output directory path")
+    parser.add_argument("--log-dir", type=str, default="../02_data_extraction/evidence_log",
+                       help="Evidence log directory")
 
     args = parser.parse_args()
 
     # Generate visualizations
-    generator = VisualizationGenerator(args.data_dir, args.output_dir)
+    generator = VisualizationGenerator(args.data_dir, args.output_dir, args.log_dir)
     results = generator.generate_all_visualizations()
 
     # Check overall success
@@ -5,7 +5,13 @@ import plotly.express as px
 import plotly.graph_objects as go
 from plotly.subplots import make_subplots
 import os
+import sys
 import base64
+from pathlib import Path
+
+# Shared plotting layer (decimation + WebGL for long series)
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'research-automation-core'))
+from timeseries_plotting import WEBGL_THRESHOLD, grouped_traces, streamlit_viewport
 
 # Set page config
 st.set_page_config(
@@ -393,10 +399,20 @@ elif analysis_type == "Temporal Trends":
     st.header("📅 Temporal Trends Analysis")
 
     # DID over time
-    fig_temporal = px.scatter(df, x='year', y='did_value',
-                            size='population', color='setting',
-                            title="DID Trends Over Time",
-                            labels={'did_value': 'DID', 'year': 'Publication Year'})
+    if len(df) > WEBGL_THRESHOLD:
+        # Surveillance-scale data: one decimated WebGL line per setting instead of
+        # one SVG bubble per row, re-decimated for the selected window
+        time_col = 'date' if 'date' in df.columns else 'year'
+        window = streamlit_viewport(st, df[time_col], key='did_trend_window')
+        fig_temporal = go.Figure(grouped_traces(df, time_col, 'did_value', 'setting',
+                                                x_range=window, mode='lines'))
+        fig_temporal.update_layout(title="DID Trends Over Time",
+                                   xaxis_title="Publication Year", yaxis_title="DID")
+    else:
+        fig_temporal = px.scatter(df, x='year', y='did_value',
+                                size='population', color='setting',
+                                title="DID Trends Over Time",
+                                labels={'did_value': 'DID', 'year': 'Publication Year'})
     fig_temporal.add_hline(y=28.4, line_dash="dash", line_color="red",
                           annotation_text="Pooled DID Estimate")
     st.plotly_chart(fig_temporal, use_container_width=True)
@@ -19,8 +19,13 @@ import warnings
 import json
 import os
 from pathlib import Path
+import sys
 warnings.filterwarnings('ignore')
 
+# Shared plotting layer (decimation + WebGL for long series)
+sys.path.append(str(Path(__file__).resolve().parent / 'research-automation-core'))
+from timeseries_plotting import series_trace, streamlit_viewport
+
 # ================================================
 # AUTO UPDATE STATUS FUNCTIONS
 # ================================================
@@ -213,6 +218,9 @@ def create_main_forecast_chart():
         st.error("Unable to load measles data")
         return
 
+    # Narrowing the window re-decimates the history at full detail for that span
+    viewport = streamlit_viewport(st, historical['ds'], key='measles_history_window')
+
     # Create subplot
     fig = make_subplots(
         rows=1, cols=2,
@@ -222,9 +230,10 @@ def create_main_forecast_chart():
 
     # Left plot: Historical trend showing progress but not elimination
     fig.add_trace(
-        go.Scatter(
-            x=historical['ds'],
-            y=historical['y'],  # Already per 100k
+        series_trace(
+            historical['ds'],
+            historical['y'],  # Already per 100k
+            x_range=viewport,
             mode='lines+markers',
             name='Historical Measles Incidence',
             line=dict(color='darkblue', width=3),
@@ -238,7 +247,7 @@ def create_main_forecast_chart():
     # Add elimination threshold line
     fig.add_trace(
         go.Scatter(
-            x=[historical['ds'].min(), historical['ds'].max()],
+            x=list(viewport) if viewport else [historical['ds'].min(), historical['ds'].max()],
             y=[1, 1],
             mode='lines',
             name='WHO Elimination Threshold (<1/100k)',
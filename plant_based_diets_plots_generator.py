@@ -287,11 +287,11 @@ class PlantBasedMentalHealthVisualizer:
         plots = {
             '1_main_forest_plot.png': self.create_main_forest_plot,
             '2_grade_evidence_profile.png': self.create_grade_evidence_profile,
-            '3_diet_type_subgroup_forest.png': lambda: self.create_subgroup_forest_plot('diet_type'),
-            '4_study_design_subgroup_forest.png': lambda: self.create_subgroup_forest_plot('study_design'),
-            '5_depression_funnel_plot.png': lambda: self.create_funnel_plot('Depression'),
-            '6_anxiety_funnel_plot.png': lambda: self.create_funnel_plot('Anxiety'),
-            '7_cognitive_funnel_plot.png': lambda: self.create_funnel_plot('Cognitive Decline'),
+            '3_diet_type_subgroup_forest.png': lambda path: self.create_subgroup_forest_plot('diet_type', path),
+            '4_study_design_subgroup_forest.png': lambda path: self.create_subgroup_forest_plot('study_design', path),
+            '5_depression_funnel_plot.png': lambda path: self.create_funnel_plot('Depression', path),
+            '6_anxiety_funnel_plot.png': lambda path: self.create_funnel_plot('Anxiety', path),
+            '7_cognitive_funnel_plot.png': lambda path: self.create_funnel_plot('Cognitive Decline', path),
             '8_effect_size_distribution.png': self.create_effect_size_distribution_plot
         }
 
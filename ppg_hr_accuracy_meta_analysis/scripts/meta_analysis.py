@@ -24,6 +24,13 @@ import numpy as np
 import json
 from datetime import datetime
 import os
+import sys
+from pathlib import Path
+
+# Add the research-automation-core to Python path
+sys.path.append(str(Path(__file__).resolve().parents[2] / 'research-automation-core'))
+
+from resampling_engine import ResamplingEngine
 
 class PPGMetaAnalysis:
     """Meta-analysis for PPG heart rate accuracy data."""
@@ -33,6 +40,10 @@ class PPGMetaAnalysis:
         self.alpha = 0.95  # 95% confidence level
         self.z_critical = 1.96  # Z-score for 95% CI
 
+        # Resampling inference parameters
+        self.n_resamples = 10000
+        self.seed = 20250923
+
         # Results storage
         self.results = {}
 
@@ -115,13 +126,18 @@ class PPGMetaAnalysis:
             else:
                 subset = df[df['study_design'] == group_name]
 
-            # Simple I² calculation (Q-based method)
+            # Inverse-variance Q with a Monte Carlo p-value under homogeneity
             maes = subset['mae_overall_bpm'].values
             k = len(maes)  # number of studies
 
             if k > 1:
-                mean_mae = maes.mean()
-                Q = np.sum((maes - mean_mae)**2) * subset['total_participants'].values.size
+                sds = subset['mae_overall_sd'].fillna(subset['mae_overall_sd'].median()).values
+                ns = subset['mae_overall_n'].fillna(subset['total_participants']).values
+                variances = np.maximum(sds, 1e-6) ** 2 / np.maximum(ns, 1)
+
+                engine = ResamplingEngine(n_resamples=self.n_resamples, seed=self.seed)
+                het_test = engine.heterogeneity_test(maes, variances)
+                Q = het_test['Q']
                 df_q = k - 1
 
                 if Q > df_q:
@@ -133,7 +149,7 @@ class PPGMetaAnalysis:
                     'I2': round(I2, 1),
                     'Q': round(Q, 2),
                     'df': df_q,
-                    'p_value': '.036' if I2 > 25 else '.64'  # Placeholder p-values
+                    'p_value': round(het_test['p_value'], 4)
                 }
             else:
                 heterogeneity[group_name] = {
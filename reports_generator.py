@@ -22,6 +22,11 @@ from pathlib import Path
 from datetime import datetime
 from typing import Dict, List, Optional
 import logging
+import sys
+
+# Shared plotting layer (decimation + WebGL for long series)
+sys.path.append(str(Path(__file__).resolve().parent / 'research-automation-core'))
+from timeseries_plotting import series_trace
 
 logger = logging.getLogger(__name__)
 
@@ -139,9 +144,9 @@ class AMRForecastReportGenerator:
         hist_data['period'] = range(1, len(hist_data) + 1)  # Numerical x-axis
 
         fig.add_trace(
-            go.Scatter(
-                x=hist_data['period'],
-                y=hist_data['percent_resistant'],
+            series_trace(
+                hist_data['period'],
+                hist_data['percent_resistant'],
                 mode='lines+markers',
                 name='Historical Resistance',
                 line=dict(color='blue', width=3),
@@ -212,9 +217,9 @@ class AMRForecastReportGenerator:
 
         # Add historical reference line to subplot 3
         fig.add_trace(
-            go.Scatter(
-                x=list(range(1, historical_period + 1)),
-                y=hist_data['percent_resistant'],
+            series_trace(
+                hist_data['period'],
+                hist_data['percent_resistant'],
                 mode='lines',
                 name='Historical Timeline',
                 line=dict(color='black', width=1, dash='dot'),
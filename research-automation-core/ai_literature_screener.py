@@ -79,6 +79,29 @@ class AILiteratureScreener:
 
         return ' '.join(tokens)
 
+    def preprocess_batch(self, texts: List[str]) -> List[str]:
+        """preprocess_text for many records at once, stemming each distinct word once
+
+        Punctuation and digits are stripped first, so splitting on whitespace gives the
+        same tokens as word_tokenize.
+        """
+        stems = {}
+
+        def stem(word: str) -> str:
+            if word not in stems:
+                stems[word] = self.stemmer.stem(word)
+            return stems[word]
+
+        processed = []
+        for text in texts:
+            if not text or pd.isna(text):
+                processed.append("")
+                continue
+            text = re.sub(r'\d+', '', re.sub(r'[^\w\s]', ' ', str(text).lower()))
+            processed.append(' '.join(stem(word) for word in text.split()
+                                      if word not in self.stop_words and len(word) > 2))
+        return processed
+
     def prepare_training_data(self, csv_file: str,
                             text_column: str,
                             label_column: str) -> Tuple[np.ndarray, np.ndarray]:
@@ -265,6 +288,45 @@ class AILiteratureScreener:
                 'probabilities': {'exclude': 0.5, 'include': 0.5}
             }
 
+    def predict_batch(self, texts: List[str], model_name: str = 'logistic_screening_model') -> pd.DataFrame:
+        """
+        Predict screening decisions for many texts in one vectorised pass
+
+        Args:
+            texts: Texts to classify
+            model_name: Name of model to use ('ensemble' averages its members)
+
+        Returns:
+            DataFrame with decision, confidence and probability_include per text
+        """
+        if model_name == 'ensemble' and 'ensemble' in self.models:
+            members = [model for _, model in self.models['ensemble'] if hasattr(model, 'predict_proba')]
+        elif model_name in self.models:
+            members = [self.models[model_name]]
+        else:
+            raise ValueError(f"Model {model_name} not found")
+
+        processed = self.preprocess_batch(texts)
+        probability_include = np.full(len(processed), 0.5)
+        has_text = np.array([bool(text.strip()) for text in processed], dtype=bool)
+
+        if has_text.any():
+            X = self.vectorizer.transform([text for text, keep in zip(processed, has_text) if keep])
+            if hasattr(members[0], 'predict_proba'):
+                probability_include[has_text] = np.mean([m.predict_proba(X)[:, 1] for m in members], axis=0)
+            else:
+                probability_include[has_text] = members[0].predict(X).astype(float)
+
+        decision = np.where(probability_include > 0.5, 'include', 'exclude')
+        decision = np.where(has_text, decision, 'unclear')
+        confidence = np.where(has_text, np.maximum(probability_include, 1 - probability_include), 0.0)
+
+        return pd.DataFrame({
+            'decision': decision,
+            'confidence': confidence,
+            'probability_include': probability_include
+        })
+
     def screen_literature(self, csv_file: str,
                          text_column: str,
                          output_file: str = None,
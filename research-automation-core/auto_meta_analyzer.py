@@ -21,6 +21,10 @@ from datetime import datetime
 import warnings
 warnings.filterwarnings('ignore')
 
+from resampling_engine import ResamplingEngine
+from meta_regression import MetaRegressionAnalyzer
+from publication_bias import PublicationBiasAnalyzer
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -267,6 +271,13 @@ class MetaAnalysisModel:
             }
         }
 
+    def resampling_inference(self, n_resamples: int = 10000, seed: Optional[int] = None,
+                             n_jobs: int = 1) -> Dict[str, Any]:
+        """Bootstrap CIs and permutation p-values for the random-effects model"""
+
+        engine = ResamplingEngine(n_resamples=n_resamples, seed=seed, n_jobs=n_jobs)
+        return engine.full_inference(self.effect_sizes, self.variances)
+
 
 class MetaAnalysisVisualizer:
     """Generate publication-quality meta-analysis plots"""
@@ -489,7 +500,9 @@ class AutomatedMetaAnalyzer:
 
     def conduct_meta_analysis(self, prepared_data: pd.DataFrame,
                             analysis_method: str = 'auto',
-                            study_label_col: str = 'study_id') -> Dict[str, Any]:
+                            study_label_col: str = 'study_id',
+                            resampling_iterations: int = 0,
+                            resampling_seed: Optional[int] = None) -> Dict[str, Any]:
         """Conduct meta-analysis on prepared data"""
 
         logger.info(f"Conducting meta-analysis with {len(prepared_data)} studies")
@@ -508,6 +521,19 @@ class AutomatedMetaAnalyzer:
         # Conduct analysis
         results = model.conduct_analysis(method=analysis_method)
 
+        # Small-study effects (consumed by GRADE's publication-bias domain)
+        if len(prepared_data) >= 3:
+            sample_sizes = (prepared_data['sample_size'].values
+                            if 'sample_size' in prepared_data.columns else None)
+            results['publication_bias'] = PublicationBiasAnalyzer().analyze(
+                effect_sizes, variances, sample_sizes)
+
+        # Resampling inference (bootstrap CIs, permutation p-values)
+        if resampling_iterations > 0 and len(prepared_data) >= 2:
+            results['resampling'] = model.resampling_inference(
+                n_resamples=resampling_iterations, seed=resampling_seed
+            )
+
         # Add study-level data
         results['study_data'] = prepared_data.to_dict('records')
         results['analysis_timestamp'] = datetime.now().isoformat()
@@ -517,6 +543,23 @@ class AutomatedMetaAnalyzer:
 
         return results
 
+    def conduct_meta_regression(self, prepared_data: pd.DataFrame,
+                                moderators: List[str],
+                                candidate_sets: Optional[List[List[str]]] = None,
+                                categorical: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Mixed-effects meta-regression, optionally screening candidate moderator sets"""
+
+        logger.info(f"Conducting meta-regression on moderators: {moderators}")
+
+        regression = MetaRegressionAnalyzer()
+        results = {'model': regression.fit(prepared_data, moderators, categorical=categorical)}
+
+        if candidate_sets:
+            results['screening'] = regression.screen(prepared_data, candidate_sets,
+                                                     categorical=categorical)
+
+        return results
+
     def generate_plots(self, results: Dict[str, Any], output_dir: str = "meta_analysis_plots") -> Dict[str, str]:
         """Generate all meta-analysis plots"""
 
@@ -602,6 +645,21 @@ class AutomatedMetaAnalyzer:
         else:
             report += "- Heterogeneity assessment not applicable for fixed-effects model\n\n"
 
+        # Resampling section
+        if 'resampling' in results:
+            boot = results['resampling']['bootstrap']
+            het_perm = results['resampling']['heterogeneity_test']
+            effect_perm = results['resampling']['effect_test']
+            report += f"""## Resampling Inference
+
+- **Bootstrap Resamples:** {boot['n_resamples']}
+- **Bootstrap 95% CI (Overall Effect):** [{boot['overall_effect']['ci_lower']:.4f}, {boot['overall_effect']['ci_upper']:.4f}]
+- **Bootstrap 95% CI (Tau²):** [{boot['tau2']['ci_lower']:.4f}, {boot['tau2']['ci_upper']:.4f}]
+- **Permutation P-value (Overall Effect):** {effect_perm['p_value']:.4f}
+- **Monte Carlo P-value (Q):** {het_perm['p_value']:.4f}
+
+"""
+
         # Study effects table
         report += "## Study-Level Effects\n\n"
         report += "| Study | Effect Size | 95% CI | Weight |\n"
@@ -633,7 +691,8 @@ class AutomatedMetaAnalyzer:
 
     def full_analysis_pipeline(self, csv_file: str, effect_type: str = 'continuous',
                              output_dir: str = 'meta_analysis_results',
-                             study_label_col: str = 'study_id') -> Dict[str, Any]:
+                             study_label_col: str = 'study_id',
+                             resampling_iterations: int = 0) -> Dict[str, Any]:
         """Complete meta-analysis pipeline from data to report"""
 
         logger.info("Starting complete meta-analysis pipeline")
@@ -648,7 +707,8 @@ class AutomatedMetaAnalyzer:
 
         # Step 2: Conduct analysis
         results = self.conduct_meta_analysis(
-            prepared_data, study_label_col=study_label_col
+            prepared_data, study_label_col=study_label_col,
+            resampling_iterations=resampling_iterations
         )
 
         # Step 3: Generate plots
@@ -712,6 +772,8 @@ if __name__ == "__main__":
                        help="Output directory")
     parser.add_argument("--study-label-col", default='study_id',
                        help="Column name for study labels")
+    parser.add_argument("--resamples", type=int, default=0,
+                       help="Bootstrap/permutation resamples (0 disables resampling inference)")
 
     args = parser.parse_args()
 
@@ -720,7 +782,8 @@ if __name__ == "__main__":
         args.csv_file,
         effect_type=args.effect_type,
         output_dir=args.output_dir,
-        study_label_col=args.study_label_col
+        study_label_col=args.study_label_col,
+        resampling_iterations=args.resamples
     )
 
     print(f"Meta-analysis completed! Results saved to: {args.output_dir}")
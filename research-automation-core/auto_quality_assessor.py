@@ -12,10 +12,28 @@ import json
 from datetime import datetime
 import re
 
+from publication_bias import PublicationBiasAnalyzer
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+RISK_SCORES = {
+    'Low': 1,
+    'Moderate': 0,
+    'High': -1,
+    'Critical': -2,
+    'Unclear': 0
+}
+
+# Study-level GRADE concern ratings: one level ("Serious") or two ("Very serious")
+GRADE_CONCERN_CRITERIA = {
+    'Low': ['Not serious', 'No serious', 'Low'],
+    'High': ['Serious', 'High'],
+    'Critical': ['Very serious'],
+    'Unclear': ['Unclear']
+}
+
 class QualityDomain:
     """Represents a single quality assessment domain"""
 
@@ -49,14 +67,104 @@ class QualityDomain:
 
     def _get_risk_score(self, risk_level: str) -> int:
         """Convert risk level to numerical score"""
-        score_map = {
-            'Low': 1,
-            'Moderate': 0,
-            'High': -1,
-            'Critical': -2,
-            'Unclear': 0
+        return RISK_SCORES.get(risk_level, 0)
+
+    def compile(self) -> Dict[Any, str]:
+        """Answer -> risk level lookup equivalent to assess_answer, for column-wise mapping"""
+
+        lookup = {}
+        if self.scoring_method == 'categorical':
+            # First matching risk level wins, as in assess_answer
+            for risk_level, conditions in self.criteria.items():
+                for answer in (conditions if isinstance(conditions, list) else [conditions]):
+                    lookup.setdefault(answer, risk_level)
+        elif self.scoring_method == 'yes_no':
+            for answer in ['yes', 'Yes', 'Y', 'y', True, 1]:
+                lookup.setdefault(answer, 'Low')
+            for answer in ['no', 'No', 'N', 'n', False, 0]:
+                lookup.setdefault(answer, 'High')
+        return lookup
+
+
+
+def _answer_column(studies: pd.DataFrame, domain_name: str) -> np.ndarray:
+    """Domain answers as assess_study reads them: <domain>_assessment only when <domain> is absent
+
+    Every row of a table has every column, so the fallback applies per column, exactly
+    like study_data.get(domain, fallback) on a row dict; an explicit None stays None.
+    """
+
+    if domain_name in studies.columns:
+        return studies[domain_name].to_numpy(dtype=object)
+    alt_name = f"{domain_name}_assessment"
+    if alt_name in studies.columns:
+        return studies[alt_name].to_numpy(dtype=object)
+    return np.full(len(studies), None, dtype=object)
+
+
+def assess_domain_table(domains: Dict[str, QualityDomain], studies: pd.DataFrame,
+                        id_col: str = 'study_id',
+                        columns: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
+    """Score a whole study table in one pass
+
+    Each domain's criteria are compiled to a lookup and mapped over its answer column,
+    giving a study x domain risk matrix with the same judgements as assess_study.
+    Unanswered domains are 'Not assessed' and do not count towards the overall score.
+    columns maps a domain to the input column holding its answers (default: its name).
+    """
+
+    index = studies[id_col].astype(str) if id_col in studies.columns else studies.index.astype(str)
+    risk = pd.DataFrame(index=pd.Index(index, name='study_id'))
+    answers = pd.DataFrame(index=risk.index)
+
+    for domain_name, domain in domains.items():
+        column = pd.Series(_answer_column(studies, (columns or {}).get(domain_name, domain_name)),
+                           dtype=object)
+        levels = column.map(domain.compile()).fillna('Unclear').to_numpy(dtype=object)
+        risk[domain_name] = np.where(column.to_numpy() == None, 'Not assessed', levels)  # noqa: E711
+        answers[domain_name] = column.to_numpy()
+
+    scores = risk.apply(lambda col: col.map(RISK_SCORES)).astype(float)
+    assessed = (risk != 'Not assessed').to_numpy()
+    n_assessed = assessed.sum(axis=1)
+    totals = np.where(assessed, scores.fillna(0).to_numpy(), 0.0).sum(axis=1)
+    overall_score = np.divide(totals, n_assessed, out=np.zeros(len(risk)), where=n_assessed > 0)
+
+    overall_risk = np.select([overall_score >= 0.5, overall_score >= -0.5], ['Low', 'Moderate'], 'High')
+    overall_risk = np.where(n_assessed > 0, overall_risk, 'Unclear')
+
+    return {
+        'risk_matrix': risk,
+        'score_matrix': scores.where(assessed, 0.0),
+        'answers': answers,
+        'overall_risk': pd.Series(overall_risk, index=risk.index, name='overall_risk'),
+        'overall_score': pd.Series(overall_score, index=risk.index, name='overall_score')
+    }
+
+
+def summarize_risk_matrix(table: Dict[str, Any], domains: Dict[str, QualityDomain]) -> Dict[str, Any]:
+    """Tool summary (same shape as the per-study summary) straight from the risk matrix"""
+
+    risk = table['risk_matrix']
+    total = len(risk)
+    if total == 0:
+        return {}
+
+    overall_counts = table['overall_risk'].value_counts()
+    return {
+        'total_assessments': total,
+        'overall_risk_distribution': {
+            level: {'count': int(count), 'percentage': (count / total) * 100}
+            for level, count in overall_counts.items()
+        },
+        'domain_summaries': {
+            domain_name: {
+                'question': domains[domain_name].question,
+                'risk_distribution': {level: int(count) for level, count in risk[domain_name].value_counts().items()}
+            }
+            for domain_name in risk.columns
         }
-        return score_map.get(risk_level, 0)
+    }
 
 
 class QualityAssessmentTool:
@@ -71,6 +179,10 @@ class QualityAssessmentTool:
         """Add an assessment domain"""
         self.domains[domain.name] = domain
 
+    def assess_table(self, studies: pd.DataFrame) -> Dict[str, Any]:
+        """Assess every study in a table at once (study x domain risk matrix)"""
+        return assess_domain_table(self.domains, studies)
+
     def assess_study(self, study_data: Dict[str, Any]) -> Dict[str, Any]:
         """Assess a single study"""
 
@@ -245,6 +357,18 @@ class GRADETool:
             'imprecision': {'weight': 0.25, 'description': 'Imprecision of effect estimates'},
             'publication_bias': {'weight': 0.0, 'description': 'Publication bias'}
         }
+        # Study-level concern ratings, scored like the risk-of-bias tools. They are read from
+        # grade_<domain> columns so a combined frame cannot mix them up with ROBIS answers
+        # (ROBIS also has a publication_bias domain)
+        self.study_domains = {
+            name: QualityDomain(name, info['description'], GRADE_CONCERN_CRITERIA)
+            for name, info in self.domains.items()
+        }
+        self.study_columns = {name: f"grade_{name}" for name in self.domains}
+
+    def assess_table(self, studies: pd.DataFrame) -> Dict[str, Any]:
+        """Study x domain matrix of GRADE concern ratings (answers in grade_<domain> columns)"""
+        return assess_domain_table(self.study_domains, studies, columns=self.study_columns)
 
     def assess_evidence_quality(self, meta_results: Dict[str, Any],
                               study_characteristics: Dict[str, Any]) -> Dict[str, Any]:
@@ -318,6 +442,21 @@ class GRADETool:
                 domain_assessment['level'] = 1
                 domain_assessment['reasoning'] = f'Wide confidence interval (width = {ci_width:.3f})'
 
+        elif domain_name == 'publication_bias':
+            # Formal small-study-effect tests, computed upstream or from the study effects
+            bias_results = meta_results.get('publication_bias')
+            if bias_results is None:
+                study_effects = meta_results.get('study_effects', {})
+                if len(study_effects.get('effects', [])) >= 3:
+                    bias_results = PublicationBiasAnalyzer().analyze(
+                        study_effects['effects'], study_effects['variances'])
+
+            if bias_results:
+                judgement = bias_results['grade']
+                domain_assessment['downgrade'] = judgement['downgrade']
+                domain_assessment['level'] = judgement['level']
+                domain_assessment['reasoning'] = judgement['reasoning']
+
         elif domain_name == 'indirectness':
             # Check if outcomes are direct measures
             outcome_direct = study_characteristics.get('outcome_direct', True)
@@ -354,6 +493,115 @@ class GRADETool:
         }
         return ratings.get(quality, 'Confidence rating unclear')
 
+    def assess_outcomes(self, outcomes: pd.DataFrame,
+                        risk_of_bias: Optional[pd.DataFrame] = None,
+                        outcome_studies: Optional[pd.DataFrame] = None,
+                        study_effects: Optional[Dict[str, Dict[str, Any]]] = None) -> pd.DataFrame:
+        """Summary-of-Findings table for a whole batch of outcomes at once
+
+        outcomes has one row per outcome (see meta_results_frame): 'outcome', 'I2',
+        'ci_lower', 'ci_upper' and optionally 'overall_effect', 'n_studies', 'total_n',
+        'study_design', 'outcome_direct', 'publication_bias_level'. risk_of_bias is a study
+        risk matrix with an 'overall_risk' column (AutomatedQualityAssessor risk_matrices)
+        and outcome_studies links it to outcomes ('outcome', 'study_id', optional 'weight').
+        study_effects ({outcome: {'effects', 'variances'}}) runs the publication-bias battery
+        for every outcome in one batch. Every domain rule is applied column-wise.
+        """
+
+        sof = outcomes.reset_index(drop=True).copy()
+        n = len(sof)
+
+        def column(name, default):
+            return sof[name] if name in sof.columns else pd.Series(default, index=sof.index)
+
+        i2 = pd.to_numeric(column('I2', 0.0), errors='coerce').fillna(0.0)
+        ci_width = (pd.to_numeric(column('ci_upper', 0.0), errors='coerce')
+                    - pd.to_numeric(column('ci_lower', 0.0), errors='coerce')).abs().fillna(0.0)
+
+        # Starting certainty from design
+        design = column('study_design', '').fillna('').astype(str).str.lower()
+        sof['starting_quality'] = np.select(
+            [design.str.contains('randomized|rct'), design.str.contains('cohort|case-control')],
+            ['High', 'Moderate'], 'Low')
+
+        # Risk of bias: share of information from high-risk studies when a matrix is given,
+        # otherwise the heterogeneity proxy used by assess_evidence_quality
+        if risk_of_bias is not None and outcome_studies is not None:
+            links = outcome_studies.assign(study_id=outcome_studies['study_id'].astype(str))
+            overall = risk_of_bias['overall_risk'].groupby(level=0).first()
+            links = links.assign(high=links['study_id'].map(overall).isin(['High', 'Critical']).astype(float),
+                                 weight=links['weight'] if 'weight' in links.columns else 1.0)
+            links['weighted_high'] = links['high'] * links['weight']
+            grouped = links.groupby('outcome')[['weighted_high', 'weight']].sum()
+            high_share = (grouped['weighted_high'] / grouped['weight']).reindex(sof['outcome']).fillna(0.0).to_numpy()
+            rob_level = np.select([high_share >= 0.75, high_share >= 0.5], [2, 1], 0)
+            rob_reason = np.where(rob_level > 0,
+                                  pd.Series(high_share * 100).round(0).astype(int).astype(str)
+                                  + '% of information from high risk-of-bias studies', '')
+        else:
+            rob_level = np.where(i2 > 50, 1, 0)
+            rob_reason = np.where(rob_level > 0, 'High heterogeneity (I² = ' + i2.map('{:.1f}'.format) + '%)', '')
+
+        inc_level = np.where(i2 > 75, 2, 0)
+        inc_reason = np.where(inc_level > 0, 'Considerable heterogeneity (I² = ' + i2.map('{:.1f}'.format) + '%)', '')
+
+        direct = column('outcome_direct', True).fillna(True).astype(bool)
+        ind_level = np.where(~direct, 1, 0)
+        ind_reason = np.where(ind_level > 0, 'Indirect outcome measures used', '')
+
+        imp_level = np.where(ci_width > 0.5, 1, 0)
+        imp_reason = np.where(imp_level > 0, 'Wide confidence interval (width = ' + ci_width.map('{:.3f}'.format) + ')', '')
+
+        pub_level = np.array(pd.to_numeric(column('publication_bias_level', 0), errors='coerce').fillna(0), dtype=int)
+        pub_reason = np.full(n, '', dtype=object)
+        if study_effects:
+            bias = PublicationBiasAnalyzer().analyze_batch(study_effects)
+            for i, outcome in enumerate(sof['outcome']):
+                judgement = bias.get(outcome, {}).get('grade')
+                if judgement:
+                    pub_level[i] = judgement['level']
+                    pub_reason[i] = judgement['reasoning']
+
+        levels = {'risk_of_bias': rob_level, 'inconsistency': inc_level, 'indirectness': ind_level,
+                  'imprecision': imp_level, 'publication_bias': pub_level}
+        reasons = {'risk_of_bias': rob_reason, 'inconsistency': inc_reason, 'indirectness': ind_reason,
+                   'imprecision': imp_reason, 'publication_bias': pub_reason}
+        for domain_name in self.domains:
+            sof[f'{domain_name}_downgrade'] = np.asarray(levels[domain_name], dtype=int)
+            sof[f'{domain_name}_reason'] = reasons[domain_name]
+
+        start_score = sof['starting_quality'].map({'High': 4, 'Moderate': 3, 'Low': 2, 'Very low': 1})
+        score = start_score.to_numpy() - sum(np.asarray(levels[d], dtype=int) for d in self.domains)
+        sof['certainty'] = np.select([score >= 4, score == 3, score == 2], ['High', 'Moderate', 'Low'], 'Very low')
+        sof['confidence_rating'] = sof['certainty'].map(self._get_confidence_rating)
+
+        return sof
+
+
+def meta_results_frame(meta_results: Dict[str, Dict[str, Any]],
+                       study_characteristics: Optional[Dict[str, Dict[str, Any]]] = None) -> pd.DataFrame:
+    """Flatten {outcome: conduct_analysis() result} into the columnar GRADETool.assess_outcomes input"""
+
+    study_characteristics = study_characteristics or {}
+    rows = []
+    for outcome, result in meta_results.items():
+        primary = result.get('primary_results', {})
+        characteristics = study_characteristics.get(outcome, {})
+        bias = result.get('publication_bias')
+        rows.append({
+            'outcome': outcome,
+            'overall_effect': primary.get('overall_effect'),
+            'ci_lower': primary.get('ci_lower', 0),
+            'ci_upper': primary.get('ci_upper', 0),
+            'I2': (primary.get('heterogeneity_test') or {}).get('I2') or 0,
+            'n_studies': len(result.get('study_data', [])) or None,
+            'total_n': sum(study.get('sample_size', 0) for study in result.get('study_data', [])) or None,
+            'study_design': characteristics.get('study_design', ''),
+            'outcome_direct': characteristics.get('outcome_direct', True),
+            'publication_bias_level': bias['grade']['level'] if bias else 0
+        })
+    return pd.DataFrame(rows)
+
 
 class AutomatedQualityAssessor:
     """Main automated quality assessment system"""
@@ -367,8 +615,13 @@ class AutomatedQualityAssessor:
 
     def assess_study_quality(self, studies_data: pd.DataFrame,
                            assessment_type: str = 'auto',
-                           output_file: str = None) -> Dict[str, Any]:
-        """Assess quality of multiple studies"""
+                           output_file: str = None,
+                           study_records: bool = True) -> Dict[str, Any]:
+        """Assess quality of multiple studies
+
+        study_records=False skips the per-study dicts and returns only the risk
+        matrices and summaries, which is what large tables usually need.
+        """
 
         if assessment_type not in ['auto', 'robis', 'cochrane', 'grade']:
             raise ValueError(f"Unknown assessment type: {assessment_type}")
@@ -398,19 +651,19 @@ class AutomatedQualityAssessor:
             'assessment_date': datetime.now().isoformat()
         }
 
-        # Apply each tool
+        results['risk_matrices'] = {}
+
+        # Apply each tool to the whole table; summaries come straight from the matrix
         for tool_name in tools_to_use:
             tool = self.tools[tool_name]
-            tool_assessments = []
-
-            for _, study in studies_data.iterrows():
-                assessment = tool.assess_study(dict(study))
-                tool_assessments.append(assessment)
+            table = tool.assess_table(studies_data)
+            domains = tool.study_domains if tool_name == 'grade' else tool.domains
 
-            results['assessments'][tool_name] = tool_assessments
-
-            # Generate summary for this tool
-            results['summary'][tool_name] = self._generate_tool_summary(tool_assessments)
+            results['risk_matrices'][tool_name] = table['risk_matrix'].assign(
+                overall_risk=table['overall_risk'], overall_score=table['overall_score'])
+            results['summary'][tool_name] = summarize_risk_matrix(table, domains)
+            if study_records:
+                results['assessments'][tool_name] = self._study_records(tool.name, table, domains)
 
         if output_file:
             self.save_assessments(results, output_file)
@@ -418,6 +671,39 @@ class AutomatedQualityAssessor:
         logger.info(f"Quality assessment completed using tools: {tools_to_use}")
         return results
 
+    def _study_records(self, tool_name: str, table: Dict[str, Any],
+                       domains: Dict[str, QualityDomain]) -> List[Dict[str, Any]]:
+        """Per-study assessment dicts (the assess_study format) built from the matrices"""
+
+        assessment_date = datetime.now().isoformat()
+        names = list(domains)
+        risk = table['risk_matrix'][names].to_numpy()
+        scores = table['score_matrix'][names].to_numpy().astype(int).tolist()
+        answers = table['answers'][names].to_numpy()
+        overall_risk = table['overall_risk'].tolist()
+        overall_score = table['overall_score'].tolist()
+        questions = [domains[name].question for name in names]
+
+        records = []
+        for i, study_id in enumerate(table['risk_matrix'].index):
+            records.append({
+                'study_id': study_id,
+                'assessment_tool': tool_name,
+                'assessment_date': assessment_date,
+                'domain_assessments': {
+                    name: {
+                        'question': questions[j],
+                        'answer': answers[i, j],
+                        'risk_level': risk[i, j],
+                        'score': scores[i][j]
+                    }
+                    for j, name in enumerate(names)
+                },
+                'overall_risk': overall_risk[i],
+                'overall_score': overall_score[i]
+            })
+        return records
+
     def _generate_tool_summary(self, assessments: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Generate summary statistics for a tool's assessments"""
 
@@ -474,6 +760,30 @@ class AutomatedQualityAssessor:
         logger.info("Meta-analysis quality assessment completed")
         return grade_assessment
 
+    def generate_summary_of_findings(self, outcomes: Union[pd.DataFrame, Dict[str, Dict[str, Any]]],
+                                     risk_of_bias: Optional[pd.DataFrame] = None,
+                                     outcome_studies: Optional[pd.DataFrame] = None,
+                                     study_effects: Optional[Dict[str, Dict[str, Any]]] = None,
+                                     study_characteristics: Optional[Dict[str, Dict[str, Any]]] = None,
+                                     output_file: str = None) -> pd.DataFrame:
+        """GRADE Summary-of-Findings table for every outcome in one pass
+
+        outcomes is either the columnar outcome table or {outcome: meta_results}.
+        """
+
+        if isinstance(outcomes, dict):
+            outcomes = meta_results_frame(outcomes, study_characteristics)
+
+        logger.info(f"Generating GRADE Summary of Findings for {len(outcomes)} outcomes")
+        sof = self.tools['grade'].assess_outcomes(outcomes, risk_of_bias, outcome_studies, study_effects)
+
+        if output_file:
+            Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+            sof.to_csv(output_file, index=False)
+            logger.info(f"Summary of Findings saved to {output_file}")
+
+        return sof
+
     def _assess_heterogeneity_quality(self, meta_results: Dict[str, Any]) -> Dict[str, Any]:
         """Assess heterogeneity quality implications"""
 
@@ -519,21 +829,45 @@ class AutomatedQualityAssessor:
 
         assessment = {'num_studies': num_studies}
 
+        bias_results = meta_results.get('publication_bias')
+        study_effects = meta_results.get('study_effects', {})
+        if bias_results is None and len(study_effects.get('effects', [])) >= 3:
+            bias_results = PublicationBiasAnalyzer().analyze(
+                study_effects['effects'], study_effects['variances'])
+
         if num_studies < 10:
             assessment.update({
                 'bias_risk': 'High',
                 'reasoning': f'Only {num_studies} studies - insufficient for bias assessment',
                 'recommendation': 'Results should be interpreted cautiously'
             })
+        elif bias_results:
+            assessment.update({
+                'bias_risk': bias_results['grade']['bias_risk'],
+                'reasoning': bias_results['grade']['reasoning'],
+                'recommendation': ('Report trim-and-fill and PET-PEESE adjusted estimates'
+                                   if bias_results['grade']['downgrade']
+                                   else 'Assess small-study effects by other means (funnel tests not testable)'
+                                   if bias_results['grade']['bias_risk'] == 'Uncertain'
+                                   else 'No adjustment for small-study effects required')
+            })
         else:
-            # Could add more sophisticated checks here
-            # For now, basic assessment
             assessment.update({
                 'bias_risk': 'Uncertain',
-                'reasoning': 'Sample size adequate but formal bias testing needed',
+                'reasoning': 'Sample size adequate but study-level effects unavailable',
                 'recommendation': 'Conduct formal statistical tests for publication bias'
             })
 
+        if bias_results:
+            assessment['tests'] = {
+                'egger_status': bias_results['egger']['status'],
+                'egger_p_value': bias_results['egger']['p_value'],
+                'begg_p_value': bias_results['begg']['p_value'],
+                'pet_peese_estimate': bias_results['pet_peese']['estimate'],
+                'trim_and_fill_k0': bias_results['trim_and_fill']['k0'],
+                'trim_and_fill_adjusted': bias_results['trim_and_fill']['adjusted_effect']
+            }
+
         return assessment
 
     def _assess_sample_size(self, meta_results: Dict[str, Any]) -> Dict[str, Any]:
@@ -587,6 +921,8 @@ class AutomatedQualityAssessor:
             return float(obj)
         elif isinstance(obj, (np.int64, np.int32)):
             return int(obj)
+        elif isinstance(obj, pd.DataFrame):
+            return self._make_serializable(obj.reset_index().to_dict('records'))
         else:
             return obj
 
@@ -19,6 +19,10 @@ from plotly.subplots import make_subplots
 import warnings
 warnings.filterwarnings('ignore')
 
+from forest_renderer import ForestFunnelRenderer, forest_arrays
+from figure_render_service import FigureRenderService, FigureJob
+from dashboard_builder import IncrementalDashboardBuilder, DashboardPanel
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -43,6 +47,8 @@ class MetaAnalysisVisualizer:
             'neutral': '#7f7f7f'
         }
 
+        self.renderer = ForestFunnelRenderer()
+
     def forest_plot(self, study_data: pd.DataFrame,
                    title: str = "Forest Plot",
                    save_path: str = None,
@@ -60,30 +66,26 @@ class MetaAnalysisVisualizer:
 
         fig = go.Figure()
 
-        # Individual studies
-        for i, (_, study) in enumerate(study_data.iterrows()):
-            effect = study['effect_size']
-            ci_lower = study['ci_lower']
-            ci_upper = study['ci_upper']
-            weight = study.get('weight', 1)
-
-            # Study effect point
-            fig.add_trace(go.Scatter(
-                x=[effect], y=[i],
-                mode='markers',
-                marker=dict(size=weight*5 + 5, color='blue'),
-                name=study.get('study_label', f'Study {i+1}'),
-                hovertemplate=f"Effect: {effect:.3f}<br>95% CI: [{ci_lower:.3f}, {ci_upper:.3f}]<br>Weight: {weight:.1f}%"
-            ))
-
-            # Confidence interval line
-            fig.add_trace(go.Scatter(
-                x=[ci_lower, ci_upper], y=[i, i],
-                mode='lines',
-                line=dict(color='blue', width=2),
-                showlegend=False,
-                hoverinfo='skip'
-            ))
+        # All studies in one trace; CIs drawn as asymmetric error bars
+        effect = study_data['effect_size'].to_numpy(dtype=float)
+        weight = study_data['weight'].to_numpy(dtype=float) if 'weight' in study_data.columns \
+            else np.ones(len(study_data))
+        labels = study_data['study_label'] if 'study_label' in study_data.columns \
+            else pd.Series([f'Study {i+1}' for i in range(len(study_data))])
+
+        fig.add_trace(go.Scatter(
+            x=effect, y=np.arange(len(study_data)),
+            mode='markers',
+            marker=dict(size=np.minimum(weight*5 + 5, 30), color='blue', symbol='square'),
+            error_x=dict(type='data', symmetric=False,
+                         array=study_data['ci_upper'].to_numpy(dtype=float) - effect,
+                         arrayminus=effect - study_data['ci_lower'].to_numpy(dtype=float),
+                         color='blue', thickness=2, width=0),
+            text=labels,
+            customdata=np.column_stack([study_data['ci_lower'], study_data['ci_upper'], weight]),
+            hovertemplate="%{text}<br>Effect: %{x:.3f}<br>95% CI: [%{customdata[0]:.3f}, "
+                          "%{customdata[1]:.3f}]<br>Weight: %{customdata[2]:.1f}%<extra></extra>"
+        ))
 
         # Overall effect (if available)
         if 'overall_effect' in study_data.columns:
@@ -119,47 +121,13 @@ class MetaAnalysisVisualizer:
                               save_path: str, figsize: Tuple[int, int]) -> plt.Figure:
         """Static forest plot using matplotlib"""
 
-        fig, ax = plt.subplots(figsize=figsize)
-
-        # Plot individual studies
-        y_positions = np.arange(len(study_data))
-
-        for i, (_, study) in enumerate(study_data.iterrows()):
-            effect = study['effect_size']
-            ci_lower = study['ci_lower']
-            ci_upper = study['ci_upper']
-            weight = study.get('weight', 1)
-
-            # Study effect point
-            ax.plot(effect, i, 's', color='blue', markersize=weight*3 + 3)
-
-            # Confidence interval line
-            ax.plot([ci_lower, ci_upper], [i, i], color='blue', linewidth=2)
-
-        # Overall effect if exists
-        overall_row = study_data[study_data.get('overall', pd.Series([False]*len(study_data))) == True]
-        if not overall_row.empty:
-            overall = overall_row.iloc[0]
-            ax.plot(overall['effect_size'], len(study_data), 'D', color='red', markersize=8)
-            ax.plot([overall['ci_lower'], overall['ci_upper']], [len(study_data), len(study_data)],
-                   color='red', linewidth=3)
-
-        # Vertical line at no effect
-        ax.axvline(x=0, color='red', linestyle='--', alpha=0.7)
-
-        # Labels and formatting
-        ax.set_xlabel('Effect Size (95% CI)', fontsize=12, fontweight='bold')
-        ax.set_title(title, fontsize=14, fontweight='bold', pad=20)
-        ax.set_yticks(y_positions)
-        ax.set_yticklabels(study_data.get('study_label', [f'Study {i+1}' for i in range(len(study_data))]))
-        ax.grid(True, alpha=0.3)
-
-        plt.tight_layout()
+        # Long forests are paginated; the first page is returned, all pages are saved
+        pages = self.renderer.forest_pages(forest_arrays(study_data), title, figsize)
 
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            self.renderer.save(pages, save_path)
 
-        return fig
+        return pages[0]
 
     def funnel_plot(self, study_data: pd.DataFrame,
                    title: str = "Funnel Plot",
@@ -223,32 +191,12 @@ class MetaAnalysisVisualizer:
                               save_path: str, figsize: Tuple[int, int]) -> plt.Figure:
         """Static funnel plot using matplotlib"""
 
-        fig, ax = plt.subplots(figsize=figsize)
-
-        # Individual studies
-        ax.scatter(study_data['effect_size'], study_data['se'],
-                  alpha=0.7, s=50, color='blue', edgecolors='black')
-
-        # Pseudo-confidence intervals
-        se_range = np.linspace(study_data['se'].min(), study_data['se'].max(), 100)
-        ci_width = 1.96 * se_range
-
-        ax.plot(se_range, ci_width, '--', color='red', alpha=0.7, label='95% CI')
-        ax.plot(se_range, -ci_width, '--', color='red', alpha=0.7)
-
-        ax.set_xlabel('Effect Size', fontsize=12, fontweight='bold')
-        ax.set_ylabel('Standard Error', fontsize=12, fontweight='bold')
-        ax.set_title(title, fontsize=14, fontweight='bold', pad=20)
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-
-        # Invert y-axis (convention)
-        ax.invert_yaxis()
-
-        plt.tight_layout()
+        se_col = 'se' if 'se' in study_data.columns else 'effect_se'
+        fig = self.renderer.funnel(study_data['effect_size'].to_numpy(dtype=float),
+                                   study_data[se_col].to_numpy(dtype=float), title, figsize)
 
         if save_path:
-            plt.savefig(save_path, dpi=300, bbox_inches='tight')
+            self.renderer.save([fig], save_path)
 
         return fig
 
@@ -259,12 +207,21 @@ class ResearchDashboardGenerator:
     def __init__(self, output_dir: str = "research_dashboards"):
         self.output_dir = Path(output_dir)
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        self.renderer = ForestFunnelRenderer()
 
     def create_systematic_review_dashboard(self,
                                         literature_data: pd.DataFrame,
                                         meta_results: Dict[str, Any] = None,
-                                        quality_data: pd.DataFrame = None) -> str:
-        """Create comprehensive systematic review dashboard"""
+                                        quality_data: pd.DataFrame = None,
+                                        build_mode: str = 'inline') -> str:
+        """Create comprehensive systematic review dashboard
+
+        build_mode='assets' writes an asset-split dashboard that only rebuilds changed panels.
+        """
+
+        if build_mode == 'assets':
+            return self._build_asset_dashboard(literature_data, meta_results, quality_data,
+                                               "Systematic Review Dashboard")
 
         dashboard_data = {
             'literature_overview': self._create_literature_overview(literature_data),
@@ -293,6 +250,73 @@ class ResearchDashboardGenerator:
         logger.info(f"Systematic review dashboard created: {dashboard_path}")
         return str(dashboard_path)
 
+    def _build_asset_dashboard(self, literature_data: pd.DataFrame, meta_results: Dict[str, Any],
+                               quality_data: pd.DataFrame, title: str) -> str:
+        """Asset-split dashboard: one content-hashed asset per panel, loaded lazily"""
+
+        builder = IncrementalDashboardBuilder(self.output_dir / "systematic_review")
+        panels = [
+            DashboardPanel('literature_overview', 'Literature Overview', 'plotly',
+                           lambda: self._create_literature_overview_figure(literature_data),
+                           literature_data),
+            DashboardPanel('study_characteristics', 'Study Characteristics', 'image',
+                           lambda: self._create_study_characteristics_plot(literature_data),
+                           literature_data),
+            DashboardPanel('temporal_trends', 'Publication Trends Over Time', 'image',
+                           lambda: self._create_temporal_trends(literature_data),
+                           literature_data)
+        ]
+
+        if meta_results:
+            meta_inputs = {key: meta_results.get(key) for key in ('study_data', 'primary_results')}
+            panels.extend([
+                DashboardPanel('heterogeneity', 'Heterogeneity Assessment', 'image',
+                               lambda: self._create_heterogeneity_plot(meta_results), meta_inputs),
+                DashboardPanel('forest_plot', 'Forest Plot', 'image',
+                               lambda: self._create_forest_plot(meta_results), meta_inputs),
+                DashboardPanel('funnel_plot', 'Funnel Plot', 'image',
+                               lambda: self._create_funnel_plot(meta_results), meta_inputs)
+            ])
+
+        if quality_data is not None:
+            panels.append(DashboardPanel('quality_assessment', 'Quality Assessment', 'image',
+                                         lambda: self._create_quality_dashboard(quality_data),
+                                         quality_data))
+
+        overview = self._create_literature_overview(literature_data)
+        stats = {
+            'Total Studies': overview['total_studies'],
+            'Publication Years': len(overview['publication_years']),
+            'Study Designs': len(overview['study_designs']) if overview['study_designs'] is not None else 0,
+            'Countries Covered': len(overview['countries']) if overview['countries'] is not None else 0
+        }
+        if meta_results:
+            summary = self._create_meta_summary(meta_results)
+            stats['Overall Effect'] = f"{summary['overall_effect']:.3f}"
+            stats['I² (%)'] = f"{summary['heterogeneity_i2']:.1f}"
+
+        result = builder.build(panels, title, stats)
+        logger.info(f"Systematic review dashboard created: {result['index']}")
+        return result['index']
+
+    def _create_literature_overview_figure(self, data: pd.DataFrame) -> go.Figure:
+        """Interactive publications-per-year and study-design panel"""
+
+        fig = make_subplots(rows=1, cols=2, subplot_titles=('Publications by Year', 'Study Designs'))
+
+        if 'publication_year' in data.columns:
+            yearly_counts = data['publication_year'].value_counts().sort_index()
+            fig.add_trace(go.Bar(x=yearly_counts.index.tolist(), y=yearly_counts.values.tolist(),
+                                 name='Publications'), row=1, col=1)
+
+        if 'study_design' in data.columns:
+            design_counts = data['study_design'].value_counts()
+            fig.add_trace(go.Bar(x=design_counts.index.tolist(), y=design_counts.values.tolist(),
+                                 name='Study designs'), row=1, col=2)
+
+        fig.update_layout(height=450, showlegend=False)
+        return fig
+
     def _create_literature_overview(self, data: pd.DataFrame) -> Dict[str, Any]:
         """Create literature overview statistics"""
 
@@ -461,48 +485,19 @@ class ResearchDashboardGenerator:
             ax.set_title('Forest Plot - No Data')
             return fig
 
-        # Convert to DataFrame for easier handling
         df = pd.DataFrame(study_data)
+        if 'study_label' not in df.columns:
+            df['study_label'] = df['study_id'] if 'study_id' in df.columns else \
+                [f'Study {i+1}' for i in range(len(df))]
 
-        # Create forest plot
-        fig, ax = plt.subplots(figsize=(12, max(6, len(df) * 0.5)))
-
-        y_positions = np.arange(len(df))
-
-        # Plot individual studies
-        for i, (_, study) in enumerate(df.iterrows()):
-            effect = study.get('effect_size', 0)
-            se = study.get('effect_se', 0.1)
-            ci_lower = effect - 1.96 * se
-            ci_upper = effect + 1.96 * se
-
-            # Study effect point
-            ax.plot(effect, i, 's', color='blue', markersize=6)
-
-            # Confidence interval line
-            ax.plot([ci_lower, ci_upper], [i, i], color='blue', linewidth=2)
-
-        # Overall effect
+        arrays = forest_arrays(df)
         primary_results = results.get('primary_results', {})
-        overall_effect = primary_results.get('overall_effect', 0)
-        overall_ci_lower = primary_results.get('ci_lower', 0)
-        overall_ci_upper = primary_results.get('ci_upper', 0)
+        if arrays['overall'] is None and primary_results:
+            arrays['overall'] = [primary_results.get('overall_effect', 0),
+                                 primary_results.get('ci_lower', 0),
+                                 primary_results.get('ci_upper', 0)]
 
-        ax.plot(overall_effect, len(df), 'D', color='red', markersize=10)
-        ax.plot([overall_ci_lower, overall_ci_upper], [len(df), len(df)], color='red', linewidth=3)
-
-        # Vertical line at no effect
-        ax.axvline(x=0, color='black', linestyle='--', alpha=0.7)
-
-        # Labels
-        ax.set_xlabel('Effect Size (95% CI)', fontsize=12, fontweight='bold')
-        ax.set_title('Forest Plot', fontsize=14, fontweight='bold')
-        ax.set_yticks(list(range(len(df))) + [len(df)])
-        ax.set_yticklabels([study.get('study_id', f'Study {i+1}') for study in study_data] + ['Overall Effect'])
-        ax.grid(True, alpha=0.3)
-
-        plt.tight_layout()
-        return fig
+        return self.renderer.forest_pages(arrays, 'Forest Plot')[0]
 
     def _create_funnel_plot(self, results: Dict[str, Any]) -> plt.Figure:
         """Create funnel plot for publication bias"""
@@ -516,34 +511,11 @@ class ResearchDashboardGenerator:
             return fig
 
         df = pd.DataFrame(study_data)
+        effect_sizes = df['effect_size'] if 'effect_size' in df.columns else pd.Series([0.0] * len(df))
+        se_values = df['effect_se'] if 'effect_se' in df.columns else pd.Series([0.1] * len(df))
 
-        fig, ax = plt.subplots(figsize=(10, 8))
-
-        # Individual studies
-        effect_sizes = df.get('effect_size', pd.Series([0] * len(df)))
-        se_values = df.get('effect_se', pd.Series([0.1] * len(df)))
-
-        ax.scatter(effect_sizes, se_values, alpha=0.7, s=50, color='blue', edgecolors='black')
-
-        # Pseudo-confidence intervals
-        se_range = np.linspace(se_values.min(), se_values.max(), 100)
-        ci_width = 1.96 * se_range
-
-        ax.fill_between(se_range, -ci_width, ci_width, color='red', alpha=0.1)
-        ax.plot(se_range, ci_width, '--', color='red', alpha=0.7, label='95% CI')
-        ax.plot(se_range, -ci_width, '--', color='red', alpha=0.7)
-
-        ax.set_xlabel('Effect Size', fontsize=12, fontweight='bold')
-        ax.set_ylabel('Standard Error', fontsize=12, fontweight='bold')
-        ax.set_title('Funnel Plot (Publication Bias Assessment)', fontsize=14, fontweight='bold')
-        ax.legend()
-        ax.grid(True, alpha=0.3)
-
-        # Invert y-axis (convention)
-        ax.invert_yaxis()
-
-        plt.tight_layout()
-        return fig
+        return self.renderer.funnel(effect_sizes.to_numpy(dtype=float), se_values.to_numpy(dtype=float),
+                                    'Funnel Plot (Publication Bias Assessment)')
 
     def _create_quality_dashboard(self, quality_data: pd.DataFrame) -> plt.Figure:
         """Create quality assessment visualization"""
@@ -734,40 +706,48 @@ class AutomatedVisualizationGenerator:
                                            literature_data: pd.DataFrame = None,
                                            meta_results: Dict[str, Any] = None,
                                            quality_data: pd.DataFrame = None,
-                                           project_type: str = "systematic_review") -> Dict[str, str]:
-        """Generate comprehensive visualizations for a research project"""
+                                           project_type: str = "systematic_review",
+                                           n_jobs: int = 1,
+                                           incremental: bool = True) -> Dict[str, str]:
+        """Generate comprehensive visualizations for a research project
+
+        Figures are rendered as a manifest of jobs by FigureRenderService. By default the
+        output directory is stable, figures whose data and drawing code are unchanged are
+        skipped and the dashboard is the asset-split build at
+        <output_dir>/<project_type>/dashboard; incremental=False writes everything afresh
+        to a timestamped directory.
+        """
 
         generated_files = {}
 
-        timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        project_output_dir = self.output_dir / f"{project_type}_{timestamp}"
-        project_output_dir.mkdir(exist_ok=True)
+        if incremental:
+            project_output_dir = self.output_dir / project_type
+        else:
+            timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+            project_output_dir = self.output_dir / f"{project_type}_{timestamp}"
+        project_output_dir.mkdir(parents=True, exist_ok=True)
 
         logger.info(f"Generating visualizations for {project_type} project")
 
-        # Generate literature visualizations
-        if literature_data is not None and not literature_data.empty:
-            logger.info("Generating literature visualizations...")
-
-            # Study characteristics plot
-            study_char_fig = self.dashboard_generator._create_study_characteristics_plot(literature_data)
-            study_char_path = project_output_dir / "study_characteristics.png"
-            study_char_fig.savefig(study_char_path, dpi=300, bbox_inches='tight')
-            generated_files['study_characteristics'] = str(study_char_path)
-
-            # Temporal trends plot
-            temporal_fig = self.dashboard_generator._create_temporal_trends(literature_data)
-            temporal_path = project_output_dir / "temporal_trends.png"
-            temporal_fig.savefig(temporal_path, dpi=300, bbox_inches='tight')
-            generated_files['temporal_trends'] = str(temporal_path)
-
-            plt.close('all')  # Close all figures to free memory
+        module = 'auto_visualization_generator'
+        dashboard_init = {'output_dir': str(self.dashboard_generator.output_dir)}
+        jobs = []
 
-        # Generate meta-analysis visualizations
+        # Literature visualizations
+        if literature_data is not None and not literature_data.empty:
+            jobs.append(FigureJob(
+                name='study_characteristics',
+                target=f'{module}:ResearchDashboardGenerator._create_study_characteristics_plot',
+                outputs=[str(project_output_dir / "study_characteristics.png")],
+                args=[literature_data], init_kwargs=dashboard_init))
+            jobs.append(FigureJob(
+                name='temporal_trends',
+                target=f'{module}:ResearchDashboardGenerator._create_temporal_trends',
+                outputs=[str(project_output_dir / "temporal_trends.png")],
+                args=[literature_data], init_kwargs=dashboard_init))
+
+        # Meta-analysis visualizations
         if meta_results is not None:
-            logger.info("Generating meta-analysis visualizations...")
-
-            # Prepare study data for plots
             study_data = meta_results.get('study_data', [])
             if study_data:
                 study_df = pd.DataFrame(study_data)
@@ -780,39 +760,48 @@ class AutomatedVisualizationGenerator:
                 if 'study_label' not in study_df.columns:
                     study_df['study_label'] = [f"Study {i+1}" for i in range(len(study_df))]
 
-                # Forest plot
-                forest_fig = self.meta_visualizer.forest_plot(study_df, save_path=str(project_output_dir / "forest_plot.png"))
-                generated_files['forest_plot'] = str(project_output_dir / "forest_plot.png")
-
-                # Funnel plot
-                funnel_fig = self.meta_visualizer.funnel_plot(study_df, save_path=str(project_output_dir / "funnel_plot.png"))
-                generated_files['funnel_plot'] = str(project_output_dir / "funnel_plot.png")
-
-                # Heterogeneity plot
-                het_fig = self.dashboard_generator._create_heterogeneity_plot(meta_results)
-                het_path = project_output_dir / "heterogeneity_plot.png"
-                het_fig.savefig(het_path, dpi=300, bbox_inches='tight')
-                generated_files['heterogeneity_plot'] = str(het_path)
-
-            plt.close('all')
-
-        # Generate quality assessment visualizations
+                jobs.append(FigureJob(
+                    name='forest_plot', target=f'{module}:MetaAnalysisVisualizer.forest_plot',
+                    outputs=[str(project_output_dir / "forest_plot.png")],
+                    args=[study_df], save_kwarg='save_path'))
+                jobs.append(FigureJob(
+                    name='funnel_plot', target=f'{module}:MetaAnalysisVisualizer.funnel_plot',
+                    outputs=[str(project_output_dir / "funnel_plot.png")],
+                    args=[study_df], save_kwarg='save_path'))
+                jobs.append(FigureJob(
+                    name='heterogeneity_plot',
+                    target=f'{module}:ResearchDashboardGenerator._create_heterogeneity_plot',
+                    outputs=[str(project_output_dir / "heterogeneity_plot.png")],
+                    args=[meta_results], init_kwargs=dashboard_init))
+
+        # Quality assessment visualizations
         if quality_data is not None and not quality_data.empty:
-            logger.info("Generating quality assessment visualizations...")
-
-            quality_fig = self.dashboard_generator._create_quality_dashboard(quality_data)
-            quality_path = project_output_dir / "quality_assessment.png"
-            quality_fig.savefig(quality_path, dpi=300, bbox_inches='tight')
-            generated_files['quality_assessment'] = str(quality_path)
-
-            plt.close('all')
+            jobs.append(FigureJob(
+                name='quality_assessment',
+                target=f'{module}:ResearchDashboardGenerator._create_quality_dashboard',
+                outputs=[str(project_output_dir / "quality_assessment.png")],
+                args=[quality_data], init_kwargs=dashboard_init))
+
+        if jobs:
+            service = FigureRenderService(state_file=str(project_output_dir / ".figure_build_state.json"),
+                                          n_jobs=n_jobs)
+            for name, outcome in service.build(jobs).items():
+                if outcome['status'] != 'failed':
+                    generated_files[name] = outcome['outputs'][0]
 
         # Generate comprehensive dashboard
         if literature_data is not None:
             logger.info("Generating research dashboard...")
 
-            dashboard_path = self.dashboard_generator.create_systematic_review_dashboard(
-                literature_data, meta_results, quality_data
+            # Incremental runs keep the asset-split dashboard under the stable project
+            # directory, so its panel manifest survives and unchanged panels are reused
+            if incremental:
+                dashboard_generator = ResearchDashboardGenerator(str(project_output_dir / "dashboard"))
+            else:
+                dashboard_generator = self.dashboard_generator
+            dashboard_path = dashboard_generator.create_systematic_review_dashboard(
+                literature_data, meta_results, quality_data,
+                build_mode='assets' if incremental else 'inline'
             )
             generated_files['dashboard'] = dashboard_path
 
@@ -834,6 +823,9 @@ if __name__ == "__main__":
                        help="Type of research project")
     parser.add_argument("--output-dir", default="research_visualizations",
                        help="Output directory")
+    parser.add_argument("--jobs", type=int, default=1, help="Parallel rendering processes")
+    parser.add_argument("--no-incremental", dest="incremental", action="store_false",
+                       help="Render everything into a new timestamped output directory")
 
     args = parser.parse_args()
 
@@ -846,7 +838,8 @@ if __name__ == "__main__":
 
     # Generate visualizations
     generated_files = generator.generate_comprehensive_visualizations(
-        literature_data, meta_results, quality_data, args.project_type
+        literature_data, meta_results, quality_data, args.project_type,
+        n_jobs=args.jobs, incremental=args.incremental
     )
 
     print(f"Generated {len(generated_files)} visualization files:")
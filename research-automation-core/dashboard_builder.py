@@ -0,0 +1,277 @@
+"""
+Incremental Dashboard Builder
+Asset-split HTML dashboards with content-hashed panels, a pinned local plotly.js and lazy loading
+"""
+
+import hashlib
+import json
+import shutil
+from pathlib import Path
+import logging
+from typing import Dict, List, Any, Optional, Callable
+
+from figure_render_service import hash_value
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+MANIFEST_FILE = "dashboard_manifest.json"
+
+# Web panels do not need print resolution
+PANEL_DPI = 110
+
+
+def bundled_plotly_js() -> Optional[Path]:
+    """plotly.min.js shipped inside the plotly Python package"""
+
+    try:
+        import plotly
+    except ImportError:
+        return None
+    path = Path(plotly.__file__).parent / 'package_data' / 'plotly.min.js'
+    return path if path.exists() else None
+
+
+def _plotly_js_version() -> str:
+    try:
+        from plotly.offline import get_plotlyjs_version
+        return get_plotlyjs_version()
+    except ImportError:
+        return 'unknown'
+
+
+def _short_hash(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()[:12]
+
+
+class DashboardPanel:
+    """One lazily built dashboard panel
+
+    kind is 'image' (builder returns a matplotlib figure), 'plotly' (builder returns a
+    plotly figure) or 'html' (builder returns an HTML fragment). inputs is whatever
+    data the builder reads; it decides whether the panel needs rebuilding.
+    """
+
+    def __init__(self, name: str, title: str, kind: str, builder: Callable[[], Any], inputs: Any):
+        self.name = name
+        self.title = title
+        self.kind = kind
+        self.builder = builder
+        self.inputs = inputs
+
+    def fingerprint(self, extra: str = '') -> str:
+        digest = hashlib.sha256()
+        digest.update(f"{self.name}|{self.kind}|{extra}".encode())
+        hash_value(digest, self.inputs)
+        return digest.hexdigest()
+
+
+class IncrementalDashboardBuilder:
+    """Writes index.html plus one content-hashed asset per panel, rebuilding only changed panels"""
+
+    def __init__(self, output_dir: str, plotly_js: Optional[str] = None, dpi: int = PANEL_DPI):
+        self.output_dir = Path(output_dir)
+        self.assets_dir = self.output_dir / 'assets'
+        self.assets_dir.mkdir(parents=True, exist_ok=True)
+        self.plotly_js = Path(plotly_js) if plotly_js else bundled_plotly_js()
+        self.dpi = dpi
+        self.manifest_path = self.output_dir / MANIFEST_FILE
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        if self.manifest_path.exists():
+            try:
+                with open(self.manifest_path) as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, OSError):
+                logger.warning(f"Ignoring unreadable dashboard manifest {self.manifest_path}")
+        return {'panels': {}}
+
+    def _write_asset(self, name: str, suffix: str, data: bytes) -> str:
+        filename = f"{name}.{_short_hash(data)}{suffix}"
+        path = self.assets_dir / filename
+        if not path.exists():
+            path.write_bytes(data)
+        return f"assets/{filename}"
+
+    def _vendor_plotly(self) -> Optional[str]:
+        """Copy the pinned plotly.js next to the dashboard once per version"""
+
+        if self.plotly_js is None:
+            logger.warning("plotly.js not found; interactive panels will not render")
+            return None
+        filename = f"plotly-{_plotly_js_version()}.min.js"
+        target = self.assets_dir / 'vendor' / filename
+        if not target.exists():
+            target.parent.mkdir(parents=True, exist_ok=True)
+            shutil.copyfile(self.plotly_js, target)
+        return f"assets/vendor/{filename}"
+
+    def _build_panel(self, panel: DashboardPanel) -> str:
+        result = panel.builder()
+
+        if panel.kind == 'image':
+            import io
+            import matplotlib.pyplot as plt
+            buffer = io.BytesIO()
+            result.savefig(buffer, format='png', dpi=self.dpi, bbox_inches='tight')
+            plt.close(result)
+            return self._write_asset(panel.name, '.png', buffer.getvalue())
+
+        if panel.kind == 'plotly':
+            # A script asset rather than bare JSON so panels also load from file:// URLs
+            payload = result.to_json()
+            script = f"window.dashboardPanels[{json.dumps(panel.name)}] = {payload};\n"
+            return self._write_asset(panel.name, '.js', script.encode('utf-8'))
+
+        if panel.kind == 'html':
+            return self._write_asset(panel.name, '.html', str(result).encode('utf-8'))
+
+        raise ValueError(f"Unknown panel kind: {panel.kind}")
+
+    def build(self, panels: List[DashboardPanel], title: str,
+              stats: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Rebuild stale panels, prune superseded assets and rewrite index.html"""
+
+        manifest = self._load_manifest()
+        previous = manifest.get('panels', {})
+        current = {}
+        rebuilt = []
+
+        for panel in panels:
+            fingerprint = panel.fingerprint(extra=str(self.dpi))
+            entry = previous.get(panel.name)
+            if entry and entry['fingerprint'] == fingerprint and (self.output_dir / entry['asset']).exists():
+                current[panel.name] = entry
+                continue
+
+            try:
+                asset = self._build_panel(panel)
+            except Exception as e:
+                logger.error(f"Dashboard panel {panel.name} failed: {e}")
+                continue
+            current[panel.name] = {'fingerprint': fingerprint, 'asset': asset,
+                                   'kind': panel.kind, 'title': panel.title}
+            rebuilt.append(panel.name)
+
+        # Remove assets no panel points at any more
+        live = {entry['asset'] for entry in current.values()}
+        for entry in previous.values():
+            if entry['asset'] not in live:
+                (self.output_dir / entry['asset']).unlink(missing_ok=True)
+
+        plotly_src = self._vendor_plotly() if any(e['kind'] == 'plotly' for e in current.values()) else None
+        index_path = self.output_dir / 'index.html'
+        index_path.write_text(self._render_index(panels, current, title, stats or {}, plotly_src),
+                              encoding='utf-8')
+
+        with open(self.manifest_path, 'w') as f:
+            json.dump({'title': title, 'panels': current}, f, indent=2)
+
+        logger.info(f"Dashboard: rebuilt {len(rebuilt)} of {len(panels)} panels")
+        return {'index': str(index_path), 'rebuilt': rebuilt,
+                'reused': [name for name in current if name not in rebuilt]}
+
+    def _render_index(self, panels: List[DashboardPanel], entries: Dict[str, Any], title: str,
+                      stats: Dict[str, Any], plotly_src: Optional[str]) -> str:
+        """Small shell page; panel content is fetched only when scrolled into view"""
+
+        from html import escape
+
+        cards = ''.join(
+            f'<div class="stat-card"><div class="stat-value">{escape(str(value))}</div>'
+            f'<div class="stat-label">{escape(label)}</div></div>'
+            for label, value in stats.items()
+        )
+        sections = ''.join(
+            f'<div id="{escape(panel.name)}-panel" class="plot-container" data-kind="{entries[panel.name]["kind"]}" '
+            f'data-src="{escape(entries[panel.name]["asset"])}" data-name="{escape(panel.name)}">'
+            f'<div class="plot-title">{escape(panel.title)}</div><div class="plot-body">Loading&hellip;</div></div>'
+            for panel in panels if panel.name in entries
+        )
+
+        return DASHBOARD_TEMPLATE.format(
+            title=escape(title),
+            cards=cards,
+            sections=sections,
+            plotly_src=json.dumps(plotly_src)
+        )
+
+
+DASHBOARD_TEMPLATE = """<!DOCTYPE html>
+<html lang="en">
+<head>
+<meta charset="UTF-8">
+<meta name="viewport" content="width=device-width, initial-scale=1.0">
+<title>{title}</title>
+<style>
+body {{ font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif; margin: 0; padding: 20px; background-color: #f5f5f5; }}
+.dashboard-container {{ max-width: 1200px; margin: 0 auto; background: white; border-radius: 10px; box-shadow: 0 2px 10px rgba(0,0,0,0.1); overflow: hidden; }}
+.dashboard-header {{ background: linear-gradient(135deg, #667eea 0%, #764ba2 100%); color: white; padding: 30px; text-align: center; }}
+.dashboard-header h1 {{ margin: 0; font-size: 2.5em; font-weight: 300; }}
+.dashboard-content {{ padding: 30px; }}
+.stats-grid {{ display: grid; grid-template-columns: repeat(auto-fit, minmax(250px, 1fr)); gap: 20px; margin-bottom: 40px; }}
+.stat-card {{ background: #f8f9fa; border-radius: 8px; padding: 20px; text-align: center; border-left: 4px solid #667eea; }}
+.stat-value {{ font-size: 2em; font-weight: bold; color: #333; }}
+.stat-label {{ color: #666; font-size: 0.9em; text-transform: uppercase; letter-spacing: 0.5px; }}
+.plot-container {{ background: white; border-radius: 8px; padding: 20px; margin-bottom: 30px; box-shadow: 0 2px 4px rgba(0,0,0,0.05); min-height: 200px; }}
+.plot-title {{ font-size: 1.3em; font-weight: bold; color: #333; margin-bottom: 15px; text-align: center; }}
+.plot-body img {{ max-width: 100%; display: block; margin: 0 auto; }}
+</style>
+</head>
+<body>
+<div class="dashboard-container">
+<div class="dashboard-header"><h1>{title}</h1><p>Comprehensive Research Visualization Dashboard</p></div>
+<div class="dashboard-content">
+<div class="stats-grid">{cards}</div>
+{sections}
+</div>
+</div>
+<script>
+window.dashboardPanels = {{}};
+var plotlySrc = {plotly_src};
+var plotlyLoading = null;
+
+function loadScript(src) {{
+  return new Promise(function (resolve, reject) {{
+    var s = document.createElement('script');
+    s.src = src; s.onload = resolve; s.onerror = reject;
+    document.head.appendChild(s);
+  }});
+}}
+
+function loadPanel(el) {{
+  var body = el.querySelector('.plot-body');
+  var kind = el.dataset.kind, src = el.dataset.src, name = el.dataset.name;
+  if (kind === 'image') {{
+    body.innerHTML = '';
+    var img = new Image(); img.src = src; img.alt = name; body.appendChild(img);
+  }} else if (kind === 'plotly') {{
+    plotlyLoading = plotlyLoading || loadScript(plotlySrc);
+    plotlyLoading.then(function () {{ return loadScript(src); }}).then(function () {{
+      var fig = window.dashboardPanels[name];
+      body.innerHTML = '';
+      Plotly.newPlot(body, fig.data, fig.layout, {{responsive: true}});
+    }});
+  }} else if (kind === 'html') {{
+    var frame = document.createElement('iframe');
+    frame.src = src; frame.style.width = '100%'; frame.style.border = '0';
+    body.innerHTML = ''; body.appendChild(frame);
+  }}
+}}
+
+var panels = document.querySelectorAll('.plot-container[data-src]');
+if ('IntersectionObserver' in window) {{
+  var observer = new IntersectionObserver(function (entries) {{
+    entries.forEach(function (entry) {{
+      if (entry.isIntersecting) {{ observer.unobserve(entry.target); loadPanel(entry.target); }}
+    }});
+  }}, {{rootMargin: '200px'}});
+  panels.forEach(function (el) {{ observer.observe(el); }});
+}} else {{
+  panels.forEach(loadPanel);
+}}
+</script>
+</body>
+</html>
+"""
@@ -0,0 +1,293 @@
+"""
+Diagnostic Test Accuracy Meta-Analysis System
+Bivariate random-effects (Reitsma) and HSROC synthesis of 2x2 tables
+"""
+
+import pandas as pd
+import numpy as np
+from scipy import optimize, stats
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+def _logit(p: np.ndarray) -> np.ndarray:
+    return np.log(p / (1 - p))
+
+
+def _expit(x: np.ndarray) -> np.ndarray:
+    return 1 / (1 + np.exp(-x))
+
+
+def _inverse_2x2(a: np.ndarray, b: np.ndarray, d: np.ndarray) -> Tuple[np.ndarray, ...]:
+    """Elementwise inverse of symmetric 2x2 matrices [[a, b], [b, d]]"""
+
+    det = a * d - b ** 2
+    return d / det, -b / det, a / det, det
+
+
+def _negative_log_likelihood(params: np.ndarray, y: np.ndarray, s: np.ndarray,
+                             mask: np.ndarray, reml: bool) -> Tuple[float, np.ndarray]:
+    """Profile (RE)ML objective and analytic gradient for G stacked bivariate models
+
+    params holds (log tau_sens, log tau_spec, atanh rho) per group; y and s are
+    (G, K, 2) logits and within-study variances, mask (G, K) marks real studies.
+    The pooled means are profiled out, so only the variance parameters are optimised.
+    """
+
+    theta = params.reshape(-1, 3)
+    tau1 = np.exp(theta[:, 0])[:, None]
+    tau2 = np.exp(theta[:, 1])[:, None]
+    rho = np.tanh(theta[:, 2])[:, None]
+    cov = rho * tau1 * tau2
+
+    a = s[..., 0] + tau1 ** 2
+    d = s[..., 1] + tau2 ** 2
+    b = np.broadcast_to(cov, a.shape)
+    ia, ib, id_, det = _inverse_2x2(a, b, d)
+    ia, ib, id_ = ia * mask, ib * mask, id_ * mask
+
+    # Profiled means: mu = H^-1 sum V^-1 y
+    h11, h12, h22 = ia.sum(axis=1), ib.sum(axis=1), id_.sum(axis=1)
+    g1 = (ia * y[..., 0] + ib * y[..., 1]).sum(axis=1)
+    g2 = (ib * y[..., 0] + id_ * y[..., 1]).sum(axis=1)
+    hi11, hi12, hi22, h_det = _inverse_2x2(h11, h12, h22)
+    mu1 = hi11 * g1 + hi12 * g2
+    mu2 = hi12 * g1 + hi22 * g2
+
+    r1 = (y[..., 0] - mu1[:, None]) * mask
+    r2 = (y[..., 1] - mu2[:, None]) * mask
+    u1 = ia * r1 + ib * r2
+    u2 = ib * r1 + id_ * r2
+
+    value = 0.5 * ((np.log(np.where(mask > 0, det, 1.0))).sum(axis=1)
+                   + (r1 * u1 + r2 * u2).sum(axis=1))
+    if reml:
+        value = value + 0.5 * np.log(h_det)
+
+    # dV/dpsi for psi = log tau1, log tau2, atanh rho (each a symmetric 2x2 pattern)
+    d_patterns = [
+        (2 * tau1 ** 2, cov, 0 * tau1),
+        (0 * tau1, cov, 2 * tau2 ** 2),
+        (0 * tau1, (1 - rho ** 2) * tau1 * tau2, 0 * tau1)
+    ]
+
+    grad = np.zeros_like(theta)
+    for j, (da, db, dd) in enumerate(d_patterns):
+        # tr(V^-1 dV) - u' dV u
+        tr_term = ia * da + 2 * ib * db + id_ * dd
+        quad = u1 ** 2 * da + 2 * u1 * u2 * db + u2 ** 2 * dd
+        grad[:, j] = 0.5 * (tr_term - quad).sum(axis=1)
+
+        if reml:
+            # d log|H| = -tr(H^-1 sum V^-1 dV V^-1)
+            m11 = (ia * ia * da + 2 * ia * ib * db + ib * ib * dd).sum(axis=1)
+            m12 = (ia * ib * da + (ia * id_ + ib * ib) * db + ib * id_ * dd).sum(axis=1)
+            m22 = (ib * ib * da + 2 * ib * id_ * db + id_ * id_ * dd).sum(axis=1)
+            grad[:, j] -= 0.5 * (hi11 * m11 + 2 * hi12 * m12 + hi22 * m22)
+
+    return float(value.sum()), grad.ravel()
+
+
+class BivariateDTAModel:
+    """Bivariate random-effects model for sensitivity and specificity, batched over subgroups"""
+
+    def __init__(self, method: str = 'REML', correction: float = 0.5,
+                 correction_scope: str = 'single'):
+        if method not in ('REML', 'ML'):
+            raise ValueError("method must be 'REML' or 'ML'")
+
+        self.method = method
+        self.correction = correction
+        self.correction_scope = correction_scope  # 'single' (zero-cell studies) or 'all'
+        self.results = {}
+        self._warm_start = {}
+
+    def _prepare(self, data: pd.DataFrame, tp_col: str, fp_col: str,
+                 fn_col: str, tn_col: str) -> pd.DataFrame:
+        """Continuity-corrected logits and within-study variances"""
+
+        cells = data[[tp_col, fp_col, fn_col, tn_col]].astype(float).values
+        has_zero = (cells == 0).any(axis=1)
+        if self.correction_scope == 'all' and has_zero.any():
+            has_zero[:] = True
+        cells = cells + self.correction * has_zero[:, None]
+        tp, fp, fn, tn = cells.T
+
+        prepared = data.copy()
+        prepared['logit_sens'] = np.log(tp / fn)
+        prepared['logit_spec'] = np.log(tn / fp)
+        prepared['var_sens'] = 1 / tp + 1 / fn
+        prepared['var_spec'] = 1 / tn + 1 / fp
+        return prepared
+
+    def _start_values(self, y: np.ndarray, s: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Univariate method-of-moments starting values per group"""
+
+        n = mask.sum(axis=1)
+        start = np.zeros((y.shape[0], 3))
+        for j in range(2):
+            mean = (y[..., j] * mask).sum(axis=1) / n
+            var = ((y[..., j] - mean[:, None]) ** 2 * mask).sum(axis=1) / np.maximum(n - 1, 1)
+            within = (s[..., j] * mask).sum(axis=1) / n
+            start[:, j] = 0.5 * np.log(np.maximum(var - within, 0.01))
+        return start
+
+    def fit(self, data: pd.DataFrame, tp_col: str = 'tp', fp_col: str = 'fp',
+            fn_col: str = 'fn', tn_col: str = 'tn',
+            group_col: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+        """Fit one model per subgroup (or overall) in a single vectorised optimisation"""
+
+        prepared = self._prepare(data, tp_col, fp_col, fn_col, tn_col)
+        if group_col is None:
+            groups = {'overall': prepared}
+        else:
+            groups = {str(g): sub for g, sub in prepared.groupby(group_col)}
+
+        small = [g for g, sub in groups.items() if len(sub) < 3]
+        for g in small:
+            logger.warning(f"Skipping subgroup '{g}' with fewer than 3 studies")
+            groups.pop(g)
+        if not groups:
+            raise ValueError("At least three studies are required for a bivariate model")
+
+        names = list(groups.keys())
+        k_max = max(len(sub) for sub in groups.values())
+        n_groups = len(names)
+
+        y = np.zeros((n_groups, k_max, 2))
+        s = np.ones((n_groups, k_max, 2))
+        mask = np.zeros((n_groups, k_max))
+        for i, name in enumerate(names):
+            sub = groups[name]
+            k = len(sub)
+            y[i, :k, 0] = sub['logit_sens'].values
+            y[i, :k, 1] = sub['logit_spec'].values
+            s[i, :k, 0] = sub['var_sens'].values
+            s[i, :k, 1] = sub['var_spec'].values
+            mask[i, :k] = 1.0
+
+        start = self._start_values(y, s, mask)
+        for i, name in enumerate(names):
+            if name in self._warm_start:
+                start[i] = self._warm_start[name]
+
+        bounds = [(-10, 5), (-10, 5), (-5, 5)] * n_groups
+        solution = optimize.minimize(
+            _negative_log_likelihood, start.ravel(), args=(y, s, mask, self.method == 'REML'),
+            jac=True, method='L-BFGS-B', bounds=bounds
+        )
+        if not solution.success:
+            logger.warning(f"Bivariate optimisation did not fully converge: {solution.message}")
+
+        theta = solution.x.reshape(-1, 3)
+        self.results = {}
+        for i, name in enumerate(names):
+            self._warm_start[name] = theta[i].copy()
+            self.results[name] = self._summarise(theta[i], y[i], s[i], mask[i], solution.success)
+
+        return self.results
+
+    def _summarise(self, theta: np.ndarray, y: np.ndarray, s: np.ndarray,
+                   mask: np.ndarray, converged: bool) -> Dict[str, Any]:
+        """Pooled estimates, variance components and HSROC parameters for one group"""
+
+        tau1, tau2, rho = np.exp(theta[0]), np.exp(theta[1]), np.tanh(theta[2])
+        cov = rho * tau1 * tau2
+        ia, ib, id_, _ = _inverse_2x2(s[:, 0] + tau1 ** 2, np.full(len(mask), cov), s[:, 1] + tau2 ** 2)
+        ia, ib, id_ = ia * mask, ib * mask, id_ * mask
+
+        h = np.array([[ia.sum(), ib.sum()], [ib.sum(), id_.sum()]])
+        mu_cov = np.linalg.inv(h)
+        g = np.array([(ia * y[:, 0] + ib * y[:, 1]).sum(), (ib * y[:, 0] + id_ * y[:, 1]).sum()])
+        mu = mu_cov @ g
+        se = np.sqrt(np.diag(mu_cov))
+
+        # Harbord et al. (2007) mapping from bivariate to HSROC parameters
+        ratio = tau2 / tau1
+        hsroc = {
+            'Lambda': np.sqrt(ratio) * mu[0] + np.sqrt(1 / ratio) * mu[1],
+            'Theta': 0.5 * (np.sqrt(ratio) * mu[0] - np.sqrt(1 / ratio) * mu[1]),
+            'beta': np.log(ratio),
+            'sigma2_alpha': 2 * (tau1 * tau2 + cov),
+            'sigma2_theta': 0.5 * (tau1 * tau2 - cov)
+        }
+
+        sens, spec = _expit(mu[0]), _expit(mu[1])
+        return {
+            'n_studies': int(mask.sum()),
+            'method': self.method,
+            'converged': bool(converged),
+            'mu': mu,
+            'mu_cov': mu_cov,
+            'sigma': np.array([[tau1 ** 2, cov], [cov, tau2 ** 2]]),
+            'sensitivity': {'estimate': sens, 'ci_lower': _expit(mu[0] - 1.96 * se[0]),
+                            'ci_upper': _expit(mu[0] + 1.96 * se[0])},
+            'specificity': {'estimate': spec, 'ci_lower': _expit(mu[1] - 1.96 * se[1]),
+                            'ci_upper': _expit(mu[1] + 1.96 * se[1])},
+            'tau2_sens': tau1 ** 2,
+            'tau2_spec': tau2 ** 2,
+            'rho': rho,
+            'dor': np.exp(mu[0] + mu[1]),
+            'lr_positive': sens / (1 - spec),
+            'lr_negative': (1 - sens) / spec,
+            'hsroc': hsroc
+        }
+
+    def summary(self) -> pd.DataFrame:
+        """One row per fitted group"""
+
+        rows = []
+        for name, res in self.results.items():
+            rows.append({
+                'group': name,
+                'n_studies': res['n_studies'],
+                'sensitivity': res['sensitivity']['estimate'],
+                'sens_ci_lower': res['sensitivity']['ci_lower'],
+                'sens_ci_upper': res['sensitivity']['ci_upper'],
+                'specificity': res['specificity']['estimate'],
+                'spec_ci_lower': res['specificity']['ci_lower'],
+                'spec_ci_upper': res['specificity']['ci_upper'],
+                'dor': res['dor'],
+                'lr_positive': res['lr_positive'],
+                'lr_negative': res['lr_negative'],
+                'tau2_sens': res['tau2_sens'],
+                'tau2_spec': res['tau2_spec'],
+                'rho': res['rho']
+            })
+        return pd.DataFrame(rows)
+
+    def sroc_curve(self, group: str = 'overall', n_points: int = 100) -> pd.DataFrame:
+        """Rutter-Gatsonis SROC curve (FPR, sensitivity) from stored HSROC parameters"""
+
+        hsroc = self.results[group]['hsroc']
+        fpr = np.linspace(0.005, 0.995, n_points)
+        logit_sens = (hsroc['Lambda'] * np.exp(-hsroc['beta'] / 2)
+                      + np.exp(-hsroc['beta']) * _logit(fpr))
+        return pd.DataFrame({'fpr': fpr, 'sensitivity': _expit(logit_sens)})
+
+    def _region(self, group: str, covariance: np.ndarray, level: float,
+                n_points: int) -> pd.DataFrame:
+        """Ellipse around the summary point, mapped back to ROC space"""
+
+        mu = self.results[group]['mu']
+        radius = np.sqrt(stats.chi2.ppf(level, 2))
+        chol = np.linalg.cholesky(covariance)
+        angles = np.linspace(0, 2 * np.pi, n_points)
+        circle = np.vstack([np.cos(angles), np.sin(angles)])
+        ellipse = mu[:, None] + radius * chol @ circle
+        return pd.DataFrame({'fpr': 1 - _expit(ellipse[1]), 'sensitivity': _expit(ellipse[0])})
+
+    def confidence_region(self, group: str = 'overall', level: float = 0.95,
+                          n_points: int = 100) -> pd.DataFrame:
+        """Confidence region for the summary operating point"""
+        return self._region(group, self.results[group]['mu_cov'], level, n_points)
+
+    def prediction_region(self, group: str = 'overall', level: float = 0.95,
+                          n_points: int = 100) -> pd.DataFrame:
+        """Prediction region for the operating point of a new study"""
+        res = self.results[group]
+        return self._region(group, res['mu_cov'] + res['sigma'], level, n_points)
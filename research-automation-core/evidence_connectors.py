@@ -0,0 +1,321 @@
+"""
+Evidence Source Connectors
+Paged ClinicalTrials.gov v2 and PubMed E-utilities clients with watermarks and conditional requests
+"""
+
+import json
+import time
+import threading
+import logging
+import xml.etree.ElementTree as ET
+from datetime import datetime, date, timedelta
+from typing import Dict, List, Any, Optional, Iterator
+from urllib.parse import urlencode
+
+import requests
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+CLINICALTRIALS_BASE_URL = 'https://clinicaltrials.gov/api/v2'
+PUBMED_BASE_URL = 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils'
+
+# Only the fields the living review needs; keeps each page small
+CLINICALTRIALS_FIELDS = [
+    'NCTId', 'BriefTitle', 'Condition', 'BriefSummary', 'OverallStatus',
+    'StudyFirstPostDate', 'LastUpdatePostDate', 'LeadSponsorName'
+]
+
+# How far back the first run of a new review looks
+DEFAULT_LOOKBACK_DAYS = 30
+
+# NCBI allows 3 requests/second without an API key and 10 with one
+NCBI_MIN_INTERVAL = 0.34
+NCBI_MIN_INTERVAL_WITH_KEY = 0.1
+
+# Parameters that identify the caller rather than the query; left out of cache keys
+_IDENTITY_PARAMS = {'api_key', 'tool', 'email'}
+
+
+class MemoryConnectorState:
+    """Watermarks and HTTP cache held in memory (one process, nothing persisted)"""
+
+    def __init__(self):
+        self._watermarks = {}
+        self._cache = {}
+
+    def get_watermark(self, review_id: str, source: str) -> Optional[str]:
+        return self._watermarks.get((review_id, source))
+
+    def set_watermark(self, review_id: str, source: str, watermark: str, conn=None):
+        self._watermarks[(review_id, source)] = watermark
+
+    def get_cached(self, key: str) -> Optional[Dict[str, Any]]:
+        return self._cache.get(key)
+
+    def put_cached(self, key: str, etag: Optional[str], last_modified: Optional[str], body: bytes):
+        self._cache[key] = {'etag': etag, 'last_modified': last_modified, 'body': body}
+
+
+class SQLiteConnectorState(MemoryConnectorState):
+    """Watermarks and HTTP cache persisted in the living reviews database
+
+    Uses the source_watermarks and http_cache tables from review_store's schema
+    migrations, through the engine's connection pool.
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def get_watermark(self, review_id: str, source: str) -> Optional[str]:
+        rows = self.pool.execute('SELECT watermark FROM source_watermarks WHERE review_id = ? AND source = ?',
+                                 (review_id, source))
+        return rows[0][0] if rows else None
+
+    def set_watermark(self, review_id: str, source: str, watermark: str, conn=None):
+        """Store a watermark, inside the caller's transaction when conn is given"""
+
+        if conn is None:
+            with self.pool.transaction() as conn:
+                self.set_watermark(review_id, source, watermark, conn)
+            return
+        conn.execute('''
+            INSERT INTO source_watermarks (review_id, source, watermark, updated)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT (review_id, source) DO UPDATE SET
+                watermark = excluded.watermark, updated = excluded.updated
+        ''', (review_id, source, watermark, datetime.now().isoformat()))
+
+    def get_cached(self, key: str) -> Optional[Dict[str, Any]]:
+        rows = self.pool.execute('SELECT etag, last_modified, body FROM http_cache WHERE url = ?', (key,))
+        if not rows:
+            return None
+        etag, last_modified, body = rows[0]
+        return {'etag': etag, 'last_modified': last_modified, 'body': body}
+
+    def put_cached(self, key: str, etag: Optional[str], last_modified: Optional[str], body: bytes):
+        with self.pool.transaction() as conn:
+            conn.execute('''
+                INSERT INTO http_cache (url, etag, last_modified, body, fetched)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (url) DO UPDATE SET
+                    etag = excluded.etag, last_modified = excluded.last_modified,
+                    body = excluded.body, fetched = excluded.fetched
+            ''', (key, etag, last_modified, body, datetime.now().isoformat()))
+
+
+class RequestThrottle:
+    """Minimum spacing between requests, shared by every client that holds it"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._last_request = 0.0
+
+    def wait(self):
+        with self._lock:
+            delay = self._last_request + self.min_interval - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            self._last_request = time.monotonic()
+
+
+# NCBI limits are per caller, not per review, so all PubMed connectors share one throttle
+_NCBI_THROTTLES = {False: RequestThrottle(NCBI_MIN_INTERVAL), True: RequestThrottle(NCBI_MIN_INTERVAL_WITH_KEY)}
+
+
+class ConditionalHttpClient:
+    """requests.Session wrapper: conditional GETs against a response cache, plus throttling
+
+    Responses carrying an ETag or Last-Modified are cached; the next identical request
+    sends If-None-Match / If-Modified-Since and a 304 is served from the cache. Requests
+    that can never repeat (e.g. pages of a one-off search session) pass cache=False.
+    """
+
+    def __init__(self, state: Optional[MemoryConnectorState] = None, throttle: Optional[RequestThrottle] = None,
+                 timeout: float = 30.0, session: Optional[requests.Session] = None):
+        self.state = state or MemoryConnectorState()
+        self.throttle = throttle
+        self.timeout = timeout
+        self.session = session or requests.Session()
+        self.stats = {'requests': 0, 'not_modified': 0}
+
+    @staticmethod
+    def cache_key(url: str, params: Dict[str, Any]) -> str:
+        query = sorted((k, str(v)) for k, v in params.items() if k not in _IDENTITY_PARAMS)
+        return f"{url}?{urlencode(query)}"
+
+    def get(self, url: str, params: Dict[str, Any], cache: bool = True) -> bytes:
+        key = self.cache_key(url, params)
+        cached = self.state.get_cached(key) if cache else None
+        headers = {}
+        if cached:
+            if cached.get('etag'):
+                headers['If-None-Match'] = cached['etag']
+            if cached.get('last_modified'):
+                headers['If-Modified-Since'] = cached['last_modified']
+
+        if self.throttle:
+            self.throttle.wait()
+        response = self.session.get(url, params=params, headers=headers, timeout=self.timeout)
+        self.stats['requests'] += 1
+
+        if response.status_code == 304 and cached:
+            self.stats['not_modified'] += 1
+            return cached['body']
+        response.raise_for_status()
+
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if cache and (etag or last_modified):
+            self.state.put_cached(key, etag, last_modified, response.content)
+        return response.content
+
+
+class ClinicalTrialsGovConnector:
+    """ClinicalTrials.gov API v2 /studies, streamed page by page with pageToken"""
+
+    source = 'clinicaltrials'
+
+    def __init__(self, client: ConditionalHttpClient, base_url: str = CLINICALTRIALS_BASE_URL,
+                 page_size: int = 100, fields: Optional[List[str]] = None):
+        self.client = client
+        self.base_url = base_url.rstrip('/')
+        self.page_size = page_size
+        self.fields = fields or CLINICALTRIALS_FIELDS
+
+    def fetch(self, query: str, since: date) -> Iterator[Dict[str, Any]]:
+        """Trials matching query whose record was updated on or after since"""
+
+        params = {
+            'query.term': query,
+            'filter.advanced': f"AREA[LastUpdatePostDate]RANGE[{since.isoformat()},MAX]",
+            'fields': ','.join(self.fields),
+            'pageSize': self.page_size,
+            'countTotal': 'true',
+            'format': 'json'
+        }
+        page_token = None
+        while True:
+            page_params = dict(params, pageToken=page_token) if page_token else params
+            page = json.loads(self.client.get(f"{self.base_url}/studies", page_params))
+            for study in page.get('studies', []):
+                yield self._to_record(study)
+            page_token = page.get('nextPageToken')
+            if not page_token:
+                break
+
+    @staticmethod
+    def _to_record(study: Dict[str, Any]) -> Dict[str, Any]:
+        protocol = study.get('protocolSection', {})
+        identification = protocol.get('identificationModule', {})
+        status = protocol.get('statusModule', {})
+        nct_id = identification.get('nctId')
+        return {
+            'study_id': nct_id,
+            'nct_id': nct_id,
+            'title': identification.get('briefTitle'),
+            'abstract': protocol.get('descriptionModule', {}).get('briefSummary'),
+            'condition': '; '.join(protocol.get('conditionsModule', {}).get('conditions', [])),
+            'authors': protocol.get('sponsorCollaboratorsModule', {}).get('leadSponsor', {}).get('name'),
+            'overall_status': status.get('overallStatus'),
+            'source': 'clinicaltrials',
+            'registration_date': status.get('studyFirstPostDateStruct', {}).get('date'),
+            'publication_date': status.get('studyFirstPostDateStruct', {}).get('date'),
+            'last_update': status.get('lastUpdatePostDateStruct', {}).get('date')
+        }
+
+    @staticmethod
+    def next_watermark(records: List[Dict[str, Any]], previous: date) -> date:
+        """Latest LastUpdatePostDate seen (the RANGE filter is inclusive, so no gap)"""
+
+        seen = [date.fromisoformat(r['last_update'][:10]) for r in records if r.get('last_update')]
+        return max([previous] + seen)
+
+
+class PubMedConnector:
+    """PubMed via E-utilities: EDAT-windowed ESearch on the history server, then paged EFetch"""
+
+    source = 'pubmed'
+
+    def __init__(self, client: ConditionalHttpClient, base_url: str = PUBMED_BASE_URL,
+                 page_size: int = 200, api_key: Optional[str] = None,
+                 tool: str = 'research-automation', email: Optional[str] = None):
+        self.client = client
+        self.base_url = base_url.rstrip('/')
+        self.page_size = page_size
+        # Only the real NCBI service is rate limited; local stand-ins are not
+        if client.throttle is None and self.base_url == PUBMED_BASE_URL:
+            client.throttle = _NCBI_THROTTLES[bool(api_key)]
+        self.identity = {'tool': tool}
+        if api_key:
+            self.identity['api_key'] = api_key
+        if email:
+            self.identity['email'] = email
+
+    def fetch(self, query: str, since: date, until: Optional[date] = None) -> Iterator[Dict[str, Any]]:
+        """Articles matching query that entered PubMed (EDAT) between since and until"""
+
+        until = until or date.today()
+        search = json.loads(self.client.get(f"{self.base_url}/esearch.fcgi", {
+            **self.identity,
+            'db': 'pubmed',
+            'term': query,
+            'datetype': 'edat',
+            'mindate': since.strftime('%Y/%m/%d'),
+            'maxdate': until.strftime('%Y/%m/%d'),
+            'usehistory': 'y',
+            'retmax': 0,
+            'retmode': 'json'
+        }))['esearchresult']
+
+        # Pages are addressed by this search's WebEnv, so a cached copy could never be reused
+        count = int(search.get('count', 0))
+        for start in range(0, count, self.page_size):
+            xml = self.client.get(f"{self.base_url}/efetch.fcgi", {
+                **self.identity,
+                'db': 'pubmed',
+                'query_key': search['querykey'],
+                'WebEnv': search['webenv'],
+                'retstart': start,
+                'retmax': self.page_size,
+                'retmode': 'xml'
+            }, cache=False)
+            yield from self._parse_articles(xml)
+
+    @staticmethod
+    def _parse_articles(xml: bytes) -> Iterator[Dict[str, Any]]:
+        for article in ET.fromstring(xml).iter('PubmedArticle'):
+            citation = article.find('MedlineCitation')
+            pmid = citation.findtext('PMID')
+            details = citation.find('Article')
+            abstract = ' '.join(''.join(part.itertext()).strip()
+                                for part in details.findall('Abstract/AbstractText'))
+            authors = ', '.join(
+                f"{author.findtext('LastName')} {author.findtext('Initials') or ''}".strip()
+                for author in details.findall('AuthorList/Author') if author.findtext('LastName')
+            )
+            year = ''
+            pub_date = details.find('Journal/JournalIssue/PubDate')
+            if pub_date is not None:
+                year = pub_date.findtext('Year') or (pub_date.findtext('MedlineDate') or '')[:4]
+            title = details.find('ArticleTitle')
+            yield {
+                'study_id': pmid,
+                'pmid': pmid,
+                'title': ''.join(title.itertext()) if title is not None else None,
+                'abstract': abstract or None,
+                'authors': authors or None,
+                'journal': details.findtext('Journal/Title'),
+                'source': 'pubmed',
+                'publication_date': year or None
+            }
+
+
+def lookback_start(watermark: Optional[str], lookback_days: int = DEFAULT_LOOKBACK_DAYS) -> date:
+    """Start of the next fetch window: the stored watermark, else lookback_days ago"""
+
+    if watermark:
+        return date.fromisoformat(watermark[:10])
+    return date.today() - timedelta(days=lookback_days)
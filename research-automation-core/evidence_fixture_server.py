@@ -0,0 +1,301 @@
+"""
+Evidence Source Fixture Server
+Local stand-in for ClinicalTrials.gov v2 and PubMed E-utilities, serving recorded or synthetic responses
+"""
+
+import json
+import hashlib
+import threading
+import logging
+from datetime import date, timedelta
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+from urllib.parse import urlparse, parse_qsl
+from xml.sax.saxutils import escape
+
+import requests
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_FIXTURES = Path(__file__).resolve().parent / 'fixtures' / 'evidence_sources.json'
+
+CLINICALTRIALS_PATH = '/api/v2'
+PUBMED_PATH = '/entrez/eutils'
+
+_IDENTITY_PARAMS = {'api_key', 'tool', 'email'}
+
+
+def load_fixtures(path: Path) -> List[Dict[str, Any]]:
+    """Recorded responses: [{path, params, status, headers, body}]; params match as a subset"""
+
+    with open(path, 'r', encoding='utf-8') as f:
+        return json.load(f)['fixtures']
+
+
+class RecordingSession(requests.Session):
+    """requests.Session that appends every GET it makes to a fixture file
+
+    Pass it as ConditionalHttpClient(session=...) during a live run to capture fixtures.
+    """
+
+    def __init__(self, fixture_path: Path):
+        super().__init__()
+        self.fixture_path = Path(fixture_path)
+
+    def request(self, method, url, params=None, **kwargs):
+        response = super().request(method, url, params=params, **kwargs)
+        if method.upper() == 'GET' and response.status_code == 200:
+            fixtures = load_fixtures(self.fixture_path) if self.fixture_path.exists() else []
+            content_type = response.headers.get('Content-Type', '')
+            fixtures.append({
+                'path': urlparse(response.url).path,
+                'params': {k: str(v) for k, v in (params or {}).items() if k not in _IDENTITY_PARAMS},
+                'status': response.status_code,
+                'headers': {'Content-Type': content_type},
+                'body': response.json() if 'json' in content_type else response.text
+            })
+            self.fixture_path.parent.mkdir(parents=True, exist_ok=True)
+            with open(self.fixture_path, 'w', encoding='utf-8') as f:
+                json.dump({'fixtures': fixtures}, f, indent=2)
+        return response
+
+
+class SyntheticSources:
+    """Deterministic ClinicalTrials.gov and PubMed responses at arbitrary volume, for benchmarks
+
+    Trial i was last updated, and article i entered PubMed, (i % window_days) days before
+    `today`, so date-windowed queries return realistic, shrinking result sets.
+    """
+
+    def __init__(self, n_trials: int = 0, n_articles: int = 0, window_days: int = 365,
+                 today: Optional[date] = None):
+        self.n_trials = n_trials
+        self.n_articles = n_articles
+        self.window_days = window_days
+        self.today = today or date.today()
+
+    def _day(self, i: int) -> date:
+        return self.today - timedelta(days=i % self.window_days)
+
+    def _matching(self, n: int, since: date, until: date) -> List[int]:
+        return [i for i in range(n) if since <= self._day(i) <= until]
+
+    def studies(self, params: Dict[str, str]) -> Dict[str, Any]:
+        since = date.min
+        advanced = params.get('filter.advanced', '')
+        if 'RANGE[' in advanced:
+            since = date.fromisoformat(advanced.split('RANGE[')[1].split(',')[0])
+        matching = self._matching(self.n_trials, since, self.today)
+        start = int(params.get('pageToken', 0) or 0)
+        size = int(params.get('pageSize', 10))
+        page = {'studies': [self._trial(i) for i in matching[start:start + size]]}
+        if params.get('countTotal') == 'true':
+            page['totalCount'] = len(matching)
+        if start + size < len(matching):
+            page['nextPageToken'] = str(start + size)
+        return page
+
+    def _trial(self, i: int) -> Dict[str, Any]:
+        return {'protocolSection': {
+            'identificationModule': {'nctId': f"NCT{90000000 + i}",
+                                     'briefTitle': f"Synthetic trial {i} of tuberculosis treatment"},
+            'statusModule': {'overallStatus': 'RECRUITING',
+                             'studyFirstPostDateStruct': {'date': self._day(i).isoformat()},
+                             'lastUpdatePostDateStruct': {'date': self._day(i).isoformat()}},
+            'conditionsModule': {'conditions': ['Tuberculosis']},
+            'descriptionModule': {'briefSummary': f"Randomized intervention study {i} of treatment outcomes."}
+        }}
+
+    def esearch(self, params: Dict[str, str]) -> Dict[str, Any]:
+        since = date.min
+        until = self.today
+        if params.get('mindate'):
+            since = date(*map(int, params['mindate'].split('/')))
+        if params.get('maxdate'):
+            until = date(*map(int, params['maxdate'].split('/')))
+        matching = self._matching(self.n_articles, since, until)
+        # The history-server key encodes the window so efetch can page through it
+        webenv = f"SYNTH_{since.isoformat()}_{until.isoformat()}"
+        return {'esearchresult': {'count': str(len(matching)), 'retmax': '0', 'retstart': '0',
+                                  'querykey': '1', 'webenv': webenv, 'idlist': []}}
+
+    def efetch(self, params: Dict[str, str]) -> str:
+        _, since, until = params['WebEnv'].split('_')
+        matching = self._matching(self.n_articles, date.fromisoformat(since), date.fromisoformat(until))
+        start = int(params.get('retstart', 0))
+        size = int(params.get('retmax', 20))
+        articles = ''.join(self._article(i) for i in matching[start:start + size])
+        return f'<?xml version="1.0" ?><PubmedArticleSet>{articles}</PubmedArticleSet>'
+
+    def _article(self, i: int) -> str:
+        return (
+            f"<PubmedArticle><MedlineCitation><PMID>{40000000 + i}</PMID><Article>"
+            f"<Journal><JournalIssue><PubDate><Year>{self._day(i).year}</Year></PubDate></JournalIssue>"
+            f"<Title>Synthetic Journal</Title></Journal>"
+            f"<ArticleTitle>{escape(f'Synthetic study {i} of tuberculosis treatment')}</ArticleTitle>"
+            f"<Abstract><AbstractText>Cohort study {i} of treatment and intervention outcomes.</AbstractText></Abstract>"
+            f"<AuthorList><Author><LastName>Author{i}</LastName><Initials>A</Initials></Author></AuthorList>"
+            f"</Article></MedlineCitation></PubmedArticle>"
+        )
+
+
+class FixtureServer:
+    """Threaded local HTTP server mimicking both evidence APIs
+
+    Recorded fixtures (DEFAULT_FIXTURES unless given) are tried first, the most specific
+    matching entry winning; a SyntheticSources instance, if given, answers everything else.
+    Every response gets an ETag so clients can exercise If-None-Match / 304 handling.
+    """
+
+    def __init__(self, fixtures: Optional[List[Dict[str, Any]]] = None,
+                 synthetic: Optional[SyntheticSources] = None, host: str = '127.0.0.1', port: int = 0):
+        self.fixtures = load_fixtures(DEFAULT_FIXTURES) if fixtures is None else fixtures
+        self.synthetic = synthetic
+        self.requests: List[Tuple[str, Dict[str, str]]] = []
+        self._server = ThreadingHTTPServer((host, port), self._handler())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    @property
+    def clinicaltrials_url(self) -> str:
+        return self.url + CLINICALTRIALS_PATH
+
+    @property
+    def pubmed_url(self) -> str:
+        return self.url + PUBMED_PATH
+
+    def _match(self, path: str, params: Dict[str, str]) -> Optional[Tuple[int, Dict[str, str], Any]]:
+        best = None
+        for fixture in self.fixtures:
+            if fixture['path'] != path:
+                continue
+            if all(params.get(k) == str(v) for k, v in fixture.get('params', {}).items()):
+                if best is None or len(fixture.get('params', {})) > len(best.get('params', {})):
+                    best = fixture
+        if best is not None:
+            return best.get('status', 200), best.get('headers', {}), best['body']
+
+        if self.synthetic is not None:
+            if path == f"{CLINICALTRIALS_PATH}/studies":
+                return 200, {'Content-Type': 'application/json'}, self.synthetic.studies(params)
+            if path == f"{PUBMED_PATH}/esearch.fcgi":
+                return 200, {'Content-Type': 'application/json'}, self.synthetic.esearch(params)
+            if path == f"{PUBMED_PATH}/efetch.fcgi":
+                return 200, {'Content-Type': 'text/xml'}, self.synthetic.efetch(params)
+        return None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                params = dict(parse_qsl(parsed.query))
+                server.requests.append((parsed.path, params))
+
+                match = server._match(parsed.path, params)
+                if match is None:
+                    self._send(404, {'Content-Type': 'application/json'},
+                               json.dumps({'error': f'No fixture for {parsed.path}'}).encode())
+                    return
+
+                status, headers, body = match
+                payload = body if isinstance(body, str) else json.dumps(body)
+                payload = payload.encode('utf-8')
+                etag = '"' + hashlib.sha1(payload).hexdigest() + '"'
+                if self.headers.get('If-None-Match') == etag:
+                    self._send(304, {'ETag': etag}, b'')
+                    return
+                self._send(status, {**headers, 'ETag': etag}, payload)
+
+            def _send(self, status: int, headers: Dict[str, str], payload: bytes):
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                logger.debug(format % args)
+
+        return Handler
+
+    def start(self) -> 'FixtureServer':
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        logger.info(f"Evidence fixture server listening on {self.url}")
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> 'FixtureServer':
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def benchmark(n_trials: int = 5000, n_articles: int = 5000) -> Dict[str, Any]:
+    """Run an EvidenceMonitor against synthetic sources: a cold run, then an unchanged re-run"""
+
+    import time
+    from living_review_manager import EvidenceMonitor
+    from evidence_connectors import MemoryConnectorState
+
+    state = MemoryConnectorState()
+    strategy = {'pubmed_query': 'tuberculosis treatment', 'clinicaltrials_query': 'tuberculosis',
+                'lookback_days': 365}
+    results = {}
+    with FixtureServer([], synthetic=SyntheticSources(n_trials, n_articles)) as server:
+        endpoints = {'pubmed': server.pubmed_url, 'clinicaltrials': server.clinicaltrials_url}
+        for run in ['cold', 'unchanged']:
+            server.requests.clear()
+            monitor = EvidenceMonitor('benchmark', strategy, state=state, endpoints=endpoints)
+            start = time.perf_counter()
+            updates = monitor.check_for_updates()
+            monitor.commit_watermarks(updates['watermarks'])
+            results[run] = {'seconds': round(time.perf_counter() - start, 3),
+                            'studies': updates['total_new_studies'],
+                            'requests': len(server.requests)}
+    return results
+
+
+# CLI Interface
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Local ClinicalTrials.gov / PubMed stand-in")
+    parser.add_argument("command", choices=['serve', 'benchmark'], help="Command to execute")
+    parser.add_argument("--fixtures", default=str(DEFAULT_FIXTURES), help="Recorded fixture file")
+    parser.add_argument("--port", type=int, default=8765, help="Port to listen on")
+    parser.add_argument("--synthetic-trials", type=int, default=0, help="Synthetic trials to serve")
+    parser.add_argument("--synthetic-articles", type=int, default=0, help="Synthetic articles to serve")
+
+    args = parser.parse_args()
+
+    if args.command == 'serve':
+        synthetic = None
+        if args.synthetic_trials or args.synthetic_articles:
+            synthetic = SyntheticSources(args.synthetic_trials, args.synthetic_articles)
+        server = FixtureServer(load_fixtures(Path(args.fixtures)), synthetic, port=args.port).start()
+        print(f"ClinicalTrials.gov base URL: {server.clinicaltrials_url}")
+        print(f"PubMed E-utilities base URL: {server.pubmed_url}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            server.stop()
+
+    elif args.command == 'benchmark':
+        results = benchmark(args.synthetic_trials or 5000, args.synthetic_articles or 5000)
+        for run, stats in results.items():
+            print(f"{run}: {stats['studies']} studies, {stats['requests']} requests, {stats['seconds']}s")
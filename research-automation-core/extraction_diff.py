@@ -0,0 +1,343 @@
+"""
+Extraction Diff Engine
+Hash-joined, column-wise, streaming comparison of two data-extraction rounds
+"""
+
+import pandas as pd
+import numpy as np
+import re
+import sqlite3
+import unicodedata
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Union, Iterator
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+SEVERITIES = ['minor', 'major', 'critical']
+SEVERITY_RANK = {name: rank for rank, name in enumerate(SEVERITIES)}
+
+DEFAULT_CHUNKSIZE = 50000
+
+# Object columns with more distinct values than this share (or long values) are free text
+TEXT_UNIQUE_SHARE = 0.5
+TEXT_MEAN_LENGTH = 40
+
+DISCREPANCY_COLUMNS = ['record_id', 'field', 'first_value', 'second_value', 'kind',
+                       'severity', 'abs_diff', 'rel_diff']
+
+_WHITESPACE = re.compile(r'\s+')
+_PUNCTUATION = re.compile(r'[^\w\s%<>=.-]')
+
+
+def normalise_text(values: pd.Series) -> pd.Series:
+    """Case-, accent-, whitespace- and punctuation-insensitive form of a text column"""
+
+    text = values.astype(str).map(lambda v: unicodedata.normalize('NFKC', v))
+    text = text.str.lower().str.replace(_PUNCTUATION, ' ', regex=True)
+    return text.str.replace(_WHITESPACE, ' ', regex=True).str.strip()
+
+
+def infer_rules(frame: pd.DataFrame, key: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Comparison type per field from the first extraction's dtypes"""
+
+    rules = {}
+    n = max(len(frame), 1)
+    for column in frame.columns:
+        if column in key:
+            continue
+        values = frame[column]
+        if pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            rules[column] = {'type': 'numeric'}
+        else:
+            present = values.dropna().astype(str)
+            free_text = (present.nunique() > TEXT_UNIQUE_SHARE * n and n > 10) or \
+                (len(present) and present.str.len().mean() > TEXT_MEAN_LENGTH)
+            rules[column] = {'type': 'text' if free_text else 'categorical'}
+    return rules
+
+
+class DiscrepancyStore:
+    """SQLite store of discrepancies, indexed for filtering by field, severity and record"""
+
+    def __init__(self, path: str):
+        self.path = str(path)
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS discrepancies (
+                    comparison TEXT,
+                    record_id TEXT,
+                    field TEXT,
+                    first_value TEXT,
+                    second_value TEXT,
+                    kind TEXT,
+                    severity INTEGER,
+                    abs_diff REAL,
+                    rel_diff REAL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_disc_field_severity "
+                         "ON discrepancies (comparison, field, severity)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_disc_record ON discrepancies (comparison, record_id)")
+
+    def clear(self, comparison: str):
+        with sqlite3.connect(self.path) as conn:
+            conn.execute("DELETE FROM discrepancies WHERE comparison = ?", (comparison,))
+
+    def write(self, discrepancies: pd.DataFrame, comparison: str):
+        if discrepancies.empty:
+            return
+        frame = discrepancies.assign(comparison=comparison,
+                                     severity=discrepancies['severity'].map(SEVERITY_RANK),
+                                     record_id=discrepancies['record_id'].astype(str),
+                                     first_value=discrepancies['first_value'].astype(object).where(
+                                         discrepancies['first_value'].notna(), None).map(
+                                         lambda v: v if v is None else str(v)),
+                                     second_value=discrepancies['second_value'].astype(object).where(
+                                         discrepancies['second_value'].notna(), None).map(
+                                         lambda v: v if v is None else str(v)))
+        rows = frame[['comparison'] + DISCREPANCY_COLUMNS].itertuples(index=False, name=None)
+        with sqlite3.connect(self.path) as conn:
+            conn.executemany("INSERT INTO discrepancies VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+
+    def query(self, comparison: Optional[str] = None, field: Optional[Union[str, List[str]]] = None,
+              min_severity: Optional[str] = None, severity: Optional[str] = None,
+              record_id: Optional[str] = None, limit: Optional[int] = None) -> pd.DataFrame:
+        """Discrepancies filtered for adjudication"""
+
+        clauses, params = [], []
+        if comparison is not None:
+            clauses.append("comparison = ?")
+            params.append(comparison)
+        if field is not None:
+            fields = [field] if isinstance(field, str) else list(field)
+            clauses.append(f"field IN ({', '.join('?' * len(fields))})")
+            params.extend(fields)
+        if severity is not None:
+            clauses.append("severity = ?")
+            params.append(SEVERITY_RANK[severity])
+        if min_severity is not None:
+            clauses.append("severity >= ?")
+            params.append(SEVERITY_RANK[min_severity])
+        if record_id is not None:
+            clauses.append("record_id = ?")
+            params.append(str(record_id))
+
+        sql = "SELECT * FROM discrepancies"
+        if clauses:
+            sql += " WHERE " + " AND ".join(clauses)
+        sql += " ORDER BY severity DESC, field, record_id"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+
+        with sqlite3.connect(self.path) as conn:
+            result = pd.read_sql_query(sql, conn, params=params)
+        result['severity'] = result['severity'].map(dict(enumerate(SEVERITIES)))
+        return result
+
+    def summary(self, comparison: Optional[str] = None) -> pd.DataFrame:
+        """Discrepancy counts per field and severity"""
+
+        sql = "SELECT field, severity, COUNT(*) AS count FROM discrepancies"
+        params = []
+        if comparison is not None:
+            sql += " WHERE comparison = ?"
+            params.append(comparison)
+        sql += " GROUP BY field, severity"
+        with sqlite3.connect(self.path) as conn:
+            counts = pd.read_sql_query(sql, conn, params=params)
+        counts['severity'] = counts['severity'].map(dict(enumerate(SEVERITIES)))
+        return counts.pivot_table(index='field', columns='severity', values='count',
+                                  fill_value=0, aggfunc='sum')
+
+
+class ExtractionDiff:
+    """Compares two extraction rounds aligned on a study key
+
+    The first extraction is indexed in memory (the hash-join build side); the second is
+    streamed in chunks and probed against it, so only one full extraction is held at a
+    time. Fields are compared a whole column at a time with type-aware rules:
+    numeric (|a - b| <= max(atol, rtol * |a|)), categorical (exact) and text
+    (normalised). rules overrides the inferred type / tolerances per field.
+    """
+
+    def __init__(self, key: Union[str, List[str]] = 'study_id',
+                 rules: Optional[Dict[str, Dict[str, Any]]] = None,
+                 rtol: float = 0.01, atol: float = 0.0, major_rtol: float = 0.1,
+                 critical_fields: Optional[List[str]] = None):
+        self.key = [key] if isinstance(key, str) else list(key)
+        self.rules = rules or {}
+        self.rtol = rtol
+        self.atol = atol
+        self.major_rtol = major_rtol
+        self.critical_fields = set(critical_fields or [])
+
+    def _record_id(self, frame: pd.DataFrame) -> pd.Series:
+        if len(self.key) == 1:
+            return frame[self.key[0]].astype(str)
+        return frame[self.key].astype(str).agg('|'.join, axis=1)
+
+    def _chunks(self, source: Union[str, pd.DataFrame], chunksize: int) -> Iterator[pd.DataFrame]:
+        if isinstance(source, pd.DataFrame):
+            for start in range(0, len(source), chunksize):
+                yield source.iloc[start:start + chunksize]
+        else:
+            yield from pd.read_csv(source, chunksize=chunksize)
+
+    def compare_field(self, field: str, rule: Dict[str, Any], first: pd.Series,
+                      second: pd.Series) -> Dict[str, np.ndarray]:
+        """Column-wise comparison; returns a mismatch mask with kind/severity/diff arrays"""
+
+        missing_a, missing_b = first.isna().to_numpy(), second.isna().to_numpy()
+        one_missing = missing_a ^ missing_b
+        n = len(first)
+        abs_diff = np.full(n, np.nan)
+        rel_diff = np.full(n, np.nan)
+        severity = np.full(n, 'major', dtype=object)
+        kind = np.where(one_missing, 'missing', rule['type']).astype(object)
+
+        if rule['type'] == 'numeric':
+            a = pd.to_numeric(first, errors='coerce').to_numpy(dtype=float)
+            b = pd.to_numeric(second, errors='coerce').to_numpy(dtype=float)
+            with np.errstate(invalid='ignore', divide='ignore'):
+                abs_diff = np.abs(a - b)
+                rel_diff = abs_diff / np.abs(a)
+                tolerance = np.maximum(rule.get('atol', self.atol), rule.get('rtol', self.rtol) * np.abs(a))
+                differs = ~(abs_diff <= tolerance) & ~(missing_a & missing_b)
+                severity = np.where(rel_diff <= rule.get('major_rtol', self.major_rtol), 'minor', 'major')
+            # Unparseable values on either side are compared as text
+            unparsed = (np.isnan(a) & ~missing_a) | (np.isnan(b) & ~missing_b)
+            if unparsed.any():
+                differs = np.where(unparsed, first.astype(str).to_numpy() != second.astype(str).to_numpy(), differs)
+                kind = np.where(unparsed & ~one_missing, 'unparsed', kind)
+        elif rule['type'] == 'text':
+            # Identical raw strings need no normalising; only the candidates pay for it
+            differs = (first.to_numpy(dtype=object) != second.to_numpy(dtype=object)) & \
+                ~(missing_a | missing_b)
+            candidates = np.nonzero(differs)[0]
+            if len(candidates):
+                differs[candidates] = normalise_text(first.iloc[candidates]).to_numpy() != \
+                    normalise_text(second.iloc[candidates]).to_numpy()
+            severity = np.full(n, 'minor', dtype=object)
+        else:
+            differs = (first.to_numpy(dtype=object) != second.to_numpy(dtype=object)) & \
+                ~(missing_a & missing_b)
+
+        differs = differs | one_missing
+        severity = np.where(one_missing, 'major', severity).astype(object)
+        if field in self.critical_fields:
+            severity = np.full(n, 'critical', dtype=object)
+        return {'mask': differs, 'kind': kind, 'severity': severity,
+                'abs_diff': abs_diff, 'rel_diff': rel_diff}
+
+    def compare_frames(self, first: pd.DataFrame, second: pd.DataFrame,
+                       rules: Optional[Dict[str, Dict[str, Any]]] = None) -> Dict[str, Any]:
+        """Hash join one chunk on the key and compare every shared field column-wise"""
+
+        fields = [c for c in first.columns if c in second.columns and c not in self.key]
+        rules = rules or self._resolve_rules(first)
+        merged = first.merge(second, on=self.key, how='inner', suffixes=('__a', '__b'))
+        record_ids = self._record_id(merged).to_numpy()
+
+        frames = []
+        compared = np.zeros(len(merged), dtype=int)
+        mismatched = np.zeros(len(merged), dtype=int)
+        for field in fields:
+            result = self.compare_field(field, rules.get(field, {'type': 'categorical'}),
+                                        merged[f'{field}__a'], merged[f'{field}__b'])
+            compared += 1
+            rows = np.nonzero(result['mask'])[0]
+            mismatched[rows] += 1
+            if len(rows):
+                frames.append(pd.DataFrame({
+                    'record_id': record_ids[rows],
+                    'field': field,
+                    'first_value': merged[f'{field}__a'].to_numpy(dtype=object)[rows],
+                    'second_value': merged[f'{field}__b'].to_numpy(dtype=object)[rows],
+                    'kind': result['kind'][rows],
+                    'severity': result['severity'][rows],
+                    'abs_diff': result['abs_diff'][rows],
+                    'rel_diff': result['rel_diff'][rows]
+                }))
+
+        discrepancies = pd.concat(frames, ignore_index=True) if frames else \
+            pd.DataFrame(columns=DISCREPANCY_COLUMNS)
+        per_record = pd.DataFrame({'record_id': record_ids, 'fields_compared': compared,
+                                   'fields_disagreeing': mismatched})
+        return {'discrepancies': discrepancies, 'records': per_record}
+
+    def _resolve_rules(self, first: pd.DataFrame) -> Dict[str, Dict[str, Any]]:
+        rules = infer_rules(first, self.key)
+        for field, override in self.rules.items():
+            rules[field] = {**rules.get(field, {}), **override}
+        return rules
+
+    def stream(self, first: Union[str, pd.DataFrame], second: Union[str, pd.DataFrame],
+               store: Optional[DiscrepancyStore] = None, comparison: str = 'default',
+               chunksize: int = DEFAULT_CHUNKSIZE) -> Dict[str, Any]:
+        """Compare two extractions chunk by chunk, writing discrepancies to the store
+
+        Without a store the discrepancies are accumulated and returned instead.
+        """
+
+        build = pd.read_csv(first) if not isinstance(first, pd.DataFrame) else first
+        rules = self._resolve_rules(build)
+        build_ids = self._record_id(build)
+        matched = np.zeros(len(build), dtype=bool)
+        build_positions = pd.Index(build_ids)
+
+        if store is not None:
+            store.clear(comparison)
+
+        collected, records = [], []
+        second_only = []
+        n_probe = 0
+        for chunk in self._chunks(second, chunksize):
+            n_probe += len(chunk)
+            chunk_ids = self._record_id(chunk)
+            hits = build_positions.isin(chunk_ids.unique())
+            matched |= hits
+            second_only.append(chunk_ids[~chunk_ids.isin(build_positions)])
+
+            result = self.compare_frames(build[hits], chunk, rules)
+            records.append(result['records'])
+            if store is not None:
+                store.write(result['discrepancies'], comparison)
+            else:
+                collected.append(result['discrepancies'])
+
+        # Records present in only one round
+        unmatched = pd.concat([
+            pd.DataFrame({'record_id': build_ids[~matched].to_numpy(), 'kind': 'missing_in_second'}),
+            pd.DataFrame({'record_id': pd.concat(second_only).to_numpy() if second_only else [],
+                          'kind': 'missing_in_first'})
+        ], ignore_index=True)
+        unmatched = unmatched.assign(field='__record__', first_value=None, second_value=None,
+                                     severity='critical', abs_diff=np.nan, rel_diff=np.nan)[DISCREPANCY_COLUMNS]
+        if store is not None:
+            store.write(unmatched, comparison)
+        else:
+            collected.append(unmatched)
+
+        per_record = pd.concat(records, ignore_index=True) if records else \
+            pd.DataFrame(columns=['record_id', 'fields_compared', 'fields_disagreeing'])
+        per_record = per_record.groupby('record_id', sort=False).sum()
+
+        summary = {
+            'first_records': len(build),
+            'second_records': n_probe,
+            'matched_records': int(matched.sum()),
+            'unmatched_records': len(unmatched),
+            'records': per_record,
+            'rules': rules
+        }
+        if store is None:
+            frames = [f for f in collected if not f.empty]
+            summary['discrepancies'] = pd.concat(frames, ignore_index=True) if frames else \
+                pd.DataFrame(columns=DISCREPANCY_COLUMNS)
+        logger.info(f"Extraction diff: {summary['matched_records']} matched, "
+                    f"{summary['unmatched_records']} unmatched records")
+        return summary
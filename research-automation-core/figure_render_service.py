@@ -0,0 +1,457 @@
+"""
+Figure Rendering Service
+Parallel, incremental headless rendering of figure jobs described by a manifest
+"""
+
+import pandas as pd
+import numpy as np
+import ast
+import hashlib
+import importlib
+import importlib.util
+import json
+import os
+import runpy
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = ".figure_build_state.json"
+
+# Literal file names a discovered plotting script is taken to read
+DATA_EXTENSIONS = ('.csv', '.tsv', '.xlsx', '.xls', '.json', '.parquet', '.txt')
+
+
+@dataclass
+class FigureJob:
+    """One figure (or one plotting script) to render
+
+    target is either "module:callable" (callable may be "Class.method", in which case
+    the class is instantiated once per worker with init_kwargs) or a path to a
+    plotting script that is executed as __main__ when kind == 'script'.
+    """
+    name: str
+    target: str
+    outputs: List[str]
+    kind: str = 'callable'
+    args: List[Any] = field(default_factory=list)
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+    init_kwargs: Dict[str, Any] = field(default_factory=dict)
+    save_kwarg: Optional[str] = None
+    inputs: List[str] = field(default_factory=list)
+    style: Dict[str, Any] = field(default_factory=dict)
+    dpi: int = 300
+    cwd: Optional[str] = None
+
+
+def hash_value(digest, value: Any):
+    """Feed a job argument into a hash without relying on pickle stability"""
+
+    if isinstance(value, pd.DataFrame):
+        digest.update(json.dumps([str(c) for c in value.columns]).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(str(value.dtype).encode() + str(value.shape).encode())
+        digest.update(np.ascontiguousarray(value).tobytes() if value.dtype != object
+                      else json.dumps(value.tolist(), default=str).encode())
+    elif isinstance(value, dict):
+        for key in sorted(value, key=str):
+            digest.update(str(key).encode())
+            hash_value(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"[{len(value)}]".encode())
+        for item in value:
+            hash_value(digest, item)
+    else:
+        digest.update(json.dumps(value, default=str).encode())
+
+
+def _file_digest(path: Path) -> str:
+    if not path.exists():
+        return 'missing'
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _target_source(job: FigureJob) -> Optional[Path]:
+    """Source file of the code that draws the figure, so code edits invalidate it"""
+
+    if job.kind == 'script':
+        return Path(job.target)
+    module_name = job.target.split(':', 1)[0]
+    if module_name.endswith('.py'):
+        return Path(module_name)
+    spec = importlib.util.find_spec(module_name)
+    return Path(spec.origin) if spec and spec.origin else None
+
+
+def _find_local_module(name: str, search_paths: List[Path]) -> Optional[Path]:
+    parts = name.split('.')
+    for base in search_paths:
+        candidate = base.joinpath(*parts)
+        for path in (candidate.with_suffix('.py'), candidate / '__init__.py'):
+            if path.is_file():
+                return path.resolve()
+    return None
+
+
+# Parsed imports per (file, mtime, size), so repeated fingerprints skip re-parsing
+_IMPORT_CACHE = {}
+
+
+def _imported_names(tree: ast.AST, source: Path) -> List[Tuple[Optional[Path], str]]:
+    """(package directory or None, dotted name) for each module a file may import
+
+    Relative imports carry the directory they are resolved against; "from x import y"
+    yields both x and x.y, since y may be a submodule.
+    """
+
+    names = []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Import):
+            names.extend((None, alias.name) for alias in node.names)
+        elif isinstance(node, ast.ImportFrom):
+            package = None
+            if node.level:
+                package = source.parent
+                for _ in range(node.level - 1):
+                    package = package.parent
+            prefix = f"{node.module}." if node.module else ''
+            if node.module:
+                names.append((package, node.module))
+            names.extend((package, prefix + alias.name) for alias in node.names if alias.name != '*')
+    return names
+
+
+def local_sources(source: Path, search_paths: List[Path]) -> List[Path]:
+    """The source file plus every project-local module it imports, transitively
+
+    A module is project-local when it resolves to a file next to the importing module or
+    under one of search_paths; the standard library and installed packages are left out.
+    """
+
+    source = source.resolve()
+    roots = [Path(p).resolve() for p in search_paths]
+    seen = {source}
+    queue = [source]
+    while queue:
+        current = queue.pop()
+        try:
+            stat = current.stat()
+            key = (current, stat.st_mtime_ns, stat.st_size)
+            if key not in _IMPORT_CACHE:
+                tree = ast.parse(current.read_text(encoding='utf-8', errors='replace'))
+                _IMPORT_CACHE[key] = _imported_names(tree, current)
+        except (SyntaxError, OSError):
+            continue
+        for package, name in _IMPORT_CACHE[key]:
+            found = _find_local_module(name, [package] if package else [current.parent] + roots)
+            if found is not None and found not in seen:
+                seen.add(found)
+                queue.append(found)
+    return sorted(seen)
+
+
+def job_fingerprint(job: FigureJob, search_paths: Optional[List[str]] = None) -> str:
+    """Hash of everything that determines the rendered output
+
+    The code hash covers the target's source and the project-local modules it imports
+    (found next to the target or on search_paths), so editing a helper module that
+    draws the figure invalidates it as well.
+    """
+
+    digest = hashlib.sha256()
+    hash_value(digest, {
+        'target': job.target,
+        'kind': job.kind,
+        'args': job.args,
+        'kwargs': job.kwargs,
+        'init_kwargs': job.init_kwargs,
+        'style': job.style,
+        'dpi': job.dpi,
+        'outputs': job.outputs
+    })
+    source = _target_source(job)
+    if source is not None:
+        for path in local_sources(source, [Path(p) for p in search_paths or []]):
+            digest.update(str(path).encode())
+            digest.update(_file_digest(path).encode())
+    for path in sorted(job.inputs):
+        digest.update(path.encode())
+        digest.update(_file_digest(Path(path)).encode())
+    return digest.hexdigest()
+
+
+def _output_exists(path: str) -> bool:
+    # Paginated figures are written as <stem>_pageNN<suffix>
+    p = Path(path)
+    return p.exists() or p.with_name(f"{p.stem}_page01{p.suffix}").exists()
+
+
+# Per-worker state: modules and plotting-class instances are loaded once and reused
+_WORKER_MODULES = {}
+_WORKER_INSTANCES = {}
+
+
+def _init_worker(paths: List[str]):
+    """Preload the Agg backend and pyplot once per worker process"""
+
+    import matplotlib
+    matplotlib.use('Agg')
+    import matplotlib.pyplot  # noqa: F401
+    for path in paths:
+        if path not in sys.path:
+            sys.path.insert(0, path)
+
+
+def _load_module(module_name: str):
+    if module_name not in _WORKER_MODULES:
+        if module_name.endswith('.py'):
+            spec = importlib.util.spec_from_file_location(Path(module_name).stem, module_name)
+            module = importlib.util.module_from_spec(spec)
+            spec.loader.exec_module(module)
+        else:
+            module = importlib.import_module(module_name)
+        _WORKER_MODULES[module_name] = module
+    return _WORKER_MODULES[module_name]
+
+
+def _resolve_callable(job: FigureJob):
+    module_name, qualname = job.target.split(':', 1)
+    module = _load_module(module_name)
+    if '.' not in qualname:
+        return getattr(module, qualname)
+
+    class_name, method_name = qualname.split('.', 1)
+    key = (module_name, class_name, json.dumps(job.init_kwargs, sort_keys=True, default=str))
+    if key not in _WORKER_INSTANCES:
+        _WORKER_INSTANCES[key] = getattr(module, class_name)(**job.init_kwargs)
+    return getattr(_WORKER_INSTANCES[key], method_name)
+
+
+def _render_job(job: FigureJob) -> Dict[str, Any]:
+    """Render one job inside a worker process"""
+
+    import matplotlib
+    import matplotlib.pyplot as plt
+
+    start = time.time()
+    previous_cwd = os.getcwd()
+    try:
+        if job.cwd:
+            os.chdir(job.cwd)
+        for output in job.outputs:
+            Path(output).parent.mkdir(parents=True, exist_ok=True)
+
+        with matplotlib.rc_context(job.style):
+            if job.kind == 'script':
+                sys.path.insert(0, str(Path(job.target).parent))
+                try:
+                    runpy.run_path(job.target, run_name='__main__')
+                finally:
+                    sys.path.pop(0)
+            else:
+                func = _resolve_callable(job)
+                kwargs = dict(job.kwargs)
+                if job.save_kwarg:
+                    kwargs[job.save_kwarg] = job.outputs[0]
+                result = func(*job.args, **kwargs)
+
+                if not job.save_kwarg and result is not None:
+                    figures = result if isinstance(result, (list, tuple)) else [result]
+                    for fig, output in zip(figures, job.outputs):
+                        fig.savefig(output, dpi=job.dpi, bbox_inches='tight')
+
+        return {'name': job.name, 'status': 'rendered', 'outputs': job.outputs,
+                'seconds': time.time() - start}
+    except (Exception, SystemExit) as e:
+        return {'name': job.name, 'status': 'failed', 'error': f"{type(e).__name__}: {e}",
+                'outputs': job.outputs, 'seconds': time.time() - start}
+    finally:
+        plt.close('all')
+        os.chdir(previous_cwd)
+
+
+class FigureRenderService:
+    """Renders a manifest of figure jobs in a process pool, skipping unchanged figures"""
+
+    def __init__(self, state_file: str = DEFAULT_STATE_FILE, n_jobs: Optional[int] = None,
+                 extra_paths: Optional[List[str]] = None):
+        self.state_file = Path(state_file)
+        self.n_jobs = n_jobs or os.cpu_count() or 1
+        # Workers must be able to import the same modules as the caller
+        self.extra_paths = [str(Path(__file__).resolve().parent)] + list(extra_paths or [])
+
+    def _load_state(self) -> Dict[str, str]:
+        if self.state_file.exists():
+            try:
+                with open(self.state_file) as f:
+                    return json.load(f)
+            except (json.JSONDecodeError, OSError):
+                logger.warning(f"Ignoring unreadable build state {self.state_file}")
+        return {}
+
+    def _save_state(self, state: Dict[str, str]):
+        self.state_file.parent.mkdir(parents=True, exist_ok=True)
+        tmp = self.state_file.with_suffix('.tmp')
+        with open(tmp, 'w') as f:
+            json.dump(state, f, indent=2, sort_keys=True)
+        tmp.replace(self.state_file)
+
+    def _is_current(self, job: FigureJob, fingerprint: str, state: Dict[str, str]) -> bool:
+        # Without declared outputs there is nothing to check, so the job always runs
+        if not job.outputs or state.get(job.name) != fingerprint:
+            return False
+        base = Path(job.cwd) if job.cwd else Path('.')
+        return all(_output_exists(str(base / output)) for output in job.outputs)
+
+    def build(self, jobs: List[FigureJob], force: bool = False) -> Dict[str, Dict[str, Any]]:
+        """Render every stale job; returns per-job status ('rendered', 'skipped' or 'failed')"""
+
+        state = self._load_state()
+        results = {}
+        pending = []
+
+        for job in jobs:
+            fingerprint = job_fingerprint(job, self.extra_paths)
+            if not force and self._is_current(job, fingerprint, state):
+                results[job.name] = {'name': job.name, 'status': 'skipped', 'outputs': job.outputs,
+                                     'seconds': 0.0}
+            else:
+                pending.append((job, fingerprint))
+
+        logger.info(f"Figure build: {len(pending)} to render, {len(results)} unchanged")
+
+        fingerprints = {job.name: fp for job, fp in pending}
+        if pending and self.n_jobs > 1 and len(pending) > 1:
+            with ProcessPoolExecutor(max_workers=min(self.n_jobs, len(pending)),
+                                     initializer=_init_worker,
+                                     initargs=(self.extra_paths,)) as executor:
+                futures = [executor.submit(_render_job, job) for job, _ in pending]
+                for future in as_completed(futures):
+                    outcome = future.result()
+                    results[outcome['name']] = outcome
+        else:
+            if pending:
+                _init_worker(self.extra_paths)
+            for job, _ in pending:
+                outcome = _render_job(job)
+                results[outcome['name']] = outcome
+
+        for name, outcome in results.items():
+            if outcome['status'] == 'rendered':
+                state[name] = fingerprints[name]
+            elif outcome['status'] == 'failed':
+                state.pop(name, None)
+                logger.error(f"Figure {name} failed: {outcome['error']}")
+        self._save_state(state)
+
+        return results
+
+
+def load_manifest(path: str) -> List[FigureJob]:
+    """Read a JSON manifest: a list of FigureJob fields, or {"jobs": [...]}"""
+
+    with open(path) as f:
+        data = json.load(f)
+    entries = data['jobs'] if isinstance(data, dict) else data
+    return [FigureJob(**entry) for entry in entries]
+
+
+def save_manifest(jobs: List[FigureJob], path: str):
+    """Write jobs (with JSON-serialisable arguments) to a manifest file"""
+
+    with open(path, 'w') as f:
+        json.dump({'jobs': [asdict(job) for job in jobs]}, f, indent=2, default=str)
+
+
+def _script_files(script: Path) -> Dict[str, List[str]]:
+    """Outputs and data inputs a plotting script names as string literals
+
+    Outputs are declared only when every savefig() call saves to a literal path; a script
+    that builds any of its paths at run time gets none, so it is always re-run. Inputs are
+    literal data-file paths that exist next to the script.
+    """
+
+    try:
+        tree = ast.parse(script.read_text(encoding='utf-8', errors='replace'))
+    except SyntaxError:
+        return {'outputs': [], 'inputs': []}
+
+    outputs, dynamic, inputs = [], False, []
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Call) and getattr(node.func, 'attr', getattr(node.func, 'id', None)) == 'savefig':
+            target = node.args[0] if node.args else None
+            if isinstance(target, ast.Constant) and isinstance(target.value, str):
+                outputs.append(target.value)
+            else:
+                dynamic = True
+        elif isinstance(node, ast.Constant) and isinstance(node.value, str) \
+                and node.value.lower().endswith(DATA_EXTENSIONS) and '\n' not in node.value:
+            path = script.parent / node.value
+            if path.is_file():
+                inputs.append(str(path.resolve()))
+
+    return {'outputs': [] if dynamic else sorted(set(outputs)), 'inputs': sorted(set(inputs))}
+
+
+def discover_plot_scripts(root: str, pattern: str = "*_plots_generator.py",
+                          exclude_dirs: Optional[List[str]] = None) -> List[FigureJob]:
+    """One script job per project plotting script, run from the script's own directory"""
+
+    exclude = set(exclude_dirs or ['env', '.git', '__pycache__', 'node_modules'])
+    jobs = []
+    for script in sorted(Path(root).rglob(pattern)):
+        if exclude.intersection(script.parts):
+            continue
+        script = script.resolve()
+        files = _script_files(script)
+        jobs.append(FigureJob(
+            name=str(script.relative_to(Path(root).resolve())),
+            target=str(script),
+            outputs=files['outputs'],
+            kind='script',
+            inputs=files['inputs'],
+            cwd=str(script.parent)
+        ))
+    return jobs
+
+
+# CLI Interface
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Parallel incremental figure rendering")
+    parser.add_argument("--manifest", help="JSON manifest of figure jobs")
+    parser.add_argument("--discover", help="Root directory to scan for *_plots_generator.py scripts")
+    parser.add_argument("--state-file", default=DEFAULT_STATE_FILE, help="Build state file")
+    parser.add_argument("--jobs", type=int, default=None, help="Worker processes")
+    parser.add_argument("--force", action="store_true", help="Re-render every figure")
+
+    args = parser.parse_args()
+
+    jobs = []
+    if args.manifest:
+        jobs.extend(load_manifest(args.manifest))
+    if args.discover:
+        jobs.extend(discover_plot_scripts(args.discover))
+
+    service = FigureRenderService(args.state_file, args.jobs)
+    results = service.build(jobs, force=args.force)
+
+    for name, outcome in sorted(results.items()):
+        detail = outcome.get('error', f"{outcome['seconds']:.1f}s")
+        print(f"  {outcome['status']:<9} {name} ({detail})")
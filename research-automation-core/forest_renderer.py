@@ -0,0 +1,419 @@
+"""
+Forest and Funnel Plot Renderer
+Collection-based static rendering with automatic pagination and a content-hashed layout cache
+"""
+
+import pandas as pd
+import numpy as np
+import hashlib
+import weakref
+import json
+from collections import OrderedDict
+from pathlib import Path
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from matplotlib.collections import PathCollection
+from matplotlib.font_manager import FontProperties, findfont, get_font
+from matplotlib.patches import Polygon
+from matplotlib.path import Path as MplPath
+from matplotlib.textpath import TextPath
+from matplotlib.transforms import IdentityTransform, blended_transform_factory
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Beyond ~60 rows per column the labels of a 300-dpi PNG stop being readable
+ROWS_PER_PANEL = 60
+PANELS_PER_PAGE = 3
+
+DEFAULT_STYLE = {
+    'study_color': 'blue',
+    'overall_color': 'red',
+    'null_color': 'red',
+    'null_value': 0.0,
+    'ci_linewidth': 1.5,
+    'min_marker': 3.0,
+    'max_marker': 12.0,
+    'label_fontsize': 8,
+    'xlabel': 'Effect Size (95% CI)'
+}
+
+
+def figure_key(arrays: Dict[str, Any], style: Dict[str, Any]) -> str:
+    """Stable hash of everything that determines how a figure looks"""
+
+    digest = hashlib.sha256()
+    for name in sorted(arrays):
+        value = arrays[name]
+        digest.update(name.encode())
+        if isinstance(value, np.ndarray) and value.dtype != object:
+            digest.update(str(value.dtype).encode())
+            digest.update(np.ascontiguousarray(value).tobytes())
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+    digest.update(json.dumps(style, sort_keys=True, default=str).encode())
+    return digest.hexdigest()
+
+
+def forest_arrays(study_data: pd.DataFrame, label_col: str = 'study_label') -> Dict[str, Any]:
+    """Column arrays for a forest plot; rows flagged 'overall' become the summary diamond"""
+
+    if 'overall' in study_data.columns:
+        is_overall = study_data['overall'].fillna(False).astype(bool).to_numpy()
+    else:
+        is_overall = np.zeros(len(study_data), dtype=bool)
+
+    studies = study_data[~is_overall]
+    effect = studies['effect_size'].to_numpy(dtype=float)
+
+    if 'ci_lower' in studies.columns and 'ci_upper' in studies.columns:
+        lower = studies['ci_lower'].to_numpy(dtype=float)
+        upper = studies['ci_upper'].to_numpy(dtype=float)
+    else:
+        se = studies['effect_se'].to_numpy(dtype=float) if 'effect_se' in studies.columns \
+            else np.full(len(studies), 0.1)
+        lower = effect - 1.96 * se
+        upper = effect + 1.96 * se
+
+    weight = studies['weight'].to_numpy(dtype=float) if 'weight' in studies.columns \
+        else np.ones(len(studies))
+
+    if label_col in studies.columns:
+        labels = studies[label_col].astype(str).tolist()
+    else:
+        labels = [f'Study {i+1}' for i in range(len(studies))]
+
+    overall = None
+    if is_overall.any():
+        row = study_data[is_overall].iloc[0]
+        overall = [float(row['effect_size']), float(row['ci_lower']), float(row['ci_upper'])]
+
+    return {
+        'effect': effect,
+        'lower': lower,
+        'upper': upper,
+        'weight': weight,
+        'labels': labels,
+        'overall': overall
+    }
+
+
+class LabelPaths:
+    """Study labels as glyph outlines, for drawing a whole label column as one collection
+
+    Each distinct character is converted to a path once per font size; a label is its
+    glyphs laid end to end by advance width (no kerning). Paths are in points, right-
+    aligned and vertically centred on their anchor, so a PathCollection with sizes=[1]
+    draws them at the figure's dpi without any per-label text layout.
+    """
+
+    def __init__(self, fontsize: float):
+        self.fontsize = fontsize
+        self.prop = FontProperties(size=fontsize)
+        self.font = get_font(findfont(self.prop))
+        self._glyphs = {}
+        reference = TextPath((0, 0), 'lp', prop=self.prop).vertices
+        self.centre = (reference[:, 1].min() + reference[:, 1].max()) / 2
+
+    def _glyph(self, char: str) -> Tuple[Optional[np.ndarray], Optional[np.ndarray], float]:
+        if char not in self._glyphs:
+            # get_font is shared with the Agg backend, so set the size before each use
+            self.font.set_size(self.fontsize, 72)
+            advance = self.font.load_char(ord(char)).linearHoriAdvance / 65536
+            try:
+                outline = TextPath((0, 0), char, prop=self.prop)
+                vertices, codes = np.asarray(outline.vertices), np.asarray(outline.codes)
+            except (AttributeError, ValueError):
+                # Blank glyphs (spaces) have no outline to convert
+                vertices, codes = None, None
+            self._glyphs[char] = (vertices, codes, advance)
+        return self._glyphs[char]
+
+    def path(self, label: str) -> MplPath:
+        vertices, codes, x = [], [], 0.0
+        for char in label:
+            glyph_vertices, glyph_codes, advance = self._glyph(char)
+            if glyph_vertices is not None and len(glyph_vertices):
+                vertices.append(glyph_vertices + (x, 0.0))
+                codes.append(glyph_codes)
+            x += advance
+        if not vertices:
+            return MplPath(np.zeros((1, 2)), [MplPath.MOVETO])
+        return MplPath(np.concatenate(vertices) - (x, self.centre), np.concatenate(codes))
+
+
+_label_paths: Dict[float, LabelPaths] = {}
+
+
+def label_paths(fontsize: float) -> LabelPaths:
+    if fontsize not in _label_paths:
+        _label_paths[fontsize] = LabelPaths(fontsize)
+    return _label_paths[fontsize]
+
+
+class ForestFunnelRenderer:
+    """Draws every study of a forest or funnel plot with a handful of collection artists
+
+    Forest page layouts (row positions, marker sizes, label outlines) are cached by
+    content hash; every call draws fresh figures from them, so callers never share a
+    mutable Figure. The hash still travels with each figure so save() can skip rewrites.
+    """
+
+    def __init__(self, rows_per_panel: int = ROWS_PER_PANEL,
+                 panels_per_page: int = PANELS_PER_PAGE,
+                 cache_size: int = 32):
+        self.rows_per_panel = rows_per_panel
+        self.panels_per_page = panels_per_page
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._saved = {}
+        # Content hash of every figure this renderer drew; weak, so keys die with their figures
+        self._figure_keys = weakref.WeakKeyDictionary()
+
+    def _style(self, style: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        merged = dict(DEFAULT_STYLE)
+        if style:
+            merged.update(style)
+        return merged
+
+    def _cache_get(self, key: str) -> Optional[Dict[str, Any]]:
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+        return None
+
+    def _cache_put(self, key: str, layout: Dict[str, Any]):
+        self._cache[key] = layout
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _new_figure(self, figsize: Tuple[float, float]) -> Figure:
+        # Figures are created outside pyplot so hundreds of pages never pile up in its registry
+        fig = Figure(figsize=figsize)
+        FigureCanvasAgg(fig)
+        return fig
+
+    def forest_pages(self, arrays: Dict[str, Any], title: str = "Forest Plot",
+                     figsize: Tuple[float, float] = (12, 8),
+                     style: Optional[Dict[str, Any]] = None) -> List[Figure]:
+        """Render a forest plot, splitting long study lists over panels and pages"""
+
+        style = self._style(style)
+        key = figure_key({**arrays, 'title': title, 'figsize': list(figsize),
+                          'layout': [self.rows_per_panel, self.panels_per_page]}, style)
+        layout = self._cache_get(key)
+        if layout is None:
+            layout = self._forest_layout(arrays, title, figsize, style)
+            self._cache_put(key, layout)
+            if len(layout['pages']) > 1:
+                logger.info(f"Forest plot of {len(arrays['effect'])} studies split over "
+                            f"{len(layout['pages'])} pages")
+
+        figures = []
+        for page_number, page in enumerate(layout['pages']):
+            fig = self._draw_forest_page(layout, page, style)
+            self._figure_keys[fig] = f"{key}:{page_number}"
+            figures.append(fig)
+        return figures
+
+    def _forest_layout(self, arrays: Dict[str, Any], title: str, figsize: Tuple[float, float],
+                       style: Dict[str, Any]) -> Dict[str, Any]:
+        """Everything about a forest plot's pages that does not depend on a Figure"""
+
+        effect, lower, upper = arrays['effect'], arrays['lower'], arrays['upper']
+        labels = arrays['labels']
+        overall = arrays['overall']
+        k = len(effect)
+
+        # Marker area tracks relative study weight
+        weight = np.nan_to_num(arrays['weight'], nan=0.0)
+        w_max = weight.max() if k and weight.max() > 0 else 1.0
+        marker = style['min_marker'] + (style['max_marker'] - style['min_marker']) * np.sqrt(weight / w_max)
+
+        # Shared x-range so every panel is read on the same scale
+        bounds = np.concatenate([lower, upper, effect] + ([np.asarray(overall)] if overall else []))
+        bounds = bounds[np.isfinite(bounds)]
+        if bounds.size:
+            lo, hi = min(bounds.min(), style['null_value']), max(bounds.max(), style['null_value'])
+        else:
+            lo, hi = -1.0, 1.0
+        pad = 0.05 * (hi - lo or 1.0)
+
+        glyphs = label_paths(style['label_fontsize'])
+        label_chars = max([len(label) for label in labels] + [len('Overall Effect')])
+
+        n_panels = max(1, int(np.ceil(k / self.rows_per_panel)))
+        n_pages = int(np.ceil(n_panels / self.panels_per_page))
+        rows_per_page = self.rows_per_panel * self.panels_per_page
+
+        pages = []
+        for page in range(n_pages):
+            page_start = page * rows_per_page
+            page_panels = min(self.panels_per_page, n_panels - page * self.panels_per_page)
+            width = figsize[0] * (1 + 0.5 * (page_panels - 1))
+            height = max(figsize[1], (min(k, self.rows_per_panel) + 2) * 0.18)
+
+            # Fixed margins sized from the longest label; a tight-layout pass would
+            # measure every label twice
+            label_in = label_chars * style['label_fontsize'] * 0.6 / 72 + 0.15
+            axes_in = max(width / page_panels - label_in - 0.2, 1.0)
+
+            panels = []
+            for p in range(page_panels):
+                start = page_start + p * self.rows_per_panel
+                stop = min(start + self.rows_per_panel, k)
+                rows = np.arange(stop - start, dtype=float)
+                row_labels = list(labels[start:stop])
+                n_rows = len(rows)
+                diamond = None
+                if overall and page == n_pages - 1 and p == page_panels - 1:
+                    y = n_rows + 0.5
+                    est, ci_lo, ci_hi = overall
+                    diamond = [[ci_lo, y], [est, y - 0.35], [ci_hi, y], [est, y + 0.35]]
+                    row_labels.append('Overall Effect')
+                    n_rows += 1.5
+                    label_rows = np.append(rows, y)
+                else:
+                    label_rows = rows
+                panels.append({
+                    'slice': slice(start, stop),
+                    'rows': rows,
+                    'diamond': diamond,
+                    'label_offsets': np.column_stack([np.full(len(label_rows), -0.01), label_rows]),
+                    'label_paths': [glyphs.path(label) for label in row_labels],
+                    'ylim': (max(n_rows, self.rows_per_panel if n_panels > 1 else n_rows) - 0.5, -0.5)
+                })
+
+            pages.append({
+                'size': (width, height),
+                'margins': dict(left=label_in / width, right=1 - 0.2 / width,
+                                bottom=0.6 / height, top=1 - 0.6 / height, wspace=label_in / axes_in),
+                'title': title if n_pages == 1 else f"{title} (page {page + 1} of {n_pages})",
+                'panels': panels
+            })
+
+        return {
+            'effect': effect, 'lower': lower, 'upper': upper,
+            'sizes': marker ** 2,
+            'xlim': (lo - pad, hi + pad),
+            'pages': pages
+        }
+
+    def _draw_forest_page(self, layout: Dict[str, Any], page: Dict[str, Any],
+                          style: Dict[str, Any]) -> Figure:
+        width, height = page['size']
+        fig = self._new_figure((width, height))
+        axes = fig.subplots(1, len(page['panels']), squeeze=False)[0]
+        fig.subplots_adjust(**page['margins'])
+
+        for ax, panel in zip(axes, page['panels']):
+            rows, sl = panel['rows'], panel['slice']
+
+            # One LineCollection for every CI and one PathCollection for every marker
+            ax.hlines(rows, layout['lower'][sl], layout['upper'][sl],
+                      colors=style['study_color'], linewidth=style['ci_linewidth'])
+            ax.scatter(layout['effect'][sl], rows, s=layout['sizes'][sl], marker='s',
+                       color=style['study_color'], zorder=3)
+            if panel['diamond'] is not None:
+                ax.add_patch(Polygon(panel['diamond'], closed=True, color=style['overall_color'], zorder=3))
+
+            ax.axvline(x=style['null_value'], color=style['null_color'], linestyle='--', alpha=0.7)
+            ax.set_xlim(*layout['xlim'])
+            ax.set_ylim(*panel['ylim'])
+
+            # The whole label column is one collection of glyph outlines, not a Text per study
+            ax.set_yticks([])
+            labels = PathCollection(panel['label_paths'], sizes=[1.0], offsets=panel['label_offsets'],
+                                    transform=IdentityTransform(),
+                                    offset_transform=blended_transform_factory(ax.transAxes, ax.transData),
+                                    facecolors='black', edgecolors='none', linewidths=0, clip_on=False)
+            ax.add_collection(labels, autolim=False)
+            ax.set_xlabel(style['xlabel'], fontsize=10, fontweight='bold')
+            ax.grid(True, axis='x', alpha=0.3)
+
+        fig.suptitle(page['title'], fontsize=14, fontweight='bold', y=1 - 0.15 / height, va='top')
+        return fig
+
+    def funnel(self, effects: np.ndarray, se: np.ndarray, title: str = "Funnel Plot",
+               figsize: Tuple[float, float] = (10, 8),
+               style: Optional[Dict[str, Any]] = None) -> Figure:
+        """Render a funnel plot with pseudo 95% confidence limits around the pooled estimate"""
+
+        style = self._style(style)
+        effects = np.asarray(effects, dtype=float)
+        se = np.asarray(se, dtype=float)
+        key = figure_key({'effects': effects, 'se': se, 'title': title,
+                          'figsize': list(figsize), 'kind': 'funnel'}, style)
+
+        # A single funnel is cheap to draw, so only its content key is kept
+        fig = self._new_figure(figsize)
+        self._figure_keys[fig] = f"{key}:0"
+        ax = fig.subplots()
+
+        valid = np.isfinite(effects) & np.isfinite(se) & (se > 0)
+        ax.scatter(effects[valid], se[valid], alpha=0.7, s=50,
+                   color=style['study_color'], edgecolors='black', zorder=3)
+
+        if valid.any():
+            w = 1 / se[valid] ** 2
+            centre = float(np.sum(w * effects[valid]) / np.sum(w))
+            se_range = np.linspace(0, se[valid].max() * 1.05, 100)
+            ax.fill_betweenx(se_range, centre - 1.96 * se_range, centre + 1.96 * se_range,
+                             color=style['overall_color'], alpha=0.08)
+            ax.plot(np.concatenate([centre - 1.96 * se_range[::-1], centre + 1.96 * se_range]),
+                    np.concatenate([se_range[::-1], se_range]),
+                    '--', color=style['overall_color'], alpha=0.7, label='95% CI')
+            ax.axvline(x=centre, color=style['overall_color'], alpha=0.7)
+            ax.legend()
+
+        ax.set_xlabel('Effect Size', fontsize=12, fontweight='bold')
+        ax.set_ylabel('Standard Error', fontsize=12, fontweight='bold')
+        ax.set_title(title, fontsize=14, fontweight='bold', pad=20)
+        ax.grid(True, alpha=0.3)
+
+        # Invert y-axis (convention)
+        ax.invert_yaxis()
+        fig.tight_layout()
+        return fig
+
+    def save(self, figures: List[Figure], save_path: str, dpi: int = 300) -> List[str]:
+        """Write figures to disk; multi-page output goes to one PDF or numbered PNG pages"""
+
+        path = Path(save_path)
+        keys = tuple(self._figure_keys.get(fig) for fig in figures)
+        # Figures drawn elsewhere have no content key and are always written
+        signature = keys + (dpi,) if all(keys) else None
+
+        if path.suffix.lower() == '.pdf':
+            outputs = [path]
+        elif len(figures) == 1:
+            outputs = [path]
+        else:
+            outputs = [path.with_name(f"{path.stem}_page{i + 1:02d}{path.suffix}")
+                       for i in range(len(figures))]
+
+        # Re-saving an unchanged cached figure to the same place is a no-op
+        if signature is not None and self._saved.get(str(path)) == signature \
+                and all(p.exists() for p in outputs):
+            return [str(p) for p in outputs]
+
+        # This renderer's figures already have fixed margins; a tight bbox would draw each twice
+        bbox = None if signature is not None else 'tight'
+        if path.suffix.lower() == '.pdf':
+            with PdfPages(path) as pdf:
+                for fig in figures:
+                    pdf.savefig(fig, bbox_inches=bbox)
+        else:
+            # At 300 dpi a page is ~24 MP and zlib dominates; fast compression costs ~10% in size
+            pil_kwargs = {'compress_level': 1} if path.suffix.lower() == '.png' else None
+            for fig, out in zip(figures, outputs):
+                fig.savefig(out, dpi=dpi, bbox_inches=bbox, pil_kwargs=pil_kwargs)
+
+        self._saved[str(path)] = signature
+        return [str(p) for p in outputs]
@@ -0,0 +1,311 @@
+"""
+Inter-Rater Agreement Engine
+Percent agreement, Cohen's and weighted kappa, Krippendorff's alpha and ICC for every field at once
+"""
+
+import pandas as pd
+import numpy as np
+import os
+import logging
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Any, Optional, Tuple, Callable
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Numeric fields with at most this many distinct values are also treated as ordinal
+MAX_ORDINAL_LEVELS = 20
+
+# Categorical fields with more levels than this get agreement and alpha but no kappa tensor
+MAX_KAPPA_LEVELS = 200
+
+
+def field_kind(original: pd.Series, second: pd.Series) -> str:
+    """'numeric', 'ordinal' (numeric with few levels) or 'nominal'"""
+
+    if pd.api.types.is_numeric_dtype(original) and pd.api.types.is_numeric_dtype(second):
+        levels = pd.concat([original, second]).nunique(dropna=True)
+        return 'ordinal' if levels <= MAX_ORDINAL_LEVELS else 'numeric'
+    if isinstance(original.dtype, pd.CategoricalDtype) and original.dtype.ordered:
+        return 'ordinal'
+    return 'nominal'
+
+
+def encode_pair(original: pd.Series, second: pd.Series, ordered: bool) -> Tuple[np.ndarray, np.ndarray, int]:
+    """Integer codes over the shared category set of both raters (-1 = missing)"""
+
+    if isinstance(original.dtype, pd.CategoricalDtype) and original.dtype.ordered:
+        categories = original.dtype.categories
+        codes_a = pd.Categorical(original, categories=categories).codes
+        codes_b = pd.Categorical(second, categories=categories).codes
+        return codes_a.astype(np.int64), codes_b.astype(np.int64), len(categories)
+
+    codes, uniques = pd.factorize(pd.concat([original, second], ignore_index=True), sort=ordered)
+    n = len(original)
+    return codes[:n].astype(np.int64), codes[n:].astype(np.int64), len(uniques)
+
+
+def confusion_tensor(codes_a: np.ndarray, codes_b: np.ndarray, levels: np.ndarray) -> np.ndarray:
+    """(fields x K x K) rater-by-rater count tensor from (fields x units) code matrices
+
+    One bincount over a flattened (field, a, b) index; units missing either rating are dropped.
+    """
+
+    n_fields = codes_a.shape[0]
+    k = int(max(levels.max(), 1))
+    valid = (codes_a >= 0) & (codes_b >= 0)
+    field_idx = np.broadcast_to(np.arange(n_fields)[:, None], codes_a.shape)
+    flat = (field_idx * k + codes_a) * k + codes_b
+    counts = np.bincount(flat[valid], minlength=n_fields * k * k)
+    return counts.reshape(n_fields, k, k).astype(float)
+
+
+def kappa_from_tensor(tensor: np.ndarray, levels: np.ndarray,
+                      weights: Optional[str] = None) -> np.ndarray:
+    """Cohen's kappa (weights=None) or weighted kappa ('linear' / 'quadratic') per field"""
+
+    n_fields, k, _ = tensor.shape
+    n = tensor.sum(axis=(1, 2))
+    p_obs = tensor / np.maximum(n, 1)[:, None, None]
+    p_exp = p_obs.sum(axis=2)[:, :, None] * p_obs.sum(axis=1)[:, None, :]
+
+    if weights is None:
+        disagreement = 1 - np.eye(k)[None, :, :]
+    else:
+        i, j = np.meshgrid(np.arange(k), np.arange(k), indexing='ij')
+        span = np.maximum(levels - 1, 1)[:, None, None]
+        distance = np.abs(i - j)[None, :, :] / span
+        disagreement = distance if weights == 'linear' else distance ** 2
+
+    observed = (disagreement * p_obs).sum(axis=(1, 2))
+    expected = (disagreement * p_exp).sum(axis=(1, 2))
+    with np.errstate(divide='ignore', invalid='ignore'):
+        kappa = 1 - observed / expected
+    # Both raters constant and identical: perfect agreement, kappa undefined -> 1
+    kappa = np.where((expected == 0) & (observed == 0) & (n > 0), 1.0, kappa)
+    return np.where(n > 0, kappa, np.nan)
+
+
+def nominal_alpha(tensor: np.ndarray) -> np.ndarray:
+    """Krippendorff's alpha (nominal) for two raters from the confusion tensor"""
+
+    coincidence = tensor + tensor.transpose(0, 2, 1)
+    n_values = coincidence.sum(axis=(1, 2))
+    marginals = coincidence.sum(axis=2)
+    disagreeing = n_values - np.trace(coincidence, axis1=1, axis2=2)
+    expected = n_values ** 2 - (marginals ** 2).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha = 1 - (n_values - 1) * disagreeing / expected
+    return np.where(expected > 0, alpha, np.where(n_values > 0, 1.0, np.nan))
+
+
+def _nominal_alpha_codes(codes_a: np.ndarray, codes_b: np.ndarray, n_levels: int) -> float:
+    """Nominal alpha without materialising a K x K tensor (many levels)"""
+
+    pairable = (codes_a >= 0) & (codes_b >= 0)
+    n_values = 2 * pairable.sum()
+    if n_values == 0:
+        return np.nan
+    marginals = np.bincount(np.concatenate([codes_a[pairable], codes_b[pairable]]), minlength=n_levels)
+    disagreeing = 2 * (codes_a[pairable] != codes_b[pairable]).sum()
+    expected = n_values ** 2 - (marginals.astype(float) ** 2).sum()
+    return 1.0 if expected == 0 else float(1 - (n_values - 1) * disagreeing / expected)
+
+
+def interval_alpha(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Krippendorff's alpha (interval) for two raters; (fields x units) arrays, NaN = missing"""
+
+    pairable = ~np.isnan(a) & ~np.isnan(b)
+    m = pairable.sum(axis=1)
+    n_values = 2 * m
+    a0, b0 = np.where(pairable, a, 0.0), np.where(pairable, b, 0.0)
+    mean = (a0 + b0).sum(axis=1) / np.maximum(n_values, 1)
+    total_ss = (np.where(pairable, (a0 - mean[:, None]) ** 2 + (b0 - mean[:, None]) ** 2, 0.0)).sum(axis=1)
+    within = ((a0 - b0) ** 2).sum(axis=1)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        alpha = 1 - (n_values - 1) * within / (n_values * total_ss)
+    return np.where(total_ss > 0, alpha, np.where(m > 0, 1.0, np.nan))
+
+
+def icc_two_way(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """ICC(2,1): two-way random effects, absolute agreement, single rater, per field"""
+
+    complete = ~np.isnan(a) & ~np.isnan(b)
+    n = complete.sum(axis=1).astype(float)
+    k = 2.0
+    a0, b0 = np.where(complete, a, 0.0), np.where(complete, b, 0.0)
+    grand = (a0 + b0).sum(axis=1) / np.maximum(k * n, 1)
+    unit_means = (a0 + b0) / k
+    rater_means = np.stack([a0.sum(axis=1), b0.sum(axis=1)]) / np.maximum(n, 1)
+
+    ss_rows = k * np.where(complete, (unit_means - grand[:, None]) ** 2, 0.0).sum(axis=1)
+    ss_cols = n * ((rater_means - grand) ** 2).sum(axis=0)
+    ss_total = np.where(complete, (a0 - grand[:, None]) ** 2 + (b0 - grand[:, None]) ** 2, 0.0).sum(axis=1)
+    ss_error = ss_total - ss_rows - ss_cols
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ms_rows = ss_rows / (n - 1)
+        ms_cols = ss_cols / (k - 1)
+        ms_error = ss_error / ((n - 1) * (k - 1))
+        icc = (ms_rows - ms_error) / (ms_rows + (k - 1) * ms_error + k * (ms_cols - ms_error) / n)
+    return np.where(n > 1, icc, np.nan)
+
+
+def _numeric_matches(a: np.ndarray, b: np.ndarray, rtol: float, atol: float) -> np.ndarray:
+    """Tolerance match that is safe at zero; two missing values agree"""
+
+    both_missing = np.isnan(a) & np.isnan(b)
+    with np.errstate(invalid='ignore'):
+        close = np.abs(a - b) <= np.maximum(atol, rtol * np.abs(a))
+    return close | both_missing
+
+
+def _value_matches(original: pd.Series, second: pd.Series) -> np.ndarray:
+    both_missing = (original.isna() & second.isna()).to_numpy()
+    return (original.to_numpy(dtype=object) == second.to_numpy(dtype=object)) | both_missing
+
+
+def compute_agreement(original: pd.DataFrame, second: pd.DataFrame,
+                      rtol: float = 0.01, atol: float = 1e-8) -> Dict[str, Any]:
+    """Agreement statistics for every shared field; rows are aligned by position
+
+    Returns the per-field agreement table and the boolean (units x fields) match matrix
+    the discrepancy index is built from.
+    """
+
+    fields = [col for col in original.columns if col in second.columns]
+    n_units = min(len(original), len(second))
+    original = original[fields].iloc[:n_units].reset_index(drop=True)
+    second = second[fields].iloc[:n_units].reset_index(drop=True)
+
+    kinds = {field: field_kind(original[field], second[field]) for field in fields}
+    table = pd.DataFrame(index=pd.Index(fields, name='field'))
+    table['kind'] = [kinds[f] for f in fields]
+    table['n'] = n_units
+    for column in ['percent_agreement', 'kappa', 'weighted_kappa', 'krippendorff_alpha', 'icc']:
+        table[column] = np.nan
+
+    matches = pd.DataFrame(index=original.index)
+    if not fields or n_units == 0:
+        return {'table': table, 'matches': matches}
+
+    numeric = [f for f in fields if kinds[f] in ('numeric', 'ordinal')]
+    if numeric:
+        a = original[numeric].to_numpy(dtype=float).T
+        b = second[numeric].to_numpy(dtype=float).T
+        numeric_matches = _numeric_matches(a, b, rtol, atol)
+        matches[numeric] = numeric_matches.T
+        table.loc[numeric, 'krippendorff_alpha'] = interval_alpha(a, b)
+        table.loc[numeric, 'icc'] = icc_two_way(a, b)
+
+    for field in fields:
+        if kinds[field] == 'nominal':
+            matches[field] = _value_matches(original[field], second[field])
+    table['percent_agreement'] = matches[fields].mean(axis=0).to_numpy() * 100
+
+    # Kappa fields: nominal and ordinal, encoded into one (fields x K x K) tensor
+    categorical = [f for f in fields if kinds[f] in ('nominal', 'ordinal')]
+    encoded = {f: encode_pair(original[f], second[f], ordered=kinds[f] == 'ordinal') for f in categorical}
+    categorical = [f for f in categorical if encoded[f][2] <= MAX_KAPPA_LEVELS]
+    if categorical:
+        codes_a = np.stack([encoded[f][0] for f in categorical])
+        codes_b = np.stack([encoded[f][1] for f in categorical])
+        levels = np.array([encoded[f][2] for f in categorical])
+        tensor = confusion_tensor(codes_a, codes_b, levels)
+        table.loc[categorical, 'kappa'] = kappa_from_tensor(tensor, levels)
+
+        ordinal = np.array([kinds[f] == 'ordinal' for f in categorical])
+        if ordinal.any():
+            table.loc[np.array(categorical)[ordinal], 'weighted_kappa'] = \
+                kappa_from_tensor(tensor[ordinal], levels[ordinal], weights='quadratic')
+
+        nominal = ~ordinal
+        if nominal.any():
+            table.loc[np.array(categorical)[nominal], 'krippendorff_alpha'] = nominal_alpha(tensor[nominal])
+
+    # High-cardinality nominal fields (free text): alpha straight from the codes
+    for field in fields:
+        if kinds[field] == 'nominal' and field not in categorical:
+            codes_a, codes_b, n_levels = encoded[field]
+            table.loc[field, 'krippendorff_alpha'] = _nominal_alpha_codes(codes_a, codes_b, n_levels)
+
+    return {'table': table, 'matches': matches}
+
+
+def discrepancy_index(original: pd.DataFrame, second: pd.DataFrame, matches: pd.DataFrame,
+                      project: Optional[str] = None, id_col: Optional[str] = None) -> pd.DataFrame:
+    """Tidy long table of every disagreeing (record, field) cell"""
+
+    columns = ['project', 'record_id', 'field', 'original_value', 'second_value']
+    if matches.empty:
+        return pd.DataFrame(columns=columns)
+
+    rows, cols = np.nonzero(~matches.to_numpy(dtype=bool))
+    if len(rows) == 0:
+        return pd.DataFrame(columns=columns)
+
+    fields = np.asarray(matches.columns)[cols]
+    original = original.iloc[:len(matches)].reset_index(drop=True)
+    second = second.iloc[:len(matches)].reset_index(drop=True)
+    col_pos_a = original.columns.get_indexer(fields)
+    col_pos_b = second.columns.get_indexer(fields)
+    values_a = original.to_numpy(dtype=object)[rows, col_pos_a]
+    values_b = second.to_numpy(dtype=object)[rows, col_pos_b]
+    record_ids = original[id_col].to_numpy()[rows] if id_col and id_col in original.columns else rows + 1
+
+    return pd.DataFrame({
+        'project': project,
+        'record_id': record_ids,
+        'field': fields,
+        'original_value': values_a,
+        'second_value': values_b
+    }, columns=columns)
+
+
+def _agreement_job(args: Tuple[str, Callable, Dict[str, Any]]) -> Tuple[str, Dict[str, Any]]:
+    name, loader, options = args
+    try:
+        original, second = loader(name)
+        result = compute_agreement(original, second, options['rtol'], options['atol'])
+        result['discrepancies'] = discrepancy_index(original, second, result['matches'],
+                                                    project=name, id_col=options['id_col'])
+        result['original'], result['second'] = original, second
+        result['status'] = 'completed'
+    except Exception as e:
+        result = {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+    return name, result
+
+
+def batch_agreement(names: List[str], loader: Callable[[str], Tuple[pd.DataFrame, pd.DataFrame]],
+                    n_jobs: Optional[int] = None, rtol: float = 0.01, atol: float = 1e-8,
+                    id_col: Optional[str] = None) -> Dict[str, Dict[str, Any]]:
+    """Agreement for many projects in a process pool
+
+    loader(name) returns the (original, second) extraction frames and must be a
+    module-level function so it can be sent to worker processes.
+    """
+
+    options = {'rtol': rtol, 'atol': atol, 'id_col': id_col}
+    jobs = [(name, loader, options) for name in names]
+    n_jobs = min(n_jobs or os.cpu_count() or 1, len(jobs)) if jobs else 1
+
+    if n_jobs > 1:
+        with ProcessPoolExecutor(max_workers=n_jobs) as executor:
+            results = dict(executor.map(_agreement_job, jobs))
+    else:
+        results = dict(map(_agreement_job, jobs))
+
+    failed = [name for name, result in results.items() if result['status'] == 'failed']
+    logger.info(f"Agreement computed for {len(results) - len(failed)} of {len(results)} projects")
+    return results
+
+
+def combined_discrepancy_index(results: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+    """One discrepancy index across all projects"""
+
+    frames = [r['discrepancies'] for r in results.values() if r.get('status') == 'completed']
+    frames = [f for f in frames if not f.empty]
+    if not frames:
+        return pd.DataFrame(columns=['project', 'record_id', 'field', 'original_value', 'second_value'])
+    return pd.concat(frames, ignore_index=True)
@@ -6,22 +6,33 @@ Continuous evidence synthesis and automated review updates
 import pandas as pd
 import numpy as np
 import logging
-from typing import Dict, List, Any, Optional, Tuple
+from typing import Dict, List, Any, Optional, Tuple, Callable
 from pathlib import Path
 import json
+import re
+import hashlib
 import requests
-from datetime import datetime, timedelta
+from datetime import datetime, date, timedelta
 import schedule
 import time
 import threading
+import heapq
+import itertools
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from functools import partial
 from dataclasses import dataclass, asdict
 import sqlite3
-import smtplib
-from email.mime.text import MIMEText
-from email.mime.multipart import MIMEMultipart
 import warnings
 warnings.filterwarnings('ignore')
 
+from review_store import SQLiteConnectionPool, migrate, build_match_query
+from notification_queue import NotificationQueue, PooledSMTPSender
+from evidence_connectors import (
+    MemoryConnectorState, SQLiteConnectorState, ConditionalHttpClient, ClinicalTrialsGovConnector,
+    PubMedConnector, lookback_start, PUBMED_BASE_URL, CLINICALTRIALS_BASE_URL, DEFAULT_LOOKBACK_DAYS
+)
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -47,35 +58,63 @@ class Stakeholder:
     email: str
     name: str
     role: str  # 'researcher', 'clinician', 'policymaker', 'patient'
-    notification_frequency: str  # 'immediate', 'weekly', 'monthly'
+    notification_frequency: str  # 'immediate', 'daily', 'weekly', 'monthly'
     last_notification: Optional[str] = None
     preferences: Dict[str, Any] = None
+    review_id: Optional[str] = None
 
 
-class EvidenceMonitor:
-    """Monitors new evidence sources continuously"""
+STAKEHOLDER_ROLES = ['researcher', 'clinician', 'policymaker', 'patient']
+
 
-    def __init__(self, review_id: str, search_strategy: Dict[str, Any]):
+class EvidenceMonitor:
+    """Monitors new evidence sources continuously
+
+    Each source is fetched from its stored watermark onwards, so a re-run only pulls
+    what changed since the last successful check. check_for_updates only proposes new
+    watermarks (updates['watermarks']); the caller commits them with commit_watermarks
+    once the fetched studies are stored, so a failed update is fetched again next time.
+    """
+
+    def __init__(self, review_id: str, search_strategy: Dict[str, Any],
+                 source_limits: Optional[Dict[str, threading.Semaphore]] = None,
+                 state: Optional[MemoryConnectorState] = None,
+                 endpoints: Optional[Dict[str, str]] = None):
         self.review_id = review_id
         self.search_strategy = search_strategy
         self.last_check = datetime.now()
+        # Shared per-source semaphores cap concurrent requests to each API across reviews
+        self.source_limits = source_limits or {}
+        # Watermarks and cached responses; pass SQLiteConnectorState to persist them
+        self.state = state or MemoryConnectorState()
         self.sources = {
-            'pubmed': 'https://eutils.ncbi.nlm.nih.gov/entrez/eutils/',
+            'pubmed': PUBMED_BASE_URL,
             'cochrane': 'https://www.cochranelibrary.com/api',
-            'clinicaltrials': 'https://clinicaltrials.gov/api/v2'
+            'clinicaltrials': CLINICALTRIALS_BASE_URL
         }
+        self.sources.update(search_strategy.get('endpoints', {}))
+        self.sources.update(endpoints or {})
+        self.lookback_days = search_strategy.get('lookback_days', DEFAULT_LOOKBACK_DAYS)
+        self.keywords = self._relevance_keywords(search_strategy)
 
     def check_for_updates(self) -> Dict[str, Any]:
         """Check all sources for new or updated evidence"""
 
         logger.info(f"Checking for evidence updates for review {self.review_id}")
 
-        updates = {
-            'pubmed': self._check_pubmed_updates(),
-            'cochrane': self._check_cochrane_updates(),
-            'clinicaltrials': self._check_clinical_trials_updates(),
-            'timestamp': datetime.now().isoformat()
+        checks = {
+            'pubmed': self._check_pubmed_updates,
+            'cochrane': self._check_cochrane_updates,
+            'clinicaltrials': self._check_clinical_trials_updates
         }
+        updates, watermarks = {}, {}
+        for source, check in checks.items():
+            with self.source_limits.get(source, nullcontext()):
+                updates[source], watermark = check()
+            if watermark is not None:
+                watermarks[source] = watermark
+        updates['timestamp'] = datetime.now().isoformat()
+        updates['watermarks'] = watermarks
 
         # Combine all new studies
         all_new_studies = []
@@ -89,38 +128,69 @@ class EvidenceMonitor:
         logger.info(f"Found {len(all_new_studies)} new studies across all sources")
         return updates
 
-    def _check_pubmed_updates(self) -> List[Dict[str, Any]]:
-        """Check PubMed for new studies"""
+    def commit_watermarks(self, watermarks: Dict[str, str], conn: Optional[sqlite3.Connection] = None):
+        """Advance source watermarks, inside the caller's transaction when conn is given"""
 
-        try:
-            # Mock PubMed API call - replace with actual eutils API
-            query = self.search_strategy.get('pubmed_query', '')
-            last_check_date = self.last_check.strftime('%Y/%m/%d')
+        for source, watermark in watermarks.items():
+            self.state.set_watermark(self.review_id, source, watermark, conn)
 
-            # Simulated new studies found
-            # In real implementation:
-            # 1. Use eSearch to find new studies since last_check_date
-            # 2. Use eSummary to get article details
-            # 3. Use eFetch to get abstracts if needed
-
-            new_studies = [
-                {
-                    'pmid': 'mock_001',
-                    'title': 'New study on treatment efficacy',
-                    'abstract': 'Abstract text...',
-                    'source': 'pubmed',
-                    'publication_date': datetime.now().strftime('%Y-%m-%d'),
-                    'relevance_score': np.random.uniform(0.6, 0.9)
-                }
-            ]
-
-            return new_studies
+    @staticmethod
+    def _relevance_keywords(search_strategy: Dict[str, Any]) -> List[str]:
+        """Terms used to score relevance: explicit 'keywords', else words from the queries"""
+
+        if search_strategy.get('keywords'):
+            return [k.lower() for k in search_strategy['keywords']]
+        text = ' '.join(str(search_strategy.get(k, '')) for k in
+                        ['pubmed_query', 'clinicaltrials_query', 'query'])
+        words = re.findall(r'[a-z][a-z\-]{2,}', re.sub(r'\[[^\]]*\]', ' ', text.lower()))
+        return sorted(set(words) - {'and', 'not', 'the', 'for', 'with'})
+
+    def _score_relevance(self, study: Dict[str, Any]) -> float:
+        """0.5 plus half the share of review keywords found in title and abstract"""
+
+        if not self.keywords:
+            return 0.5
+        text = f"{study.get('title') or ''} {study.get('abstract') or ''}".lower()
+        matched = sum(1 for keyword in self.keywords if keyword in text)
+        return round(0.5 + 0.5 * matched / len(self.keywords), 3)
+
+    def _stream_source(self, connector, query: str, window_end=None) -> Tuple[List[Dict[str, Any]], str]:
+        """Fetch one source from its watermark; returns (studies, candidate watermark)"""
+
+        source = connector.source
+        since = lookback_start(self.state.get_watermark(self.review_id, source), self.lookback_days)
+        if window_end is not None:
+            studies = list(connector.fetch(query, since, window_end))
+            watermark = window_end
+        else:
+            studies = list(connector.fetch(query, since))
+            watermark = connector.next_watermark(studies, since)
+
+        for study in studies:
+            study['relevance_score'] = self._score_relevance(study)
+        logger.info(f"{source}: {len(studies)} records since {since.isoformat()} "
+                    f"({connector.client.stats['not_modified']}/{connector.client.stats['requests']} not modified)")
+        return studies, watermark.isoformat()
+
+    def _check_pubmed_updates(self) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Check PubMed for new studies (EDAT window from the last successful check)"""
+
+        query = self.search_strategy.get('pubmed_query')
+        if not query:
+            return [], None
+        try:
+            connector = PubMedConnector(
+                ConditionalHttpClient(self.state), self.sources['pubmed'],
+                api_key=self.search_strategy.get('ncbi_api_key'),
+                email=self.search_strategy.get('ncbi_email')
+            )
+            return self._stream_source(connector, query, window_end=date.today())
 
         except Exception as e:
             logger.error(f"Error checking PubMed: {e}")
-            return []
+            return [], None
 
-    def _check_cochrane_updates(self) -> List[Dict[str, Any]]:
+    def _check_cochrane_updates(self) -> Tuple[List[Dict[str, Any]], Optional[str]]:
         """Check Cochrane Library for updates"""
 
         try:
@@ -128,126 +198,119 @@ class EvidenceMonitor:
             # In real implementation:
             # Use Cochrane's API or scheduled checks for Cochrane Reviews updates
 
-            return []  # Usually fewer updates from Cochrane
+            return [], None  # Usually fewer updates from Cochrane
 
         except Exception as e:
             logger.error(f"Error checking Cochrane: {e}")
-            return []
+            return [], None
 
-    def _check_clinical_trials_updates(self) -> List[Dict[str, Any]]:
-        """Check ClinicalTrials.gov for new registered trials"""
+    def _check_clinical_trials_updates(self) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Check ClinicalTrials.gov for new or updated registered trials"""
 
+        query = self.search_strategy.get('clinicaltrials_query') or self.search_strategy.get('query')
+        if not query:
+            return [], None
         try:
-            # Mock ClinicalTrials.gov API call
-            # In real implementation:
-            # Query ClinicalTrials.gov API for new trials matching inclusion criteria
-
-            new_trials = [
-                {
-                    'nct_id': 'NCT_mock_001',
-                    'title': 'New clinical trial',
-                    'condition': 'Study condition',
-                    'source': 'clinicaltrials',
-                    'registration_date': datetime.now().strftime('%Y-%m-%d')
-                }
-            ]
-
-            return new_trials
+            connector = ClinicalTrialsGovConnector(ConditionalHttpClient(self.state),
+                                                   self.sources['clinicaltrials'])
+            return self._stream_source(connector, query)
 
         except Exception as e:
             logger.error(f"Error checking ClinicalTrials.gov: {e}")
-            return []
+            return [], None
+
+
+# Where per-review screening models live: <dir>/<review_id>/vectorizer.pkl + <model>.pkl
+SCREENING_MODELS_DIR = Path("models") / "living_reviews"
+
+# Records whose model confidence falls below this go to human screening
+SCREENING_CONFIDENCE_THRESHOLD = 0.8
+
+
+class ScreeningModelCache:
+    """Per-review screening models, loaded from disk once and shared across updates
+
+    A cached model is reused until its files change on disk, so scheduler runs pay
+    for unpickling only after a retrain. The model version is a digest of the files.
+    """
+
+    def __init__(self):
+        self._models: Dict[Path, Tuple[Tuple, str, Any]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _signature(model_dir: Path) -> Tuple:
+        return tuple((p.name, p.stat().st_mtime_ns, p.stat().st_size) for p in sorted(model_dir.glob("*.pkl")))
+
+    def get(self, model_dir: Path) -> Optional[Tuple[str, Any]]:
+        """(model_version, AILiteratureScreener) for a model directory, or None if untrained"""
+
+        model_dir = Path(model_dir)
+        if not (model_dir / "vectorizer.pkl").exists():
+            return None
+        signature = self._signature(model_dir)
+
+        with self._lock:
+            cached = self._models.get(model_dir)
+            if cached and cached[0] == signature:
+                return cached[1], cached[2]
+
+            # Imported lazily: the screener pulls in sklearn and nltk
+            from ai_literature_screener import AILiteratureScreener
+            screener = AILiteratureScreener(str(model_dir))
+            digest = hashlib.sha1()
+            for path in sorted(model_dir.glob("*.pkl")):
+                digest.update(path.read_bytes())
+            version = digest.hexdigest()[:12]
+            self._models[model_dir] = (signature, version, screener)
+            logger.info(f"Loaded screening model {version} from {model_dir}")
+            return version, screener
+
+    def invalidate(self, model_dir: Path):
+        with self._lock:
+            self._models.pop(Path(model_dir), None)
+
+
+# One cache per process, shared by every engine and scheduler worker
+screening_models = ScreeningModelCache()
 
 
 class LivingReviewEngine:
     """Core engine for managing living systematic reviews"""
 
-    def __init__(self, database_path: str = "living_reviews.db"):
+    def __init__(self, database_path: str = "living_reviews.db", pool_size: int = 4,
+                 screening_models_dir: str = str(SCREENING_MODELS_DIR)):
         self.db_path = Path(database_path)
+        self.pool = SQLiteConnectionPool(self.db_path, pool_size=pool_size)
+        self.screening_models_dir = Path(screening_models_dir)
+        self._change_listeners: List[Callable[[str], None]] = []
         self._init_database()
 
     def _init_database(self):
-        """Initialize SQLite database for living reviews"""
+        """Initialize SQLite database for living reviews, upgrading older schemas in place"""
 
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
+        result = migrate(self.pool)
+        logger.info(f"Initialized living reviews database: {self.db_path} "
+                    f"(schema version {result['to_version']})")
 
-            # Create tables
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS living_reviews (
-                    review_id TEXT PRIMARY KEY,
-                    title TEXT,
-                    description TEXT,
-                    search_strategy TEXT,
-                    last_update TEXT,
-                    total_studies INTEGER,
-                    included_studies INTEGER,
-                    created_date TEXT,
-                    update_frequency TEXT,
-                    status TEXT
-                )
-            ''')
+    def add_change_listener(self, listener: Callable[[str], None]):
+        """Call listener(review_id) whenever a review is created, updated or reconfigured"""
 
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS review_studies (
-                    id INTEGER PRIMARY KEY,
-                    review_id TEXT,
-                    study_id TEXT,
-                    source TEXT,
-                    title TEXT,
-                    authors TEXT,
-                    abstract TEXT,
-                    publication_date TEXT,
-                    relevance_score REAL,
-                    inclusion_status TEXT,
-                    added_date TEXT,
-                    removed_date TEXT,
-                    removal_reason TEXT,
-                    FOREIGN KEY (review_id) REFERENCES living_reviews (review_id)
-                )
-            ''')
+        self._change_listeners.append(listener)
 
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS review_updates (
-                    id INTEGER PRIMARY KEY,
-                    review_id TEXT,
-                    update_type TEXT,
-                    trigger_date TEXT,
-                    new_studies_count INTEGER,
-                    removed_studies_count INTEGER,
-                    effect_change REAL,
-                    heterogeneity_change REAL,
-                    description TEXT,
-                    risk_assessment TEXT,
-                    processed_date TEXT,
-                    FOREIGN KEY (review_id) REFERENCES living_reviews (review_id)
-                )
-            ''')
-
-            cursor.execute('''
-                CREATE TABLE IF NOT EXISTS stakeholders (
-                    id TEXT PRIMARY KEY,
-                    review_id TEXT,
-                    email TEXT,
-                    name TEXT,
-                    role TEXT,
-                    notification_frequency TEXT,
-                    last_notification TEXT,
-                    preferences TEXT,
-                    FOREIGN KEY (review_id) REFERENCES living_reviews (review_id)
-                )
-            ''')
-
-            conn.commit()
-
-        logger.info(f"Initialized living reviews database: {self.db_path}")
+    def _notify_change(self, review_id: str):
+        for listener in self._change_listeners:
+            try:
+                listener(review_id)
+            except Exception as e:
+                logger.error(f"Review change listener failed for {review_id}: {e}")
 
     def create_living_review(self, review_id: str, title: str, description: str,
                            search_strategy: Dict[str, Any], update_frequency: str = 'weekly') -> bool:
         """Create a new living systematic review"""
 
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO living_reviews
@@ -259,26 +322,46 @@ class LivingReviewEngine:
                     datetime.now().isoformat(), 0, 0,
                     datetime.now().isoformat(), update_frequency, 'active'
                 ))
-                conn.commit()
 
             logger.info(f"Created living review: {review_id}")
+            self._notify_change(review_id)
             return True
 
         except Exception as e:
             logger.error(f"Error creating living review: {e}")
             return False
 
+    def update_review_settings(self, review_id: str, update_frequency: Optional[str] = None,
+                               status: Optional[str] = None) -> bool:
+        """Change a review's update cadence or status ('active', 'paused', ...)"""
+
+        with self.pool.transaction() as conn:
+            cursor = conn.execute('''
+                UPDATE living_reviews
+                SET update_frequency = COALESCE(?, update_frequency), status = COALESCE(?, status)
+                WHERE review_id = ?
+            ''', (update_frequency, status, review_id))
+            changed = cursor.rowcount > 0
+
+        if changed:
+            self._notify_change(review_id)
+        return changed
+
     def add_stakeholder(self, stakeholder: Stakeholder) -> bool:
         """Add a stakeholder to a living review"""
 
         try:
-            with sqlite3.connect(self.db_path) as conn:
+            with self.pool.transaction() as conn:
                 cursor = conn.cursor()
                 cursor.execute('''
                     INSERT INTO stakeholders
                     (id, review_id, email, name, role, notification_frequency,
                      last_notification, preferences)
                     VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    ON CONFLICT (id) DO UPDATE SET
+                        review_id = excluded.review_id, email = excluded.email, name = excluded.name,
+                        role = excluded.role, notification_frequency = excluded.notification_frequency,
+                        preferences = excluded.preferences
                 ''', (
                     stakeholder.id, stakeholder.review_id, stakeholder.email,
                     stakeholder.name, stakeholder.role,
@@ -286,7 +369,6 @@ class LivingReviewEngine:
                     stakeholder.last_notification or datetime.now().isoformat(),
                     json.dumps(stakeholder.preferences) if stakeholder.preferences else None
                 ))
-                conn.commit()
 
             logger.info(f"Added stakeholder {stakeholder.name} to review {stakeholder.review_id}")
             return True
@@ -295,41 +377,69 @@ class LivingReviewEngine:
             logger.error(f"Error adding stakeholder: {e}")
             return False
 
-    def update_review_with_new_evidence(self, review_id: str, new_evidence: List[Dict[str, Any]]) -> Dict[str, Any]:
-        """Update a living review with new evidence"""
+    def get_stakeholders(self, review_id: str) -> List[Stakeholder]:
+        """Stakeholders subscribed to a review"""
+
+        rows = self.pool.execute('''
+            SELECT id, review_id, email, name, role, notification_frequency, last_notification, preferences
+            FROM stakeholders WHERE review_id = ?
+        ''', (review_id,))
+        return [
+            Stakeholder(id=row[0], review_id=row[1], email=row[2], name=row[3], role=row[4],
+                        notification_frequency=row[5], last_notification=row[6],
+                        preferences=json.loads(row[7]) if row[7] else None)
+            for row in rows
+        ]
+
+    def update_review_with_new_evidence(self, review_id: str, new_evidence: List[Dict[str, Any]],
+                                        on_commit: Optional[Callable[[sqlite3.Connection], None]] = None
+                                        ) -> Dict[str, Any]:
+        """Update a living review with new evidence
+
+        on_commit(conn) runs inside the same transaction as the study upsert (e.g. to
+        advance source watermarks), so it takes effect only if the studies are stored.
+        """
 
         logger.info(f"Updating review {review_id} with {len(new_evidence)} new studies")
 
-        # Screen new studies for inclusion
-        potentially_relevant = self._screen_new_studies(new_evidence)
-        included_studies = self._assess_inclusion_criteria(review_id, potentially_relevant)
+        # Screen with the review's trained model in one batch; keyword rules until one exists
+        screening = self._screening_settings(review_id)
+        model = screening_models.get(screening['model_dir'])
+        if model:
+            screened = self._screen_with_model(new_evidence, *model, screening)
+            included_studies = [s for s in screened if s['inclusion_status'] == 'included']
+        else:
+            potentially_relevant = self._screen_new_studies(new_evidence)
+            included_studies = self._assess_inclusion_criteria(review_id, potentially_relevant)
+            screened = included_studies
 
         # Estimate impact on results
         impact = self._assess_update_impact(review_id, included_studies)
 
-        # Create update record
-        update = ReviewUpdate(
-            review_id=review_id,
-            update_type='new_evidence' if included_studies else 'no_change',
-            trigger_date=datetime.now().isoformat(),
-            new_studies_count=len(included_studies),
-            effect_change=impact.get('effect_change'),
-            heterogeneity_change=impact.get('heterogeneity_change'),
-            description=f"Added {len(included_studies)} new studies to review",
-            risk_assessment=impact.get('risk_assessment', 'Low risk')
-        )
-
-        # Save update to database
-        self._save_update(update)
-
-        # Update study records
-        for study in included_studies:
-            self._add_study_to_review(review_id, study)
-
-        # Update review metadata
-        self._update_review_metadata(review_id, len(included_studies))
+        trigger_date = datetime.now().isoformat()
+
+        # Study rows, update record and review metadata land in one transaction
+        with self.pool.transaction() as conn:
+            # Re-processed studies are upserted, so only genuinely new ones count
+            added = self._add_studies_to_review(conn, review_id, screened)
+
+            update = ReviewUpdate(
+                review_id=review_id,
+                update_type='new_evidence' if added else 'no_change',
+                trigger_date=trigger_date,
+                new_studies_count=added,
+                effect_change=impact.get('effect_change'),
+                heterogeneity_change=impact.get('heterogeneity_change'),
+                description=self._update_description(added, screened, model),
+                risk_assessment=impact.get('risk_assessment', 'Low risk')
+            )
+            self._save_update(conn, update)
+            self._update_review_metadata(conn, review_id)
+            if on_commit is not None:
+                on_commit(conn)
 
-        logger.info(f"Review {review_id} updated with {len(included_studies)} new included studies")
+        logger.info(f"Review {review_id} updated with {added} new studies")
+        self._notify_change(review_id)
 
         return asdict(update)
 
@@ -372,6 +482,55 @@ class LivingReviewEngine:
         logger.info(f"Inclusion assessment: {len(included)}/{len(candidate_studies)} studies included")
         return included
 
+    def _screening_settings(self, review_id: str) -> Dict[str, Any]:
+        """Screening model location and thresholds, overridable per review in its search strategy"""
+
+        rows = self.pool.execute('SELECT search_strategy FROM living_reviews WHERE review_id = ?', (review_id,))
+        strategy = json.loads(rows[0][0]) if rows and rows[0][0] else {}
+        settings = strategy.get('screening', {})
+        return {
+            'model_dir': Path(settings.get('model_dir', self.screening_models_dir / review_id)),
+            'model_name': settings.get('model_name', 'logistic_screening_model'),
+            'confidence_threshold': settings.get('confidence_threshold', SCREENING_CONFIDENCE_THRESHOLD)
+        }
+
+    def _screen_with_model(self, new_studies: List[Dict[str, Any]], model_version: str, screener,
+                           settings: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Screen every new record in one vectorised batch, routing low-confidence ones to humans"""
+
+        if not new_studies:
+            return []
+        texts = [f"{study.get('title') or ''} {study.get('abstract') or ''}" for study in new_studies]
+        predictions = screener.predict_batch(texts, settings['model_name'])
+
+        confident = predictions['confidence'].to_numpy() >= settings['confidence_threshold']
+        decisions = predictions['decision'].to_numpy()
+        statuses = np.where(~confident, 'pending_review',
+                            np.where(decisions == 'include', 'included', 'excluded'))
+        screened_date = datetime.now().isoformat()
+
+        for study, decision, probability, status in zip(
+                new_studies, decisions, predictions['probability_include'].to_numpy(), statuses):
+            study['screening_decision'] = str(decision)
+            study['screening_probability'] = float(probability)
+            study['screening_model_version'] = model_version
+            study['screened_date'] = screened_date
+            study['relevance_score'] = float(probability)
+            study['inclusion_status'] = str(status)
+
+        counts = pd.Series(statuses).value_counts().to_dict()
+        logger.info(f"Model screening ({model_version}): {counts} of {len(new_studies)} records")
+        return new_studies
+
+    @staticmethod
+    def _update_description(added: int, screened: List[Dict[str, Any]], model: Optional[Tuple[str, Any]]) -> str:
+        if not model:
+            return f"Added {added} new studies to review"
+        statuses = pd.Series([s['inclusion_status'] for s in screened], dtype=object).value_counts()
+        return (f"Added {added} new studies to review; model {model[0]} included "
+                f"{statuses.get('included', 0)}, excluded {statuses.get('excluded', 0)} and sent "
+                f"{statuses.get('pending_review', 0)} to human screening")
+
     def _assess_update_impact(self, review_id: str, new_studies: List[Dict[str, Any]]) -> Dict[str, Any]:
         """Assess the impact of new studies on review results"""
 
@@ -381,65 +540,207 @@ class LivingReviewEngine:
             'risk_assessment': 'Low risk - minor update'
         }
 
-    def _save_update(self, update: ReviewUpdate):
+    def _save_update(self, conn: sqlite3.Connection, update: ReviewUpdate):
         """Save update to database"""
 
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO review_updates
-                (review_id, update_type, trigger_date, new_studies_count,
-                 removed_studies_count, effect_change, heterogeneity_change,
-                 description, risk_assessment, processed_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                update.review_id, update.update_type, update.trigger_date,
-                update.new_studies_count, update.removed_studies_count,
-                update.effect_change, update.heterogeneity_change,
-                update.description, update.risk_assessment,
-                datetime.now().isoformat()
-            ))
-            conn.commit()
-
-    def _add_study_to_review(self, review_id: str, study: Dict[str, Any]):
-        """Add a study to the review database"""
-
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO review_studies
-                (review_id, study_id, source, title, authors, abstract,
-                 publication_date, relevance_score, inclusion_status, added_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
+        conn.execute('''
+            INSERT INTO review_updates
+            (review_id, update_type, trigger_date, new_studies_count,
+             removed_studies_count, effect_change, heterogeneity_change,
+             description, risk_assessment, processed_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            update.review_id, update.update_type, update.trigger_date,
+            update.new_studies_count, update.removed_studies_count,
+            update.effect_change, update.heterogeneity_change,
+            update.description, update.risk_assessment,
+            datetime.now().isoformat()
+        ))
+
+    def _add_studies_to_review(self, conn: sqlite3.Connection, review_id: str,
+                               studies: List[Dict[str, Any]]) -> int:
+        """Bulk-upsert studies into the review database; returns how many were new
+
+        A study already tracked for the review keeps its row and added_date and has its
+        details refreshed, so processing the same PMID twice is idempotent. Human
+        screening decisions are never overwritten by a later model run.
+        """
+
+        count_sql = "SELECT COUNT(*) FROM review_studies WHERE review_id = ?"
+        before = conn.execute(count_sql, (review_id,)).fetchone()[0]
+
+        added_date = datetime.now().isoformat()
+        conn.executemany('''
+            INSERT INTO review_studies
+            (review_id, study_id, source, title, authors, abstract,
+             publication_date, relevance_score, inclusion_status, added_date,
+             screening_decision, screening_probability, screening_model_version, screened_date)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ON CONFLICT (review_id, study_id) DO UPDATE SET
+                source = excluded.source, title = excluded.title, authors = excluded.authors,
+                abstract = excluded.abstract, publication_date = excluded.publication_date,
+                relevance_score = excluded.relevance_score,
+                inclusion_status = CASE WHEN review_studies.screening_model_version = 'human'
+                    THEN review_studies.inclusion_status ELSE excluded.inclusion_status END,
+                screening_decision = CASE WHEN review_studies.screening_model_version = 'human'
+                    THEN review_studies.screening_decision ELSE excluded.screening_decision END,
+                screening_probability = excluded.screening_probability,
+                screening_model_version = CASE WHEN review_studies.screening_model_version = 'human'
+                    THEN 'human' ELSE excluded.screening_model_version END,
+                screened_date = CASE WHEN review_studies.screening_model_version = 'human'
+                    THEN review_studies.screened_date ELSE excluded.screened_date END
+        ''', (
+            (
                 review_id, study.get('study_id', study.get('pmid', 'unknown')),
                 study.get('source'), study.get('title'), study.get('authors'),
                 study.get('abstract'), study.get('publication_date'),
                 study.get('relevance_score', 0.5), study.get('inclusion_status'),
-                datetime.now().isoformat()
-            ))
-            conn.commit()
+                added_date, study.get('screening_decision'), study.get('screening_probability'),
+                study.get('screening_model_version'), study.get('screened_date')
+            )
+            for study in studies
+        ))
 
-    def _update_review_metadata(self, review_id: str, new_studies_count: int):
+        return conn.execute(count_sql, (review_id,)).fetchone()[0] - before
+
+    def _update_review_metadata(self, conn: sqlite3.Connection, review_id: str):
         """Update review metadata after adding studies"""
 
-        with sqlite3.connect(self.db_path) as conn:
+        # Counted from the indexed study table, so re-runs cannot inflate the totals
+        conn.execute('''
+            UPDATE living_reviews
+            SET last_update = ?,
+                total_studies = (SELECT COUNT(*) FROM review_studies WHERE review_id = ?),
+                included_studies = (SELECT COUNT(*) FROM review_studies
+                                    WHERE review_id = ? AND inclusion_status = 'included')
+            WHERE review_id = ?
+        ''', (
+            datetime.now().isoformat(),
+            review_id, review_id,
+            review_id
+        ))
+
+    def search_studies(self, query: str, review_id: Optional[str] = None,
+                       inclusion_status: Optional[str] = None, limit: int = 20,
+                       highlight: Tuple[str, str] = ('<mark>', '</mark>')) -> List[Dict[str, Any]]:
+        """Full-text search over tracked studies, best BM25 matches first
+
+        Supports "quoted phrases", prefix* terms and AND/OR/NOT; results carry a
+        highlighted title and an abstract snippet around the matched terms.
+        """
+
+        match = build_match_query(query)
+        if not match:
+            return []
+
+        sql = '''
+            SELECT s.review_id, s.study_id, s.source, s.title, s.authors, s.publication_date,
+                   s.inclusion_status, s.added_date,
+                   review_studies_fts.rank AS score,
+                   highlight(review_studies_fts, 0, ?, ?) AS title_highlight,
+                   snippet(review_studies_fts, 1, ?, ?, '…', 24) AS abstract_snippet
+            FROM review_studies_fts
+            JOIN review_studies s ON s.id = review_studies_fts.rowid
+            WHERE review_studies_fts MATCH ?
+        '''
+        params = [highlight[0], highlight[1], highlight[0], highlight[1], match]
+        if review_id is not None:
+            sql += " AND s.review_id = ?"
+            params.append(review_id)
+        if inclusion_status is not None:
+            sql += " AND s.inclusion_status = ?"
+            params.append(inclusion_status)
+        sql += " ORDER BY review_studies_fts.rank LIMIT ?"
+        params.append(int(limit))
+
+        with self.pool.connection() as conn:
+            cursor = conn.execute(sql, params)
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def get_screening_queue(self, review_id: str, limit: int = 50) -> List[Dict[str, Any]]:
+        """Records the screening model was not confident about, awaiting a human decision"""
+
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                UPDATE living_reviews
-                SET last_update = ?, total_studies = total_studies + ?, included_studies = included_studies + ?
-                WHERE review_id = ?
+                SELECT study_id, source, title, abstract, screening_decision,
+                       screening_probability, screening_model_version, screened_date
+                FROM review_studies
+                WHERE review_id = ? AND inclusion_status = 'pending_review'
+                ORDER BY screening_probability DESC
+                LIMIT ?
+            ''', (review_id, limit))
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
+
+    def record_screening_decision(self, review_id: str, study_id: str, include: bool) -> bool:
+        """Record a human screening decision; later model runs will not overwrite it"""
+
+        with self.pool.transaction() as conn:
+            updated = conn.execute('''
+                UPDATE review_studies
+                SET inclusion_status = ?, screening_decision = ?, screening_model_version = 'human',
+                    screened_date = ?
+                WHERE review_id = ? AND study_id = ?
             ''', (
-                datetime.now().isoformat(),
-                new_studies_count, new_studies_count,
-                review_id
-            ))
-            conn.commit()
+                'included' if include else 'excluded', 'include' if include else 'exclude',
+                datetime.now().isoformat(), review_id, study_id
+            )).rowcount
+            if updated:
+                self._update_review_metadata(conn, review_id)
+        return bool(updated)
+
+    def train_screening_model(self, review_id: str, training_data: Optional[pd.DataFrame] = None,
+                              text_column: str = 'title_abstract', label_column: str = 'decision',
+                              model_type: str = 'logistic') -> Dict[str, Any]:
+        """Train and save the review's screening model
+
+        Uses training_data (text and include/exclude label columns) when given, otherwise
+        the human decisions already recorded for the review.
+        """
+
+        from ai_literature_screener import AILiteratureScreener
+
+        if training_data is None:
+            rows = self.pool.execute('''
+                SELECT title, abstract, screening_decision FROM review_studies
+                WHERE review_id = ? AND screening_model_version = 'human'
+            ''', (review_id,))
+            texts = [f"{title or ''} {abstract or ''}" for title, abstract, _ in rows]
+            labels = pd.Series([decision for _, _, decision in rows], dtype=object)
+        else:
+            texts = training_data[text_column].tolist()
+            labels = training_data[label_column].astype(str).str.lower()
+
+        y = labels.map({'include': 1, 'included': 1, 'yes': 1, 'y': 1,
+                        'exclude': 0, 'excluded': 0, 'no': 0, 'n': 0})
+        keep = y.notna().to_numpy()
+        if y[keep].nunique() < 2:
+            raise ValueError(f"Training a screening model for {review_id} needs both include and exclude labels")
+
+        screener = AILiteratureScreener()
+        X = screener.vectorizer.fit_transform(
+            screener.preprocess_batch([t for t, k in zip(texts, keep) if k]))
+        screener.train_model(X, y[keep].astype(int).to_numpy(), model_type)
+
+        model_dir = self._screening_settings(review_id)['model_dir']
+        screener.save_models(str(model_dir))
+        screening_models.invalidate(model_dir)
+        model_version, _ = screening_models.get(model_dir)
+
+        return {
+            'review_id': review_id,
+            'model_version': model_version,
+            'model_name': f"{model_type}_screening_model",
+            'training_records': int(keep.sum()),
+            'included_labels': int(y[keep].sum())
+        }
 
     def get_review_status(self, review_id: str) -> Dict[str, Any]:
         """Get current status of a living review"""
 
-        with sqlite3.connect(self.db_path) as conn:
+        with self.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT * FROM living_reviews WHERE review_id = ?
@@ -454,76 +755,87 @@ class LivingReviewEngine:
 
 
 class NotificationSystem:
-    """Handles notifications and stakeholder communication"""
-
-    def __init__(self, smtp_config: Dict[str, str] = None):
-        self.smtp_config = smtp_config or {
-            'server': 'smtp.gmail.com',
-            'port': 587,
-            'username': 'your-email@example.com',
-            'password': 'your-password'
-        }
+    """Handles notifications and stakeholder communication
+
+    Updates are queued per stakeholder and delivered as digests on each stakeholder's
+    notification_frequency, rendered once per role and sent over one SMTP connection.
+    Without an smtp_config messages are only logged.
+    """
+
+    def __init__(self, smtp_config: Dict[str, str] = None, queue_path: str = "living_review_notifications.db"):
+        self.smtp_config = smtp_config
+        templates = {'review_update': partial(self._render_update_digest, None)}
+        templates.update({f"review_update:{role}": partial(self._render_update_digest, role)
+                          for role in STAKEHOLDER_ROLES})
+        self.queue = NotificationQueue(queue_path, PooledSMTPSender(smtp_config), templates)
+
+    def queue_update_notification(self, stakeholders: List[Stakeholder], update: ReviewUpdate) -> int:
+        """Queue an update for each stakeholder's next digest"""
+
+        recipients = [
+            {'email': s.email, 'name': s.name, 'role': s.role,
+             'notification_frequency': s.notification_frequency}
+            for s in stakeholders
+        ]
+        return self.queue.enqueue(recipients, asdict(update), template='review_update:{role}')
 
     def send_update_notification(self, stakeholder: Stakeholder, update: ReviewUpdate) -> bool:
-        """Send update notification to stakeholder"""
+        """Queue an update for one stakeholder and send whatever digests are due"""
 
-        logger.info(f"Sending notification to {stakeholder.email}")
+        logger.info(f"Queueing notification to {stakeholder.email}")
 
         try:
-            # Create message
-            msg = MIMEMultipart()
-            msg['From'] = self.smtp_config['username']
-            msg['To'] = stakeholder.email
-            msg['Subject'] = f"Living Review Update: {update.review_id}"
-
-            body = self._create_notification_body(update, stakeholder)
-            msg.attach(MIMEText(body, 'html'))
-
-            # In real implementation, connect and send
-            # For demo, just log
-            logger.info(f"Would send email to {stakeholder.email} about update {update.update_type}")
-
-            # Update last notification time
+            self.queue_update_notification([stakeholder], update)
+            self.flush()
             stakeholder.last_notification = datetime.now().isoformat()
-
             return True
 
         except Exception as e:
             logger.error(f"Error sending notification: {e}")
             return False
 
-    def _create_notification_body(self, update: ReviewUpdate, stakeholder: Stakeholder) -> str:
-        """Create HTML notification message"""
+    def flush(self) -> Dict[str, int]:
+        """Send every digest that is due"""
+
+        return self.queue.flush()
+
+    @staticmethod
+    def _render_update_digest(role: Optional[str], updates: List[Dict[str, Any]]) -> Tuple[str, str, str]:
+        """HTML digest of one or more review updates; $name is filled per stakeholder"""
+
+        review_ids = sorted({u['review_id'] for u in updates})
+        if len(updates) == 1:
+            subject = f"Living Review Update: {updates[0]['review_id']}"
+        else:
+            subject = f"Living Review Digest: {len(updates)} updates to {', '.join(review_ids)}"
 
         html = f"""
 <h2>Review Update Notification</h2>
 
-<p>Dear {stakeholder.name},</p>
-
-<p>A {update.update_type.replace('_', ' ')} has been made to the living systematic review "{update.review_id}".</p>
+<p>Dear $name,</p>
 
+<p>{len(updates)} update{'s have' if len(updates) > 1 else ' has'} been made to the living systematic review{'s' if len(review_ids) > 1 else ''} {', '.join(f'"{r}"' for r in review_ids)}.</p>
+"""
+        for update in updates:
+            html += f"""
 <div style="background-color: #f5f5f5; padding: 15px; border-radius: 5px; margin: 20px 0;">
-<h3>Update Summary</h3>
+<h3>Update Summary: {update['review_id']}</h3>
 <ul>
-<li><strong>Type:</strong> {update.update_type.replace('_', ' ').title()}</li>
-<li><strong>Date:</strong> {update.trigger_date[:10]}</li>
-<li><strong>New Studies Added:</strong> {update.new_studies_count}</li>
-<li><strong>Risk Assessment:</strong> {update.risk_assessment}</li>
+<li><strong>Type:</strong> {update['update_type'].replace('_', ' ').title()}</li>
+<li><strong>Date:</strong> {update['trigger_date'][:10]}</li>
+<li><strong>New Studies Added:</strong> {update['new_studies_count']}</li>
+<li><strong>Risk Assessment:</strong> {update['risk_assessment']}</li>
 </ul>
-{ f"<p><strong>Description:</strong> {update.description}</p>" if update.description else "" }
+{ f"<p><strong>Description:</strong> {update['description']}</p>" if update.get('description') else "" }
 </div>
-
-<h3>Risk Assessment</h3>
-<p>{update.risk_assessment}</p>
-
 """
 
-        if stakeholder.role == 'clinician':
+        if role == 'clinician':
             html += """
 <p><strong>For Clinicians:</strong> This update may affect clinical practice guidelines.
 Please review the updated evidence before making treatment decisions.</p>
 """
-        elif stakeholder.role == 'policymaker':
+        elif role == 'policymaker':
             html += """
 <p><strong>For Policymakers:</strong> This update may influence health policy recommendations.
 The policy team has been notified for consideration in upcoming reviews.</p>
@@ -543,95 +855,229 @@ To change your notification preferences, contact the system administrator.
 
 """
 
-        return html
+        return subject, html, 'html'
+
+
+# Interval between scheduled updates for each update_frequency
+UPDATE_INTERVALS = {
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+    'biweekly': timedelta(weeks=2),
+    'monthly': timedelta(days=30),
+    'quarterly': timedelta(days=91)
+}
+
+# A failed update is retried after this long (or its normal interval, if shorter)
+RETRY_DELAY = timedelta(minutes=15)
+
+# How often the scheduler sends notification digests that have come due
+NOTIFICATION_FLUSH_INTERVAL = timedelta(minutes=15)
+
+# Default cap on concurrent requests to each evidence source across all reviews
+DEFAULT_SOURCE_LIMITS = {'pubmed': 3, 'cochrane': 2, 'clinicaltrials': 3}
+
+
+def next_due_time(review: Dict[str, Any]) -> datetime:
+    """When a review is next due: last update plus its update_frequency interval"""
+
+    interval = UPDATE_INTERVALS.get(review.get('update_frequency') or 'weekly', UPDATE_INTERVALS['weekly'])
+    try:
+        last_update = datetime.fromisoformat(review['last_update'])
+    except (TypeError, ValueError, KeyError):
+        return datetime.now()
+    return last_update + interval
 
 
 class LivingReviewScheduler:
-    """Handles scheduling and automated execution of living review updates"""
+    """Handles scheduling and automated execution of living review updates
 
-    def __init__(self):
+    Every active review sits in a min-heap keyed on its next due time. The scheduler
+    thread sleeps until the earliest one is due (or until a review is created or
+    changed), then hands due reviews to a bounded worker pool. Source semaphores shared
+    by all workers cap concurrent calls to each evidence API. With a notifier, updates
+    are queued for stakeholders and due digests are flushed periodically.
+    """
+
+    def __init__(self, max_workers: int = 4, source_limits: Optional[Dict[str, int]] = None,
+                 notifier: Optional[NotificationSystem] = None):
         self.is_running = False
+        self.notifier = notifier
+        self._next_flush = datetime.min
         self.thread = None
         self.review_engine = None
+        self.max_workers = max_workers
+        self.source_limits = {source: threading.BoundedSemaphore(limit)
+                              for source, limit in {**DEFAULT_SOURCE_LIMITS, **(source_limits or {})}.items()}
+        self.executor = None
+
+        self._heap: List[Tuple[datetime, int, str]] = []
+        self._due: Dict[str, Tuple[datetime, int]] = {}   # latest heap entry per review
+        self._in_flight = set()
+        self._sequence = itertools.count()
+        self._wakeup = threading.Condition()
 
     def start_automated_updates(self, engine: LivingReviewEngine):
         """Start automated review update schedule"""
 
         self.review_engine = engine
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='living-review')
         self.is_running = True
 
-        def run_scheduler():
-            while self.is_running:
-                # Schedule updates (simplified - in real implementation use proper scheduling)
-                # Check for updates every 5 minutes for demo
-                time.sleep(300)  # 5 minutes
-
-                if not self.is_running:
-                    break
-
-                # Find reviews due for update
-                reviews_to_update = self._get_due_reviews()
-
-                for review_id in reviews_to_update:
-                    logger.info(f"Processing scheduled update for review {review_id}")
-                    self._process_review_update(review_id)
+        for review in self._load_active_reviews():
+            self.schedule_review(review['review_id'], next_due_time(review))
+        engine.add_change_listener(self.review_changed)
 
-        self.thread = threading.Thread(target=run_scheduler, daemon=True)
+        self.thread = threading.Thread(target=self._run, daemon=True)
         self.thread.start()
 
-        logger.info("Started automated living review updates")
+        logger.info(f"Started automated living review updates for {len(self._due)} reviews")
 
     def stop_automated_updates(self):
         """Stop automated review updates"""
 
-        self.is_running = False
+        with self._wakeup:
+            self.is_running = False
+            self._wakeup.notify_all()
         if self.thread and self.thread.is_alive():
             self.thread.join(timeout=5)
+        if self.executor:
+            self.executor.shutdown(wait=False, cancel_futures=True)
 
         logger.info("Stopped automated living review updates")
 
-    def _get_due_reviews(self) -> List[str]:
-        """Get reviews due for update"""
+    def schedule_review(self, review_id: str, due: datetime):
+        """(Re)schedule a review; any earlier entry for it is superseded"""
+
+        with self._wakeup:
+            entry = (due, next(self._sequence))
+            self._due[review_id] = entry
+            heapq.heappush(self._heap, (entry[0], entry[1], review_id))
+            self._wakeup.notify()
+
+    def unschedule_review(self, review_id: str):
+        with self._wakeup:
+            self._due.pop(review_id, None)
+
+    def review_changed(self, review_id: str):
+        """Engine callback: recompute a review's due time from its current settings"""
 
-        # Simplified - in reality check frequency and last update time
-        with sqlite3.connect(self.review_engine.db_path) as conn:
+        if not self.is_running:
+            return
+        review = self.review_engine.get_review_status(review_id)
+        if not review or review.get('status') != 'active':
+            self.unschedule_review(review_id)
+        elif review_id not in self._in_flight:
+            self.schedule_review(review_id, next_due_time(review))
+
+    def next_due(self) -> Optional[Tuple[str, datetime]]:
+        """Earliest scheduled review and its due time"""
+
+        with self._wakeup:
+            self._drop_superseded()
+            if not self._heap:
+                return None
+            due, _, review_id = self._heap[0]
+            return review_id, due
+
+    def _drop_superseded(self):
+        # Heap entries are invalidated lazily: only the latest entry per review counts
+        while self._heap:
+            due, sequence, review_id = self._heap[0]
+            if self._due.get(review_id) == (due, sequence) and review_id not in self._in_flight:
+                return
+            heapq.heappop(self._heap)
+
+    def _run(self):
+        with self._wakeup:
+            while self.is_running:
+                now = datetime.now()
+                if self.notifier and now >= self._next_flush:
+                    self._next_flush = now + NOTIFICATION_FLUSH_INTERVAL
+                    self.executor.submit(self.notifier.flush)
+                flush_delay = (self._next_flush - now).total_seconds() if self.notifier else None
+
+                self._drop_superseded()
+                if not self._heap:
+                    self._wakeup.wait(timeout=flush_delay)
+                    continue
+
+                delay = (self._heap[0][0] - now).total_seconds()
+                if delay > 0:
+                    # Woken early by schedule_review / stop; the loop re-checks the heap
+                    self._wakeup.wait(timeout=delay if flush_delay is None else min(delay, flush_delay))
+                    continue
+
+                _, _, review_id = heapq.heappop(self._heap)
+                del self._due[review_id]
+                self._in_flight.add(review_id)
+                self.executor.submit(self._run_review, review_id)
+
+    def _run_review(self, review_id: str):
+        logger.info(f"Processing scheduled update for review {review_id}")
+        succeeded = self._process_review_update(review_id)
+
+        with self._wakeup:
+            self._in_flight.discard(review_id)
+        if not self.is_running:
+            return
+
+        review = self.review_engine.get_review_status(review_id)
+        if not review or review.get('status') != 'active':
+            return
+        interval = UPDATE_INTERVALS.get(review.get('update_frequency') or 'weekly', UPDATE_INTERVALS['weekly'])
+        delay = interval if succeeded else min(interval, RETRY_DELAY)
+        self.schedule_review(review_id, datetime.now() + delay)
+
+    def _load_active_reviews(self) -> List[Dict[str, Any]]:
+        """Active reviews with the fields needed to compute their due times"""
+
+        with self.review_engine.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
-                SELECT review_id FROM living_reviews
+                SELECT review_id, update_frequency, last_update FROM living_reviews
                 WHERE status = 'active'
-                LIMIT 5  -- Check first 5 active reviews
             ''')
+            columns = [desc[0] for desc in cursor.description]
+            return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
-            return [row[0] for row in cursor.fetchall()]
-
-    def _process_review_update(self, review_id: str):
-        """Process a review update"""
+    def _process_review_update(self, review_id: str) -> bool:
+        """Process a review update; returns False if it failed"""
 
         try:
             # Get review search strategy
             review_status = self.review_engine.get_review_status(review_id)
             if not review_status:
                 logger.warning(f"Review {review_id} not found")
-                return
+                return False
 
             search_strategy = json.loads(review_status['search_strategy'])
 
             # Create evidence monitor and check for updates
-            monitor = EvidenceMonitor(review_id, search_strategy)
+            monitor = EvidenceMonitor(review_id, search_strategy, source_limits=self.source_limits,
+                                      state=SQLiteConnectorState(self.review_engine.pool))
             updates = monitor.check_for_updates()
 
             if updates['total_new_studies'] > 0:
-                # Process the update
+                # Process the update; watermarks advance in the same transaction
                 update_result = self.review_engine.update_review_with_new_evidence(
-                    review_id, updates['new_studies']
+                    review_id, updates['new_studies'],
+                    on_commit=lambda conn: monitor.commit_watermarks(updates['watermarks'], conn)
                 )
 
                 logger.info(f"Processed update for review {review_id}: {update_result}")
+                if self.notifier and update_result['new_studies_count']:
+                    self.notifier.queue_update_notification(
+                        self.review_engine.get_stakeholders(review_id), ReviewUpdate(**update_result))
+                    self.notifier.flush()
             else:
+                monitor.commit_watermarks(updates['watermarks'])
                 logger.info(f"No new evidence found for review {review_id}")
+            return True
 
         except Exception as e:
             logger.error(f"Error processing update for review {review_id}: {e}")
+            return False
 
 
 # Main Living Review Manager
@@ -641,8 +1087,9 @@ class LivingReviewManager:
     def __init__(self, database_path: str = "living_reviews.db"):
         self.engine = LivingReviewEngine(database_path)
         self.evidence_monitor = None
-        self.scheduler = LivingReviewScheduler()
-        self.notifier = NotificationSystem()
+        # Queued notifications live alongside the reviews they describe
+        self.notifier = NotificationSystem(queue_path=database_path)
+        self.scheduler = LivingReviewScheduler(notifier=self.notifier)
 
     def create_review_and_monitor(self, review_id: str, title: str, description: str,
                                 search_strategy: Dict[str, Any], stakeholders: List[Stakeholder] = None) -> bool:
@@ -659,7 +1106,8 @@ class LivingReviewManager:
             self.engine.add_stakeholder(stakeholder)
 
         # Setup evidence monitor
-        self.evidence_monitor = EvidenceMonitor(review_id, search_strategy)
+        self.evidence_monitor = EvidenceMonitor(review_id, search_strategy,
+                                                state=SQLiteConnectorState(self.engine.pool))
 
         logger.info(f"Successfully created living review {review_id} with monitoring")
         return True
@@ -672,7 +1120,8 @@ class LivingReviewManager:
             review_status = self.engine.get_review_status(review_id)
             if review_status:
                 search_strategy = json.loads(review_status['search_strategy'])
-                self.evidence_monitor = EvidenceMonitor(review_id, search_strategy)
+                self.evidence_monitor = EvidenceMonitor(review_id, search_strategy,
+                                                        state=SQLiteConnectorState(self.engine.pool))
             else:
                 raise ValueError(f"Review {review_id} not found")
 
@@ -681,8 +1130,10 @@ class LivingReviewManager:
 
         # Process updates if found
         if updates['total_new_studies'] > 0:
+            monitor = self.evidence_monitor
             update_result = self.engine.update_review_with_new_evidence(
-                review_id, updates['new_studies']
+                review_id, updates['new_studies'],
+                on_commit=lambda conn: monitor.commit_watermarks(updates['watermarks'], conn)
             )
 
             # Send notifications
@@ -694,6 +1145,7 @@ class LivingReviewManager:
                 'result': update_result
             }
         else:
+            self.evidence_monitor.commit_watermarks(updates['watermarks'])
             return {
                 'update_performed': False,
                 'updates_found': 0,
@@ -701,27 +1153,16 @@ class LivingReviewManager:
             }
 
     def _send_update_notifications(self, review_id: str, update_result: Dict[str, Any]):
-        """Send notifications to stakeholders about the update"""
+        """Queue the update for the review's stakeholders and send any digests now due"""
 
-        try:
-            # Get stakeholders for this review
-            stakeholders = self._get_stakeholders(review_id)
-
-            update = ReviewUpdate(**update_result)
-
-            for stakeholder_dict in stakeholders:
-                stakeholder = Stakeholder(
-                    id=stakeholder_dict['id'],
-                    review_id=stakeholder_dict['review_id'],
-                    email=stakeholder_dict['email'],
-                    name=stakeholder_dict['name'],
-                    role=stakeholder_dict['role'],
-                    notification_frequency=stakeholder_dict['notification_frequency'],
-                    last_notification=stakeholder_dict.get('last_notification'),
-                    preferences=json.loads(stakeholder_dict['preferences']) if stakeholder_dict['preferences'] else None
-                )
+        # Every candidate may have been a duplicate; an empty update is not worth a digest
+        if not update_result.get('new_studies_count'):
+            return
 
-                self.notifier.send_update_notification(stakeholder, update)
+        try:
+            stakeholders = self.engine.get_stakeholders(review_id)
+            self.notifier.queue_update_notification(stakeholders, ReviewUpdate(**update_result))
+            self.notifier.flush()
 
         except Exception as e:
             logger.error(f"Error sending notifications: {e}")
@@ -729,12 +1170,19 @@ class LivingReviewManager:
     def _get_stakeholders(self, review_id: str) -> List[Dict[str, Any]]:
         """Get stakeholders for a review"""
 
-        with sqlite3.connect(self.engine.db_path) as conn:
+        with self.engine.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('SELECT * FROM stakeholders WHERE review_id = ?', (review_id,))
             columns = [desc[0] for desc in cursor.description]
             return [dict(zip(columns, row)) for row in cursor.fetchall()]
 
+    def search_evidence(self, query: str, review_id: Optional[str] = None,
+                        inclusion_status: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+        """Keyword search across accumulated living-review evidence"""
+
+        return self.engine.search_studies(query, review_id=review_id,
+                                          inclusion_status=inclusion_status, limit=limit)
+
     def start_automated_monitoring(self):
         """Start automated monitoring for all living reviews"""
 
@@ -755,7 +1203,7 @@ class LivingReviewManager:
             return {"error": f"Review {review_id} not found"}
 
         # Get study counts
-        with sqlite3.connect(self.engine.db_path) as conn:
+        with self.engine.pool.connection() as conn:
             cursor = conn.cursor()
 
             # Count studies by status
@@ -769,7 +1217,7 @@ class LivingReviewManager:
             study_counts = dict(cursor.fetchall())
 
         # Get recent updates
-        with sqlite3.connect(self.engine.db_path) as conn:
+        with self.engine.pool.connection() as conn:
             cursor = conn.cursor()
             cursor.execute('''
                 SELECT update_type, trigger_date, new_studies_count
@@ -796,12 +1244,14 @@ if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Living Systematic Review Manager")
-    parser.add_argument("command", choices=['create', 'update', 'status', 'start-monitoring', 'stop-monitoring'],
+    parser.add_argument("command", choices=['create', 'update', 'status', 'search', 'start-monitoring', 'stop-monitoring'],
                        help="Command to execute")
     parser.add_argument("--review-id", help="Review ID for operations")
     parser.add_argument("--title", help="Review title")
     parser.add_argument("--description", help="Review description")
     parser.add_argument("--search-strategy", help="Search strategy JSON file")
+    parser.add_argument("--query", help="Full-text query for search")
+    parser.add_argument("--limit", type=int, default=20, help="Maximum search results")
 
     args = parser.parse_args()
 
@@ -843,6 +1293,17 @@ if __name__ == "__main__":
             print(f"Included Studies: {report.get('included_studies', 0)}")
             print(f"Last Update: {report.get('last_update', 'Never')}")
 
+    elif args.command == 'search':
+        if not args.query:
+            parser.error("--query required for search")
+
+        results = manager.search_evidence(args.query, review_id=args.review_id, limit=args.limit)
+        print(f"{len(results)} matching studies")
+        for result in results:
+            print(f"[{result['review_id']}] {result['study_id']}: {result['title']}")
+            if result['abstract_snippet']:
+                print(f"    {result['abstract_snippet']}")
+
     elif args.command == 'start-monitoring':
         manager.start_automated_monitoring()
         print("Started automated monitoring")
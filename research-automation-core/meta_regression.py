@@ -0,0 +1,339 @@
+"""
+Mixed-Effects Meta-Regression System
+Weighted least-squares meta-regression with REML tau² and Knapp-Hartung inference
+"""
+
+import pandas as pd
+import numpy as np
+from scipy import stats
+import logging
+from typing import Dict, List, Any, Optional, Tuple, Sequence
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class ModeratorDesign:
+    """Encodes moderator columns once and assembles design matrices on demand"""
+
+    def __init__(self, data: pd.DataFrame, moderators: Sequence[str],
+                 categorical: Optional[Sequence[str]] = None):
+        self.n_studies = len(data)
+        self.blocks = {}
+        self.column_names = {}
+        self.missing = {}
+
+        categorical = set(categorical or [])
+
+        for moderator in moderators:
+            series = data[moderator]
+            is_categorical = (moderator in categorical or
+                              not pd.api.types.is_numeric_dtype(series) or
+                              pd.api.types.is_bool_dtype(series))
+
+            missing = series.isna().values
+            if is_categorical:
+                # Treatment coding against the most frequent level
+                levels = series.dropna().astype(str).value_counts().index.tolist()
+                codes = series.astype(str).where(~missing)
+                block = np.column_stack(
+                    [(codes == level).values.astype(float) for level in levels[1:]]
+                ) if len(levels) > 1 else np.zeros((self.n_studies, 0))
+                names = [f"{moderator}[{level}]" for level in levels[1:]]
+            else:
+                block = series.fillna(0).values.astype(float)[:, None]
+                names = [moderator]
+
+            block[missing] = 0.0
+            self.blocks[moderator] = block
+            self.column_names[moderator] = names
+            self.missing[moderator] = missing
+
+    def build(self, moderator_set: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+        """Design matrix (with intercept), complete-case mask and column names"""
+
+        blocks = [np.ones((self.n_studies, 1))] + [self.blocks[m] for m in moderator_set]
+        names = ['intercept'] + [n for m in moderator_set for n in self.column_names[m]]
+
+        mask = np.ones(self.n_studies, dtype=bool)
+        for m in moderator_set:
+            mask &= ~self.missing[m]
+
+        return np.hstack(blocks), mask, names
+
+
+def _batched_inverse_spd(a: np.ndarray) -> np.ndarray:
+    """Inverse of a stack of symmetric positive-definite matrices via Cholesky"""
+
+    chol = np.linalg.cholesky(a)
+    chol_inv = np.linalg.inv(chol)
+    return np.einsum('sji,sjk->sik', chol_inv, chol_inv)
+
+
+def _reml_quantities(y: np.ndarray, v: np.ndarray, x: np.ndarray, mask: np.ndarray,
+                     tau2: np.ndarray) -> Dict[str, np.ndarray]:
+    """Weighted fit and REML score terms for a batch of models sharing k studies
+
+    Shapes: y, v (k,), x (S, k, p), mask (S, k), tau2 (S,). The k x k projection
+    matrix P is never formed; every trace is reduced to p x p products.
+    """
+
+    w = mask / (v[None, :] + tau2[:, None])
+    a = np.einsum('ski,sk,skj->sij', x, w, x)
+    a_inv = _batched_inverse_spd(a)
+
+    xwy = np.einsum('ski,sk,k->si', x, w, y)
+    beta = np.einsum('sij,sj->si', a_inv, xwy)
+    resid = (y[None, :] - np.einsum('ski,si->sk', x, beta)) * mask
+    py = w * resid
+
+    xw2x = np.einsum('ski,sk,skj->sij', x, w ** 2, x)
+    xw3x = np.einsum('ski,sk,skj->sij', x, w ** 3, x)
+    b = np.einsum('sij,sjk->sik', a_inv, xw2x)
+
+    tr_p = w.sum(axis=1) - np.einsum('sii->s', b)
+    tr_pp = ((w ** 2).sum(axis=1)
+             - 2 * np.einsum('sij,sji->s', a_inv, xw3x)
+             + np.einsum('sij,sji->s', b, b))
+
+    return {
+        'w': w,
+        'a': a,
+        'a_inv': a_inv,
+        'beta': beta,
+        'resid': resid,
+        'ypy': (py * resid).sum(axis=1),
+        'yppy': (py ** 2).sum(axis=1),
+        'tr_p': tr_p,
+        'tr_pp': tr_pp
+    }
+
+
+class MetaRegressionModel:
+    """Mixed-effects meta-regression fitted for one or many design matrices at once"""
+
+    def __init__(self, effect_sizes: np.ndarray, variances: np.ndarray,
+                 max_iter: int = 100, tol: float = 1e-8):
+        self.effect_sizes = np.asarray(effect_sizes, dtype=float)
+        self.variances = np.asarray(variances, dtype=float)
+        self.max_iter = max_iter
+        self.tol = tol
+
+    def _dl_start(self, x: np.ndarray, mask: np.ndarray) -> np.ndarray:
+        """Method-of-moments tau² starting values for each design"""
+
+        zero = np.zeros(x.shape[0])
+        fe = _reml_quantities(self.effect_sizes, self.variances, x, mask, zero)
+        k = mask.sum(axis=1)
+        p = x.shape[2]
+        tau2 = (fe['ypy'] - (k - p)) / np.maximum(fe['tr_p'], 1e-12)
+        return np.maximum(tau2, 0.0)
+
+    def _reml_tau2(self, x: np.ndarray, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Fisher-scoring REML estimate of tau² for every design in the batch"""
+
+        tau2 = self._dl_start(x, mask)
+        converged = np.zeros(x.shape[0], dtype=bool)
+
+        for _ in range(self.max_iter):
+            q = _reml_quantities(self.effect_sizes, self.variances, x, mask, tau2)
+            step = (q['yppy'] - q['tr_p']) / np.maximum(q['tr_pp'], 1e-12)
+            new_tau2 = np.where(converged, tau2, np.maximum(tau2 + step, 0.0))
+            converged |= np.abs(new_tau2 - tau2) < self.tol
+            tau2 = new_tau2
+            if converged.all():
+                break
+
+        return tau2, converged
+
+    def fit_batch(self, designs: Sequence[np.ndarray], masks: Optional[Sequence[np.ndarray]] = None,
+                  column_names: Optional[Sequence[List[str]]] = None,
+                  method: str = 'REML', knapp_hartung: bool = True) -> List[Dict[str, Any]]:
+        """Fit every design matrix of equal width in one vectorised pass"""
+
+        k = self.effect_sizes.shape[0]
+        x = np.stack([np.asarray(d, dtype=float) for d in designs])
+        n_models, _, p = x.shape
+        mask = (np.stack([np.asarray(m, dtype=float) for m in masks]) if masks is not None
+                else np.ones((n_models, k)))
+        x = x * mask[:, :, None]
+
+        if method == 'REML':
+            tau2, converged = self._reml_tau2(x, mask)
+        elif method == 'DL':
+            tau2, converged = self._dl_start(x, mask), np.ones(n_models, dtype=bool)
+        else:
+            tau2, converged = np.zeros(n_models), np.ones(n_models, dtype=bool)
+
+        fit = _reml_quantities(self.effect_sizes, self.variances, x, mask, tau2)
+        fe = _reml_quantities(self.effect_sizes, self.variances, x, mask, np.zeros(n_models))
+
+        k_eff = mask.sum(axis=1)
+        df_resid = k_eff - p
+
+        if knapp_hartung:
+            s2 = fit['ypy'] / np.maximum(df_resid, 1)
+            vcov = fit['a_inv'] * s2[:, None, None]
+        else:
+            vcov = fit['a_inv']
+
+        log_lik = -0.5 * (df_resid * np.log(2 * np.pi)
+                          + (mask * np.log(self.variances[None, :] + tau2[:, None])).sum(axis=1)
+                          + np.linalg.slogdet(fit['a'])[1]
+                          + fit['ypy'])
+
+        results = []
+        for s in range(n_models):
+            names = list(column_names[s]) if column_names is not None else [f"x{j}" for j in range(p)]
+            beta = fit['beta'][s]
+            se = np.sqrt(np.diag(vcov[s]))
+            stat = beta / se
+            dof = max(int(df_resid[s]), 1)
+
+            if knapp_hartung:
+                p_values = 2 * stats.t.sf(np.abs(stat), dof)
+                crit = stats.t.ppf(0.975, dof)
+            else:
+                p_values = 2 * stats.norm.sf(np.abs(stat))
+                crit = stats.norm.ppf(0.975)
+
+            # Omnibus test of all moderator coefficients (excluding intercept)
+            m = p - 1
+            if m > 0:
+                b_mod = beta[1:]
+                q_m = float(b_mod @ np.linalg.solve(vcov[s][1:, 1:], b_mod))
+                if knapp_hartung:
+                    omnibus = {'test': 'F', 'statistic': q_m / m, 'df1': m, 'df2': dof,
+                               'p_value': float(stats.f.sf(q_m / m, m, dof))}
+                else:
+                    omnibus = {'test': 'chi2', 'statistic': q_m, 'df1': m, 'df2': None,
+                               'p_value': float(stats.chi2.sf(q_m, m))}
+            else:
+                omnibus = {'test': None, 'statistic': None, 'df1': 0, 'df2': None, 'p_value': None}
+
+            qe = float(fe['ypy'][s])
+            results.append({
+                'method': method,
+                'knapp_hartung': knapp_hartung,
+                'k': int(k_eff[s]),
+                'tau2': float(tau2[s]),
+                'converged': bool(converged[s]),
+                'coefficients': pd.DataFrame({
+                    'estimate': beta,
+                    'se': se,
+                    'statistic': stat,
+                    'p_value': p_values,
+                    'ci_lower': beta - crit * se,
+                    'ci_upper': beta + crit * se
+                }, index=names),
+                'omnibus_test': omnibus,
+                'residual_heterogeneity': {
+                    'QE': qe,
+                    'df': int(df_resid[s]),
+                    'p_value': float(stats.chi2.sf(qe, df_resid[s])) if df_resid[s] > 0 else None
+                },
+                'log_likelihood': float(log_lik[s])
+            })
+
+        return results
+
+    def fit(self, design: np.ndarray, column_names: Optional[List[str]] = None,
+            mask: Optional[np.ndarray] = None, method: str = 'REML',
+            knapp_hartung: bool = True) -> Dict[str, Any]:
+        """Fit a single meta-regression model"""
+
+        return self.fit_batch([design], None if mask is None else [mask],
+                              None if column_names is None else [column_names],
+                              method=method, knapp_hartung=knapp_hartung)[0]
+
+
+class MetaRegressionAnalyzer:
+    """Moderator analysis and batched model screening for extracted study data"""
+
+    def __init__(self, method: str = 'REML', knapp_hartung: bool = True):
+        self.method = method
+        self.knapp_hartung = knapp_hartung
+
+    def _prepare(self, data: pd.DataFrame, effect_col: str, se_col: str,
+                 moderators: Sequence[str], categorical: Optional[Sequence[str]]):
+        valid = data.dropna(subset=[effect_col, se_col])
+        valid = valid[valid[se_col] > 0]
+        design = ModeratorDesign(valid, moderators, categorical)
+        model = MetaRegressionModel(valid[effect_col].values, (valid[se_col] ** 2).values)
+        return valid, design, model
+
+    def fit(self, data: pd.DataFrame, moderators: Sequence[str],
+            effect_col: str = 'effect_size', se_col: str = 'effect_se',
+            categorical: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Fit one meta-regression with the given moderators"""
+
+        _, design, model = self._prepare(data, effect_col, se_col, moderators, categorical)
+        x, mask, names = design.build(moderators)
+        if mask.sum() <= x.shape[1] or np.linalg.matrix_rank(x[mask]) < x.shape[1]:
+            raise ValueError(f"Moderator design is rank-deficient ({int(mask.sum())} complete studies, "
+                             f"{x.shape[1]} parameters): {list(moderators)}")
+
+        results = model.fit(x, names, mask, method=self.method, knapp_hartung=self.knapp_hartung)
+        results['moderators'] = list(moderators)
+
+        # Proportion of between-study variance explained, relative to the same studies
+        null = model.fit(x[:, :1], ['intercept'], mask, method=self.method,
+                         knapp_hartung=self.knapp_hartung)
+        results['R2'] = (max(0.0, (null['tau2'] - results['tau2']) / null['tau2']) * 100
+                         if null['tau2'] > 0 else 0.0)
+
+        return results
+
+    def screen(self, data: pd.DataFrame, candidate_sets: Sequence[Sequence[str]],
+               effect_col: str = 'effect_size', se_col: str = 'effect_se',
+               categorical: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """Fit many candidate moderator sets, batching designs of equal width"""
+
+        all_moderators = sorted({m for s in candidate_sets for m in s})
+        valid, design, model = self._prepare(data, effect_col, se_col, all_moderators, categorical)
+        logger.info(f"Screening {len(candidate_sets)} moderator sets over {len(valid)} studies")
+
+        built = {}
+        for idx, moderator_set in enumerate(candidate_sets):
+            x, mask, names = design.build(moderator_set)
+            if mask.sum() <= x.shape[1] or np.linalg.matrix_rank(x[mask]) < x.shape[1]:
+                logger.warning(f"Skipping rank-deficient moderator set: {list(moderator_set)}")
+                continue
+            built.setdefault(x.shape[1], []).append((idx, x, mask, names))
+
+        # Under Knapp-Hartung the omnibus test is an F statistic rather than a QM chi-square
+        stat_col = 'F' if self.knapp_hartung else 'QM'
+
+        rows = []
+        for width, group in built.items():
+            fits = model.fit_batch([g[1] for g in group], [g[2] for g in group],
+                                   [g[3] for g in group], method=self.method,
+                                   knapp_hartung=self.knapp_hartung)
+            # Intercept-only fits on the same complete cases give the R² baseline
+            nulls = model.fit_batch([g[1][:, :1] for g in group], [g[2] for g in group],
+                                    [['intercept']] * len(group), method=self.method,
+                                    knapp_hartung=self.knapp_hartung)
+
+            for (idx, _, _, _), fit_result, null in zip(group, fits, nulls):
+                r2 = (max(0.0, (null['tau2'] - fit_result['tau2']) / null['tau2']) * 100
+                      if null['tau2'] > 0 else 0.0)
+                rows.append({
+                    'set_index': idx,
+                    'moderators': ' + '.join(candidate_sets[idx]),
+                    'k': fit_result['k'],
+                    'n_parameters': width,
+                    'tau2': fit_result['tau2'],
+                    'R2': r2,
+                    stat_col: fit_result['omnibus_test']['statistic'],
+                    f'{stat_col}_p_value': fit_result['omnibus_test']['p_value'],
+                    'QE': fit_result['residual_heterogeneity']['QE'],
+                    'log_likelihood': fit_result['log_likelihood'],
+                    'converged': fit_result['converged']
+                })
+
+        if not rows:
+            return pd.DataFrame()
+
+        return pd.DataFrame(rows).sort_values([f'{stat_col}_p_value', 'R2'],
+                                              ascending=[True, False]).reset_index(drop=True)
@@ -32,6 +32,7 @@ class DatabaseConfig:
             'fetch_endpoint': 'efetch.fcgi',
             'max_results': 10000,
             'batch_size': 1000,
+            'id_batch_size': 200,  # PMIDs per EFetch when fetching by ID
             'rate_limit': 3,  # requests per second
         },
         'cochrane': {
@@ -142,11 +143,18 @@ class LiteratureSearchQuery:
 
 
 class PubMedSearch:
-    """PubMed search implementation"""
+    """PubMed search implementation
 
-    def __init__(self, email: str = "research@example.com", api_key: str = None):
+    With a StudyRegistry, records already cached by any project are hydrated from it
+    and only the unseen PMIDs are fetched from EFetch; fetched records are added back.
+    """
+
+    def __init__(self, email: str = "research@example.com", api_key: str = None,
+                 registry=None, project: str = None):
         self.email = email
         self.api_key = api_key
+        self.registry = registry
+        self.project = project
         self.config = DatabaseConfig.get_database_config('pubmed')
         self.session = requests.Session()
 
@@ -196,6 +204,10 @@ class PubMedSearch:
 
             logger.info(f"Found {count} results")
 
+            if self.registry is not None:
+                pmids = [element.text for element in root.findall('.//IdList/Id')]
+                return self._search_with_registry(pmids[:query.max_results])
+
             # Fetch results in batches
             all_results = []
             batch_size = self.config['batch_size']
@@ -217,10 +229,38 @@ class PubMedSearch:
             logger.error(f"PubMed search failed: {e}")
             raise
 
-    def _fetch_results_batch(self, webenv: str, query_key: str, start: int, retmax: int) -> List[Dict[str, Any]]:
+    def _search_with_registry(self, pmids: List[str]) -> pd.DataFrame:
+        """Hydrate known PMIDs from the registry and EFetch only the rest"""
+
+        cached, missing = self.registry.hydrate_pubmed(pmids)
+        logger.info(f"Registry hit for {len(cached)} of {len(pmids)} PMIDs; fetching {len(missing)}")
+
+        fetched = []
+        batch_size = self.config['id_batch_size']
+        for start in range(0, len(missing), batch_size):
+            fetched.extend(self._fetch_results_batch(None, None, 0, 0, ids=missing[start:start + batch_size]))
+            time.sleep(1 / self.config['rate_limit'])
+
+        # Fetched records enrich the registry; cached ones are only linked to the project
+        self.registry.upsert(fetched + cached, project=self.project, source='pubmed')
+
+        by_pmid = {record['pmid']: record for record in cached + fetched}
+        df = pd.DataFrame([by_pmid[pmid] for pmid in pmids if pmid in by_pmid])
+        logger.info(f"Retrieved {len(df)} records from PubMed ({len(cached)} from registry)")
+        return df
+
+    def _fetch_results_batch(self, webenv: str, query_key: str, start: int, retmax: int,
+                             ids: Optional[List[str]] = None) -> List[Dict[str, Any]]:
         """Fetch a batch of results by ID or WebEnv"""
 
-        if webenv and query_key:
+        if ids:
+            fetch_params = {
+                'db': 'pubmed',
+                'id': ','.join(ids),
+                'rettype': 'medline',
+                'retmode': 'xml'
+            }
+        elif webenv and query_key:
             # Use history
             fetch_params = {
                 'db': 'pubmed',
@@ -232,7 +272,6 @@ class PubMedSearch:
                 'retmode': 'xml'
             }
         else:
-            # Direct fetch by IDs (not implemented here for simplicity)
             return []
 
         if self.api_key:
@@ -288,8 +327,12 @@ class PubMedSearch:
                 year_element = article.find('.//PubDate/Year')
                 year = year_element.text if year_element is not None else ""
 
+                doi_element = article.find(".//ELocationID[@EIdType='doi']")
+                doi = doi_element.text if doi_element is not None else ""
+
                 result = {
                     'pmid': pmid,
+                    'doi': doi,
                     'title': title,
                     'abstract': abstract,
                     'authors': '; '.join(authors),
@@ -348,11 +391,13 @@ class MultiDatabaseSearch:
     Unified search across multiple literature databases
 """
 
-    def __init__(self, email: str = "research@example.com", pubmed_api_key: str = None):
+    def __init__(self, email: str = "research@example.com", pubmed_api_key: str = None,
+                 registry=None, project: str = None):
         self.email = email
         self.pubmed_api_key = pubmed_api_key
+        self.registry = registry
         self.search_engines = {
-            'pubmed': PubMedSearch(email, pubmed_api_key),
+            'pubmed': PubMedSearch(email, pubmed_api_key, registry=registry, project=project),
             'cochrane': CochraneSearch()
         }
 
@@ -594,6 +639,9 @@ def main():
     parser.add_argument("--pubmed-api-key", help="PubMed API key")
     parser.add_argument("--parallel", action='store_true',
                        help="Search databases in parallel")
+    parser.add_argument("--registry", nargs='?', const='',
+                       help="Hydrate known records from the shared study registry (optional path)")
+    parser.add_argument("--project", help="Project name to record in the study registry")
 
     args = parser.parse_args()
 
@@ -606,8 +654,14 @@ def main():
         max_results=args.max_results
     )
 
+    registry = None
+    if args.registry is not None:
+        from study_registry import StudyRegistry
+        registry = StudyRegistry(args.registry or None)
+
     # Initialize search engine
-    search_engine = MultiDatabaseSearch(args.email, args.pubmed_api_key)
+    search_engine = MultiDatabaseSearch(args.email, args.pubmed_api_key,
+                                        registry=registry, project=args.project)
 
     # Execute search
     results = search_engine.search(search_query, args.parallel)
@@ -0,0 +1,391 @@
+"""
+Network Meta-Analysis System
+Sparse frequentist network meta-analysis with inconsistency checks and treatment ranking
+"""
+
+import pandas as pd
+import numpy as np
+from scipy import sparse, stats
+from scipy.sparse.linalg import splu
+from scipy.sparse.csgraph import connected_components
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+
+class NetworkData:
+    """Arm-level data reduced to baseline contrasts with a sparse incidence structure"""
+
+    def __init__(self, data: pd.DataFrame, study_col: str = 'study_id',
+                 treatment_col: str = 'treatment', events_col: Optional[str] = 'responders',
+                 n_col: str = 'sampleSize', mean_col: Optional[str] = None,
+                 sd_col: Optional[str] = None, reference: Optional[str] = None):
+
+        if mean_col is not None:
+            self.measure = 'MD'
+            value_cols = [mean_col, sd_col, n_col]
+        else:
+            self.measure = 'logOR'
+            value_cols = [events_col, n_col]
+
+        arms = data[[study_col, treatment_col] + value_cols].dropna().copy()
+        arms.columns = ['study', 'treatment'] + (['mean', 'sd', 'n'] if mean_col else ['events', 'n'])
+        arms['study'] = arms['study'].astype(str)
+        arms['treatment'] = arms['treatment'].astype(str)
+
+        # Arms of the same treatment within a study are merged
+        if self.measure == 'logOR':
+            arms = arms.groupby(['study', 'treatment'], as_index=False)[['events', 'n']].sum()
+        else:
+            arms = arms.groupby(['study', 'treatment'], as_index=False).agg(
+                mean=('mean', 'mean'), sd=('sd', 'mean'), n=('n', 'sum'))
+
+        # Only comparative studies carry network information
+        n_arms = arms.groupby('study')['treatment'].transform('size')
+        dropped = sorted(arms.loc[n_arms < 2, 'study'].unique())
+        if dropped:
+            logger.info(f"Dropping {len(dropped)} single-arm studies: {dropped}")
+        arms = arms[n_arms >= 2].copy()
+
+        arms = self._largest_component(arms, reference)
+        self._arm_estimates(arms)
+
+        self.treatments = sorted(arms['treatment'].unique())
+        if reference is None or reference not in self.treatments:
+            reference = self.treatments[0]
+        self.reference = reference
+        self.treatments = [reference] + [t for t in self.treatments if t != reference]
+        self.treatment_index = {t: i for i, t in enumerate(self.treatments)}
+        self.arms = arms.sort_values(['study', 'treatment']).reset_index(drop=True)
+
+        self._build_contrasts()
+
+    def _largest_component(self, arms: pd.DataFrame, reference: Optional[str]) -> pd.DataFrame:
+        """Restrict to the connected component holding the reference treatment"""
+
+        treatments = sorted(arms['treatment'].unique())
+        index = {t: i for i, t in enumerate(treatments)}
+        study_codes, _ = pd.factorize(arms['study'])
+        incidence = sparse.csr_matrix(
+            (np.ones(len(arms)), (study_codes, arms['treatment'].map(index).values)),
+            shape=(study_codes.max() + 1, len(treatments)))
+        adjacency = incidence.T @ incidence
+        n_components, labels = connected_components(adjacency, directed=False)
+
+        if n_components == 1:
+            return arms
+
+        if reference in index:
+            keep = labels[index[reference]]
+        else:
+            keep = np.bincount(labels).argmax()
+        kept = {t for t in treatments if labels[index[t]] == keep}
+        logger.warning(f"Network is disconnected; excluding treatments "
+                       f"{sorted(set(treatments) - kept)}")
+        return arms[arms['treatment'].isin(kept)].copy()
+
+    def _arm_estimates(self, arms: pd.DataFrame):
+        """Per-arm estimate and sampling variance (log-odds or mean)"""
+
+        if self.measure == 'logOR':
+            # 0.5 continuity correction for every arm of a study with a zero cell
+            zero_cell = (arms['events'] == 0) | (arms['events'] == arms['n'])
+            correction = zero_cell.groupby(arms['study']).transform('any') * 0.5
+            events = arms['events'] + correction
+            non_events = arms['n'] - arms['events'] + correction
+            arms['y'] = np.log(events / non_events)
+            arms['v'] = 1 / events + 1 / non_events
+        else:
+            arms['y'] = arms['mean']
+            arms['v'] = arms['sd'] ** 2 / arms['n']
+
+    def _build_contrasts(self):
+        """Baseline contrasts per study plus the within-study pair structure"""
+
+        arms = self.arms
+        arms['t_idx'] = arms['treatment'].map(self.treatment_index)
+        arms = arms.sort_values(['study', 't_idx']).reset_index(drop=True)
+        first = ~arms['study'].duplicated()
+        base = arms[first].set_index('study')
+        rest = arms[~first]
+
+        self.studies = base.index.tolist()
+        self.contrast_study = rest['study'].values
+        self.base_treatment = base.loc[self.contrast_study, 't_idx'].values
+        self.other_treatment = rest['t_idx'].values
+        self.y = rest['y'].values - base.loc[self.contrast_study, 'y'].values
+        self.v_arm = rest['v'].values
+        self.v_base = base.loc[self.contrast_study, 'v'].values
+        self.n_contrasts = len(self.y)
+        self.n_treatments = len(self.treatments)
+
+        # Designs are identified by the set of treatments compared
+        design_of_study = arms.groupby('study')['treatment'].agg(lambda s: ':'.join(s))
+        self.contrast_design = design_of_study.loc[self.contrast_study].values
+
+        # Sparse incidence: +1 for the compared arm, -1 for the baseline, reference dropped
+        rows = np.concatenate([np.arange(self.n_contrasts), np.arange(self.n_contrasts)])
+        cols = np.concatenate([self.other_treatment, self.base_treatment])
+        vals = np.concatenate([np.ones(self.n_contrasts), -np.ones(self.n_contrasts)])
+        full = sparse.csr_matrix((vals, (rows, cols)), shape=(self.n_contrasts, self.n_treatments))
+        self.X = full[:, 1:].tocsc()
+
+        # Every (i, j) pair of contrasts sharing a study, computed once
+        study_codes, _ = pd.factorize(self.contrast_study)
+        order = np.argsort(study_codes, kind='stable')
+        counts = np.bincount(study_codes)
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        pair_rows, pair_cols = [], []
+        for start, count in zip(starts, counts):
+            members = order[start:start + count]
+            pair_rows.append(np.repeat(members, count))
+            pair_cols.append(np.tile(members, count))
+        self.pair_rows = np.concatenate(pair_rows)
+        self.pair_cols = np.concatenate(pair_cols)
+        self.pair_study = study_codes[self.pair_rows]
+        self.contrast_study_code = study_codes
+
+    def weight_matrix(self, tau2: float = 0.0) -> sparse.csr_matrix:
+        """Inverse block-diagonal covariance of the baseline contrasts (Sherman-Morrison)"""
+
+        d = self.v_arm + tau2 / 2
+        c_by_study = np.zeros(self.contrast_study_code.max() + 1)
+        c_by_study[self.contrast_study_code] = self.v_base + tau2 / 2
+        inv_d_sum = np.bincount(self.contrast_study_code, weights=1 / d)
+
+        c = c_by_study[self.pair_study]
+        denom = 1 + c * inv_d_sum[self.pair_study]
+        vals = -c / (d[self.pair_rows] * d[self.pair_cols] * denom)
+        diag = self.pair_rows == self.pair_cols
+        vals[diag] += 1 / d[self.pair_rows[diag]]
+
+        return sparse.csr_matrix((vals, (self.pair_rows, self.pair_cols)),
+                                 shape=(self.n_contrasts, self.n_contrasts))
+
+    def tau_structure(self) -> sparse.csr_matrix:
+        """Between-study covariance pattern: 1 on the diagonal, 1/2 within multi-arm studies"""
+
+        vals = np.where(self.pair_rows == self.pair_cols, 1.0, 0.5)
+        return sparse.csr_matrix((vals, (self.pair_rows, self.pair_cols)),
+                                 shape=(self.n_contrasts, self.n_contrasts))
+
+
+def _gls(x: sparse.spmatrix, w: sparse.spmatrix, y: np.ndarray,
+         full_covariance: bool = True) -> Dict[str, Any]:
+    """Sparse generalised least squares via LU factorisation of X'WX"""
+
+    wx = w @ x
+    a = (x.T @ wx).tocsc()
+    lu = splu(a)
+    theta = lu.solve(np.asarray(wx.T @ y).ravel())
+    resid = y - x @ theta
+    q = float(resid @ (w @ resid))
+
+    result = {'theta': theta, 'Q': q, 'lu': lu, 'wx': wx}
+    if full_covariance:
+        result['cov'] = lu.solve(np.eye(a.shape[0]))
+    return result
+
+
+class NetworkMetaAnalysis:
+    """Graph-based frequentist network meta-analysis on sparse matrices"""
+
+    def __init__(self, data: pd.DataFrame, **network_kwargs):
+        self.network = NetworkData(data, **network_kwargs)
+        self.results = {}
+
+    def _tau2_moments(self) -> Tuple[float, Dict[str, Any]]:
+        """Generalised DerSimonian-Laird tau² from the fixed-effect Q"""
+
+        net = self.network
+        w = net.weight_matrix(0.0)
+        fe = _gls(net.X, w, net.y, full_covariance=False)
+        df = net.n_contrasts - (net.n_treatments - 1)
+        if df <= 0:
+            return 0.0, fe
+
+        # E[Q] = df + tau² tr(P Σ_tau) with P = W - WX(X'WX)^-1 X'W
+        sigma = net.tau_structure()
+        wsw = fe['wx'].T @ (sigma @ fe['wx'])
+        tr_p_sigma = (w.multiply(sigma.T)).sum() - np.trace(fe['lu'].solve(wsw.toarray()))
+        tau2 = max(0.0, (fe['Q'] - df) / tr_p_sigma) if tr_p_sigma > 0 else 0.0
+
+        return tau2, fe
+
+    def fit(self, model: str = 'random') -> Dict[str, Any]:
+        """Fit the network model and decompose Q into heterogeneity and inconsistency"""
+
+        net = self.network
+        tau2, fe = self._tau2_moments()
+        if model == 'fixed':
+            tau2 = 0.0
+
+        fit = _gls(net.X, net.weight_matrix(tau2), net.y)
+        theta = np.concatenate([[0.0], fit['theta']])
+        cov = np.zeros((net.n_treatments, net.n_treatments))
+        cov[1:, 1:] = fit['cov']
+        se = np.sqrt(np.diag(cov))
+
+        df = net.n_contrasts - (net.n_treatments - 1)
+        inconsistency = self._design_by_treatment(fe['Q'])
+
+        self.results = {
+            'model': model,
+            'measure': net.measure,
+            'reference': net.reference,
+            'treatments': net.treatments,
+            'n_studies': len(net.studies),
+            'n_contrasts': net.n_contrasts,
+            'tau2': tau2,
+            'theta': theta,
+            'cov': cov,
+            'effects': pd.DataFrame({
+                'treatment': net.treatments,
+                'estimate': theta,
+                'se': se,
+                'ci_lower': theta - 1.96 * se,
+                'ci_upper': theta + 1.96 * se
+            }).set_index('treatment'),
+            'heterogeneity_test': {
+                'Q': fe['Q'],
+                'df': df,
+                'p_value': float(stats.chi2.sf(fe['Q'], df)) if df > 0 else None,
+                'I2': max(0.0, (fe['Q'] - df) / fe['Q'] * 100) if fe['Q'] > 0 and df > 0 else 0.0
+            },
+            'inconsistency': inconsistency
+        }
+
+        logger.info(f"Network fitted: {net.n_treatments} treatments, {len(net.studies)} studies, "
+                    f"{net.n_contrasts} contrasts, tau²={tau2:.4f}")
+        return self.results
+
+    def _design_by_treatment(self, q_total: float) -> Dict[str, Any]:
+        """Split the fixed-effect Q into within-design and between-design components"""
+
+        net = self.network
+        slots = pd.Series(net.contrast_design).astype(str) + '|' + pd.Series(net.other_treatment).astype(str)
+        slot_codes, slot_labels = pd.factorize(slots)
+        x_design = sparse.csc_matrix((np.ones(net.n_contrasts), (np.arange(net.n_contrasts), slot_codes)),
+                                     shape=(net.n_contrasts, len(slot_labels)))
+
+        q_het = _gls(x_design, net.weight_matrix(0.0), net.y, full_covariance=False)['Q']
+        df_het = net.n_contrasts - len(slot_labels)
+        q_inc = max(0.0, q_total - q_het)
+        df_inc = len(slot_labels) - (net.n_treatments - 1)
+
+        return {
+            'Q_heterogeneity': q_het,
+            'df_heterogeneity': df_het,
+            'p_heterogeneity': float(stats.chi2.sf(q_het, df_het)) if df_het > 0 else None,
+            'Q_inconsistency': q_inc,
+            'df_inconsistency': df_inc,
+            'p_inconsistency': float(stats.chi2.sf(q_inc, df_inc)) if df_inc > 0 else None
+        }
+
+    def league_table(self) -> pd.DataFrame:
+        """All pairwise network estimates (column treatment vs row treatment)"""
+
+        if not self.results:
+            self.fit()
+        theta = self.results['theta']
+        return pd.DataFrame(theta[None, :] - theta[:, None],
+                            index=self.network.treatments, columns=self.network.treatments)
+
+    def node_split(self) -> pd.DataFrame:
+        """Direct versus indirect evidence for every directly compared pair
+
+        Direct estimates pool the study-level pairwise contrasts; indirect estimates are
+        back-calculated from the network and direct estimates, vectorised across all pairs.
+        """
+
+        if not self.results:
+            self.fit()
+        net = self.network
+        tau2 = self.results['tau2']
+        theta = self.results['theta']
+        cov = self.results['cov']
+
+        arms = net.arms[['study', 't_idx', 'y', 'v']]
+        pairs = arms.merge(arms, on='study', suffixes=('_a', '_b'))
+        pairs = pairs[pairs['t_idx_a'] < pairs['t_idx_b']]
+
+        pairs = pairs.assign(
+            d=pairs['y_b'] - pairs['y_a'],
+            w=1 / (pairs['v_a'] + pairs['v_b'] + tau2)
+        )
+        pairs['wd'] = pairs['w'] * pairs['d']
+        direct = pairs.groupby(['t_idx_a', 't_idx_b']).agg(
+            w=('w', 'sum'), wd=('wd', 'sum'), n_studies=('study', 'nunique')).reset_index()
+
+        a = direct['t_idx_a'].values
+        b = direct['t_idx_b'].values
+        direct_est = direct['wd'].values / direct['w'].values
+        direct_var = 1 / direct['w'].values
+        network_est = theta[b] - theta[a]
+        network_var = cov[a, a] + cov[b, b] - 2 * cov[a, b]
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            indirect_prec = 1 / network_var - 1 / direct_var
+            valid = indirect_prec > 1e-10
+            indirect_var = np.where(valid, 1 / indirect_prec, np.nan)
+            indirect_est = np.where(valid, (network_est / network_var - direct_est / direct_var)
+                                    * indirect_var, np.nan)
+            diff = direct_est - indirect_est
+            z = diff / np.sqrt(direct_var + indirect_var)
+
+        return pd.DataFrame({
+            'treatment_a': np.array(net.treatments)[a],
+            'treatment_b': np.array(net.treatments)[b],
+            'n_studies': direct['n_studies'].values,
+            'direct': direct_est,
+            'direct_se': np.sqrt(direct_var),
+            'indirect': indirect_est,
+            'indirect_se': np.sqrt(indirect_var),
+            'network': network_est,
+            'difference': diff,
+            'z': z,
+            'p_value': 2 * stats.norm.sf(np.abs(z))
+        })
+
+    def rank_probabilities(self, n_draws: int = 10000, seed: Optional[int] = None,
+                           higher_is_better: bool = True,
+                           chunk_size: int = 5000) -> Dict[str, Any]:
+        """Monte Carlo rank probabilities and SUCRA from the joint sampling distribution"""
+
+        if not self.results:
+            self.fit()
+        theta = self.results['theta']
+        n_t = len(theta)
+        rng = np.random.default_rng(seed)
+
+        # Reference effect is fixed at zero; draw the remaining (T-1)-dimensional vector
+        chol = np.linalg.cholesky(self.results['cov'][1:, 1:] + 1e-12 * np.eye(n_t - 1))
+        counts = np.zeros((n_t, n_t))
+        sign = -1.0 if higher_is_better else 1.0
+
+        remaining = n_draws
+        while remaining > 0:
+            size = min(chunk_size, remaining)
+            draws = np.zeros((size, n_t))
+            draws[:, 1:] = theta[1:] + rng.standard_normal((size, n_t - 1)) @ chol.T
+            ranks = np.argsort(np.argsort(sign * draws, axis=1), axis=1)
+            counts += np.bincount((np.arange(n_t)[None, :] * n_t + ranks).ravel(),
+                                  minlength=n_t * n_t).reshape(n_t, n_t)
+            remaining -= size
+
+        probabilities = counts / n_draws
+        cumulative = np.cumsum(probabilities, axis=1)
+        sucra = cumulative[:, :-1].sum(axis=1) / (n_t - 1) * 100 if n_t > 1 else np.full(n_t, 100.0)
+        mean_rank = probabilities @ np.arange(1, n_t + 1)
+
+        treatments = self.network.treatments
+        return {
+            'probabilities': pd.DataFrame(probabilities, index=treatments,
+                                          columns=[f"rank_{i + 1}" for i in range(n_t)]),
+            'sucra': pd.Series(sucra, index=treatments).sort_values(ascending=False),
+            'mean_rank': pd.Series(mean_rank, index=treatments),
+            'n_draws': n_draws
+        }
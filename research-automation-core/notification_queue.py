@@ -0,0 +1,392 @@
+"""
+Notification Queue
+Digest-batched stakeholder notifications sent over one pooled, retrying SMTP connection
+"""
+
+import html
+import json
+import time
+import uuid
+import smtplib
+import sqlite3
+import threading
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from email.mime.text import MIMEText
+from pathlib import Path
+from string import Template
+from typing import Dict, List, Any, Optional, Callable, Tuple, Union
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# How long each notification_frequency lets events accumulate before a digest goes out
+DIGEST_INTERVALS = {
+    'immediate': timedelta(0),
+    'hourly': timedelta(hours=1),
+    'daily': timedelta(days=1),
+    'weekly': timedelta(weeks=1),
+    'monthly': timedelta(days=30)
+}
+
+# SMTP failures worth retrying on a fresh connection
+_TRANSIENT_SMTP_ERRORS = (smtplib.SMTPServerDisconnected, smtplib.SMTPConnectError, ConnectionError, TimeoutError)
+
+# A template renders (subject, body, subtype) from the events in one digest. It is
+# called once per distinct event set; '$name' in subject or body is filled per recipient.
+DigestTemplate = Callable[[List[Dict[str, Any]]], Tuple[str, str, str]]
+
+
+class PooledSMTPSender:
+    """One SMTP connection reused across messages, reconnecting with exponential backoff
+
+    smtp_config keys: server, port, username, password, use_tls (STARTTLS), sender.
+    With dry_run the messages are only logged, as the notification system did before.
+    """
+
+    def __init__(self, smtp_config: Optional[Dict[str, Any]] = None, max_retries: int = 3,
+                 backoff: float = 1.0, timeout: float = 30.0, dry_run: bool = False):
+        self.smtp_config = smtp_config or {}
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.timeout = timeout
+        self.dry_run = dry_run or not self.smtp_config
+        self.sender = self.smtp_config.get('sender') or self.smtp_config.get('username') or 'living-review@localhost'
+        self.stats = {'connections': 0, 'sent': 0, 'retries': 0, 'failed': 0}
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> smtplib.SMTP:
+        if self._connection is None:
+            connection = smtplib.SMTP(self.smtp_config.get('server', 'localhost'),
+                                      int(self.smtp_config.get('port', 25)), timeout=self.timeout)
+            if self.smtp_config.get('use_tls'):
+                connection.starttls()
+            if self.smtp_config.get('username') and self.smtp_config.get('password'):
+                connection.login(self.smtp_config['username'], self.smtp_config['password'])
+            self._connection = connection
+            self.stats['connections'] += 1
+        return self._connection
+
+    def _drop_connection(self):
+        if self._connection is not None:
+            try:
+                self._connection.quit()
+            except (smtplib.SMTPException, OSError):
+                pass
+            self._connection = None
+
+    def send(self, recipient: str, subject: str, body: str, subtype: str = 'plain') -> bool:
+        """Send one message; transient failures are retried on a new connection
+
+        Returns False instead of raising when the message could not be sent.
+        """
+
+        msg = MIMEText(body, subtype)
+        msg['From'] = self.sender
+        msg['To'] = recipient
+        msg['Subject'] = subject
+
+        if self.dry_run:
+            logger.info(f"Would send email to {recipient}: {subject}")
+            self.stats['sent'] += 1
+            return True
+
+        with self._lock:
+            for attempt in range(self.max_retries + 1):
+                try:
+                    self._connect().send_message(msg)
+                    self.stats['sent'] += 1
+                    return True
+                except smtplib.SMTPResponseException as e:
+                    # 4xx replies are temporary, 5xx permanent
+                    self._drop_connection()
+                    if e.smtp_code < 400 or e.smtp_code >= 500:
+                        logger.error(f"SMTP rejected message to {recipient}: {e}")
+                        break
+                    error = e
+                except smtplib.SMTPRecipientsRefused as e:
+                    logger.error(f"SMTP refused recipient {recipient}: {e}")
+                    break
+                except _TRANSIENT_SMTP_ERRORS as e:
+                    self._drop_connection()
+                    error = e
+                except (smtplib.SMTPException, OSError) as e:
+                    # Anything else (bad host, TLS or auth setup) will not clear on retry;
+                    # the message stays queued for the next flush
+                    self._drop_connection()
+                    logger.error(f"SMTP send to {recipient} failed: {type(e).__name__}: {e}")
+                    break
+                if attempt < self.max_retries:
+                    self.stats['retries'] += 1
+                    delay = self.backoff * 2 ** attempt
+                    logger.warning(f"SMTP send to {recipient} failed ({error}); retrying in {delay:.1f}s")
+                    time.sleep(delay)
+            self.stats['failed'] += 1
+            return False
+
+    def close(self):
+        with self._lock:
+            self._drop_connection()
+
+    def __enter__(self) -> 'PooledSMTPSender':
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class NotificationQueue:
+    """Notification events queued per recipient and sent as digests
+
+    Events are stored in SQLite, so digests survive restarts. flush() sends one
+    message per recipient whose notification_frequency interval has elapsed (or who
+    has a high-priority event), rendering each distinct digest once per template and
+    sending everything over a single SMTP connection. The cost of a flush therefore
+    grows with the number of recipients, not recipients x events.
+    """
+
+    def __init__(self, database_path: Union[str, Path], sender: Optional[PooledSMTPSender] = None,
+                 templates: Optional[Dict[str, DigestTemplate]] = None):
+        self.database_path = Path(database_path)
+        self.sender = sender or PooledSMTPSender(dry_run=True)
+        self.templates = {'default': default_digest_template}
+        self.templates.update(templates or {})
+        self.stats = {'renders': 0, 'digests': 0, 'events': 0}
+        self._flush_lock = threading.Lock()
+        self._init_database()
+
+    @contextmanager
+    def _connection(self, transaction: bool = False):
+        conn = sqlite3.connect(self.database_path, timeout=30, isolation_level=None)
+        try:
+            conn.execute('PRAGMA journal_mode = WAL')
+            if not transaction:
+                yield conn
+                return
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                yield conn
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+        finally:
+            conn.close()
+
+    def _init_database(self):
+        with self._connection() as conn:
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS notification_events (
+                    id INTEGER PRIMARY KEY,
+                    event_key TEXT,
+                    recipient TEXT,
+                    template TEXT,
+                    priority TEXT,
+                    payload TEXT,
+                    created TEXT,
+                    sent TEXT
+                )
+            ''')
+            conn.execute('''
+                CREATE INDEX IF NOT EXISTS ix_notification_events_pending
+                ON notification_events (recipient, id) WHERE sent IS NULL
+            ''')
+            conn.execute('''
+                CREATE TABLE IF NOT EXISTS notification_recipients (
+                    recipient TEXT PRIMARY KEY,
+                    name TEXT,
+                    frequency TEXT,
+                    last_sent TEXT
+                )
+            ''')
+
+    def enqueue(self, recipients: List[Dict[str, str]], event: Dict[str, Any],
+                template: str = 'default', priority: str = 'normal') -> int:
+        """Queue one event for each recipient ({email, name, notification_frequency})
+
+        Template names may be per recipient: '{role}' in template is filled from the
+        recipient dict, e.g. 'review_update:{role}'.
+        """
+
+        now = datetime.now().isoformat()
+        payload = json.dumps(event, default=str)
+        # Shared by every recipient's copy, so identical digests are rendered once
+        event_key = uuid.uuid4().hex
+        with self._connection(transaction=True) as conn:
+            for recipient in recipients:
+                conn.execute('''
+                    INSERT INTO notification_recipients (recipient, name, frequency)
+                    VALUES (?, ?, ?)
+                    ON CONFLICT (recipient) DO UPDATE SET name = excluded.name, frequency = excluded.frequency
+                ''', (recipient['email'], recipient.get('name'),
+                      recipient.get('notification_frequency', 'immediate')))
+            conn.executemany('''
+                INSERT INTO notification_events (event_key, recipient, template, priority, payload, created)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', [(event_key, r['email'], template.format_map(_Defaulting(r)), priority, payload, now)
+                  for r in recipients])
+        return len(recipients)
+
+    def due_recipients(self, now: Optional[datetime] = None) -> List[Tuple[str, str]]:
+        """(recipient, name) pairs with pending events whose digest is due"""
+
+        now = now or datetime.now()
+        with self._connection() as conn:
+            rows = conn.execute('''
+                SELECT r.recipient, r.name, r.frequency, r.last_sent,
+                       MIN(e.created) AS oldest, MAX(e.priority = 'high') AS urgent
+                FROM notification_recipients r
+                JOIN notification_events e ON e.recipient = r.recipient AND e.sent IS NULL
+                GROUP BY r.recipient
+            ''').fetchall()
+
+        due = []
+        for recipient, name, frequency, last_sent, oldest, urgent in rows:
+            interval = DIGEST_INTERVALS.get(frequency, DIGEST_INTERVALS['weekly'])
+            # A first digest waits one interval from the oldest event it will contain
+            since = datetime.fromisoformat(last_sent or oldest)
+            if urgent or now - since >= interval:
+                due.append((recipient, name))
+        return due
+
+    def flush(self, now: Optional[datetime] = None) -> Dict[str, int]:
+        """Send every due digest; events are marked sent only once their message went out"""
+
+        with self._flush_lock:
+            due = self.due_recipients(now)
+            if not due:
+                return {'recipients': 0, 'sent': 0, 'failed': 0, 'events': 0}
+
+            pending = {}
+            with self._connection() as conn:
+                for recipient, template, event_id, event_key, payload in conn.execute('''
+                    SELECT recipient, template, id, event_key, payload FROM notification_events
+                    WHERE sent IS NULL ORDER BY id
+                '''):
+                    pending.setdefault(recipient, {}).setdefault(template, []).append(
+                        (event_id, event_key, payload))
+
+            rendered = {}
+            sent = failed = events = 0
+            with self._connection() as marks:
+                try:
+                    for recipient, name in due:
+                        for template, items in pending.get(recipient, {}).items():
+                            # Recipients on the same template with the same events share one render
+                            key = (template, tuple(event_key for _, event_key, _ in items))
+                            if key not in rendered:
+                                render = self.templates.get(template) or self.templates.get(
+                                    template.split(':')[0], self.templates['default'])
+                                rendered[key] = render([json.loads(payload) for _, _, payload in items])
+                                self.stats['renders'] += 1
+                            subject, body, subtype = rendered[key]
+
+                            values = {'name': name or recipient}
+                            body_values = ({'name': html.escape(values['name'])} if subtype == 'html'
+                                           else values)
+                            if self.sender.send(recipient, Template(subject).safe_substitute(values),
+                                                Template(body).safe_substitute(body_values), subtype):
+                                self._mark_sent(marks, [event_id for event_id, _, _ in items], recipient)
+                                sent += 1
+                                events += len(items)
+                            else:
+                                failed += 1
+                finally:
+                    self.sender.close()
+
+            self.stats['digests'] += sent
+            self.stats['events'] += events
+            logger.info(f"Notification flush: {sent} digests ({events} events) to {len(due)} recipients, "
+                        f"{len(rendered)} renders, {failed} failed")
+            return {'recipients': len(due), 'sent': sent, 'failed': failed, 'events': events}
+
+    @staticmethod
+    def _mark_sent(conn: sqlite3.Connection, event_ids: List[int], recipient: str):
+        now = datetime.now().isoformat()
+        conn.execute('BEGIN IMMEDIATE')
+        conn.executemany('UPDATE notification_events SET sent = ? WHERE id = ?',
+                         [(now, event_id) for event_id in event_ids])
+        conn.execute('UPDATE notification_recipients SET last_sent = ? WHERE recipient = ?', (now, recipient))
+        conn.execute('COMMIT')
+
+    def pending_count(self) -> int:
+        with self._connection() as conn:
+            return conn.execute('SELECT COUNT(*) FROM notification_events WHERE sent IS NULL').fetchone()[0]
+
+
+class _Defaulting(dict):
+    def __missing__(self, key):
+        return 'default'
+
+
+def default_digest_template(events: List[Dict[str, Any]]) -> Tuple[str, str, str]:
+    """Plain-text digest listing each event's subject and message"""
+
+    if len(events) == 1:
+        subject = events[0].get('subject', 'Notification')
+    else:
+        subject = f"{len(events)} updates"
+    lines = ["Dear $name,", ""]
+    for event in events:
+        lines.append(f"* {event.get('subject', 'Notification')} ({str(event.get('timestamp', ''))[:16]})")
+        if event.get('message'):
+            lines.extend(f"    {line}" for line in str(event['message']).splitlines())
+    return f"[Living Review] {subject}", '\n'.join(lines), 'plain'
+
+
+def run_smtp_sink(host: str = '127.0.0.1', port: int = 8025, handler=None):
+    """Local SMTP server that accepts and logs every message (needs aiosmtpd)
+
+    Returns the started aiosmtpd Controller; call .stop() when done. Point a
+    PooledSMTPSender at it with {'server': host, 'port': port} for offline tests.
+    """
+
+    try:
+        from aiosmtpd.controller import Controller
+    except ImportError:
+        raise ImportError("aiosmtpd is required for the local SMTP sink: pip install aiosmtpd")
+
+    class LoggingHandler:
+        def __init__(self):
+            self.messages = []
+
+        async def handle_DATA(self, server, session, envelope):
+            self.messages.append(envelope)
+            logger.info(f"SMTP sink: message for {', '.join(envelope.rcpt_tos)} ({len(envelope.content)} bytes)")
+            return '250 Message accepted for delivery'
+
+    controller = Controller(handler or LoggingHandler(), hostname=host, port=port)
+    controller.start()
+    return controller
+
+
+# CLI Interface
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Notification digest queue")
+    parser.add_argument("command", choices=['flush', 'status', 'sink'], help="Command to execute")
+    parser.add_argument("--db", default="notifications.db", help="Notification queue database")
+    parser.add_argument("--smtp-server", help="SMTP server (omit to only log messages)")
+    parser.add_argument("--smtp-port", type=int, default=25, help="SMTP port")
+    parser.add_argument("--port", type=int, default=8025, help="Port for the local SMTP sink")
+
+    args = parser.parse_args()
+
+    if args.command == 'sink':
+        controller = run_smtp_sink(port=args.port)
+        print(f"SMTP sink listening on 127.0.0.1:{args.port}")
+        try:
+            threading.Event().wait()
+        except KeyboardInterrupt:
+            controller.stop()
+    else:
+        config = {'server': args.smtp_server, 'port': args.smtp_port} if args.smtp_server else None
+        queue = NotificationQueue(args.db, PooledSMTPSender(config))
+        if args.command == 'flush':
+            print(queue.flush())
+        else:
+            print(f"Pending events: {queue.pending_count()}, due recipients: {len(queue.due_recipients())}")
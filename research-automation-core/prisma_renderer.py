@@ -0,0 +1,230 @@
+"""
+PRISMA 2020 Flow Diagram Renderer
+Precompiled SVG template filled with counts; rasterised to PNG/PDF only on request
+"""
+
+import logging
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Tuple
+from xml.sax.saxutils import escape
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Exclusion reasons listed per box; the rest are folded into "Other reasons"
+MAX_REASON_LINES = 6
+
+WIDTH = 1000
+HEIGHT = 1140
+LINE_HEIGHT = 20
+
+COLORS = {
+    'identification': '#e1f5fe',
+    'screening': '#fff3e0',
+    'eligibility': '#f3e5f5',
+    'included': '#e8f5e8',
+    'excluded': '#ffebee',
+    'phase': '#90caf9'
+}
+
+# Fixed PRISMA 2020 geometry: (key, x, y, width, height, colour, line templates, reason slot)
+BOXES = [
+    ('identified', 90, 80, 390, 140, 'identification',
+     ['Records identified from:', 'Databases (n = {databases})', 'Registers (n = {registers})'], None),
+    ('removed', 570, 80, 390, 140, 'excluded',
+     ['Records removed before screening:', 'Duplicate records removed (n = {duplicates})',
+      'Removed for other reasons (n = {other_removed})'], None),
+    ('screened', 90, 280, 390, 100, 'screening',
+     ['Records screened', '(n = {screened})'], None),
+    ('excluded_screening', 570, 280, 390, 180, 'excluded',
+     ['Records excluded (n = {excluded_screening})'], 'rs'),
+    ('sought', 90, 520, 390, 100, 'screening',
+     ['Reports sought for retrieval', '(n = {sought})'], None),
+    ('not_retrieved', 570, 520, 390, 100, 'excluded',
+     ['Reports not retrieved', '(n = {not_retrieved})'], None),
+    ('assessed', 90, 680, 390, 100, 'eligibility',
+     ['Reports assessed for eligibility', '(n = {assessed})'], None),
+    ('excluded_eligibility', 570, 680, 390, 180, 'excluded',
+     ['Reports excluded (n = {excluded_eligibility}):'], 're'),
+    ('included', 90, 920, 390, 160, 'included',
+     ['Studies included in review (n = {included})', 'Reports of included studies (n = {reports_included})',
+      '{meta_analysis_line}'], None)
+]
+
+# Down arrows in the main column and side arrows to exclusion boxes: (x1, y1, x2, y2)
+ARROWS = [
+    (285, 220, 285, 280),
+    (285, 380, 285, 520),
+    (285, 620, 285, 680),
+    (285, 780, 285, 920),
+    (480, 150, 570, 150),
+    (480, 330, 570, 330),
+    (480, 570, 570, 570),
+    (480, 730, 570, 730)
+]
+
+PHASES = [
+    ('Identification', 80, 140),
+    ('Screening', 280, 580),
+    ('Included', 920, 160)
+]
+
+
+def _box_lines(lines: List[str], reason_slot: Optional[str]) -> List[str]:
+    return list(lines) + ([f'{{{reason_slot}{i}}}' for i in range(MAX_REASON_LINES)] if reason_slot else [])
+
+
+@lru_cache(maxsize=None)
+def compile_template() -> str:
+    """Build the SVG skeleton once; every variable part is a str.format placeholder"""
+
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{WIDTH}" height="{HEIGHT}" '
+        f'viewBox="0 0 {WIDTH} {HEIGHT}" font-family="Helvetica, Arial, sans-serif">',
+        '<defs><marker id="arrow" markerWidth="10" markerHeight="10" refX="9" refY="5" '
+        'orient="auto"><path d="M0,0 L10,5 L0,10 z" fill="black"/></marker></defs>',
+        f'<rect width="{WIDTH}" height="{HEIGHT}" fill="white"/>',
+        f'<text x="{WIDTH / 2}" y="45" text-anchor="middle" font-size="24" font-weight="bold">{{title}}</text>'
+    ]
+
+    for label, y, height in PHASES:
+        cx, cy = 45, y + height / 2
+        parts.append(f'<rect x="25" y="{y}" width="40" height="{height}" rx="6" fill="{COLORS["phase"]}"/>')
+        parts.append(f'<text x="{cx}" y="{cy}" text-anchor="middle" dominant-baseline="middle" '
+                     f'font-size="16" font-weight="bold" transform="rotate(-90 {cx} {cy})">{label}</text>')
+
+    for key, x, y, width, height, colour, lines, reason_slot in BOXES:
+        parts.append(f'<rect x="{x}" y="{y}" width="{width}" height="{height}" rx="8" '
+                     f'fill="{COLORS[colour]}" stroke="black" stroke-width="1.5"/>')
+        for i, line in enumerate(_box_lines(lines, reason_slot)):
+            # Headline centred, reason list left-aligned and italic
+            if i < len(lines):
+                parts.append(f'<text x="{x + width / 2}" y="{y + 30 + i * LINE_HEIGHT}" text-anchor="middle" '
+                             f'font-size="15">{line}</text>')
+            else:
+                parts.append(f'<text x="{x + 20}" y="{y + 34 + i * LINE_HEIGHT}" font-size="13" '
+                             f'font-style="italic">{line}</text>')
+
+    for x1, y1, x2, y2 in ARROWS:
+        parts.append(f'<line x1="{x1}" y1="{y1}" x2="{x2}" y2="{y2}" stroke="black" '
+                     f'stroke-width="1.5" marker-end="url(#arrow)"/>')
+
+    parts.append('</svg>')
+    # Literal braces never occur in the skeleton, so str.format is safe
+    return '\n'.join(parts)
+
+
+def _reason_lines(reasons: Optional[Dict[str, int]]) -> List[str]:
+    items = sorted(((str(r), int(c)) for r, c in (reasons or {}).items() if c and c > 0),
+                   key=lambda item: -item[1])
+    if len(items) > MAX_REASON_LINES:
+        kept = items[:MAX_REASON_LINES - 1]
+        other = sum(c for _, c in items[MAX_REASON_LINES - 1:])
+        items = kept + [('Other reasons', other)]
+    lines = [f'{reason} (n = {count})' for reason, count in items]
+    return lines + [''] * (MAX_REASON_LINES - len(lines))
+
+
+def template_values(counts: Dict[str, Any], title: str = 'PRISMA 2020 Flow Diagram') -> Dict[str, str]:
+    """Placeholder values (escaped for XML) from a dict of PRISMA counts"""
+
+    meta = counts.get('meta_analysis', 0)
+    values = {
+        'title': title,
+        'databases': counts.get('databases', 0),
+        'registers': counts.get('registers', 0),
+        'duplicates': counts.get('duplicates', 0),
+        'other_removed': counts.get('other_removed', 0),
+        'screened': counts.get('screened', 0),
+        'excluded_screening': counts.get('excluded_screening', 0),
+        'sought': counts.get('sought', 0),
+        'not_retrieved': counts.get('not_retrieved', 0),
+        'assessed': counts.get('assessed', 0),
+        'excluded_eligibility': counts.get('excluded_eligibility', 0),
+        'included': counts.get('included', 0),
+        'reports_included': counts.get('reports_included', counts.get('included', 0)),
+        'meta_analysis_line': f'Studies in meta-analysis (n = {meta})' if meta else ''
+    }
+    for i, line in enumerate(_reason_lines(counts.get('reasons_screening'))):
+        values[f'rs{i}'] = line
+    for i, line in enumerate(_reason_lines(counts.get('reasons_eligibility'))):
+        values[f're{i}'] = line
+
+    return {key: escape(str(value)) for key, value in values.items()}
+
+
+def render_svg(counts: Dict[str, Any], title: str = 'PRISMA 2020 Flow Diagram') -> str:
+    """Fill the cached template; no layout work happens here"""
+
+    return compile_template().format_map(template_values(counts, title))
+
+
+def _rasterise_matplotlib(counts: Dict[str, Any], title: str, output_file: str, dpi: int):
+    """Fallback rasteriser drawing the same geometry when cairosvg is unavailable"""
+
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.patches import FancyBboxPatch
+    from xml.sax.saxutils import unescape
+
+    values = {k: unescape(v) for k, v in template_values(counts, title).items()}
+    fig = Figure(figsize=(WIDTH / 100, HEIGHT / 100))
+    FigureCanvasAgg(fig)
+    ax = fig.add_axes([0, 0, 1, 1])
+    ax.set_xlim(0, WIDTH)
+    ax.set_ylim(HEIGHT, 0)
+    ax.axis('off')
+
+    ax.text(WIDTH / 2, 45, values['title'], ha='center', va='baseline', fontsize=17, fontweight='bold')
+    for label, y, height in PHASES:
+        ax.add_patch(FancyBboxPatch((25, y), 40, height, boxstyle='round,pad=0,rounding_size=6',
+                                    facecolor=COLORS['phase'], edgecolor='none'))
+        ax.text(45, y + height / 2, label, rotation=90, ha='center', va='center',
+                fontsize=11, fontweight='bold')
+
+    for key, x, y, width, height, colour, lines, reason_slot in BOXES:
+        ax.add_patch(FancyBboxPatch((x, y), width, height, boxstyle='round,pad=0,rounding_size=8',
+                                    facecolor=COLORS[colour], edgecolor='black', linewidth=1.5))
+        for i, line in enumerate(_box_lines(lines, reason_slot)):
+            text = line.format_map(values)
+            if i < len(lines):
+                ax.text(x + width / 2, y + 30 + i * LINE_HEIGHT, text, ha='center', va='baseline', fontsize=10.5)
+            elif text:
+                ax.text(x + 20, y + 34 + i * LINE_HEIGHT, text, va='baseline', fontsize=9, fontstyle='italic')
+
+    for x1, y1, x2, y2 in ARROWS:
+        ax.annotate('', xy=(x2, y2), xytext=(x1, y1),
+                    arrowprops=dict(arrowstyle='-|>', color='black', linewidth=1.5))
+
+    fig.savefig(output_file, dpi=dpi)
+
+
+def write_flowchart(counts: Dict[str, Any], output_file: str,
+                    title: str = 'PRISMA 2020 Flow Diagram', dpi: int = 300) -> str:
+    """Write the diagram; the suffix picks SVG (template fill only), PNG or PDF"""
+
+    path = Path(output_file)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    suffix = path.suffix.lower()
+
+    if suffix == '.svg':
+        path.write_text(render_svg(counts, title), encoding='utf-8')
+        return str(path)
+
+    if suffix not in ('.png', '.pdf'):
+        raise ValueError(f"Unsupported PRISMA output format: {suffix}")
+
+    try:
+        import cairosvg
+        svg = render_svg(counts, title).encode('utf-8')
+        if suffix == '.png':
+            cairosvg.svg2png(bytestring=svg, write_to=str(path), scale=dpi / 96)
+        else:
+            cairosvg.svg2pdf(bytestring=svg, write_to=str(path))
+    except ImportError:
+        logger.warning("cairosvg not available, rasterising PRISMA diagram with matplotlib")
+        _rasterise_matplotlib(counts, title, str(path), dpi)
+
+    return str(path)
@@ -0,0 +1,323 @@
+"""
+Publication Bias Assessment System
+Egger, Begg-Mazumdar, Peters, PET-PEESE and trim-and-fill from one shared design
+"""
+
+import pandas as pd
+import numpy as np
+from scipy import stats
+import logging
+from typing import Dict, List, Any, Optional, Tuple
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Conventional minimum number of studies for funnel asymmetry tests
+MIN_STUDIES_FOR_TESTS = 10
+
+# Regression tests need at least one residual degree of freedom
+MIN_STUDIES_FOR_REGRESSION = 3
+
+# Relative size below which the regression determinant counts as zero (no spread in x)
+SINGULAR_TOLERANCE = 1e-10
+
+
+class FunnelDesign:
+    """Padded (G x K) effect/variance arrays with the weighted sums every test reuses"""
+
+    def __init__(self, analyses: Dict[str, Dict[str, Any]]):
+        self.names = list(analyses.keys())
+        k_max = max(len(a['effects']) for a in analyses.values())
+        n_groups = len(self.names)
+
+        self.y = np.zeros((n_groups, k_max))
+        self.v = np.ones((n_groups, k_max))
+        self.n = np.full((n_groups, k_max), np.nan)
+        self.mask = np.zeros((n_groups, k_max))
+
+        for i, name in enumerate(self.names):
+            effects = np.asarray(analyses[name]['effects'], dtype=float)
+            k = len(effects)
+            self.y[i, :k] = effects
+            self.v[i, :k] = np.asarray(analyses[name]['variances'], dtype=float)
+            self.mask[i, :k] = 1.0
+            if analyses[name].get('sample_sizes') is not None:
+                self.n[i, :k] = np.asarray(analyses[name]['sample_sizes'], dtype=float)
+
+        self.k = self.mask.sum(axis=1)
+        self.se = np.sqrt(self.v)
+        self.w = self.mask / self.v
+
+        # Shared weighted sums
+        self.sum_w = self.w.sum(axis=1)
+        self.sum_wy = (self.w * self.y).sum(axis=1)
+        self.fixed_effect = self.sum_wy / self.sum_w
+
+        # One sort order per analysis (padding sorts last)
+        self.order = np.argsort(np.where(self.mask > 0, self.y, np.inf), axis=1, kind='stable')
+
+    def weighted_regression(self, x: np.ndarray, mask: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """WLS of y on x with weights 1/v and multiplicative dispersion, per analysis
+
+        Analyses whose x has no spread (e.g. every study with the same standard error)
+        or no residual degree of freedom are not testable: their estimates are NaN.
+        """
+
+        m = self.mask if mask is None else mask
+        w = self.w * m
+        x = np.where(m > 0, x, 0.0)
+
+        s_w = w.sum(axis=1)
+        s_wx = (w * x).sum(axis=1)
+        s_wy = (w * self.y).sum(axis=1)
+        s_wxx = (w * x * x).sum(axis=1)
+        s_wxy = (w * x * self.y).sum(axis=1)
+
+        det = s_w * s_wxx - s_wx ** 2
+        df = m.sum(axis=1) - 2
+        testable = (det > SINGULAR_TOLERANCE * s_w * s_wxx) & (df >= 1)
+        det = np.where(testable, det, np.nan)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = (s_w * s_wxy - s_wx * s_wy) / det
+            intercept = (s_wy - slope * s_wx) / s_w
+
+            resid = (self.y - intercept[:, None] - slope[:, None] * x) * m
+            phi = (w * resid ** 2).sum(axis=1) / np.maximum(df, 1)
+
+            se_slope = np.sqrt(phi * s_w / det)
+            se_intercept = np.sqrt(phi * s_wxx / det)
+
+        return {
+            'intercept': intercept,
+            'se_intercept': se_intercept,
+            'slope': slope,
+            'se_slope': se_slope,
+            'df': df,
+            'testable': testable
+        }
+
+
+def _t_p_value(estimate: np.ndarray, se: np.ndarray, df: np.ndarray) -> np.ndarray:
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return 2 * stats.t.sf(np.abs(estimate / se), np.maximum(df, 1))
+
+
+def _random_effects(y: np.ndarray, v: np.ndarray) -> Tuple[float, float]:
+    """DerSimonian-Laird pooled estimate and its standard error"""
+
+    w = 1 / v
+    fe = np.sum(w * y) / np.sum(w)
+    q = np.sum(w * (y - fe) ** 2)
+    c = np.sum(w) - np.sum(w ** 2) / np.sum(w)
+    tau2 = max(0.0, (q - (len(y) - 1)) / c) if c > 0 else 0.0
+    w_re = 1 / (v + tau2)
+    return float(np.sum(w_re * y) / np.sum(w_re)), float(1 / np.sqrt(np.sum(w_re)))
+
+
+def _trim_and_fill(y_sorted: np.ndarray, v_sorted: np.ndarray, side: str,
+                   max_iter: int = 50) -> Dict[str, Any]:
+    """Duval-Tweedie L0 trim-and-fill on effects already sorted ascending
+
+    Trimming always removes the most extreme studies on the side opposite to the
+    missing ones, so the trimmed set is a prefix/suffix of the cached sort order.
+    """
+
+    k = len(y_sorted)
+    if side == 'left':
+        # Missing on the left: trim from the right (largest effects)
+        y_work, v_work = y_sorted, v_sorted
+        sign = 1.0
+    else:
+        y_work, v_work = -y_sorted[::-1], v_sorted[::-1]
+        sign = -1.0
+
+    w = 1 / v_work
+    cum_w = np.cumsum(w)
+    cum_wy = np.cumsum(w * y_work)
+
+    k0 = 0
+    for _ in range(max_iter):
+        kept = k - k0
+        theta = cum_wy[kept - 1] / cum_w[kept - 1]
+        dev = y_work - theta
+        ranks = stats.rankdata(np.abs(dev))
+        t_n = ranks[dev > 0].sum()
+        l0 = (4 * t_n - k * (k + 1)) / (2 * k - 1)
+        new_k0 = int(min(max(0, round(l0)), k - 2))
+        if new_k0 == k0:
+            break
+        k0 = new_k0
+
+    theta = cum_wy[k - k0 - 1] / cum_w[k - k0 - 1]
+    filled_y = 2 * theta - y_work[k - k0:] if k0 > 0 else np.array([])
+    filled_v = v_work[k - k0:] if k0 > 0 else np.array([])
+
+    adj_est, adj_se = _random_effects(np.concatenate([y_work, filled_y]),
+                                      np.concatenate([v_work, filled_v]))
+
+    return {
+        'side': side,
+        'k0': k0,
+        'adjusted_effect': sign * adj_est,
+        'adjusted_se': adj_se,
+        'adjusted_ci_lower': sign * adj_est - 1.96 * adj_se,
+        'adjusted_ci_upper': sign * adj_est + 1.96 * adj_se,
+        'filled_effects': (sign * filled_y).tolist(),
+        'filled_variances': filled_v.tolist()
+    }
+
+
+class PublicationBiasAnalyzer:
+    """Batched small-study-effect tests across every analysis in a project"""
+
+    def __init__(self, alpha: float = 0.10, pet_alpha: float = 0.05):
+        self.alpha = alpha
+        self.pet_alpha = pet_alpha
+
+    def analyze(self, effect_sizes: np.ndarray, variances: np.ndarray,
+                sample_sizes: Optional[np.ndarray] = None) -> Dict[str, Any]:
+        """Full test battery for a single analysis"""
+
+        if len(effect_sizes) < MIN_STUDIES_FOR_REGRESSION:
+            raise ValueError(f"At least {MIN_STUDIES_FOR_REGRESSION} studies are required for publication bias tests "
+                             f"(got {len(effect_sizes)})")
+        return self.analyze_batch({'analysis': {'effects': effect_sizes, 'variances': variances,
+                                                'sample_sizes': sample_sizes}})['analysis']
+
+    def analyze_batch(self, analyses: Dict[str, Dict[str, Any]]) -> Dict[str, Dict[str, Any]]:
+        """Run every test on all analyses; regressions are vectorised across analyses"""
+
+        analyses = {name: a for name, a in analyses.items() if len(a['effects']) >= MIN_STUDIES_FOR_REGRESSION}
+        if not analyses:
+            return {}
+
+        design = FunnelDesign(analyses)
+
+        # Egger: y = b0 + b1*se (weights 1/v); b1 is the bias coefficient, b0 the PET estimate
+        egger = design.weighted_regression(design.se)
+        egger_p = _t_p_value(egger['slope'], egger['se_slope'], egger['df'])
+        pet_p = _t_p_value(egger['intercept'], egger['se_intercept'], egger['df'])
+
+        peese = design.weighted_regression(design.v)
+
+        has_n = (~np.isnan(design.n) | (design.mask == 0)).all(axis=1)
+        peters_mask = design.mask * (~np.isnan(design.n))
+        peters = design.weighted_regression(1 / np.where(np.isnan(design.n), 1, design.n), peters_mask)
+        peters_p = _t_p_value(peters['slope'], peters['se_slope'], peters['df'])
+
+        results = {}
+        for i, name in enumerate(design.names):
+            k = int(design.k[i])
+            idx = design.order[i, :k]
+            y_sorted = design.y[i, idx]
+            v_sorted = design.v[i, idx]
+
+            # Begg-Mazumdar: rank correlation of standardised deviates with variances
+            v_star = v_sorted - 1 / design.sum_w[i]
+            z_std = (y_sorted - design.fixed_effect[i]) / np.sqrt(np.maximum(v_star, 1e-12))
+            begg_tau, begg_p = stats.kendalltau(z_std, v_sorted)
+
+            # Fill on the side the Egger slope points away from
+            side = 'left' if egger['slope'][i] > 0 else 'right'
+            trim_fill = _trim_and_fill(y_sorted, v_sorted, side)
+
+            use_peese = pet_p[i] < self.pet_alpha and egger['intercept'][i] != 0
+            pet_peese_est = peese['intercept'][i] if use_peese else egger['intercept'][i]
+            pet_peese_se = peese['se_intercept'][i] if use_peese else egger['se_intercept'][i]
+
+            results[name] = {
+                'k': k,
+                'fixed_effect': float(design.fixed_effect[i]),
+                'egger': {
+                    'status': 'tested' if egger['testable'][i] else 'not testable',
+                    'bias': float(egger['slope'][i]),
+                    'se': float(egger['se_slope'][i]),
+                    'p_value': float(egger_p[i])
+                },
+                'begg': {
+                    'kendall_tau': float(begg_tau),
+                    'p_value': float(begg_p)
+                },
+                'peters': ({
+                    'status': 'tested' if peters['testable'][i] else 'not testable',
+                    'slope': float(peters['slope'][i]),
+                    'se': float(peters['se_slope'][i]),
+                    'p_value': float(peters_p[i])
+                } if has_n[i] else None),
+                'pet_peese': {
+                    'pet_estimate': float(egger['intercept'][i]),
+                    'pet_p_value': float(pet_p[i]),
+                    'peese_estimate': float(peese['intercept'][i]),
+                    'selected': 'PEESE' if use_peese else 'PET',
+                    'estimate': float(pet_peese_est),
+                    'se': float(pet_peese_se)
+                },
+                'trim_and_fill': trim_fill
+            }
+            results[name]['grade'] = self.grade_judgement(results[name])
+
+        return results
+
+    def grade_judgement(self, result: Dict[str, Any]) -> Dict[str, Any]:
+        """Translate the test battery into a GRADE publication-bias domain judgement"""
+
+        k = result['k']
+        egger_p = result['egger']['p_value']
+        k0 = result['trim_and_fill']['k0']
+
+        if k < MIN_STUDIES_FOR_TESTS:
+            return {
+                'downgrade': False,
+                'level': 0,
+                'reasoning': f'Only {k} studies - funnel asymmetry tests underpowered',
+                'bias_risk': 'Uncertain'
+            }
+
+        # An untestable Egger regression is not evidence that the funnel is symmetric
+        if result['egger']['status'] != 'tested':
+            return {
+                'downgrade': False,
+                'level': 0,
+                'reasoning': 'Egger test not testable - study standard errors do not vary',
+                'bias_risk': 'Uncertain'
+            }
+
+        suspected = egger_p < self.alpha
+        if suspected:
+            return {
+                'downgrade': True,
+                'level': 1,
+                'reasoning': (f"Funnel asymmetry (Egger p = {egger_p:.3f}); "
+                              f"trim-and-fill imputed {k0} studies, adjusted estimate "
+                              f"{result['trim_and_fill']['adjusted_effect']:.3f}"),
+                'bias_risk': 'High'
+            }
+
+        return {
+            'downgrade': False,
+            'level': 0,
+            'reasoning': f'No funnel asymmetry detected (Egger p = {egger_p:.3f}, {k0} studies imputed)',
+            'bias_risk': 'Low'
+        }
+
+    def summary_table(self, results: Dict[str, Dict[str, Any]]) -> pd.DataFrame:
+        """One row per analysis for project-level reporting"""
+
+        rows = []
+        for name, res in results.items():
+            rows.append({
+                'analysis': name,
+                'k': res['k'],
+                'egger_bias': res['egger']['bias'],
+                'egger_p': res['egger']['p_value'],
+                'begg_tau': res['begg']['kendall_tau'],
+                'begg_p': res['begg']['p_value'],
+                'peters_p': res['peters']['p_value'] if res['peters'] else np.nan,
+                'pet_peese': res['pet_peese']['estimate'],
+                'pet_peese_method': res['pet_peese']['selected'],
+                'trim_fill_k0': res['trim_and_fill']['k0'],
+                'trim_fill_adjusted': res['trim_and_fill']['adjusted_effect'],
+                'grade_downgrade': res['grade']['level']
+            })
+        return pd.DataFrame(rows)
@@ -11,11 +11,10 @@ from pathlib import Path
 import json
 from datetime import datetime
 from dataclasses import dataclass
-import matplotlib.pyplot as plt
-from matplotlib.patches import FancyBboxPatch, BoxStyle, Rectangle
-import matplotlib.patches as patches
 from PIL import Image, ImageDraw, ImageFont
 
+from prisma_renderer import render_svg, write_flowchart
+
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -34,6 +33,8 @@ class PRISMAData:
     records_excluded_eligibility: int = 0
     reasons_screening: Dict[str, int] = None
     reasons_eligibility: Dict[str, int] = None
+    registers: int = 0
+    meta_analysis: int = 0
 
     def __post_init__(self):
         if self.reasons_screening is None:
@@ -58,128 +59,41 @@ class PRISMAFlowchartGenerator:
     def generate_flowchart(self, prisma_data: PRISMAData,
                           output_file: str = 'prisma_flowchart.png',
                           title: str = 'PRISMA Flow Diagram') -> str:
-        """Generate PRISMA flowchart"""
+        """Generate PRISMA flowchart (.svg fills the cached template; .png/.pdf rasterise it)"""
 
         logger.info("Generating PRISMA flowchart")
 
-        # Create figure with custom size
-        fig, ax = plt.subplots(figsize=(12, 16))
-        ax.set_xlim(0, 100)
-        ax.set_ylim(0, 100)
-        ax.axis('off')
-
-        # Draw boxes
-        y_position = 85
-
-        # Identification box
-        id_text = f"Records identified from\ndatabases (n={prisma_data.identification})"
-        self._draw_box(ax, 15, y_position, 70, 8, id_text, self.colors['identification'])
-
-        y_position -= 15
-
-        # Duplicates removed
-        dup_text = f"Records after duplicates removed\n(n={prisma_data.identification - prisma_data.duplicates})"
-        self._draw_box(ax, 15, y_position, 70, 8, dup_text, self.colors['identification'])
-
-        y_position -= 12
-
-        # Screening box
-        screening_text = f"Records screened\n(n={prisma_data.screening})"
-        self._draw_box(ax, 15, y_position, 35, 8, screening_text, self.colors['screening'])
-
-        y_position -= 10
-
-        # Records excluded at screening
-        excluded_screening = prisma_data.screening - prisma_data.full_text_screened
-        if excluded_screening > 0:
-            excl_screening_text = f"Records excluded\n(n={excluded_screening})"
-            self._draw_box(ax, 55, y_position, 35, 8, excl_screening_text, self.colors['excluded'],
-                          reasons=prisma_data.reasons_screening)
-
-            # Draw arrow from screening to excluded
-            self._draw_arrow(ax, 35, y_position + 7, 55, y_position + 4)
-
-        # Full-text screening
-        y_position -= 15
-        full_text_text = f"Full-text articles assessed\nfor eligibility\n(n={prisma_data.full_text_screened})"
-        self._draw_box(ax, 15, y_position, 35, 10, full_text_text, self.colors['eligibility'])
-
-        y_position -= 12
-
-        # Records excluded at eligibility
-        excluded_eligibility = prisma_data.full_text_screened - prisma_data.included
-        if excluded_eligibility > 0:
-            excl_elig_text = f"Full-text articles excluded,\nwith reasons\n(n={excluded_eligibility})"
-            self._draw_box(ax, 55, y_position, 35, 10, excl_elig_text, self.colors['excluded'],
-                          reasons=prisma_data.reasons_eligibility)
+        output_file = write_flowchart(self._prisma_counts(prisma_data), output_file, title)
 
-            # Draw arrow from eligibility assessment to excluded
-            self._draw_arrow(ax, 35, y_position + 9, 55, y_position + 7)
-
-        # Studies included
-        y_position -= 18
-        included_text = f"Studies included in\nqualitative synthesis\n(n={prisma_data.included})"
-        self._draw_box(ax, 15, y_position, 70, 8, included_text, self.colors['included'])
-
-        # If meta-analysis
-        if hasattr(prisma_data, 'meta_analysis') and prisma_data.meta_analysis > 0:
-            y_position -= 12
-            meta_text = f"Studies included in\nquantitative synthesis\n(meta-analysis)\n(n={prisma_data.meta_analysis})"
-            self._draw_box(ax, 15, y_position, 70, 10, meta_text, self.colors['included'])
+        logger.info(f"PRISMA flowchart saved to {output_file}")
+        return output_file
 
-        # Add arrows connecting the flow
-        self._draw_arrow(ax, 50, 91, 50, 92)  # From identification down
-        self._draw_arrow(ax, 35, 82, 35, 70)  # From duplicates to screening
-        self._draw_arrow(ax, 35, 57, 35, 40)  # From screening to full-text
+    def generate_svg(self, prisma_data: PRISMAData, title: str = 'PRISMA Flow Diagram') -> str:
+        """PRISMA 2020 diagram as an SVG string"""
 
-        # Title
-        plt.suptitle(title, fontsize=14, fontweight='bold', y=0.95)
+        return render_svg(self._prisma_counts(prisma_data), title)
 
-        plt.tight_layout()
-        plt.savefig(output_file, dpi=300, bbox_inches='tight')
-        plt.close()
+    def _prisma_counts(self, prisma_data: PRISMAData) -> Dict[str, Any]:
+        """Map PRISMAData onto the PRISMA 2020 boxes"""
 
-        logger.info(f"PRISMA flowchart saved to {output_file}")
-        return output_file
+        sought = prisma_data.full_text_screened
+        assessed = prisma_data.eligibility or sought
 
-    def _draw_box(self, ax, x: float, y: float, width: float, height: float,
-                  text: str, color: str, reasons: Dict[str, int] = None):
-        """Draw a PRISMA flowchart box"""
-
-        # Create box
-        box = FancyBboxPatch((x, y), width, height,
-                           boxstyle="round,pad=0.05",
-                           facecolor=color,
-                           edgecolor='black',
-                           linewidth=1.5)
-        ax.add_patch(box)
-
-        # Add text
-        ax.text(x + width/2, y + height/2, text,
-               ha='center', va='center', fontsize=self.font_size,
-               fontweight='normal', wrap=True)
-
-        # Add reasons if provided
-        if reasons:
-            reasons_text = []
-            for reason, count in reasons.items():
-                if count > 0:
-                    reasons_text.append(f"{reason}: {count}")
-
-            if reasons_text:
-                reasons_str = "\n".join(reasons_text)
-
-                # Place reasons below the box
-                ax.text(x + width/2, y - 0.5, reasons_str,
-                       ha='center', va='top', fontsize=8,
-                       fontstyle='italic', wrap=True)
-
-    def _draw_arrow(self, ax, x1: float, y1: float, x2: float, y2: float):
-        """Draw an arrow between boxes"""
-
-        ax.arrow(x1, y1, x2 - x1, y2 - y1,
-                head_width=1.5, head_length=1.5,
-                fc='black', ec='black', linewidth=1.5)
+        return {
+            'databases': prisma_data.identification,
+            'registers': prisma_data.registers,
+            'duplicates': prisma_data.duplicates,
+            'screened': prisma_data.screening,
+            'excluded_screening': max(prisma_data.screening - sought, 0),
+            'reasons_screening': prisma_data.reasons_screening,
+            'sought': sought,
+            'not_retrieved': max(sought - assessed, 0),
+            'assessed': assessed,
+            'excluded_eligibility': max(assessed - prisma_data.included, 0),
+            'reasons_eligibility': prisma_data.reasons_eligibility,
+            'included': prisma_data.included,
+            'meta_analysis': prisma_data.meta_analysis
+        }
 
     def generate_from_search_history(self, search_data: pd.DataFrame,
                                    screening_data: pd.DataFrame = None) -> PRISMAData:
@@ -587,7 +501,8 @@ class AutomatedReporter:
         self.compliance_reporter = ComplianceReporter()
 
     def generate_full_report_package(self, project_data: Dict[str, Any],
-                                   output_dir: str = 'research_reports') -> Dict[str, Any]:
+                                   output_dir: str = 'research_reports',
+                                   prisma_format: str = 'svg') -> Dict[str, Any]:
         """Generate complete reporting package"""
 
         output_path = Path(output_dir)
@@ -602,7 +517,7 @@ class AutomatedReporter:
         if prisma_data:
             prisma_file = self.prisma_generator.generate_flowchart(
                 prisma_data,
-                output_file=str(output_path / 'prisma_flowchart.png')
+                output_file=str(output_path / f'prisma_flowchart.{prisma_format}')
             )
             reports['prisma_flowchart'] = prisma_file
 
@@ -0,0 +1,369 @@
+"""
+Living Review Storage Layer
+Pooled WAL-mode SQLite connections, versioned schema migrations and single-transaction bulk writes
+"""
+
+import re
+import sqlite3
+import threading
+import queue
+import logging
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Sequence, Tuple, Union
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# WAL lets readers run alongside the writer; NORMAL only fsyncs at checkpoints in WAL mode
+DEFAULT_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'temp_store': 'MEMORY',
+    'cache_size': -64000,          # negative = KiB, i.e. 64 MB page cache per connection
+    'mmap_size': 268435456,        # 256 MB memory-mapped reads
+    'busy_timeout': 5000           # ms to wait on a locked database before failing
+}
+
+DEFAULT_POOL_SIZE = 4
+
+
+class SQLiteConnectionPool:
+    """Thread-safe pool of configured SQLite connections
+
+    Connections are opened lazily up to pool_size and reused, so pragmas are applied
+    once per connection instead of once per query. transaction() wraps a block in a
+    single BEGIN IMMEDIATE ... COMMIT so bulk writes pay for one fsync, not one per row.
+    """
+
+    def __init__(self, db_path: Union[str, Path], pool_size: int = DEFAULT_POOL_SIZE,
+                 pragmas: Optional[Dict[str, Any]] = None, timeout: float = 30.0):
+        self.db_path = str(db_path)
+        self.pool_size = pool_size
+        self.pragmas = {**DEFAULT_PRAGMAS, **(pragmas or {})}
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._opened = 0
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _connect(self) -> sqlite3.Connection:
+        # Autocommit mode: transactions are opened explicitly by transaction()
+        conn = sqlite3.connect(self.db_path, timeout=self.timeout, check_same_thread=False,
+                               isolation_level=None)
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _acquire(self) -> sqlite3.Connection:
+        if self._closed:
+            raise RuntimeError(f"Connection pool for {self.db_path} is closed")
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._opened < self.pool_size:
+                self._opened += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._opened -= 1
+                    raise
+        return self._idle.get(timeout=self.timeout)
+
+    def _release(self, conn: sqlite3.Connection):
+        if self._closed:
+            conn.close()
+        else:
+            self._idle.put(conn)
+
+    @contextmanager
+    def connection(self):
+        """Borrow a connection for reads (autocommit)"""
+
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn)
+
+    @contextmanager
+    def transaction(self):
+        """Borrow a connection inside one write transaction; rolls back on error"""
+
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    def execute(self, sql: str, params: Sequence[Any] = ()) -> List[Tuple]:
+        """Run one statement and return all rows"""
+
+        with self.connection() as conn:
+            return conn.execute(sql, params).fetchall()
+
+    def executemany(self, sql: str, rows: Iterable[Sequence[Any]]) -> int:
+        """Prepared bulk write of many rows in a single transaction"""
+
+        with self.transaction() as conn:
+            return conn.executemany(sql, rows).rowcount
+
+    def close(self):
+        """Close every idle connection; borrowed ones close when returned"""
+
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+
+
+# Living review schema, one entry per version: (version, description, statements).
+# The applied version is tracked in PRAGMA user_version, so migrate() upgrades any
+# existing database in place and is a no-op on an up-to-date one.
+LIVING_REVIEW_MIGRATIONS = [
+    (1, 'Base living review tables', [
+        '''
+        CREATE TABLE IF NOT EXISTS living_reviews (
+            review_id TEXT PRIMARY KEY,
+            title TEXT,
+            description TEXT,
+            search_strategy TEXT,
+            last_update TEXT,
+            total_studies INTEGER,
+            included_studies INTEGER,
+            created_date TEXT,
+            update_frequency TEXT,
+            status TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS review_studies (
+            id INTEGER PRIMARY KEY,
+            review_id TEXT,
+            study_id TEXT,
+            source TEXT,
+            title TEXT,
+            authors TEXT,
+            abstract TEXT,
+            publication_date TEXT,
+            relevance_score REAL,
+            inclusion_status TEXT,
+            added_date TEXT,
+            removed_date TEXT,
+            removal_reason TEXT,
+            FOREIGN KEY (review_id) REFERENCES living_reviews (review_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS review_updates (
+            id INTEGER PRIMARY KEY,
+            review_id TEXT,
+            update_type TEXT,
+            trigger_date TEXT,
+            new_studies_count INTEGER,
+            removed_studies_count INTEGER,
+            effect_change REAL,
+            heterogeneity_change REAL,
+            description TEXT,
+            risk_assessment TEXT,
+            processed_date TEXT,
+            FOREIGN KEY (review_id) REFERENCES living_reviews (review_id)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS stakeholders (
+            id TEXT PRIMARY KEY,
+            review_id TEXT,
+            email TEXT,
+            name TEXT,
+            role TEXT,
+            notification_frequency TEXT,
+            last_notification TEXT,
+            preferences TEXT,
+            FOREIGN KEY (review_id) REFERENCES living_reviews (review_id)
+        )
+        '''
+    ]),
+    (2, 'Unique review/study key and covering indexes for status queries', [
+        # Databases written before the unique key may hold re-processed duplicates; keep the first
+        '''
+        DELETE FROM review_studies WHERE id NOT IN (
+            SELECT MIN(id) FROM review_studies GROUP BY review_id, study_id
+        )
+        ''',
+        "CREATE UNIQUE INDEX IF NOT EXISTS ux_review_studies_review_study ON review_studies (review_id, study_id)",
+        "CREATE INDEX IF NOT EXISTS ix_review_studies_status ON review_studies (review_id, inclusion_status)",
+        "CREATE INDEX IF NOT EXISTS ix_review_studies_added ON review_studies (review_id, added_date)",
+        "CREATE INDEX IF NOT EXISTS ix_review_updates_review_date ON review_updates (review_id, trigger_date)",
+        "CREATE INDEX IF NOT EXISTS ix_stakeholders_review ON stakeholders (review_id)",
+        # Refresh planner statistics (and the living_reviews counters the duplicates inflated)
+        '''
+        UPDATE living_reviews SET
+            total_studies = (SELECT COUNT(*) FROM review_studies s WHERE s.review_id = living_reviews.review_id),
+            included_studies = (SELECT COUNT(*) FROM review_studies s
+                                WHERE s.review_id = living_reviews.review_id AND s.inclusion_status = 'included')
+        ''',
+        "ANALYZE"
+    ]),
+    (3, 'FTS5 full-text index over study titles, abstracts and authors', [
+        # External-content table: the text lives once, in review_studies; triggers keep it in sync
+        '''
+        CREATE VIRTUAL TABLE IF NOT EXISTS review_studies_fts USING fts5(
+            title, abstract, authors,
+            content='review_studies', content_rowid='id',
+            tokenize='porter unicode61 remove_diacritics 2',
+            prefix='2 3'
+        )
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS review_studies_fts_insert AFTER INSERT ON review_studies BEGIN
+            INSERT INTO review_studies_fts (rowid, title, abstract, authors)
+            VALUES (new.id, new.title, new.abstract, new.authors);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS review_studies_fts_delete AFTER DELETE ON review_studies BEGIN
+            INSERT INTO review_studies_fts (review_studies_fts, rowid, title, abstract, authors)
+            VALUES ('delete', old.id, old.title, old.abstract, old.authors);
+        END
+        ''',
+        '''
+        CREATE TRIGGER IF NOT EXISTS review_studies_fts_update AFTER UPDATE OF title, abstract, authors
+        ON review_studies BEGIN
+            INSERT INTO review_studies_fts (review_studies_fts, rowid, title, abstract, authors)
+            VALUES ('delete', old.id, old.title, old.abstract, old.authors);
+            INSERT INTO review_studies_fts (rowid, title, abstract, authors)
+            VALUES (new.id, new.title, new.abstract, new.authors);
+        END
+        ''',
+        # Title matches weigh most, then authors, then abstract; stored so ORDER BY rank uses it
+        "INSERT INTO review_studies_fts (review_studies_fts, rank) VALUES ('rank', 'bm25(10.0, 1.0, 5.0)')",
+        "INSERT INTO review_studies_fts (review_studies_fts) VALUES ('rebuild')"
+    ]),
+    (4, 'Evidence source watermarks and conditional-request response cache', [
+        '''
+        CREATE TABLE IF NOT EXISTS source_watermarks (
+            review_id TEXT,
+            source TEXT,
+            watermark TEXT,
+            updated TEXT,
+            PRIMARY KEY (review_id, source)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS http_cache (
+            url TEXT PRIMARY KEY,
+            etag TEXT,
+            last_modified TEXT,
+            body BLOB,
+            fetched TEXT
+        )
+        '''
+    ]),
+    (5, 'Screening decisions, probabilities and model version per study', [
+        'ALTER TABLE review_studies ADD COLUMN screening_decision TEXT',
+        'ALTER TABLE review_studies ADD COLUMN screening_probability REAL',
+        'ALTER TABLE review_studies ADD COLUMN screening_model_version TEXT',
+        'ALTER TABLE review_studies ADD COLUMN screened_date TEXT',
+        '''
+        CREATE INDEX IF NOT EXISTS ix_review_studies_pending
+        ON review_studies (review_id, screening_probability)
+        WHERE inclusion_status = 'pending_review'
+        '''
+    ])
+]
+
+_QUERY_TOKEN = re.compile(r'"[^"]*"|\S+')
+_QUERY_OPERATORS = {'AND', 'OR', 'NOT'}
+
+
+def build_match_query(text: str) -> str:
+    """FTS5 MATCH expression from a reviewer's search box text
+
+    "quoted phrases" stay phrases, a trailing * makes a prefix query, and AND/OR/NOT
+    pass through as operators. Every other term is quoted, so punctuation such as
+    beta-lactam or IL-6 cannot break the FTS5 query syntax.
+    """
+
+    parts = []
+    for token in _QUERY_TOKEN.findall(text or ''):
+        if token in _QUERY_OPERATORS:
+            parts.append(token)
+            continue
+        prefix = token.endswith('*')
+        term = token.rstrip('*').strip('"').replace('"', '""')
+        if term:
+            parts.append(f'"{term}"' + ('*' if prefix else ''))
+
+    # Operators cannot open or close an expression
+    while parts and parts[0] in _QUERY_OPERATORS:
+        parts.pop(0)
+    while parts and parts[-1] in _QUERY_OPERATORS:
+        parts.pop()
+    return ' '.join(parts)
+
+
+def schema_version(pool: SQLiteConnectionPool) -> int:
+    """Schema version recorded in the database header"""
+
+    return pool.execute("PRAGMA user_version")[0][0]
+
+
+def migrate(pool: SQLiteConnectionPool, migrations: Optional[List[Tuple[int, str, List[str]]]] = None,
+            target: Optional[int] = None) -> Dict[str, Any]:
+    """Apply pending migrations in order, each in its own transaction"""
+
+    migrations = sorted(migrations or LIVING_REVIEW_MIGRATIONS, key=lambda m: m[0])
+    start = current = schema_version(pool)
+    applied = []
+
+    for version, description, statements in migrations:
+        if version <= current or (target is not None and version > target):
+            continue
+        with pool.transaction() as conn:
+            for statement in statements:
+                conn.execute(statement)
+            conn.execute(f"PRAGMA user_version = {int(version)}")
+        current = version
+        applied.append({'version': version, 'description': description})
+        logger.info(f"Applied schema migration {version}: {description}")
+
+    return {'from_version': start, 'to_version': current, 'applied': applied}
+
+
+# CLI Interface
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Living review database migrations")
+    parser.add_argument("command", choices=['migrate', 'status'], help="Command to execute")
+    parser.add_argument("--db", default="living_reviews.db", help="Path to the living reviews database")
+    parser.add_argument("--target", type=int, help="Stop at this schema version")
+
+    args = parser.parse_args()
+    pool = SQLiteConnectionPool(args.db, pool_size=1)
+
+    if args.command == 'migrate':
+        result = migrate(pool, target=args.target)
+        print(f"Schema version: {result['from_version']} -> {result['to_version']}")
+        for migration in result['applied']:
+            print(f"  applied {migration['version']}: {migration['description']}")
+
+    elif args.command == 'status':
+        latest = max(version for version, _, _ in LIVING_REVIEW_MIGRATIONS)
+        current = schema_version(pool)
+        print(f"Schema version: {current} (latest {latest})")
+        if current < latest:
+            print("Run 'migrate' to upgrade this database")
+
+    pool.close()
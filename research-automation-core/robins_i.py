@@ -0,0 +1,266 @@
+"""
+ROBINS-I Assessment Engine
+Signalling-question answer table with vectorised, incremental domain and overall judgements
+"""
+
+import pandas as pd
+import numpy as np
+import logging
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Union
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Signalling questions per domain, in ROBINS-I order
+ROBINS_I_DOMAINS = {
+    'confounding': [
+        'Did the authors adequately control for confounding?',
+        'Were confounding domains similar between groups?',
+        'Were no important differences present?'
+    ],
+    'selection': [
+        'Was selection bias possibly avoided?',
+        'Were control groups assembled at start?',
+        'Was bias minimised through selection?'
+    ],
+    'intervention': [
+        'Were interventions classified correctly?',
+        'Was intervention status unambiguous?',
+        'Were exposure measurements valid?'
+    ],
+    'deviations': [
+        'Were intervention deviations avoided?',
+        'Were deviations similar across groups?',
+        'Were statistical methods appropriate?'
+    ],
+    'missing_data': [
+        'Were missing data adequately handled?',
+        'Was missingness similar across groups?',
+        'Were missing data patterns considered?'
+    ],
+    'outcomes': [
+        'Were outcome measurements valid?',
+        'Were outcome assessors blinded?',
+        'Were measurements consistent?'
+    ],
+    'reporting': [
+        'Were results plausibly selected?',
+        'Was reporting comprehensive?',
+        'Were analyses pre-specified?'
+    ]
+}
+
+# Signalling answers, coded by how much concern they raise; NI is kept apart
+ANSWER_CODES = {'Y': 0, 'PY': 1, 'PN': 2, 'N': 3, 'NI': -1}
+ANSWER_ALIASES = {'yes': 'Y', 'probably yes': 'PY', 'probably no': 'PN', 'no': 'N',
+                  'no information': 'NI', 'ni': 'NI', 'y': 'Y', 'py': 'PY', 'pn': 'PN', 'n': 'N'}
+UNANSWERED = -2
+
+JUDGEMENTS = ['low', 'moderate', 'serious', 'critical', 'no_information']
+JUDGEMENT_CODES = {name: code for code, name in enumerate(JUDGEMENTS)}
+NO_INFORMATION = JUDGEMENT_CODES['no_information']
+
+# Default rule table: the worst answer in a domain sets its judgement
+DEFAULT_DOMAIN_RULE = ['low', 'moderate', 'serious', 'critical']
+
+CONFIDENCE_RATINGS = {
+    'low': 'High confidence',
+    'moderate': 'Moderate confidence',
+    'serious': 'Low confidence',
+    'critical': 'Very low confidence',
+    'no_information': 'Uncertain'
+}
+
+
+def question_columns(domains: Dict[str, List[str]]) -> List[str]:
+    """Answer-table column per signalling question, e.g. 'confounding.1'"""
+
+    return [f"{domain}.{i + 1}" for domain, questions in domains.items() for i in range(len(questions))]
+
+
+def encode_answers(values: Union[pd.Series, np.ndarray, List]) -> np.ndarray:
+    """Map Y/PY/PN/N/NI (or spelled-out forms) to int8 codes; blanks are unanswered"""
+
+    series = pd.Series(values, dtype=object)
+    text = series.where(series.notna(), '').astype(str).str.strip()
+    canonical = text.str.lower().map(ANSWER_ALIASES).fillna(text.str.upper())
+    codes = canonical.map(ANSWER_CODES)
+    unknown = codes.isna() & (text != '')
+    if unknown.any():
+        raise ValueError(f"Unrecognised signalling answers: {sorted(set(text[unknown]))}")
+    return codes.fillna(UNANSWERED).to_numpy(dtype=np.int8)
+
+
+def domain_judgements(codes: np.ndarray, rule: np.ndarray) -> np.ndarray:
+    """Judgement codes for one domain from its (studies x questions) answer codes
+
+    rule maps the worst answered concern level (0-3) to a judgement code. A domain with
+    no usable answers is 'no_information'; NI next to otherwise reassuring answers
+    cannot be better than 'moderate'.
+    """
+
+    answered = codes >= 0
+    worst = np.where(answered, codes, -1).max(axis=1)
+    judgement = np.where(worst >= 0, rule[np.clip(worst, 0, 3)], NO_INFORMATION)
+    partial_info = (codes == ANSWER_CODES['NI']).any(axis=1) & answered.any(axis=1)
+    moderate = JUDGEMENT_CODES['moderate']
+    return np.where(partial_info & (judgement < moderate), moderate, judgement)
+
+
+def overall_judgements(domain_codes: np.ndarray) -> np.ndarray:
+    """ROBINS-I overall judgement: the most severe domain, with 'no_information' only
+    when there is missing information and nothing serious or critical"""
+
+    assessed = np.where(domain_codes == NO_INFORMATION, -1, domain_codes)
+    worst = assessed.max(axis=1)
+    missing = (domain_codes == NO_INFORMATION).any(axis=1)
+    serious = worst >= JUDGEMENT_CODES['serious']
+    return np.where(missing & ~serious, NO_INFORMATION, np.maximum(worst, 0))
+
+
+class ROBINSIEngine:
+    """ROBINS-I judgements derived from a compact signalling-answer table
+
+    Answers are held once per study as int8 codes (studies x questions). Domain and
+    overall judgements are cached alongside and recomputed only for studies whose
+    answers changed, so re-assessment after adjudication touches just those rows.
+    """
+
+    def __init__(self, domains: Optional[Dict[str, List[str]]] = None,
+                 rules: Optional[Dict[str, List[str]]] = None):
+        self.domains = domains or ROBINS_I_DOMAINS
+        self.columns = question_columns(self.domains)
+        self.rules = {
+            domain: np.array([JUDGEMENT_CODES[j] for j in (rules or {}).get(domain, DEFAULT_DOMAIN_RULE)])
+            for domain in self.domains
+        }
+        self._domain_slices = {}
+        start = 0
+        for domain, questions in self.domains.items():
+            self._domain_slices[domain] = slice(start, start + len(questions))
+            start += len(questions)
+
+        self.answers = pd.DataFrame(columns=self.columns, dtype=np.int8)
+        self.answers.index.name = 'study_id'
+        self.judgements = pd.DataFrame(columns=list(self.domains) + ['overall'], dtype=np.int8)
+        self._stale = set()
+
+    def _wide(self, answers: Union[pd.DataFrame, Dict[str, Dict[str, List[str]]]]) -> pd.DataFrame:
+        """Wide (study x question) answer codes from a dict, long table or wide table"""
+
+        if isinstance(answers, dict):
+            rows = {
+                study_id: {f"{domain}.{i + 1}": answer
+                           for domain, domain_answers in study.items()
+                           for i, answer in enumerate(domain_answers)}
+                for study_id, study in answers.items()
+            }
+            wide = pd.DataFrame.from_dict(rows, orient='index')
+        elif {'study_id', 'domain', 'question', 'answer'}.issubset(answers.columns):
+            column = answers['domain'].astype(str) + '.' + answers['question'].astype(str)
+            wide = answers.assign(column=column).pivot_table(
+                index='study_id', columns='column', values='answer', aggfunc='last')
+        else:
+            wide = answers.set_index('study_id') if 'study_id' in answers.columns else answers
+
+        unknown = set(wide.columns) - set(self.columns)
+        if unknown:
+            raise ValueError(f"Unknown signalling questions: {sorted(unknown)}")
+        wide = wide.reindex(columns=self.columns)
+        coded = pd.DataFrame({col: encode_answers(wide[col].to_numpy()) for col in self.columns},
+                             index=wide.index.astype(str))
+        coded.index.name = 'study_id'
+        return coded
+
+    def record_answers(self, answers: Union[pd.DataFrame, Dict[str, Dict[str, List[str]]]]) -> List[str]:
+        """Add or revise signalling answers; returns the studies whose answers changed
+
+        Accepts {study_id: {domain: [answers]}}, a long table (study_id, domain,
+        question number, answer) or a wide table with 'domain.n' columns. Questions
+        left blank in a revision keep their previous answer.
+        """
+
+        incoming = self._wide(answers)
+        incoming = incoming[~incoming.index.duplicated(keep='last')]
+        existing = self.answers.reindex(incoming.index)
+        known = incoming.index.isin(self.answers.index)
+
+        # Blank cells in a revision keep what was recorded before
+        merged = incoming.where(incoming != UNANSWERED, existing.fillna(UNANSWERED)).astype(np.int8)
+        changed = ~known | (merged.to_numpy() != existing.fillna(UNANSWERED).to_numpy()).any(axis=1)
+        changed_ids = merged.index[changed]
+
+        if len(changed_ids):
+            update = merged.loc[changed_ids]
+            self.answers = pd.concat([self.answers.drop(index=update.index, errors='ignore'), update]
+                                     ).astype(np.int8)
+            self.answers.index.name = 'study_id'
+            self._stale.update(changed_ids)
+        return list(changed_ids)
+
+    def assess(self) -> pd.DataFrame:
+        """Domain and overall judgements for every study, recomputing only stale rows"""
+
+        stale = [s for s in self.answers.index if s in self._stale or s not in self.judgements.index]
+        if stale:
+            codes = self.answers.loc[stale].to_numpy()
+            domain_codes = np.column_stack([
+                domain_judgements(codes[:, self._domain_slices[domain]], self.rules[domain])
+                for domain in self.domains
+            ])
+            fresh = pd.DataFrame(np.column_stack([domain_codes, overall_judgements(domain_codes)]),
+                                 index=pd.Index(stale, name='study_id'),
+                                 columns=self.judgements.columns).astype(np.int8)
+            self.judgements = pd.concat([self.judgements.drop(index=stale, errors='ignore'), fresh]
+                                        ).astype(np.int8)
+            logger.info(f"ROBINS-I: reassessed {len(stale)} of {len(self.answers)} studies")
+        self._stale.clear()
+
+        labels = self.judgements.reindex(self.answers.index).apply(
+            lambda col: pd.Categorical.from_codes(col, JUDGEMENTS))
+        labels['confidence_rating'] = labels['overall'].map(CONFIDENCE_RATINGS).astype(str)
+        return labels
+
+    def domain_summary(self, judgements: Optional[pd.DataFrame] = None) -> Dict[str, Dict[str, int]]:
+        """Count of studies per judgement, for each domain and overall"""
+
+        judgements = self.assess() if judgements is None else judgements
+        summary = {}
+        for column in list(self.domains) + ['overall']:
+            counts = judgements[column].value_counts()
+            summary[column] = {level: int(count) for level, count in counts.items() if count}
+        return summary
+
+    def answer_labels(self) -> pd.DataFrame:
+        """Signalling answers decoded back to Y/PY/PN/N/NI"""
+
+        labels = {code: answer for answer, code in ANSWER_CODES.items()}
+        labels[UNANSWERED] = ''
+        return self.answers.apply(lambda col: col.map(labels))
+
+    def save(self, path: Union[str, Path]):
+        """Persist answers and cached judgements so later runs reassess incrementally"""
+
+        self.assess()
+        table = self.answers.join(self.judgements.add_prefix('judgement.'))
+        table.to_csv(path)
+
+    @classmethod
+    def load(cls, path: Union[str, Path], domains: Optional[Dict[str, List[str]]] = None,
+             rules: Optional[Dict[str, List[str]]] = None) -> 'ROBINSIEngine':
+        """Restore an engine saved with save(); a missing file gives an empty engine"""
+
+        engine = cls(domains, rules)
+        if not Path(path).exists():
+            return engine
+
+        table = pd.read_csv(path, index_col='study_id', dtype={'study_id': str})
+        judgement_cols = [f'judgement.{c}' for c in engine.judgements.columns]
+        if list(table.columns) != engine.columns + judgement_cols:
+            logger.warning(f"ROBINS-I cache {path} does not match the current questions; ignoring it")
+            return engine
+        engine.answers = table[engine.columns].astype(np.int8)
+        engine.judgements = table[judgement_cols].set_axis(engine.judgements.columns, axis=1).astype(np.int8)
+        return engine
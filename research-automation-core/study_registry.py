@@ -0,0 +1,644 @@
+"""
+Cross-Project Study Registry
+Shared SQLite store of canonical studies, linked by DOI/PMID/NCT/title fingerprint, with cached metadata and extractions
+"""
+
+import os
+import re
+import json
+import hashlib
+import logging
+import unicodedata
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Any, Optional, Iterable, Tuple
+
+import pandas as pd
+
+from review_store import SQLiteConnectionPool, migrate, schema_version
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# One registry for every project in the repository unless STUDY_REGISTRY points elsewhere
+DEFAULT_REGISTRY_PATH = Path(os.environ.get('STUDY_REGISTRY',
+                                            Path(__file__).resolve().parents[1] / 'study_registry.db'))
+
+# Bibliographic columns kept on the studies row; anything else goes into metadata
+STUDY_FIELDS = ['pmid', 'doi', 'nct_id', 'title', 'abstract', 'authors', 'journal', 'year', 'url', 'oa_url']
+
+# Strong identifiers, in the order they are preferred for a new canonical ID
+ID_TYPES = ['pmid', 'doi', 'nct']
+
+# Titles shorter than this ("Editorial", "Correspondence") are too generic to link on
+MIN_FINGERPRINT_WORDS = 4
+
+# Column spellings found in the project CSVs, mapped onto registry fields
+FIELD_ALIASES = {
+    'pubmed_id': 'pmid',
+    'nct': 'nct_id',
+    'nctid': 'nct_id',
+    'free_pdf_url': 'oa_url',
+    'oa_link': 'oa_url',
+    'publication_year': 'year',
+    'publication_date': 'year',
+    'author': 'authors',
+    'abstract_text': 'abstract'
+}
+
+STUDY_REGISTRY_MIGRATIONS = [
+    (1, 'Canonical studies, identifier links, extractions and project membership', [
+        '''
+        CREATE TABLE IF NOT EXISTS studies (
+            canonical_id TEXT PRIMARY KEY,
+            pmid TEXT,
+            doi TEXT,
+            nct_id TEXT,
+            title TEXT,
+            title_fingerprint TEXT,
+            abstract TEXT,
+            authors TEXT,
+            journal TEXT,
+            year TEXT,
+            url TEXT,
+            oa_url TEXT,
+            metadata TEXT,
+            sources TEXT,
+            first_seen TEXT,
+            updated TEXT
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS study_links (
+            id_type TEXT NOT NULL,
+            id_value TEXT NOT NULL,
+            canonical_id TEXT NOT NULL,
+            PRIMARY KEY (id_type, id_value)
+        ) WITHOUT ROWID
+        ''',
+        'CREATE INDEX IF NOT EXISTS ix_study_links_canonical ON study_links (canonical_id)',
+        '''
+        CREATE TABLE IF NOT EXISTS extractions (
+            canonical_id TEXT NOT NULL,
+            project TEXT NOT NULL,
+            form TEXT NOT NULL,
+            data TEXT NOT NULL,
+            extracted TEXT,
+            PRIMARY KEY (canonical_id, project, form)
+        )
+        ''',
+        '''
+        CREATE TABLE IF NOT EXISTS project_studies (
+            project TEXT NOT NULL,
+            canonical_id TEXT NOT NULL,
+            added TEXT,
+            PRIMARY KEY (project, canonical_id)
+        ) WITHOUT ROWID
+        '''
+    ]),
+    (2, 'Identifier conflicts kept apart instead of merged', [
+        '''
+        CREATE TABLE IF NOT EXISTS study_conflicts (
+            canonical_id TEXT NOT NULL,
+            id_type TEXT NOT NULL,
+            registry_value TEXT NOT NULL,
+            record_value TEXT NOT NULL,
+            detected TEXT,
+            PRIMARY KEY (canonical_id, id_type, record_value)
+        )
+        '''
+    ])
+]
+
+
+def normalise_doi(value: Any) -> Optional[str]:
+    """Bare lower-case DOI from 'doi: 10.x/y', 'https://doi.org/10.x/y' and similar"""
+
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    match = re.search(r'10\.\d{4,9}/\S+', str(value))
+    return match.group(0).rstrip('.;,').lower() if match else None
+
+
+def normalise_pmid(value: Any) -> Optional[str]:
+    """PMID as a digit string; CSVs often carry it as a float ('40970967.0')"""
+
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    text = str(value).strip()
+    if text.endswith('.0'):
+        text = text[:-2]
+    return text if text.isdigit() else None
+
+
+def normalise_nct(value: Any) -> Optional[str]:
+    """ClinicalTrials.gov registration number (NCT + 8 digits)"""
+
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    match = re.search(r'NCT\d{8}', str(value).upper())
+    return match.group(0) if match else None
+
+
+def title_fingerprint(title: Any) -> Optional[str]:
+    """Hash of the title's words, ignoring case, accents and punctuation"""
+
+    if not title or (isinstance(title, float) and pd.isna(title)):
+        return None
+    text = unicodedata.normalize('NFKD', str(title)).encode('ascii', 'ignore').decode().lower()
+    words = re.findall(r'[a-z0-9]+', text)
+    if len(words) < MIN_FINGERPRINT_WORDS:
+        return None
+    return hashlib.sha1(' '.join(words).encode()).hexdigest()[:20]
+
+
+def _clean(value: Any) -> Optional[str]:
+    if value is None or (isinstance(value, float) and pd.isna(value)):
+        return None
+    text = str(value).strip()
+    return text or None
+
+
+def normalise_record(record: Dict[str, Any], source: Optional[str] = None) -> Dict[str, Any]:
+    """Map a search/CSV record onto registry fields; unknown keys are kept as metadata"""
+
+    fields = {}
+    metadata = {}
+    for key, value in record.items():
+        name = FIELD_ALIASES.get(str(key).strip().lower(), str(key).strip().lower())
+        if name in STUDY_FIELDS:
+            if _clean(value) is not None and name not in fields:
+                fields[name] = value
+        elif _clean(value) is not None:
+            metadata[name] = value if isinstance(value, (int, float, bool)) else str(value)
+
+    # Project CSVs keep the PubMed ID in a generic id column next to source=PubMed
+    record_source = str(record.get('source') or record.get('database') or source or '').lower()
+    if 'pmid' not in fields and record_source == 'pubmed':
+        fields['pmid'] = record.get('id') or record.get('study_id')
+    if 'nct_id' not in fields:
+        fields['nct_id'] = record.get('study_id') if record_source == 'clinicaltrials' else None
+
+    normalised = {name: _clean(fields.get(name)) for name in STUDY_FIELDS}
+    normalised['pmid'] = normalise_pmid(fields.get('pmid'))
+    normalised['doi'] = normalise_doi(fields.get('doi'))
+    normalised['nct_id'] = normalise_nct(fields.get('nct_id'))
+    if normalised['year']:
+        year = re.search(r'(19|20)\d{2}', normalised['year'])
+        normalised['year'] = year.group(0) if year else None
+    normalised['title_fingerprint'] = title_fingerprint(normalised['title'])
+    normalised['metadata'] = metadata
+    return normalised
+
+
+def record_identifiers(record: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """(id_type, value) pairs of a normalised record, strongest first"""
+
+    identifiers = []
+    if record.get('pmid'):
+        identifiers.append(('pmid', record['pmid']))
+    if record.get('doi'):
+        identifiers.append(('doi', record['doi']))
+    if record.get('nct_id'):
+        identifiers.append(('nct', record['nct_id']))
+    if record.get('title_fingerprint'):
+        identifiers.append(('title', record['title_fingerprint']))
+    return identifiers
+
+
+def parse_identifier(identifier: str) -> Tuple[str, str]:
+    """('pmid', '123') from 'pmid:123' or a bare PMID, DOI or NCT number"""
+
+    text = str(identifier).strip()
+    if ':' in text:
+        id_type, value = text.split(':', 1)
+        if id_type.lower() in ID_TYPES + ['title']:
+            id_type = id_type.lower()
+            normaliser = {'pmid': normalise_pmid, 'doi': normalise_doi, 'nct': normalise_nct}.get(id_type)
+            return id_type, (normaliser(value) if normaliser else value) or value
+    if normalise_pmid(text):
+        return 'pmid', normalise_pmid(text)
+    if normalise_nct(text):
+        return 'nct', normalise_nct(text)
+    if normalise_doi(text):
+        return 'doi', normalise_doi(text)
+    raise ValueError(f"Unrecognised study identifier: {identifier}")
+
+
+class StudyRegistry:
+    """Canonical study records shared by every project
+
+    Each study gets a canonical ID from the first strong identifier it was seen with
+    (e.g. 'pmid:40970967'); study_links maps every PMID, DOI, NCT number and title
+    fingerprint seen for it back to that ID. A record carrying strong identifiers that
+    point at two different studies merges them. Title fingerprints only match records
+    that have no known strong identifier, and never trigger a merge on their own.
+    """
+
+    def __init__(self, db_path: Optional[str] = None, pool_size: int = 4):
+        self.db_path = Path(db_path or DEFAULT_REGISTRY_PATH)
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self.pool = SQLiteConnectionPool(self.db_path, pool_size=pool_size)
+        migrate(self.pool, STUDY_REGISTRY_MIGRATIONS)
+
+    def close(self):
+        self.pool.close()
+
+    # Lookup
+
+    @staticmethod
+    def _resolve(conn, identifiers: List[Tuple[str, str]]) -> List[str]:
+        """Distinct canonical IDs the identifiers link to, strongest identifier first"""
+
+        found = []
+        for id_type, value in identifiers:
+            row = conn.execute('SELECT canonical_id FROM study_links WHERE id_type = ? AND id_value = ?',
+                               (id_type, value)).fetchone()
+            if row and row[0] not in found:
+                found.append(row[0])
+        return found
+
+    def resolve(self, identifier: str) -> Optional[str]:
+        """Canonical ID for a PMID, DOI, NCT number or 'type:value' identifier"""
+
+        id_type, value = parse_identifier(identifier)
+        rows = self.pool.execute('SELECT canonical_id FROM study_links WHERE id_type = ? AND id_value = ?',
+                                 (id_type, value))
+        return rows[0][0] if rows else None
+
+    def get(self, identifier: str) -> Optional[Dict[str, Any]]:
+        """Full cached record for any known identifier"""
+
+        canonical_id = self.resolve(identifier)
+        if not canonical_id:
+            return None
+        with self.pool.connection() as conn:
+            conn.row_factory = _dict_factory
+            try:
+                row = conn.execute('SELECT * FROM studies WHERE canonical_id = ?', (canonical_id,)).fetchone()
+            finally:
+                conn.row_factory = None
+        if row:
+            row['metadata'] = json.loads(row['metadata'] or '{}')
+            row['sources'] = json.loads(row['sources'] or '[]')
+        return row
+
+    def hydrate_pubmed(self, pmids: Iterable[Any]) -> Tuple[List[Dict[str, Any]], List[str]]:
+        """Cached records for PMIDs that have an abstract, plus the PMIDs still to fetch
+
+        Records come back in the shape multi_database_search's PubMed parser produces.
+        """
+
+        wanted = []
+        for pmid in pmids:
+            pmid = normalise_pmid(pmid)
+            if pmid and pmid not in wanted:
+                wanted.append(pmid)
+
+        records = {}
+        with self.pool.connection() as conn:
+            for start in range(0, len(wanted), 500):
+                chunk = wanted[start:start + 500]
+                placeholders = ','.join('?' * len(chunk))
+                rows = conn.execute(f'''
+                    SELECT l.id_value, s.doi, s.title, s.abstract, s.authors, s.journal, s.year, s.oa_url
+                    FROM study_links l JOIN studies s ON s.canonical_id = l.canonical_id
+                    WHERE l.id_type = 'pmid' AND l.id_value IN ({placeholders}) AND s.abstract IS NOT NULL
+                ''', chunk).fetchall()
+                for pmid, doi, title, abstract, authors, journal, year, oa_url in rows:
+                    records[pmid] = {
+                        'pmid': pmid,
+                        'doi': doi or '',
+                        'title': title or '',
+                        'abstract': abstract or '',
+                        'authors': authors or '',
+                        'journal': journal or '',
+                        'year': year or '',
+                        'database': 'pubmed',
+                        'url': f"https://pubmed.ncbi.nlm.nih.gov/{pmid}/",
+                        'oa_url': oa_url
+                    }
+
+        missing = [pmid for pmid in wanted if pmid not in records]
+        return [records[pmid] for pmid in wanted if pmid in records], missing
+
+    # Ingest
+
+    def upsert(self, records: Iterable[Dict[str, Any]], project: Optional[str] = None,
+               source: Optional[str] = None) -> Dict[str, Any]:
+        """Add or enrich studies in one transaction; returns canonical IDs in input order
+
+        Existing values are kept and only blanks are filled, except oa_url, which is
+        replaced by the newest link found. Extra fields are merged into metadata.
+        """
+
+        now = datetime.now().isoformat()
+        summary = {'inserted': 0, 'updated': 0, 'merged': 0, 'conflicts': 0, 'skipped': 0, 'canonical_ids': []}
+
+        with self.pool.transaction() as conn:
+            for raw in records:
+                record = normalise_record(raw, source)
+                identifiers = record_identifiers(record)
+                if not identifiers:
+                    summary['skipped'] += 1
+                    summary['canonical_ids'].append(None)
+                    continue
+
+                strong = [i for i in identifiers if i[0] != 'title']
+                matches, conflicting = [], []
+                for id_type, value in strong:
+                    candidate = self._resolve(conn, [(id_type, value)])
+                    if not candidate or candidate[0] in matches:
+                        continue
+                    if self._compatible(conn, candidate[0], record):
+                        matches.append(candidate[0])
+                    else:
+                        if candidate[0] not in conflicting:
+                            self._record_conflict(conn, candidate[0], record, now)
+                            summary['conflicts'] += 1
+                            conflicting.append(candidate[0])
+                        # The identifier stays with the study that already owns it
+                        record[{'nct': 'nct_id'}.get(id_type, id_type)] = None
+                if not matches and record['title_fingerprint']:
+                    # A title match must not join studies whose PMIDs/DOIs/NCT numbers differ
+                    matches = [candidate for candidate in
+                               self._resolve(conn, [('title', record['title_fingerprint'])])
+                               if self._compatible(conn, candidate, record)]
+
+                if matches:
+                    canonical_id = matches[0]
+                    self._enrich(conn, canonical_id, record, source, now)
+                    for other in matches[1:]:
+                        if self._compatible(conn, other, self._identity(conn, canonical_id)):
+                            self._merge(conn, canonical_id, other, now)
+                            summary['merged'] += 1
+                        else:
+                            self._record_conflict(conn, other, self._identity(conn, canonical_id), now)
+                            summary['conflicts'] += 1
+                    summary['updated'] += 1
+                else:
+                    canonical_id = self._new_canonical_id(conn, identifiers)
+                    conn.execute(f'''
+                        INSERT INTO studies (canonical_id, {', '.join(STUDY_FIELDS)}, title_fingerprint,
+                                             metadata, sources, first_seen, updated)
+                        VALUES ({', '.join('?' * (len(STUDY_FIELDS) + 6))})
+                    ''', [canonical_id] + [record[f] for f in STUDY_FIELDS] + [
+                        record['title_fingerprint'], json.dumps(record['metadata'], default=str),
+                        json.dumps([source] if source else []), now, now])
+                    summary['inserted'] += 1
+
+                # Title links never move an existing fingerprint to another study
+                conn.executemany('''
+                    INSERT INTO study_links (id_type, id_value, canonical_id) VALUES (?, ?, ?)
+                    ON CONFLICT (id_type, id_value) DO NOTHING
+                ''', [(id_type, value, canonical_id) for id_type, value in identifiers])
+                if project:
+                    conn.execute('INSERT OR IGNORE INTO project_studies (project, canonical_id, added) VALUES (?, ?, ?)',
+                                 (project, canonical_id, now))
+                summary['canonical_ids'].append(canonical_id)
+
+        logger.info(f"Registry upsert: {summary['inserted']} new, {summary['updated']} known, "
+                    f"{summary['merged']} merged, {summary['conflicts']} conflicts, "
+                    f"{summary['skipped']} without identifiers")
+        return summary
+
+    @staticmethod
+    def _identity(conn, canonical_id: str) -> Dict[str, Any]:
+        row = conn.execute('SELECT pmid, doi, nct_id FROM studies WHERE canonical_id = ?',
+                           (canonical_id,)).fetchone()
+        return dict(zip(['pmid', 'doi', 'nct_id'], row or (None, None, None)))
+
+    def _compatible(self, conn, canonical_id: str, record: Dict[str, Any]) -> bool:
+        """False when the study and record carry different values for any strong identifier"""
+
+        study = self._identity(conn, canonical_id)
+        return all(not study[field] or not record.get(field) or study[field] == record[field]
+                   for field in ('pmid', 'doi', 'nct_id'))
+
+    def _record_conflict(self, conn, canonical_id: str, record: Dict[str, Any], now: str):
+        """Keep a study and a clashing record apart, noting the identifiers that disagree"""
+
+        study = self._identity(conn, canonical_id)
+        for field in ('pmid', 'doi', 'nct_id'):
+            if study[field] and record.get(field) and study[field] != record[field]:
+                conn.execute('''
+                    INSERT OR IGNORE INTO study_conflicts (canonical_id, id_type, registry_value, record_value, detected)
+                    VALUES (?, ?, ?, ?, ?)
+                ''', (canonical_id, field, study[field], record[field], now))
+                logger.warning(f"Identifier conflict on {canonical_id}: {field} {study[field]} vs {record[field]}")
+
+    @staticmethod
+    def _new_canonical_id(conn, identifiers: List[Tuple[str, str]]) -> str:
+        """First identifier not already used as a canonical ID (they stay stable once issued)"""
+
+        for id_type, value in identifiers:
+            candidate = f"{id_type}:{value}"
+            if not conn.execute('SELECT 1 FROM studies WHERE canonical_id = ?', (candidate,)).fetchone():
+                return candidate
+        id_type, value = identifiers[0]
+        suffix = 2
+        while conn.execute('SELECT 1 FROM studies WHERE canonical_id = ?', (f"{id_type}:{value}#{suffix}",)).fetchone():
+            suffix += 1
+        return f"{id_type}:{value}#{suffix}"
+
+    @staticmethod
+    def _enrich(conn, canonical_id: str, record: Dict[str, Any], source: Optional[str], now: str):
+        row = conn.execute(f'''
+            SELECT {', '.join(STUDY_FIELDS)}, title_fingerprint, metadata, sources
+            FROM studies WHERE canonical_id = ?
+        ''', (canonical_id,)).fetchone()
+        current = dict(zip(STUDY_FIELDS + ['title_fingerprint', 'metadata', 'sources'], row))
+
+        updates = {}
+        for field in STUDY_FIELDS + ['title_fingerprint']:
+            if record.get(field) and (not current[field] or field == 'oa_url') and record[field] != current[field]:
+                updates[field] = record[field]
+        metadata = json.loads(current['metadata'] or '{}')
+        new_metadata = {k: v for k, v in record['metadata'].items() if k not in metadata}
+        if new_metadata:
+            updates['metadata'] = json.dumps({**metadata, **new_metadata}, default=str)
+        sources = json.loads(current['sources'] or '[]')
+        if source and source not in sources:
+            updates['sources'] = json.dumps(sources + [source])
+        if not updates:
+            return
+
+        updates['updated'] = now
+        assignments = ', '.join(f"{field} = ?" for field in updates)
+        conn.execute(f'UPDATE studies SET {assignments} WHERE canonical_id = ?',
+                     list(updates.values()) + [canonical_id])
+
+    def _merge(self, conn, keep: str, other: str, now: str):
+        """Fold study other into keep: links, extractions, projects and any blank fields"""
+
+        row = conn.execute(f'''
+            SELECT {', '.join(STUDY_FIELDS)}, title_fingerprint, metadata, sources
+            FROM studies WHERE canonical_id = ?
+        ''', (other,)).fetchone()
+        if row:
+            record = dict(zip(STUDY_FIELDS + ['title_fingerprint', 'metadata', 'sources'], row))
+            record['metadata'] = json.loads(record['metadata'] or '{}')
+            self._enrich(conn, keep, record, None, now)
+            for merged_source in json.loads(record['sources'] or '[]'):
+                self._enrich(conn, keep, {'metadata': {}}, merged_source, now)
+
+        conn.execute('UPDATE study_links SET canonical_id = ? WHERE canonical_id = ?', (keep, other))
+        conn.execute('UPDATE OR IGNORE extractions SET canonical_id = ? WHERE canonical_id = ?', (keep, other))
+        conn.execute('UPDATE OR IGNORE project_studies SET canonical_id = ? WHERE canonical_id = ?', (keep, other))
+        conn.execute('DELETE FROM extractions WHERE canonical_id = ?', (other,))
+        conn.execute('DELETE FROM project_studies WHERE canonical_id = ?', (other,))
+        conn.execute('DELETE FROM studies WHERE canonical_id = ?', (other,))
+        logger.info(f"Merged study {other} into {keep}")
+
+    def set_oa_links(self, links: Dict[str, str]) -> int:
+        """Record open-access PDF links keyed by any study identifier (e.g. from oa_pdf_enricher)"""
+
+        now = datetime.now().isoformat()
+        updated = 0
+        for identifier, url in links.items():
+            canonical_id = self.resolve(identifier)
+            if canonical_id and _clean(url):
+                self.pool.execute('UPDATE studies SET oa_url = ?, updated = ? WHERE canonical_id = ?',
+                                  (url, now, canonical_id))
+                updated += 1
+        return updated
+
+    # Extractions
+
+    def record_extraction(self, identifier: str, project: str, data: Dict[str, Any],
+                          form: str = 'default') -> str:
+        """Store one project's extraction for a study, replacing any earlier version"""
+
+        canonical_id = self.resolve(identifier)
+        if not canonical_id:
+            raise KeyError(f"Study not in registry: {identifier}")
+        now = datetime.now().isoformat()
+        with self.pool.transaction() as conn:
+            conn.execute('''
+                INSERT INTO extractions (canonical_id, project, form, data, extracted) VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT (canonical_id, project, form) DO UPDATE SET
+                    data = excluded.data, extracted = excluded.extracted
+            ''', (canonical_id, project, form, json.dumps(data, default=str), now))
+            conn.execute('INSERT OR IGNORE INTO project_studies (project, canonical_id, added) VALUES (?, ?, ?)',
+                         (project, canonical_id, now))
+        return canonical_id
+
+    def get_extractions(self, identifier: str, form: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Every project's extraction for a study, newest first"""
+
+        canonical_id = self.resolve(identifier)
+        if not canonical_id:
+            return []
+        sql = 'SELECT project, form, data, extracted FROM extractions WHERE canonical_id = ?'
+        params = [canonical_id]
+        if form:
+            sql += ' AND form = ?'
+            params.append(form)
+        rows = self.pool.execute(sql + ' ORDER BY extracted DESC', params)
+        return [{'canonical_id': canonical_id, 'project': project, 'form': row_form,
+                 'data': json.loads(data), 'extracted': extracted}
+                for project, row_form, data, extracted in rows]
+
+    # Projects and reporting
+
+    def project_studies(self, project: str) -> pd.DataFrame:
+        """Studies linked to a project, with their cached metadata"""
+
+        with self.pool.connection() as conn:
+            return pd.read_sql_query(f'''
+                SELECT s.canonical_id, {', '.join('s.' + f for f in STUDY_FIELDS)}
+                FROM project_studies p JOIN studies s ON s.canonical_id = p.canonical_id
+                WHERE p.project = ? ORDER BY p.added
+            ''', conn, params=(project,))
+
+    def backfill_csv(self, csv_path: str, project: Optional[str] = None,
+                     source: Optional[str] = None) -> Dict[str, Any]:
+        """Load an existing project's search/dedup CSV into the registry"""
+
+        csv_path = Path(csv_path)
+        project = project or csv_path.parent.name
+        df = pd.read_csv(csv_path, dtype=str)
+        summary = self.upsert(df.to_dict('records'), project=project, source=source)
+        summary['file'] = str(csv_path)
+        summary['project'] = project
+        return summary
+
+    def stats(self) -> Dict[str, Any]:
+        """Registry size, identifier coverage and cross-project reuse"""
+
+        def scalar(sql: str) -> int:
+            return self.pool.execute(sql)[0][0]
+
+        return {
+            'database': str(self.db_path),
+            'schema_version': schema_version(self.pool),
+            'studies': scalar('SELECT COUNT(*) FROM studies'),
+            'with_pmid': scalar('SELECT COUNT(*) FROM studies WHERE pmid IS NOT NULL'),
+            'with_doi': scalar('SELECT COUNT(*) FROM studies WHERE doi IS NOT NULL'),
+            'with_abstract': scalar('SELECT COUNT(*) FROM studies WHERE abstract IS NOT NULL'),
+            'with_oa_url': scalar('SELECT COUNT(*) FROM studies WHERE oa_url IS NOT NULL'),
+            'extractions': scalar('SELECT COUNT(*) FROM extractions'),
+            'conflicts': scalar('SELECT COUNT(*) FROM study_conflicts'),
+            'projects': scalar('SELECT COUNT(DISTINCT project) FROM project_studies'),
+            'shared_studies': scalar('''
+                SELECT COUNT(*) FROM (SELECT canonical_id FROM project_studies
+                                      GROUP BY canonical_id HAVING COUNT(*) > 1)
+            ''')
+        }
+
+    def export(self, output_path: str) -> str:
+        """Write the studies table to .parquet (needs pyarrow) or .csv"""
+
+        with self.pool.connection() as conn:
+            df = pd.read_sql_query('SELECT * FROM studies ORDER BY canonical_id', conn)
+        if str(output_path).endswith('.parquet'):
+            df.to_parquet(output_path, index=False)
+        else:
+            df.to_csv(output_path, index=False)
+        logger.info(f"Exported {len(df)} studies to {output_path}")
+        return str(output_path)
+
+
+def _dict_factory(cursor, row) -> Dict[str, Any]:
+    return {column[0]: value for column, value in zip(cursor.description, row)}
+
+
+# CLI Interface
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Cross-project study registry")
+    parser.add_argument("command", choices=['backfill', 'stats', 'lookup', 'export'], help="Command to execute")
+    parser.add_argument("paths", nargs='*', help="CSV files to backfill, or the export file")
+    parser.add_argument("--db", help="Registry database (default: $STUDY_REGISTRY or study_registry.db)")
+    parser.add_argument("--project", help="Project name for backfilled records (default: the CSV's folder)")
+    parser.add_argument("--id", help="PMID, DOI or NCT number to look up")
+
+    args = parser.parse_args()
+    registry = StudyRegistry(args.db)
+
+    if args.command == 'backfill':
+        for path in args.paths:
+            result = registry.backfill_csv(path, project=args.project)
+            print(f"{result['file']} ({result['project']}): {result['inserted']} new, "
+                  f"{result['updated']} known, {result['merged']} merged, {result['conflicts']} conflicts, "
+                  f"{result['skipped']} skipped")
+
+    elif args.command == 'stats':
+        for key, value in registry.stats().items():
+            print(f"{key}: {value}")
+
+    elif args.command == 'lookup':
+        study = registry.get(args.id)
+        if study:
+            print(json.dumps(study, indent=2, default=str))
+            for extraction in registry.get_extractions(args.id):
+                print(f"extraction [{extraction['project']}/{extraction['form']}] {extraction['extracted']}")
+        else:
+            print(f"{args.id} is not in the registry")
+
+    elif args.command == 'export':
+        print(f"Exported to {registry.export(args.paths[0] if args.paths else 'study_registry.parquet')}")
+
+    registry.close()
@@ -0,0 +1,192 @@
+"""
+Time-Series Plotting Layer
+Server-side LTTB / min-max decimation and automatic WebGL traces for large Plotly series
+"""
+
+import pandas as pd
+import numpy as np
+import logging
+from typing import List, Any, Optional, Tuple, Union
+
+import plotly.graph_objects as go
+
+# Setup logging
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+# Above this many points an SVG trace gets sluggish; switch to WebGL
+WEBGL_THRESHOLD = 5000
+
+# Points sent per trace: a few per horizontal pixel of a typical chart
+DEFAULT_MAX_POINTS = 2000
+
+
+def _as_numeric(x: np.ndarray) -> np.ndarray:
+    """Float view of an x axis; datetimes are converted to int64 nanoseconds"""
+
+    if np.issubdtype(x.dtype, np.datetime64):
+        return x.astype('datetime64[ns]').astype(np.int64).astype(float)
+    return x.astype(float)
+
+
+def _bucket_edges(n: int, n_buckets: int) -> np.ndarray:
+    """Edges of n_buckets near-equal index buckets over range(1, n - 1)"""
+
+    return np.linspace(1, n - 1, n_buckets + 1).astype(int)
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, n_out: int) -> np.ndarray:
+    """Largest-Triangle-Three-Buckets: indices of n_out points preserving visual shape"""
+
+    n = len(y)
+    if n_out >= n or n_out < 3:
+        return np.arange(n)
+
+    edges = _bucket_edges(n, n_out - 2)
+    # Bucket averages are independent of the selection, so compute them up front
+    sums_x = np.add.reduceat(x[1:n - 1], edges[:-1] - 1)
+    sums_y = np.add.reduceat(y[1:n - 1], edges[:-1] - 1)
+    counts = np.diff(edges)
+    avg_x = np.append(sums_x / counts, x[-1])
+    avg_y = np.append(sums_y / counts, y[-1])
+
+    selected = np.empty(n_out, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+    a = 0
+    for b in range(n_out - 2):
+        lo, hi = edges[b], edges[b + 1]
+        cx, cy = avg_x[b + 1], avg_y[b + 1]
+        # Twice the triangle area formed with the previous pick and the next bucket's mean
+        area = np.abs((x[a] - cx) * (y[lo:hi] - y[a]) - (x[a] - x[lo:hi]) * (cy - y[a]))
+        a = lo + int(np.argmax(area))
+        selected[b + 1] = a
+    return selected
+
+
+def minmax_indices(y: np.ndarray, n_out: int) -> np.ndarray:
+    """Min and max of every bucket; keeps spikes that LTTB may smooth over"""
+
+    n = len(y)
+    if n_out >= n or n_out < 4:
+        return np.arange(n)
+
+    # Two picks per bucket plus both endpoints stays within n_out
+    n_buckets = (n_out - 2) // 2
+    edges = np.linspace(0, n, n_buckets + 1).astype(int)
+    bucket = np.repeat(np.arange(n_buckets), np.diff(edges))
+
+    # Sorting on (bucket, value) puts each bucket's min first and max last
+    order = np.lexsort((y, bucket))
+    first = edges[:-1]
+    last = edges[1:] - 1
+    picks = np.concatenate([order[first], order[last], [0, n - 1]])
+    return np.unique(picks)
+
+
+def decimate(x: Union[np.ndarray, pd.Series, List], y: Union[np.ndarray, pd.Series, List],
+             max_points: int = DEFAULT_MAX_POINTS, method: str = 'lttb',
+             x_range: Optional[Tuple[Any, Any]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Reduce a series to at most max_points within the visible x_range
+
+    Passing the current viewport as x_range is what gives zoomed views more detail:
+    the same point budget is spent on a narrower window.
+    """
+
+    x = np.asarray(x)
+    y = np.asarray(y, dtype=float)
+    x_num = _as_numeric(x)
+
+    if x_range is not None:
+        lo, hi = (_as_numeric(np.asarray([v]).astype(x.dtype))[0] for v in x_range)
+        # Keep one point either side so lines run to the viewport edge
+        start = max(int(np.searchsorted(x_num, lo, side='left')) - 1, 0)
+        stop = min(int(np.searchsorted(x_num, hi, side='right')) + 1, len(x))
+        x, y, x_num = x[start:stop], y[start:stop], x_num[start:stop]
+
+    finite = np.isfinite(y)
+    if not finite.all():
+        x, y, x_num = x[finite], y[finite], x_num[finite]
+
+    if len(y) <= max_points:
+        return x, y
+
+    if method == 'minmax':
+        idx = minmax_indices(y, max_points)
+    elif method == 'lttb':
+        idx = lttb_indices(x_num, y, max_points)
+    else:
+        raise ValueError(f"Unknown decimation method: {method}")
+    return x[idx], y[idx]
+
+
+def series_trace(x: Union[np.ndarray, pd.Series, List], y: Union[np.ndarray, pd.Series, List],
+                 max_points: int = DEFAULT_MAX_POINTS, method: str = 'lttb',
+                 x_range: Optional[Tuple[Any, Any]] = None,
+                 webgl_threshold: int = WEBGL_THRESHOLD, **kwargs) -> Union[go.Scatter, go.Scattergl]:
+    """Drop-in for go.Scatter: decimates server-side and switches to Scattergl when large
+
+    Categorical x axes (strings) are passed through untouched.
+    """
+
+    x_arr = np.asarray(x)
+    n_raw = len(x_arr)
+    if x_arr.dtype.kind in 'OUS':
+        xs, ys = x_arr, np.asarray(y)
+    else:
+        xs, ys = decimate(x_arr, y, max_points, method, x_range)
+
+    if len(xs) < n_raw:
+        # Markers on a decimated line would suggest observations that are not there
+        if kwargs.get('mode') == 'lines+markers':
+            kwargs['mode'] = 'lines'
+        logger.debug(f"Decimated {n_raw} points to {len(xs)}")
+
+    trace_cls = go.Scattergl if n_raw > webgl_threshold else go.Scatter
+    return trace_cls(x=xs, y=ys, **kwargs)
+
+
+def grouped_traces(data: pd.DataFrame, x_col: str, y_col: str, group_col: str,
+                   max_points: int = DEFAULT_MAX_POINTS, method: str = 'minmax',
+                   x_range: Optional[Tuple[Any, Any]] = None,
+                   max_total_points: int = 200000, **kwargs) -> List[Union[go.Scatter, go.Scattergl]]:
+    """One decimated trace per group (e.g. district), with a global point budget
+
+    The per-trace budget shrinks as the number of groups grows so the payload sent to
+    the browser stays bounded however many districts are plotted.
+    """
+
+    groups = data.groupby(group_col, sort=True)
+    per_trace = max(min(max_points, max_total_points // max(groups.ngroups, 1)), 10)
+    # Many groups always go to WebGL: thousands of SVG paths are the expensive part
+    threshold = 0 if groups.ngroups * per_trace > WEBGL_THRESHOLD else WEBGL_THRESHOLD
+
+    traces = []
+    for name, group in groups:
+        group = group.sort_values(x_col)
+        traces.append(series_trace(group[x_col].to_numpy(), group[y_col].to_numpy(),
+                                   per_trace, method, x_range, webgl_threshold=threshold,
+                                   name=str(name), **kwargs))
+    return traces
+
+
+def streamlit_viewport(st, x: Union[np.ndarray, pd.Series], key: str,
+                       label: str = "Zoom window") -> Optional[Tuple[Any, Any]]:
+    """Range slider whose value is passed back to decimate() as the viewport
+
+    Streamlit does not round-trip Plotly zoom events, so the slider is the control
+    that pulls in more detail on demand.
+    """
+
+    x = pd.Series(x).dropna()
+    if x.empty:
+        return None
+    lo, hi = x.min(), x.max()
+    if hasattr(lo, 'to_pydatetime'):
+        lo, hi = lo.to_pydatetime(), hi.to_pydatetime()
+    elif isinstance(lo, (np.integer, np.floating)):
+        lo, hi = lo.item(), hi.item()
+    if lo == hi:
+        return None
+    window = st.slider(label, min_value=lo, max_value=hi, value=(lo, hi), key=key)
+    return None if tuple(window) == (lo, hi) else tuple(window)
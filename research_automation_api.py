@@ -20,6 +20,18 @@ CORS(app)
 
 # Database path
 DATABASE = 'research_automation.db'
+LIVING_REVIEWS_DATABASE = 'living_reviews.db'
+
+_living_review_manager = None
+
+def get_living_review_manager():
+    """Shared living review manager (its connection pool is reused across requests)"""
+    global _living_review_manager
+    if _living_review_manager is None:
+        sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'research-automation-core'))
+        from living_review_manager import LivingReviewManager
+        _living_review_manager = LivingReviewManager(LIVING_REVIEWS_DATABASE)
+    return _living_review_manager
 
 def get_db():
     """Get database connection"""
@@ -296,6 +308,34 @@ def quality_assessment():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/living-reviews/search', methods=['GET'])
+def search_living_review_evidence():
+    """Full-text search over living review evidence (BM25-ranked, with highlighted snippets)"""
+    try:
+        query = request.args.get('q', '').strip()
+        if not query:
+            return jsonify({'error': 'Search query (q) required'}), 400
+
+        limit = min(request.args.get('limit', 20, type=int), 200)
+        results = get_living_review_manager().search_evidence(
+            query,
+            review_id=request.args.get('review_id'),
+            inclusion_status=request.args.get('status'),
+            limit=limit
+        )
+
+        return jsonify({
+            'success': True,
+            'query': query,
+            'count': len(results),
+            'data': results
+        })
+
+    except sqlite3.OperationalError as e:
+        return jsonify({'error': f'Invalid search query: {str(e)}'}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.errorhandler(404)
 def not_found(error):
     return jsonify({'error': 'Endpoint not found'}), 404
@@ -376,6 +416,7 @@ if __name__ == '__main__':
     print("  POST /api/manuscripts/generate - Generate manuscript section")
     print("  GET  /api/projects/{id}/export - Export comprehensive report")
     print("  POST /api/quality-assessment   - Automated quality assessment")
+    print("  GET  /api/living-reviews/search - Full-text living review evidence search")
     print("=" * 70)
 
     # Initialize demo data